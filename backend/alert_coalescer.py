@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("alert_coalescer")
+
+class AlertGroup:
+    def __init__(self, kind: str, key: str, now: float, window: float):
+        """
+        Alerts of one kind and key, such as unknown visitors at one location,
+        collected during one window
+
+        Args:
+            kind: Alert type, e.g. "unknown_visitor"
+            key: What alerts are grouped by within the type, e.g. the location
+            now: Time the group opened
+            window: Seconds until the group is flushed
+        """
+        self.kind = kind
+        self.key = key
+        self.closes_at = now + window
+        self.count = 0
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.events: List[dict] = []
+
+    def add(self, event: dict, now: float, keep: int):
+        self.count += 1
+        if self.first is None:
+            self.first = now
+        self.last = now
+        if len(self.events) < keep:
+            self.events.append(event)
+
+    def to_alert(self, digest: bool) -> dict:
+        return {
+            "kind": self.kind,
+            "key": self.key,
+            "digest": digest,
+            "count": self.count,
+            "first": self.first,
+            "last": self.last,
+            "events": self.events,
+        }
+
+class AlertCoalescer:
+    def __init__(self, emit: Callable[[dict], None], window: float = 60.0, keep_events: int = 10):
+        """
+        Group repeated alerts into digests
+
+        The first alert of a kind and key is emitted at once. Alerts with the
+        same kind and key that follow within ``window`` seconds are only
+        counted. When the window ends, they are emitted as one digest with the
+        count and the times of the first and last, and a new window starts.
+        A window with no further alerts closes the group, so the next alert
+        is emitted at once again. A crowd at one entrance then produces one
+        alert and one digest per window, not one alert per face.
+
+        Each alert passed to ``emit`` is a dict with "kind", "key", "digest"
+        (False for an alert emitted at once), "count", "first" and "last"
+        (epoch seconds) and up to ``keep_events`` of the grouped "events".
+
+        Args:
+            emit: Called with every alert and digest, on the caller's thread
+                for first alerts and on the coalescer's thread for digests
+            window: Seconds alerts are grouped for, 0 emits every alert
+            keep_events: Events kept per digest as examples
+        """
+        self.emit = emit
+        self.window = window
+        self.keep_events = keep_events
+        self.groups: Dict[Tuple[str, str], AlertGroup] = {}
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        self.received = 0
+        self.emitted = 0
+        self.digests = 0
+
+    def start(self):
+        """Start flushing digests when their windows end"""
+        with self.condition:
+            if self.running:
+                return self
+            self.running = True
+        self.thread = threading.Thread(target=self._flush_loop, name="alert-coalescer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, flush: bool = True):
+        """
+        Stop the flusher
+
+        Args:
+            flush: Emit the digests of open windows now instead of dropping them
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=5.0)
+            self.thread = None
+        with self.condition:
+            groups = list(self.groups.values())
+            self.groups.clear()
+        if flush:
+            for group in groups:
+                if group.count:
+                    self._emit(group.to_alert(digest=True))
+
+    def add(self, kind: str, key: str, event: dict) -> bool:
+        """
+        Report one alert
+
+        Args:
+            kind: Alert type
+            key: What alerts of this type are grouped by
+            event: Details of this alert
+
+        Returns:
+            True if the alert was emitted at once, False if it will be part of a digest
+        """
+        now = time.time()
+        immediate = None
+        with self.condition:
+            self.received += 1
+            group = self.groups.get((kind, key))
+            if group is None:
+                immediate = AlertGroup(kind, key, now, self.window)
+                immediate.add(event, now, self.keep_events)
+                # Without the flusher a digest would never be sent, so only group while running
+                if self.window > 0 and self.running:
+                    self.groups[(kind, key)] = AlertGroup(kind, key, now, self.window)
+                    self.condition.notify()
+            else:
+                group.add(event, now, self.keep_events)
+
+        if immediate is None:
+            return False
+        self._emit(immediate.to_alert(digest=False))
+        return True
+
+    def _emit(self, alert: dict):
+        with self.condition:
+            self.emitted += 1
+            if alert["digest"]:
+                self.digests += 1
+        try:
+            self.emit(alert)
+        except Exception as e:
+            logger.error(f"Failed to emit {alert['kind']} alert for {alert['key']}: {str(e)}")
+
+    def _flush_loop(self):
+        while True:
+            due = []
+            with self.condition:
+                if not self.running:
+                    return
+                now = time.time()
+                for group_key, group in list(self.groups.items()):
+                    if group.closes_at > now:
+                        continue
+                    if group.count:
+                        due.append(group)
+                        # Still busy: keep grouping for another window
+                        self.groups[group_key] = AlertGroup(group.kind, group.key, now, self.window)
+                    else:
+                        del self.groups[group_key]
+                if not due:
+                    next_close = min((group.closes_at for group in self.groups.values()), default=None)
+                    self.condition.wait(None if next_close is None else max(0.0, next_close - now))
+                    continue
+            for group in due:
+                self._emit(group.to_alert(digest=True))
+
+    def get_stats(self) -> dict:
+        with self.condition:
+            return {
+                "received": self.received,
+                "emitted": self.emitted,
+                "digests": self.digests,
+                "open_groups": len(self.groups),
+                "suppressed": self.received - (self.emitted - self.digests),
+            }
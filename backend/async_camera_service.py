@@ -0,0 +1,390 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import aiohttp
+import cv2
+import numpy as np
+
+from camera_service import RECONNECT_AFTER, CameraService
+from frame_payload import build_frame_request, rejects_binary
+from frame_reader import LatestFrameReader
+from metrics import RateLimitedLog
+
+logger = logging.getLogger("async_camera_service")
+log_limiter = RateLimitedLog(logger)
+
+DEFAULT_STREAM_FPS = 25.0  # Assumed when a capture does not report its frame rate
+
+class AsyncCameraService(CameraService):
+    def __init__(
+        self,
+        backend_url: str,
+        api_token: str,
+        capture_workers: int = 8,
+        encode_workers: int = 4,
+        max_inflight_uploads: int = 32,
+        **kwargs
+    ):
+        """
+        Camera service driven by a single asyncio event loop
+
+        Instead of one thread per camera, one event loop schedules every camera.
+        Blocking ``VideoCapture`` calls run on a bounded capture pool and
+        ``cv2.imencode`` runs on a bounded encode pool (OpenCV releases the GIL
+        for both). Uploads use aiohttp with a shared connection limit. A camera
+        never has more than one upload in flight. If the previous upload is
+        still running when the next frame is due, that frame is skipped.
+
+        With capture_mode "sequential", each read first grabs past the frames
+        the stream buffered since the previous read and then decodes the
+        newest one, so a camera processed once a second does not fall behind
+        a 25 fps stream. "latest" drains each stream on a LatestFrameReader
+        thread instead, which costs a thread per camera but never waits for
+        the buffer to be skipped.
+
+        The public API is the same as CameraService.
+
+        Args:
+            backend_url: URL of the backend API
+            api_token: JWT token for API authentication
+            capture_workers: Threads used for blocking capture reads
+            encode_workers: Threads used for JPEG encoding
+            max_inflight_uploads: Maximum concurrent uploads across all cameras
+            **kwargs: Passed on to CameraService
+        """
+        super().__init__(backend_url, api_token, **kwargs)
+
+        self.capture_pool = ThreadPoolExecutor(max_workers=capture_workers, thread_name_prefix="capture")
+        self.encode_pool = ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix="encode")
+        self.max_inflight_uploads = max_inflight_uploads
+
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.loop_thread.start()
+
+        self.http: Optional[aiohttp.ClientSession] = None
+        self.camera_tasks: Dict[int, asyncio.Task] = {}  # Camera ID -> Task
+        self.uploads: Dict[int, asyncio.Task] = {}  # Camera ID -> In-flight upload
+        self.skipped_uploads: Dict[int, int] = {}  # Camera ID -> Frames skipped by backpressure
+
+        self._call(self._open_http())
+
+    def _run_loop(self):
+        """Run the event loop on its own thread"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _call(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the engine loop and wait for the result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def _open_http(self):
+        connector = aiohttp.TCPConnector(limit=self.max_inflight_uploads)
+        self.http = aiohttp.ClientSession(
+            connector=connector,
+            headers={"Authorization": f"Bearer {self.api_token}"},
+            timeout=aiohttp.ClientTimeout(total=self.upload_timeout)
+        )
+
+    def start_camera(self, camera_id: int):
+        """
+        Start processing a camera feed
+
+        Args:
+            camera_id: ID of the camera to start
+        """
+        if camera_id not in self.cameras:
+            logger.error(f"Camera {camera_id} not found")
+            return False
+
+        task = self.camera_tasks.get(camera_id)
+        if task is not None and not task.done():
+            logger.warning(f"Camera {camera_id} is already running")
+            return True
+
+        camera = self.cameras[camera_id]
+        self.running[camera_id] = True
+        self._prepare_pipeline(camera_id)
+        self.skipped_uploads.setdefault(camera_id, 0)
+
+        self._call(self._start_task(camera_id, camera["url"]))
+
+        logger.info(f"Started camera {camera_id} - {camera['name']}")
+        return True
+
+    async def _start_task(self, camera_id: int, camera_url: str):
+        self.camera_tasks[camera_id] = asyncio.create_task(self._camera_loop(camera_id, camera_url))
+
+    def stop_camera(self, camera_id: int):
+        """
+        Stop processing a camera feed
+
+        Args:
+            camera_id: ID of the camera to stop
+        """
+        if camera_id not in self.running:
+            logger.warning(f"Camera {camera_id} is not running")
+            return False
+
+        self.running[camera_id] = False
+        if camera_id in self.camera_tasks:
+            try:
+                self._call(self._stop_task(camera_id), timeout=5.0)
+            except Exception as e:
+                logger.error(f"Error stopping camera {camera_id}: {str(e)}")
+        self._release_pipeline(camera_id)
+
+        logger.info(f"Stopped camera {camera_id}")
+        return True
+
+    async def _stop_task(self, camera_id: int):
+        task = self.camera_tasks.pop(camera_id, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def shutdown(self):
+        """Stop all cameras, close the HTTP session and stop the event loop"""
+        self.stop_all_cameras()
+        if self.http is not None:
+            self._call(self.http.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join(timeout=5.0)
+        self.capture_pool.shutdown(wait=False)
+        self.encode_pool.shutdown(wait=False)
+
+    async def _camera_loop(self, camera_id: int, camera_url: str):
+        """
+        Capture, encode and upload frames for one camera
+
+        Args:
+            camera_id: ID of the camera
+            camera_url: URL of the camera feed (RTSP, HTTP, etc.)
+        """
+        loop = asyncio.get_running_loop()
+
+        cap = await loop.run_in_executor(self.capture_pool, self._open_capture, camera_url)
+        if not cap.isOpened():
+            logger.error(f"Failed to open camera {camera_id} - {camera_url}")
+            self.running[camera_id] = False
+            return
+
+        # Keep the driver buffer short since frames are read at the processing rate
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        logger.info(f"Processing camera {camera_id} - {camera_url}")
+
+        reader = None
+        if self.capture_mode == "latest":
+            reader = LatestFrameReader(
+                cap,
+                camera_id,
+                reopen=lambda: self._open_capture(self.cameras[camera_id]["url"]),
+                reconnect_after=RECONNECT_AFTER,
+                metrics=self.camera_metrics.get(camera_id)
+            )
+            self.frame_readers[camera_id] = reader
+            reader.start()
+
+        try:
+            next_process_time = loop.time()
+            last_read = time.time()
+            failures = 0
+            while self.running.get(camera_id, False):
+                if reader is not None:
+                    frame, captured_at = await loop.run_in_executor(self.capture_pool, reader.read, self._interval_for(camera_id))
+                    if frame is None:
+                        # The reader reconnects the stream by itself
+                        log_limiter.warning(("read", camera_id), f"No frame available from camera {camera_id}")
+                        continue
+                    ret = True
+                else:
+                    ret, frame = await loop.run_in_executor(
+                        self.capture_pool, self._read_newest_frame, camera_id, cap, time.time() - last_read
+                    )
+                    last_read = captured_at = time.time()
+                if not ret:
+                    log_limiter.warning(("read", camera_id), f"Failed to read frame from camera {camera_id}")
+                    failures += 1
+                    if failures >= RECONNECT_AFTER:
+                        cap = await loop.run_in_executor(self.capture_pool, self._reopen_capture, camera_id, cap)
+                        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                        failures = 0
+                    await asyncio.sleep(1)
+                    continue
+                failures = 0
+
+                await self._submit_frame(camera_id, frame, captured_at)
+
+                next_process_time += self._interval_for(camera_id)
+                delay = next_process_time - loop.time()
+                if delay < 0:
+                    # Fell behind, don't try to catch up with a burst
+                    next_process_time = loop.time()
+                    delay = 0
+                await asyncio.sleep(delay)
+        finally:
+            upload = self.uploads.pop(camera_id, None)
+            if upload is not None:
+                upload.cancel()
+            if reader is not None:
+                await loop.run_in_executor(self.capture_pool, reader.stop)
+                cap = reader.cap
+            await loop.run_in_executor(self.capture_pool, cap.release)
+            logger.info(f"Camera {camera_id} processing stopped")
+
+    def _read_newest_frame(self, camera_id: int, cap, elapsed: float):
+        """
+        Skip the frames a stream buffered since the last read and decode the newest
+
+        Frames are only grabbed, not decoded, while skipping. A grab that has
+        to wait for the camera means the buffer is empty, so the frame it
+        returned is current. Sources that never make a grab wait, like video
+        files, skip at most twice the frames due since the last read, which
+        still works off any backlog left from earlier reads.
+
+        Args:
+            camera_id: ID of the camera
+            cap: Opened video capture
+            elapsed: Seconds since the previous read
+
+        Returns:
+            Tuple of (success, frame) like cv2.VideoCapture.read
+        """
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not 1.0 <= fps <= 240.0:
+            fps = DEFAULT_STREAM_FPS
+        due = int(elapsed * fps)
+        if due == 0:
+            return self._read_frame(camera_id, cap)
+
+        series = self.camera_metrics.get(camera_id)
+        for _ in range(2 * due):
+            start = time.perf_counter()
+            if not cap.grab():
+                return False, None
+            if series is not None:
+                series.frames.inc()
+            if time.perf_counter() - start > 0.5 / fps:
+                break
+
+        start = time.perf_counter()
+        ret, frame = cap.retrieve()
+        if ret and series is not None:
+            series.decode.observe(time.perf_counter() - start)
+        return ret, frame
+
+    async def _submit_frame(self, camera_id: int, frame: np.ndarray, captured_at: float):
+        """
+        Encode a frame on the encode pool and start its upload
+
+        Args:
+            camera_id: ID of the camera
+            frame: Decoded BGR frame
+            captured_at: Time the frame was read from the camera
+        """
+        upload = self.uploads.get(camera_id)
+        if upload is not None and not upload.done():
+            self.skipped_uploads[camera_id] += 1
+            series = self.camera_metrics.get(camera_id)
+            if series is not None:
+                series.dropped("backpressure")
+            return
+
+        try:
+            payload = await asyncio.get_running_loop().run_in_executor(
+                self.encode_pool, self._encode_frame, camera_id, frame, captured_at
+            )
+        except Exception as e:
+            log_limiter.error(("process", camera_id), f"Error processing frame from camera {camera_id}: {str(e)}")
+            return
+
+        if payload is not None:
+            self.uploads[camera_id] = asyncio.create_task(self._upload_frame(camera_id, payload))
+
+    async def _upload_frame(self, camera_id: int, payload: dict):
+        """
+        Send a frame to the backend for processing
+
+        Args:
+            camera_id: ID of the camera
+            payload: Full frame or face crops, see frame_payload.build_frame_request
+        """
+        start = time.time()
+        try:
+            response = await self._upload(camera_id, payload)
+            async with response:
+                status = response.status
+                body = await response.read()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Refused, reset or timed out: the backend may never have seen the frame
+            self._record_upload(camera_id, time.time() - start, None)
+            await self._spool_frame_async(camera_id, payload, None)
+            log_limiter.error(("upload", camera_id), f"Error sending frame from camera {camera_id} to backend: {str(e)}")
+            return
+        latency = time.time() - start
+
+        if status != 200:
+            self._record_upload(camera_id, latency, status)
+            await self._spool_frame_async(camera_id, payload, status)
+            log_limiter.error(
+                ("upload", camera_id),
+                f"Failed to process frame from camera {camera_id}: {status} - {body.decode(errors='replace')}"
+            )
+            return
+
+        # The backend accepted the frame, so nothing below may spool it or count it as failed
+        try:
+            result = json.loads(body)
+            if not isinstance(result, dict):
+                raise ValueError(f"expected an object, got {type(result).__name__}")
+        except ValueError as e:
+            self._record_upload(camera_id, latency, 200)
+            log_limiter.error(("result", camera_id), f"Invalid response to frame from camera {camera_id}: {str(e)}")
+            return
+
+        self._record_upload(camera_id, latency, 200, result)
+        try:
+            self._handle_result(camera_id, result, payload)
+        except Exception as e:
+            log_limiter.error(("result", camera_id), f"Error handling result for camera {camera_id}: {str(e)}")
+
+    async def _upload(self, camera_id: int, payload: dict) -> aiohttp.ClientResponse:
+        """Post a payload with the camera's transport, retrying it as JSON if the backend does not take binary frames"""
+        transport = self._transport_for(camera_id)
+        response = await self._post(camera_id, payload, transport)
+        if transport == "binary" and response.status in (415, 422):
+            if not rejects_binary(response.status, await response.read()):
+                return response
+            response.release()
+            self._fall_back_to_json(camera_id, response.status)
+            response = await self._post(camera_id, payload, "json")
+        return response
+
+    async def _spool_frame_async(self, camera_id: int, payload: dict, status: Optional[int]):
+        """Spool a failed upload on the encode pool, disk writes must not block the loop"""
+        if self.spool is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                self.encode_pool, self._spool_frame, camera_id, payload, status
+            )
+
+    async def _post(self, camera_id: int, payload: dict, transport: str) -> aiohttp.ClientResponse:
+        headers, body = build_frame_request(camera_id, payload, transport)
+        return await self.http.post(f"{self.backend_url}/api/process-frame", data=body, headers=headers)
+
+    def get_backpressure_stats(self, camera_id: int) -> Optional[dict]:
+        """
+        Get the number of frames skipped because an upload was still in flight
+
+        Args:
+            camera_id: ID of the camera
+        """
+        if camera_id not in self.skipped_uploads:
+            return None
+        return {"skipped_uploads": self.skipped_uploads[camera_id]}
@@ -0,0 +1,125 @@
+"""
+Emails and SMTP connections for a crowd of unknown visitors
+
+Simulates a crowd passing several entrances: unknown-visitor detections
+arrive at a steady rate, spread over the locations, with an occasional
+"Camera Offline" system issue. Every email goes to a local SMTP stand-in
+(benchmarks.stub_smtp) with a simulated network round trip. Three setups are
+compared:
+
+- "per-alert, new session": one email per alert, each over its own SMTP
+  session without pipelining, as smtplib.SMTP per message would do
+- "per-alert, reused": one email per alert over the email workers' reused,
+  pipelined connections
+- "coalesced": alerts grouped per location into digests, over reused
+  connections
+
+For each setup the benchmark reports the alerts raised, the emails the
+server received, the SMTP connections and round trips, and the time until
+every email was delivered.
+
+Usage (from the backend directory):
+    python -m benchmarks.alert_digest_benchmark --detections 500 --duration 5 --window 2
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from benchmarks.stub_smtp import StubSMTPServer
+from notification_service import NotificationService
+from smtp_mailer import SMTPMailer
+
+SETTINGS = {
+    "email_notifications": True,
+    "email_address": "security@example.com",
+    "unknown_alerts": True,
+    "system_alerts": True,
+}
+
+class BenchmarkService(NotificationService):
+    def _load_settings(self) -> dict:
+        return dict(SETTINGS)
+
+class OneShotMailer(SMTPMailer):
+    """Closes its SMTP session after every message"""
+
+    def send(self, message):
+        try:
+            super().send(message)
+        finally:
+            self.close()
+
+class SessionPerEmailService(BenchmarkService):
+    def _mailer(self) -> SMTPMailer:
+        mailer = getattr(self.thread_state, "mailer", None)
+        if mailer is None:
+            mailer = OneShotMailer(**self.smtp)
+            self.thread_state.mailer = mailer
+            self.mailers.append(mailer)
+        return mailer
+
+def run(name: str, args) -> dict:
+    server = StubSMTPServer(latency=args.rtt, pipelining=name != "per-alert, new session").start()
+    smtp = {"host": "127.0.0.1", "port": server.port, "username": "estin", "password": "secret", "starttls": False}
+    service_class = SessionPerEmailService if name == "per-alert, new session" else BenchmarkService
+    service = service_class(
+        "http://127.0.0.1:9",
+        "benchmark",
+        alert_window=args.window if name == "coalesced" else 0.0,
+        smtp=smtp,
+        queue_size=args.detections * 4
+    )
+
+    started = time.time()
+    service.start()
+    interval = args.duration / args.detections
+    for index in range(args.detections):
+        service.notify_unknown_visitor({"location": f"Entrance {index % args.locations + 1}"})
+        if index % args.issue_every == 0:
+            service.notify_system_issue("Camera Offline", f"Camera 'Entrance {index % args.locations + 1}' is offline")
+        time.sleep(interval)
+    alerts = service.coalescer.get_stats()["received"]
+    service.stop(timeout=600.0)
+    elapsed = time.time() - started
+    stats = server.get_stats()
+    server.stop()
+
+    return {
+        "setup": name,
+        "alerts": alerts,
+        "emails": stats["messages"],
+        "connections": stats["connections"],
+        "round_trips": stats["round_trips"],
+        "seconds": elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert coalescing and SMTP reuse benchmark")
+    parser.add_argument("--detections", type=int, default=500, help="Unknown-visitor detections")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds the detections are spread over")
+    parser.add_argument("--locations", type=int, default=3)
+    parser.add_argument("--issue-every", type=int, default=50, help="A system issue every n detections")
+    parser.add_argument("--window", type=float, default=2.0, help="Alert window of the coalesced setup")
+    parser.add_argument("--rtt", type=float, default=0.005, help="Simulated SMTP round trip in seconds")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+    # Every email and connection is logged at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    for name in ("per-alert, new session", "per-alert, reused", "coalesced"):
+        result = run(name, args)
+        results.append(result)
+        print(
+            f"{name:>22}: {result['alerts']} alerts -> {result['emails']:4d} emails, "
+            f"{result['connections']:4d} SMTP connections, {result['round_trips']:5d} round trips, "
+            f"delivered in {result['seconds']:.1f}s"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Recall versus latency of the IVF face index against exact search
+
+Builds galleries of synthetic 128-d encodings, then matches noisy copies of
+enrolled encodings with exact search and with an IVFIndex at several nprobe
+settings. Recall@1 is the share of probes whose best person is the one exact
+search finds, recall@10 the share of exact search's 10 best people that are
+found, and "same verdict" the share of probes for which the verified person
+(or the lack of one) is the same. Latency is per probe.
+
+Usage (from the backend directory):
+    python -m benchmarks.ann_benchmark --sizes 20000 100000 --nprobe 1 2 4 8 16 32
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from face_gallery import FaceGallery
+from face_index import IVFIndex
+
+def synthetic_encodings(count: int, per_person: int, groups: int = 64, seed: int = 0):
+    """
+    Encodings clustered per person, with people clustered in groups
+
+    Real face embeddings are not uniformly spread: similar looking people sit
+    close together, which is what gives nearest-neighbour search structure.
+    """
+    rng = np.random.default_rng(seed)
+    people = count // per_person
+    group_centres = rng.normal(0, 0.08, (groups, 128))
+    centres = group_centres[rng.integers(0, groups, people)] + rng.normal(0, 0.05, (people, 128))
+    person_ids = np.repeat(np.arange(1, people + 1), per_person)
+    encodings = centres[person_ids - 1] + rng.normal(0, 0.02, (len(person_ids), 128))
+    return person_ids, encodings
+
+def search(gallery: FaceGallery, probes: np.ndarray, top_k: int):
+    start = time.perf_counter()
+    results = [gallery.match(probe, top_k=top_k)[0] for probe in probes]
+    return results, (time.perf_counter() - start) / len(probes)
+
+def recall(exact, approximate, k: int) -> float:
+    found = 0
+    total = 0
+    for expected, got in zip(exact, approximate):
+        wanted = {match.person_id for match in expected[:k]}
+        found += len(wanted & {match.person_id for match in got[:k]})
+        total += len(wanted)
+    return found / total if total else 1.0
+
+def verified_agreement(exact, approximate) -> float:
+    """Share of probes given the same verified person, or none, as by exact search"""
+    def verdict(matches):
+        return matches[0].person_id if matches and matches[0].verified else None
+    same = sum(1 for expected, got in zip(exact, approximate) if verdict(expected) == verdict(got))
+    return same / len(exact) if exact else 1.0
+
+def run_size(size: int, args) -> list:
+    person_ids, encodings = synthetic_encodings(size, args.per_person)
+    rows = [(face_id, int(person_id), encoding) for face_id, (person_id, encoding) in enumerate(zip(person_ids, encodings), start=1)]
+    rng = np.random.default_rng(2)
+    probes = (encodings[rng.choice(size, args.probes, replace=False)] + rng.normal(0, 0.02, (args.probes, 128))).astype(np.float32)
+
+    exact = FaceGallery()
+    exact.load(rows)
+    exact_results, exact_seconds = search(exact, probes, 10)
+    results = [{
+        "encodings": size, "index": "exact", "nprobe": None, "ms": exact_seconds * 1000,
+        "recall@1": 1.0, "recall@10": 1.0, "verified_agreement": 1.0,
+    }]
+
+    index = IVFIndex(nlist=args.nlist, min_size=0)
+    gallery = FaceGallery(index=index)
+    start = time.perf_counter()
+    gallery.load(rows)
+    train_seconds = time.perf_counter() - start
+    for nprobe in args.nprobe:
+        index.nprobe = nprobe
+        approximate, seconds = search(gallery, probes, 10)
+        results.append({
+            "encodings": size,
+            "index": f"ivf{len(index.centroids)}",
+            "nprobe": nprobe,
+            "ms": seconds * 1000,
+            "recall@1": recall(exact_results, approximate, 1),
+            "recall@10": recall(exact_results, approximate, 10),
+            "verified_agreement": verified_agreement(exact_results, approximate),
+            "train_s": train_seconds,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF face index recall/latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cells, defaults to 4 * sqrt(size)")
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--per-person", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for result in run_size(size, args):
+            results.append(result)
+            nprobe = result["nprobe"] if result["nprobe"] is not None else "-"
+            print(
+                f"{result['encodings']:7d} {result['index']:>8} nprobe {nprobe:>3}: "
+                f"{result['ms']:7.3f} ms/probe, recall@1 {result['recall@1']:.3f}, recall@10 {result['recall@10']:.3f}, "
+                f"same verdict {result['verified_agreement']:.3f}"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Throughput and tail latency of micro-batched recognition versus concurrency
+
+A load generator runs N synthetic cameras as asyncio tasks. Each one sends
+a JPEG frame to MicroBatcher.recognize and sends the next as soon as the
+answer arrives. The run is repeated without batching (max_batch 1) and with
+batching, and with batching plus a queue limit. Each run covers every
+concurrency level and reports frames per second, p50 and p99 latency, and
+frames refused by the limit.
+
+face_recognition is not needed. The pool runs a stand-in extractor instead.
+It decodes the JPEG and runs OpenCV's Haar face detector for a realistic
+per-frame CPU cost. It then derives one 128-d encoding from the centre of
+the frame, so every frame also exercises gallery matching.
+
+Usage (from the backend directory):
+    python -m benchmarks.batching_benchmark --concurrency 1 4 16 64 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.gallery_benchmark import synthetic_encodings
+from benchmarks.suite import percentiles
+from benchmarks.synthetic_camera import SyntheticCapture
+from face_gallery import FaceGallery
+from inference_batcher import MicroBatcher, Overloaded
+
+_cascade = None
+
+def synthetic_extract(jpeg: bytes) -> dict:
+    """Decode, detect with a Haar cascade, and return one pseudo-face from the frame centre"""
+    global _cascade
+    if _cascade is None:
+        _cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(40, 40))
+
+    height, width = gray.shape
+    size = min(width, height) // 3
+    x, y = (width - size) // 2, (height - size) // 2
+    patch = cv2.resize(gray[y:y + size, x:x + size], (16, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+    encoding = (patch.reshape(-1) - patch.mean()) / (patch.std() + 1e-6) * 0.09
+    return {"boxes": [(x, y, size, size)], "encodings": encoding.reshape(1, 128)}
+
+async def run_load(batcher: MicroBatcher, frames: list, concurrency: int, duration: float) -> dict:
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    rejected = 0
+
+    async def camera(index: int):
+        nonlocal rejected
+        sent = index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await batcher.recognize(frames[sent % len(frames)])
+                latencies.append(time.perf_counter() - start)
+            except Overloaded:
+                # A camera answered with 429 backs off before its next frame
+                rejected += 1
+                await asyncio.sleep(0.1)
+            sent += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(camera(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return dict(percentiles(latencies), fps=len(latencies) / elapsed, rejected=rejected)
+
+async def run(args) -> list:
+    person_ids, encodings = synthetic_encodings(args.gallery, 5)
+    gallery = FaceGallery()
+    gallery.load((face_id, int(person_id), encoding) for face_id, (person_id, encoding) in enumerate(zip(person_ids, encodings), start=1))
+
+    cap = SyntheticCapture(args.width, args.height, fps=1e6)
+    frames = []
+    for _ in range(16):
+        _, frame = cap.read()
+        frames.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+
+    results = []
+    configurations = [
+        ("unbatched", 1, None),
+        ("batched", args.max_batch, None),
+        ("batched+limit", args.max_batch, args.max_queue),
+    ]
+    for name, max_batch, max_queue in configurations:
+        batcher = await MicroBatcher(
+            gallery,
+            max_batch=max_batch,
+            max_wait=args.max_wait,
+            workers=args.workers,
+            extract=synthetic_extract,
+            max_queue=max_queue
+        ).start()
+        await run_load(batcher, frames, args.workers, 1.0)  # Warm up the pool
+        for concurrency in args.concurrency:
+            batcher.batches = batcher.frames = 0
+            result = await run_load(batcher, frames, concurrency, args.duration)
+            result.update(
+                configuration=name,
+                max_batch=max_batch,
+                concurrency=concurrency,
+                mean_batch=batcher.get_stats()["mean_batch"],
+            )
+            results.append(result)
+            print(
+                f"{name:>14}, {concurrency:4d} cameras: {result['fps']:7.1f} fps, "
+                f"p50 {result['p50_ms']:7.1f} ms, p99 {result['p99_ms']:7.1f} ms, "
+                f"mean batch {result['mean_batch']:.1f}, rejected {result['rejected']}"
+            )
+        await batcher.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching recognition benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait", type=float, default=0.005)
+    parser.add_argument("--max-queue", type=int, default=16, help="Queue limit of the last configuration")
+    parser.add_argument("--gallery", type=int, default=10000, help="Enrolled encodings")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
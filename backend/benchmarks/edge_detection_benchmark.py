@@ -0,0 +1,82 @@
+"""
+Measure what edge face detection saves compared to uploading full frames
+
+Reads frames from a video file or a directory of images (recordings from
+the site's own cameras give the most realistic numbers). For every frame it
+reports the full-frame JPEG size against the size of the face crops, along
+with the pixels the backend would need to scan. Pixels are a rough stand-in
+for backend face detection CPU. It also reports the detector's own time per
+frame.
+
+Usage (from the backend directory):
+    python -m benchmarks.edge_detection_benchmark --video entrance.mp4
+    python -m benchmarks.edge_detection_benchmark --images samples/
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+
+from face_detector import EdgeFaceDetector
+from frame_payload import payload_size
+
+def iter_frames(args):
+    if args.video:
+        cap = cv2.VideoCapture(args.video)
+        count = 0
+        while count < args.limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+        cap.release()
+    else:
+        for name in sorted(os.listdir(args.images))[:args.limit]:
+            frame = cv2.imread(os.path.join(args.images, name))
+            if frame is not None:
+                yield frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Edge face detection benchmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="Video file to read frames from")
+    source.add_argument("--images", help="Directory of images")
+    parser.add_argument("--limit", type=int, default=500, help="Maximum frames to use")
+    parser.add_argument("--width", type=int, default=480, help="Detector input width")
+    args = parser.parse_args()
+
+    detector = EdgeFaceDetector(width=args.width)
+    frames = with_faces = 0
+    full_bytes = crop_bytes = 0
+    full_pixels = crop_pixels = 0
+    detect_time = 0.0
+
+    for frame in iter_frames(args):
+        frames += 1
+        _, buffer = cv2.imencode('.jpg', frame)
+        full_bytes += len(buffer)
+        full_pixels += frame.shape[0] * frame.shape[1]
+
+        start = time.perf_counter()
+        crops = detector.crop(frame)
+        detect_time += time.perf_counter() - start
+
+        if crops:
+            with_faces += 1
+            crop_bytes += payload_size({"crops": crops})
+            crop_pixels += sum(crop["width"] * crop["height"] for crop in crops)
+
+    if not frames:
+        print("No frames read")
+        return
+
+    print(f"Frames: {frames}, with faces: {with_faces} ({with_faces / frames:.0%})")
+    print(f"Bytes uploaded: {full_bytes} full frames vs {crop_bytes} crops ({crop_bytes / full_bytes:.1%})")
+    print(f"Pixels for backend: {full_pixels} vs {crop_pixels} ({crop_pixels / full_pixels:.1%})")
+    print(f"Edge detection time: {detect_time / frames * 1000:.1f} ms per frame")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure encode time and upload size per encode profile
+
+Encodes frames from synthetic cameras of several resolutions through
+CameraService._encode_frame, once per encode profile, and reports the mean
+encode time and JPEG bytes per frame of each. Then replays a stretch of slow
+uploads into an adaptive profile and prints the quality it settles on.
+
+Generated frames are noise, which compresses far worse than a real scene;
+pass --frames-from with a video file or image directory for realistic sizes.
+
+Usage (from the backend directory):
+    python -m benchmarks.encode_profile_benchmark --frames 100
+"""
+
+import argparse
+import json
+
+from benchmarks.stub_backend import StubBackend
+from benchmarks.synthetic_camera import SyntheticCapture, load_frames
+from camera_service import CameraService
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+# A doorway in the middle third of the frame
+DOORWAY = [(0.35, 0.1), (0.65, 0.1), (0.65, 0.95), (0.35, 0.95)]
+
+PROFILES = {
+    "native": None,
+    "720p-q80": {"max_width": 1280, "max_height": 720, "quality": 80},
+    "doorway-960-q80": {"max_width": 960, "max_height": 960, "roi": DOORWAY, "quality": 80},
+}
+
+def run_profile(backend: StubBackend, name: str, profile, args, frames) -> dict:
+    camera_ids = {}
+    cameras = []
+    for index, resolution in enumerate(RESOLUTIONS, start=1):
+        record = {"id": index, "name": resolution, "url": f"rtsp://synthetic/{index}"}
+        if profile is not None:
+            record["encode_profile"] = dict(profile, name=f"{name}@{resolution}")
+        cameras.append(record)
+        camera_ids[resolution] = index
+    with backend.lock:
+        backend.cameras = cameras
+
+    service = CameraService(backend.url, "benchmark", metrics=False)
+    results = {}
+    for resolution, camera_id in camera_ids.items():
+        width, height = RESOLUTIONS[resolution]
+        service._prepare_pipeline(camera_id)
+        cap = SyntheticCapture(width, height, fps=1e6, seed=camera_id, frames=frames and frames[resolution])
+        for _ in range(args.frames):
+            _, frame = cap.read()
+            service._encode_frame(camera_id, frame)
+        results[resolution] = service.get_encode_stats(camera_id)
+    return results
+
+def adaptive_quality(backend: StubBackend, uploads: int) -> list:
+    """Quality of an adaptive camera while uploads take 1 s and then 50 ms"""
+    with backend.lock:
+        backend.cameras = [{
+            "id": 1, "name": "Adaptive", "url": "rtsp://synthetic/1",
+            "encode_profile": {"name": "adaptive", "quality": 90, "min_quality": 50},
+        }]
+    service = CameraService(backend.url, "benchmark", metrics=False)
+    service._prepare_pipeline(1)
+    trace = []
+    for latency in [1.0] * uploads + [0.05] * uploads:
+        service._record_upload(1, latency, 200)
+        trace.append(service.get_encode_stats(1)["quality"])
+    return trace
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode profile benchmark")
+    parser.add_argument("--frames", type=int, default=100, help="Frames encoded per camera and profile")
+    parser.add_argument("--frames-from", help="Video file or image directory to loop instead of noise")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    frames = None
+    if args.frames_from:
+        frames = {
+            resolution: load_frames(args.frames_from, width=width, limit=args.frames)
+            for resolution, (width, _) in RESOLUTIONS.items()
+        }
+
+    backend = StubBackend().start()
+    result = {name: run_profile(backend, name, profile, args, frames) for name, profile in PROFILES.items()}
+    result["adaptive_quality_trace"] = adaptive_quality(backend, 40)
+    backend.stop()
+
+    for name, profile in PROFILES.items():
+        for resolution, stats in result[name].items():
+            print(
+                f"{name:>16} {resolution:>6}: {stats['encode_ms']:6.1f} ms, "
+                f"{stats['bytes_per_frame'] / 1024:7.1f} KiB per frame, output {stats['output_size']}"
+            )
+    print(f"Adaptive quality: {result['adaptive_quality_trace']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare the thread-per-camera engine with the asyncio engine
+
+Each engine runs 10, 100 and 300 synthetic cameras against a local stub
+backend for a fixed duration. The script reports how many frames reached the
+backend compared to the target rate, along with CPU time and thread count.
+
+Usage (from the backend directory):
+    python -m benchmarks.engine_benchmark --cameras 10 100 300 --duration 20
+"""
+
+import argparse
+import threading
+import time
+
+from async_camera_service import AsyncCameraService
+from benchmarks.stub_backend import StubBackend
+from benchmarks.synthetic_camera import SyntheticCapture
+from camera_service import CameraService
+
+def with_synthetic_cameras(service_class, width: int, height: int, fps: float):
+    """Subclass a camera service so every camera URL opens a SyntheticCapture"""
+    class SyntheticService(service_class):
+        def _open_capture(self, camera_url: str):
+            return SyntheticCapture(width, height, fps, seed=int(camera_url.rsplit("/", 1)[-1]))
+
+    return SyntheticService
+
+def run_engine(name: str, service_class, backend: StubBackend, args) -> dict:
+    backend.reset()
+    service = service_class(backend.url, "benchmark")
+    service.set_frame_interval(args.interval)
+
+    cpu_start = time.process_time()
+    service.start_all_cameras()
+    start = time.time()
+    time.sleep(args.duration)
+    elapsed = time.time() - start
+    cpu = time.process_time() - cpu_start
+    threads = threading.active_count()
+    frames = backend.frames
+
+    service.stop_all_cameras()
+    if hasattr(service, "shutdown"):
+        service.shutdown()
+
+    expected = len(service.cameras) * elapsed / args.interval
+    return {
+        "engine": name,
+        "cameras": len(service.cameras),
+        "frames": frames,
+        "target_ratio": frames / expected if expected else 0.0,
+        "cpu_seconds": cpu,
+        "threads": threads,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera engine scaling benchmark")
+    parser.add_argument("--cameras", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--width", type=int, default=480)
+    parser.add_argument("--height", type=int, default=270)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub backend latency per frame")
+    args = parser.parse_args()
+
+    engines = [
+        ("threads", with_synthetic_cameras(CameraService, args.width, args.height, args.fps)),
+        ("asyncio", with_synthetic_cameras(AsyncCameraService, args.width, args.height, args.fps)),
+    ]
+
+    for count in args.cameras:
+        cameras = [
+            {"id": i, "name": f"Synthetic {i}", "url": f"rtsp://synthetic/{i}"}
+            for i in range(1, count + 1)
+        ]
+        backend = StubBackend(cameras, latency=args.latency).start()
+        for name, service_class in engines:
+            result = run_engine(name, service_class, backend, args)
+            print(
+                f"{result['engine']:>8} {result['cameras']:4d} cameras: "
+                f"{result['frames']:6d} frames ({result['target_ratio']:.0%} of target), "
+                f"{result['cpu_seconds']:.1f}s CPU, {result['threads']} threads"
+            )
+        backend.stop()
+
+if __name__ == "__main__":
+    main()
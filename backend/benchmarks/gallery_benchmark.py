@@ -0,0 +1,106 @@
+"""
+Compare the resident face gallery with per-encoding matching
+
+For 1k, 10k and 100k synthetic 128-d encodings, times matching one frame's
+faces three ways: comparing each probe with each known encoding in a loop,
+rebuilding an array of the known encodings per request and comparing one
+probe at a time (face_recognition.face_distance style), and one batched
+FaceGallery.match. Also times incremental adds and person removals against
+reloading the whole gallery, and checks that every probe finds its person.
+
+Usage (from the backend directory):
+    python -m benchmarks.gallery_benchmark --sizes 1000 10000 100000 --faces 4
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from face_gallery import FaceGallery
+
+def synthetic_encodings(count: int, per_person: int, seed: int = 0):
+    """Encodings clustered per person, roughly as spread out as dlib's"""
+    rng = np.random.default_rng(seed)
+    people = count // per_person
+    centres = rng.normal(0, 0.09, (people, 128))
+    person_ids = np.repeat(np.arange(1, people + 1), per_person)
+    encodings = centres[person_ids - 1] + rng.normal(0, 0.02, (len(person_ids), 128))
+    return person_ids, encodings
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+def run_size(size: int, args) -> dict:
+    person_ids, encodings = synthetic_encodings(size, args.per_person)
+    rows = [(face_id, int(person_id), encoding) for face_id, (person_id, encoding) in enumerate(zip(person_ids, encodings), start=1)]
+    known = [encoding for encoding in encodings]
+
+    rng = np.random.default_rng(1)
+    targets = rng.choice(len(encodings), args.faces, replace=False)
+    probes = encodings[targets] + rng.normal(0, 0.02, (args.faces, 128))
+
+    def loop_match():
+        for probe in probes:
+            best = None
+            for index, encoding in enumerate(known):
+                distance = np.linalg.norm(encoding - probe)
+                if best is None or distance < best[0]:
+                    best = (distance, index)
+
+    def per_request_match():
+        matrix = np.array(known)
+        for probe in probes:
+            np.argmin(np.linalg.norm(matrix - probe, axis=1))
+
+    gallery = FaceGallery()
+    start = time.perf_counter()
+    gallery.load(rows)
+    load_seconds = time.perf_counter() - start
+
+    matches = gallery.match(probes)
+    correct = sum(1 for target, result in zip(targets, matches) if result and result[0].person_id == person_ids[target])
+
+    loop_repeat = 1 if size >= 10000 else 3
+    result = {
+        "encodings": size,
+        "loop_ms": timed(loop_match, loop_repeat) * 1000 if size <= args.loop_limit else None,
+        "per_request_ms": timed(per_request_match, 3) * 1000,
+        "gallery_ms": timed(lambda: gallery.match(probes), 20) * 1000,
+        "load_ms": load_seconds * 1000,
+        "add_us": timed(lambda: gallery.add(0, 0, probes[0]), 200) * 1e6,
+        "remove_person_ms": timed(lambda: gallery.remove_person(0), 1) * 1000,
+        "correct": f"{correct}/{args.faces}",
+    }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Face gallery matching benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--faces", type=int, default=4, help="Faces per frame")
+    parser.add_argument("--per-person", type=int, default=5, help="Encodings enrolled per person")
+    parser.add_argument("--loop-limit", type=int, default=10000, help="Largest gallery to time the Python loop on")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        result = run_size(size, args)
+        results.append(result)
+        loop = f"{result['loop_ms']:9.2f}" if result["loop_ms"] is not None else "        -"
+        print(
+            f"{size:7d} encodings: loop {loop} ms, per-request array {result['per_request_ms']:8.2f} ms, "
+            f"gallery {result['gallery_ms']:6.3f} ms per frame; load {result['load_ms']:.1f} ms, "
+            f"add {result['add_us']:.1f} us, remove person {result['remove_person_ms']:.2f} ms, "
+            f"correct {result['correct']}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Cold-start time to first recognition: database load versus gallery snapshot
+
+Fills a SQLite stand-in for the FaceData table with synthetic encodings,
+writes a gallery snapshot, then adds a batch of newer face data to a change
+log. Each start-up path then runs in a fresh interpreter, timed from process
+start to the first answered match:
+
+- "database": read every FaceData row and build the gallery
+- "snapshot": map the snapshot and catch up on the newer change-log entries
+
+Both files are in the page cache when measured, as after a service restart.
+Anonymous RSS shows how much of the gallery each process holds privately.
+
+Usage (from the backend directory):
+    python -m benchmarks.gallery_startup_benchmark --sizes 10000 100000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.gallery_benchmark import synthetic_encodings
+
+def build_database(path: str, size: int, changes: int, per_person: int):
+    person_ids, encodings = synthetic_encodings(size + changes, per_person)
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE face_data (id INTEGER PRIMARY KEY, person_id INTEGER, encoding BLOB)")
+    db.execute("CREATE TABLE face_data_changes (sequence INTEGER PRIMARY KEY, op TEXT, face_id INTEGER, person_id INTEGER)")
+    rows = [(face_id, int(person_ids[face_id - 1]), encodings[face_id - 1].tobytes()) for face_id in range(1, size + changes + 1)]
+    db.executemany("INSERT INTO face_data VALUES (?, ?, ?)", rows)
+    db.executemany(
+        "INSERT INTO face_data_changes VALUES (?, 'add', ?, ?)",
+        [(face_id, face_id, person_id) for face_id, person_id, _ in rows]
+    )
+    db.commit()
+    db.close()
+    return encodings
+
+def anon_rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    return 0
+
+def child(args):
+    """Run one start-up path; the parent passes its start time in argv"""
+    from face_gallery import FaceGallery
+    from gallery_snapshot import catch_up, open_snapshot
+
+    db = sqlite3.connect(args.db)
+    if args.child == "database":
+        gallery = FaceGallery()
+        gallery.load(db.execute("SELECT id, person_id, encoding FROM face_data"))
+    else:
+        gallery = open_snapshot(args.snapshot)
+        changes = db.execute(
+            "SELECT c.sequence, c.op, c.face_id, c.person_id, f.encoding FROM face_data_changes c "
+            "JOIN face_data f ON f.id = c.face_id WHERE c.sequence > ? ORDER BY c.sequence",
+            (gallery.sequence,)
+        )
+        catch_up(gallery, (
+            {"sequence": sequence, "op": op, "face_id": face_id, "person_id": person_id, "encoding": encoding}
+            for sequence, op, face_id, person_id, encoding in changes
+        ))
+
+    probe = np.frombuffer(db.execute("SELECT encoding FROM face_data ORDER BY id DESC LIMIT 1").fetchone()[0])
+    match = gallery.match(probe)[0][0]
+    print(json.dumps({
+        "seconds": time.time() - args.started,
+        "encodings": len(gallery),
+        "matched_face": match.face_id,
+        "anon_rss_mb": anon_rss_kb() / 1024,
+    }))
+
+def measure(path: str, args, db: str, snapshot: str) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.gallery_startup_benchmark",
+        "--child", path, "--db", db, "--snapshot", snapshot, "--started", repr(time.time()),
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Gallery cold-start benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--changes", type=int, default=500, help="Face data added after the snapshot")
+    parser.add_argument("--per-person", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--child", choices=["database", "snapshot"], help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    parser.add_argument("--started", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    from face_gallery import FaceGallery
+    from gallery_snapshot import save_snapshot
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            db = os.path.join(directory, f"faces-{size}.db")
+            snapshot = os.path.join(directory, f"gallery-{size}.snap")
+            encodings = build_database(db, size, args.changes, args.per_person)
+
+            # Snapshot of the first ``size`` rows, as of change-log entry ``size``
+            gallery = FaceGallery()
+            gallery.load(
+                ((face_id, 0, encodings[face_id - 1]) for face_id in range(1, size + 1)),
+                sequence=size
+            )
+            save_snapshot(gallery, snapshot)
+
+            for path in ("database", "snapshot"):
+                runs = [measure(path, args, db, snapshot) for _ in range(args.runs)]
+                best = min(runs, key=lambda run: run["seconds"])
+                result = dict(best, path=path, size=size, snapshot_mb=os.path.getsize(snapshot) / 1e6)
+                results.append(result)
+                print(
+                    f"{size:7d} + {args.changes} changes, {path:>8}: {best['seconds'] * 1000:7.1f} ms to first match "
+                    f"({best['encodings']} encodings), anonymous RSS {best['anon_rss_mb']:.1f} MB"
+                )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Stand-in backend application that loads a large model at import
+
+Importing this module fills HEAVY_APP_MB megabytes (default 200) with
+random weights, taking about as long as loading dlib's models and a face
+gallery. On lifespan startup each server process writes its PID into
+HEAVY_APP_READY_DIR, if set, so a benchmark can tell when every worker is
+ready. GET / answers with the serving PID and a checksum read from the
+model.
+
+Usage (from the backend directory):
+    python run.py --workers 4 --app benchmarks.heavy_app:app
+"""
+
+import json
+import os
+
+import numpy as np
+
+MODEL = np.random.default_rng(0).standard_normal(int(os.getenv("HEAVY_APP_MB", "200")) * 2**20 // 8)
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                ready_dir = os.getenv("HEAVY_APP_READY_DIR")
+                if ready_dir:
+                    with open(os.path.join(ready_dir, str(os.getpid())), "w"):
+                        pass
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    body = json.dumps({"pid": os.getpid(), "checksum": float(MODEL[::4096].sum())}).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
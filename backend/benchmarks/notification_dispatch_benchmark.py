@@ -0,0 +1,178 @@
+"""
+Enqueue latency and dispatch throughput of notifications behind a slow channel
+
+Producer threads stand in for the camera and detection threads. They queue
+routine emails faster than a simulated SMTP server accepts them, plus
+system notifications and a trickle of high-priority system alerts (an
+email and a system notification each). The benchmark runs this load
+against two services:
+
+- "legacy": the previous dispatch loop, which polls a list every 100 ms
+  and sends while holding the queue lock
+- "queued": NotificationService with per-channel priority queues and worker
+  pools
+
+Each run reports how long add_notification blocked the producers, the
+throughput and latency of each channel, the latency of alert emails, and
+how many notifications were dropped.
+
+Usage (from the backend directory):
+    python -m benchmarks.notification_dispatch_benchmark --email-delay 0.2 --duration 10
+"""
+
+import argparse
+import json
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.suite import percentiles
+from notification_service import NotificationService
+
+SETTINGS = {
+    "email_notifications": True,
+    "email_address": "security@example.com",
+    "unknown_alerts": True,
+    "system_alerts": True,
+}
+
+class SimulatedChannels:
+    """Record every send; emails take ``email_delay`` seconds like a slow SMTP server"""
+
+    email_delay = 0.2
+
+    def _load_settings(self) -> dict:
+        self.sent: Dict[str, List[float]] = {"email": [], "system": [], "alert_email": []}
+        self.sent_lock = threading.Lock()
+        return dict(SETTINGS)
+
+    def _record(self, kind: str, notification: dict):
+        with self.sent_lock:
+            self.sent[kind].append(time.time() - notification["queued_at"])
+
+    def _send_email_notification(self, notification: dict):
+        time.sleep(self.email_delay)
+        self._record("alert_email" if notification.get("alert") else "email", notification)
+
+    def _send_system_notification(self, notification: dict):
+        self._record("system", notification)
+
+class QueuedService(SimulatedChannels, NotificationService):
+    pass
+
+class LegacyService(SimulatedChannels, NotificationService):
+    """The dispatch loop NotificationService used before per-channel queues"""
+
+    def start(self):
+        self.notification_queue = []
+        self.queue_lock = threading.Lock()
+        self.running = True
+        self.notification_thread = threading.Thread(target=self._process_notifications, daemon=True)
+        self.notification_thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self.running = False
+        self.notification_thread.join(timeout=timeout)
+
+    def _process_notifications(self):
+        while self.running:
+            with self.queue_lock:
+                if self.notification_queue:
+                    notification = self.notification_queue.pop(0)
+                    self._send_notification(notification)
+            time.sleep(0.1)
+
+    def add_notification(self, notification_type: str, data: dict, priority: str = "normal") -> bool:
+        notification = {"type": notification_type, **data, "queued_at": time.time()}
+        with self.queue_lock:
+            self.notification_queue.append(notification)
+        return True
+
+def run(service, args) -> dict:
+    service.email_delay = args.email_delay
+    service.start()
+    enqueue: List[float] = []
+    enqueue_lock = threading.Lock()
+    deadline = time.time() + args.duration
+
+    def produce(index: int):
+        interval = args.producers / args.rate
+        sent = 0
+        latencies = []
+        next_at = time.time()
+        while time.time() < deadline:
+            alert = sent % args.alert_every == args.alert_every - 1
+            started = time.perf_counter()
+            if alert:
+                service.add_notification("email", {"subject": "System alert", "alert": True}, priority="high")
+                service.add_notification("system", {"message": "System alert"}, priority="high")
+            else:
+                service.add_notification("email", {"subject": f"Visitor {index}-{sent}"})
+                service.add_notification("system", {"message": f"Visitor {index}-{sent}"})
+            latencies.append(time.perf_counter() - started)
+            sent += 1
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.time()))
+        with enqueue_lock:
+            enqueue.extend(latencies)
+
+    producers = [threading.Thread(target=produce, args=(index,)) for index in range(args.producers)]
+    started = time.time()
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    elapsed = time.time() - started
+    service.stop(timeout=0.0)
+
+    with service.sent_lock:
+        sent = {kind: list(values) for kind, values in service.sent.items()}
+    dropped = 0
+    if hasattr(service, "queues"):
+        dropped = sum(sum(stats["dropped"].values()) for stats in service.get_queue_stats().values())
+    return {
+        "enqueued": len(enqueue),
+        "enqueue_latency": percentiles(enqueue),
+        "system_per_second": len(sent["system"]) / elapsed,
+        "system_latency": percentiles(sent["system"]),
+        "emails_per_second": (len(sent["email"]) + len(sent["alert_email"])) / elapsed,
+        "alert_email_latency": percentiles(sent["alert_email"]),
+        "alert_emails_sent": len(sent["alert_email"]),
+        "dropped": dropped,
+    }
+
+def ms(value) -> str:
+    return "    n/a" if value is None else f"{value:7.1f}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification dispatch benchmark")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--producers", type=int, default=4, help="Threads queueing notifications")
+    parser.add_argument("--rate", type=float, default=40.0, help="Visitor events per second across producers")
+    parser.add_argument("--alert-every", type=int, default=20, help="Every n-th event of a producer is a system alert")
+    parser.add_argument("--email-delay", type=float, default=0.2, help="Seconds per simulated SMTP send")
+    parser.add_argument("--email-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=200)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for name in ("legacy", "queued"):
+        if name == "legacy":
+            service = LegacyService("http://127.0.0.1:9", "benchmark")
+        else:
+            service = QueuedService("http://127.0.0.1:9", "benchmark", workers={"email": args.email_workers}, queue_size=args.queue_size)
+        result = dict(run(service, args), service=name)
+        results.append(result)
+        print(
+            f"{name:>6}: enqueue p50 {ms(result['enqueue_latency']['p50_ms'])} ms, p99 {ms(result['enqueue_latency']['p99_ms'])} ms, "
+            f"max {ms(result['enqueue_latency']['max_ms'])} ms | system {result['system_per_second']:6.1f}/s, "
+            f"p99 {ms(result['system_latency']['p99_ms'])} ms | emails {result['emails_per_second']:5.1f}/s, "
+            f"alert emails {result['alert_emails_sent']}, p99 {ms(result['alert_email_latency']['p99_ms'])} ms | dropped {result['dropped']}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
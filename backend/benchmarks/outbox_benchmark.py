@@ -0,0 +1,255 @@
+"""
+Enqueue throughput of the notification outbox, and recovery after a crash
+
+Enqueue: producer threads queue notifications as fast as they can into
+
+- "memory": the in-memory NotificationQueue, which loses them on a crash
+- "commit per insert": an SQLite outbox that commits every notification
+  on the caller's thread
+- "group commit": notification_outbox.NotificationOutbox, whose writer
+  thread commits everything buffered since its last commit at once
+
+and the benchmark reports notifications per second, put latency
+percentiles, the number of commits, and the time until all of them were
+durable.
+
+Crash recovery: a child process runs NotificationService with an outbox
+and slow emails, some of which fail once and are retried, and a few of
+which always fail and end up dead-lettered. Once everything is queued the
+child is killed with SIGKILL mid-dispatch. A new service then opens the
+same outbox and sends the rest. The benchmark reports how many
+notifications were delivered before and after the crash, lost and sent
+twice.
+
+Usage (from the backend directory):
+    python -m benchmarks.outbox_benchmark --producers 4 --notifications 20000 --crash-notifications 200
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+from benchmarks.suite import percentiles
+from notification_outbox import NotificationOutbox, RetryPolicy
+from notification_queue import NotificationQueue
+from notification_service import NotificationService
+
+SETTINGS = {
+    "email_notifications": True,
+    "email_address": "security@example.com",
+    "unknown_alerts": True,
+    "system_alerts": True,
+}
+
+class CommitPerInsertOutbox(NotificationOutbox):
+    """Writes and commits every notification in put, without the writer thread"""
+
+    def put(self, channel: str, notification: dict, priority: str = "normal") -> bool:
+        with self.db_lock:
+            self.connection.execute(
+                "INSERT INTO outbox (channel, priority, payload, queued_at) VALUES (?, ?, ?, ?)",
+                (channel, 1, json.dumps(notification), notification["queued_at"])
+            )
+        self.enqueued += 1
+        self.commits += 1
+        return True
+
+def enqueue(name: str, args, directory: str) -> dict:
+    if name == "memory":
+        queue = NotificationQueue(maxsize=args.producers * args.notifications)
+        put = lambda notification: queue.put(notification)
+    else:
+        outbox_class = CommitPerInsertOutbox if name == "commit per insert" else NotificationOutbox
+        outbox = outbox_class(os.path.join(directory, f"{name.replace(' ', '_')}.db"), ["email"], synchronous=args.synchronous).start()
+        put = lambda notification: outbox.put("email", notification)
+
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def produce(index: int):
+        own = []
+        for sequence in range(args.notifications):
+            notification = {"type": "email", "subject": f"Visitor {index}-{sequence}", "queued_at": time.time()}
+            started = time.perf_counter()
+            put(notification)
+            own.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own)
+
+    producers = [threading.Thread(target=produce, args=(index,)) for index in range(args.producers)]
+    started = time.perf_counter()
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    queued = time.perf_counter() - started
+    commits = None
+    if name != "memory":
+        outbox.flush()
+        commits = outbox.commits
+        outbox.stop()
+        outbox.close()
+    durable = time.perf_counter() - started
+
+    return {
+        "setup": name,
+        "per_second": len(latencies) / queued,
+        "put_latency": percentiles(latencies),
+        "commits": commits,
+        "durable_after_s": None if name == "memory" else durable,
+    }
+
+class CrashTestService(NotificationService):
+    """Emails take ``email_delay`` seconds and are logged to ``sent_log``; some fail once, some always"""
+
+    def _load_settings(self) -> dict:
+        return dict(SETTINGS)
+
+    def _send_email_notification(self, notification: dict):
+        time.sleep(self.email_delay)
+        if notification["poison"]:
+            raise ConnectionError("Injected permanent failure")
+        if notification["flaky"] and not os.path.exists(f"{self.sent_log}.{notification['sequence']}.failed"):
+            open(f"{self.sent_log}.{notification['sequence']}.failed", "w").close()
+            raise ConnectionError("Injected transient failure")
+        with open(self.sent_log, "a") as f:
+            f.write(f"{notification['sequence']}\n")
+
+def crash_plan(args) -> List[tuple]:
+    """Whether each crash-test notification fails once and whether it always fails"""
+    rng = random.Random(0)
+    return [(rng.random() < args.flaky, rng.random() < args.poison) for _ in range(args.crash_notifications)]
+
+def crash_service(path: str, sent_log: str, email_delay: float) -> CrashTestService:
+    service = CrashTestService(
+        "http://127.0.0.1:9",
+        "benchmark",
+        alert_window=0.0,
+        outbox_path=path,
+        retry={"email": RetryPolicy(base=0.05, maximum=0.2, max_attempts=3)}
+    )
+    service.sent_log = sent_log
+    service.email_delay = email_delay
+    return service
+
+def child(args):
+    """Queue the crash-test notifications and send them until killed"""
+    service = crash_service(args.child[0], args.child[1], args.email_delay)
+    service.start()
+    for sequence, (flaky, poison) in enumerate(crash_plan(args)):
+        service.add_notification("email", {
+            "subject": f"Visitor {sequence}",
+            "sequence": sequence,
+            "flaky": flaky,
+            "poison": poison,
+        }, priority="high" if sequence % 10 == 0 else "normal")
+    service.outbox.flush()
+    print("queued", flush=True)
+    while True:
+        time.sleep(1)
+
+def delivered(sent_log: str) -> List[int]:
+    if not os.path.exists(sent_log):
+        return []
+    with open(sent_log) as f:
+        return [int(line) for line in f if line.strip()]
+
+def crash_recovery(args, directory: str) -> dict:
+    path = os.path.join(directory, "crash.db")
+    sent_log = os.path.join(directory, "sent.log")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.outbox_benchmark", "--child", path, sent_log,
+         "--crash-notifications", str(args.crash_notifications), "--email-delay", str(args.email_delay),
+         "--flaky", str(args.flaky), "--poison", str(args.poison)],
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    assert process.stdout.readline().strip() == "queued"
+    time.sleep(args.kill_after)
+    process.send_signal(signal.SIGKILL)
+    process.wait()
+    before = delivered(sent_log)
+
+    service = crash_service(path, sent_log, 0.0)
+    resumed = service.outbox.resumed
+    started = time.time()
+    service.start()
+    while len(service.outbox) and time.time() - started < 60:
+        time.sleep(0.01)
+    recovery = time.time() - started
+    service.stop()
+    after = delivered(sent_log)[len(before):]
+
+    connection = sqlite3.connect(path)
+    dead = connection.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+    connection.close()
+    poison = sum(1 for _, always_fails in crash_plan(args) if always_fails)
+    unique = set(before) | set(after)
+    return {
+        "queued": args.crash_notifications,
+        "sent_before_crash": len(before),
+        "resumed": resumed,
+        "sent_after_restart": len(after),
+        "recovery_s": recovery,
+        "dead_lettered": dead,
+        "expected_dead": poison,
+        "lost": args.crash_notifications - poison - len(unique),
+        "duplicates": len(before) + len(after) - len(unique),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification outbox benchmark")
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--notifications", type=int, default=20000, help="Notifications per producer")
+    parser.add_argument("--synchronous", default="NORMAL", choices=["NORMAL", "FULL"])
+    parser.add_argument("--crash-notifications", type=int, default=200)
+    parser.add_argument("--email-delay", type=float, default=0.01, help="Seconds per email in the crashing process")
+    parser.add_argument("--kill-after", type=float, default=0.5, help="Seconds after queueing the process is killed")
+    parser.add_argument("--flaky", type=float, default=0.1, help="Fraction of emails that fail once")
+    parser.add_argument("--poison", type=float, default=0.02, help="Fraction of emails that always fail")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+    # Every notification is logged at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.child:
+        child(args)
+        return
+
+    results = {"enqueue": [], "crash_recovery": None}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("memory", "commit per insert", "group commit"):
+            result = enqueue(name, args, directory)
+            results["enqueue"].append(result)
+            durable = "never" if result["durable_after_s"] is None else f"{result['durable_after_s']:.2f}s"
+            commits = "" if result["commits"] is None else f", {result['commits']} commits"
+            print(
+                f"{name:>17}: {result['per_second']:9.0f} puts/s, p50 {result['put_latency']['p50_ms'] * 1000:6.1f} us, "
+                f"p99 {result['put_latency']['p99_ms'] * 1000:7.1f} us{commits}, all durable after {durable}"
+            )
+
+        recovery = crash_recovery(args, directory)
+        results["crash_recovery"] = recovery
+        print(
+            f"crash recovery: {recovery['queued']} queued, {recovery['sent_before_crash']} sent before SIGKILL, "
+            f"{recovery['resumed']} resumed, {recovery['sent_after_restart']} sent after restart in {recovery['recovery_s']:.2f}s, "
+            f"{recovery['dead_lettered']} dead-lettered (expected {recovery['expected_dead']}), "
+            f"{recovery['lost']} lost, {recovery['duplicates']} sent twice"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
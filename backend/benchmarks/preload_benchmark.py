@@ -0,0 +1,135 @@
+"""
+Memory and time to ready: independent workers versus preload-and-fork
+
+Starts N backend workers serving benchmarks.heavy_app, which loads a large
+stand-in model at import, in two ways:
+
+- "independent": ``uvicorn --workers N``, where every worker process
+  imports the application and loads its own copy of the model
+- "preload": ``run.py --workers N``, which loads the application once and
+  forks the workers from it, sharing the model copy-on-write
+
+Each run reports the seconds until every worker has finished lifespan
+startup and the total RSS and PSS of the process tree. PSS splits each
+shared page between the processes that map it, so its sum is the memory
+the tree really uses. Then one worker is killed to time the restart.
+
+Usage (from the backend directory):
+    python -m benchmarks.preload_benchmark --workers 1 2 4 --model-mb 200
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+def children(pid: int) -> list:
+    """Every descendant of a process"""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parents.setdefault(int(f.read().rsplit(")", 1)[1].split()[1]), []).append(int(entry))
+            except (OSError, IndexError):
+                continue
+    found = []
+    pending = [pid]
+    while pending:
+        for child in parents.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+def memory_mb(pids: list) -> dict:
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        totals["rss_mb"] += int(line.split()[1]) / 1024
+                    elif line.startswith("Pss:"):
+                        totals["pss_mb"] += int(line.split()[1]) / 1024
+        except OSError:
+            continue
+    return totals
+
+def wait_ready(ready_dir: str, count: int, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while len(os.listdir(ready_dir)) < count:
+        if time.time() > deadline:
+            raise TimeoutError(f"Only {len(os.listdir(ready_dir))} of {count} workers became ready")
+        time.sleep(0.01)
+
+def measure(mode: str, workers: int, port: int, args) -> dict:
+    app = "benchmarks.heavy_app:app"
+    if mode == "independent":
+        command = [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning", "--workers", str(workers)]
+    else:
+        command = [sys.executable, "run.py", "--app", app, "--port", str(port), "--host", "127.0.0.1", "--workers", str(workers)]
+
+    with tempfile.TemporaryDirectory() as ready_dir:
+        env = dict(os.environ, HEAVY_APP_MB=str(args.model_mb), HEAVY_APP_READY_DIR=ready_dir)
+        started = time.time()
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        try:
+            wait_ready(ready_dir, workers)
+            ready = time.time() - started
+            time.sleep(args.settle)
+
+            # Touch the model in every worker, as requests would
+            for _ in range(workers * 4):
+                requests.get(f"http://127.0.0.1:{port}/", timeout=10)
+            result = dict(memory_mb([process.pid] + children(process.pid)), mode=mode, workers=workers, ready_seconds=ready)
+
+            # Kill one worker and time until its replacement is ready. A
+            # single uvicorn worker is the runner's own process, with no
+            # supervisor to restart it
+            victims = [int(name) for name in os.listdir(ready_dir) if int(name) != process.pid]
+            result["restart_seconds"] = None
+            if victims:
+                restarted = time.time()
+                os.kill(victims[0], signal.SIGKILL)
+                wait_ready(ready_dir, workers + 1)
+                result["restart_seconds"] = time.time() - restarted
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload-and-fork worker benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--model-mb", type=int, default=200, help="Size of the stand-in model")
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds to wait after ready before measuring memory")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        for mode in ("independent", "preload"):
+            result = measure(mode, workers, args.port, args)
+            results.append(result)
+            restart = "n/a" if result["restart_seconds"] is None else f"{result['restart_seconds']:.2f}s"
+            print(
+                f"{workers} workers, {mode:>11}: ready in {result['ready_seconds']:5.2f}s, "
+                f"RSS {result['rss_mb']:7.1f} MB, PSS {result['pss_mb']:7.1f} MB, worker restart {restart}"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
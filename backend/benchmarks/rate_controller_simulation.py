@@ -0,0 +1,86 @@
+"""
+Simulate how RateController converges against a backend with limited capacity
+
+No network or cameras are involved. Time is simulated in small steps.
+The backend is modelled as a single queue: latency grows as the offered
+load approaches ``--capacity`` frames per second, and above capacity a
+share of requests is answered with 429. A subset of cameras "sees people"
+during a window in the middle of the run.
+
+Usage (from the backend directory):
+    python -m benchmarks.rate_controller_simulation --cameras 50 --capacity 20 --budget 30
+"""
+
+import argparse
+import random
+from collections import deque
+
+from rate_controller import RateController
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate controller convergence simulation")
+    parser.add_argument("--cameras", type=int, default=50)
+    parser.add_argument("--capacity", type=float, default=20.0, help="Backend frames per second")
+    parser.add_argument("--budget", type=float, default=None, help="Global budget in frames per second")
+    parser.add_argument("--base-latency", type=float, default=0.08)
+    parser.add_argument("--active", type=int, default=5, help="Cameras that see people")
+    parser.add_argument("--duration", type=float, default=180.0)
+    parser.add_argument("--step", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    controller = RateController(budget_fps=args.budget)
+    for camera_id in range(args.cameras):
+        controller.add_camera(camera_id)
+
+    next_frame = {camera_id: rng.uniform(0, 1) for camera_id in range(args.cameras)}
+    recent = deque()  # Times of recent requests, to measure offered load
+    activity_start, activity_end = args.duration / 3, 2 * args.duration / 3
+    active = set(range(args.active))
+
+    print(f"{'time':>6} {'load fps':>9} {'latency':>8} {'429s':>5} {'active int':>10} {'idle int':>9}")
+    throttled = 0
+    t = 0.0
+    report_at = 10.0
+    while t < args.duration:
+        for camera_id in range(args.cameras):
+            if next_frame[camera_id] > t:
+                continue
+
+            recent.append(t)
+            while recent and recent[0] < t - 1.0:
+                recent.popleft()
+            load = len(recent)
+
+            utilisation = load / args.capacity
+            if utilisation >= 1.0 and rng.random() < 1.0 - 1.0 / utilisation:
+                status, latency = 429, args.base_latency
+                throttled += 1
+            else:
+                status = 200
+                latency = args.base_latency / max(0.05, 1.0 - min(utilisation, 0.95))
+
+            seeing_people = camera_id in active and activity_start <= t <= activity_end
+            detections = 1 if seeing_people and rng.random() < 0.7 else 0
+
+            interval = controller.record(camera_id, latency, status, detections, now=t)
+            next_frame[camera_id] = t + interval
+
+        if t >= report_at:
+            report_at += 10.0
+            intervals = [controller.cameras[c].interval for c in range(args.cameras)]
+            active_interval = sum(intervals[c] for c in active) / len(active) if active else 0.0
+            idle = [intervals[c] for c in range(args.cameras) if c not in active]
+            idle_interval = sum(idle) / len(idle) if idle else 0.0
+            latencies = [controller.cameras[c].latency or 0.0 for c in range(args.cameras)]
+            print(
+                f"{t:6.0f} {len(recent):9d} {sum(latencies) / len(latencies):8.3f} "
+                f"{throttled:5d} {active_interval:10.2f} {idle_interval:9.2f}"
+            )
+            throttled = 0
+
+        t += args.step
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure incremental camera registry sync against a full restart
+
+Starts many synthetic cameras on the thread engine against a local stub
+backend, then changes the backend's camera list (retargets, removals and
+additions) and applies it with ``sync_cameras``. Reports how long the sync
+took and how many running streams it interrupted, next to the same numbers
+for stopping and restarting every camera. Also times an unchanged poll,
+which the backend answers with 304.
+
+Usage (from the backend directory):
+    python -m benchmarks.registry_sync_benchmark --cameras 200 --changes 5
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.engine_benchmark import with_synthetic_cameras
+from benchmarks.stub_backend import StubBackend
+from camera_service import CameraService
+
+def camera_record(camera_id: int, stream: int = None) -> dict:
+    return {
+        "id": camera_id,
+        "name": f"Synthetic {camera_id}",
+        "url": f"rtsp://synthetic/{camera_id if stream is None else stream}",
+    }
+
+def mutate(cameras: list, changes: int, next_id: int) -> list:
+    """Retarget, remove and add ``changes`` cameras each"""
+    updated = [dict(camera) for camera in cameras[changes:]]
+    for camera in updated[:changes]:
+        camera["url"] = camera_record(camera["id"], stream=camera["id"] + 10000)["url"]
+    updated += [camera_record(camera_id) for camera_id in range(next_id, next_id + changes)]
+    return updated
+
+def thread_identities(service: CameraService) -> dict:
+    return {camera_id: thread.ident for camera_id, thread in service.camera_threads.items()}
+
+def interrupted(before: dict, after: dict) -> int:
+    """Streams that were running before and were stopped or restarted"""
+    return sum(1 for camera_id, ident in before.items() if after.get(camera_id) != ident)
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera registry sync benchmark")
+    parser.add_argument("--cameras", type=int, default=200)
+    parser.add_argument("--changes", type=int, default=5, help="Cameras retargeted, removed and added each")
+    parser.add_argument("--polls", type=int, default=50, help="Unchanged polls to time")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=180)
+    parser.add_argument("--fps", type=float, default=5.0)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    cameras = [camera_record(camera_id) for camera_id in range(1, args.cameras + 1)]
+    backend = StubBackend(cameras).start()
+    service_class = with_synthetic_cameras(CameraService, args.width, args.height, args.fps)
+    service = service_class(backend.url, "benchmark", metrics=False)
+    service.set_frame_interval(args.interval)
+    service.start_all_cameras()
+    time.sleep(1.0)
+
+    poll_times = []
+    for _ in range(args.polls):
+        start = time.perf_counter()
+        service.sync_cameras()
+        poll_times.append(time.perf_counter() - start)
+
+    before = thread_identities(service)
+    with backend.lock:
+        backend.cameras = mutate(cameras, args.changes, args.cameras + 1)
+    start = time.perf_counter()
+    diff = service.sync_cameras()
+    sync_seconds = time.perf_counter() - start
+    sync_interrupted = interrupted(before, thread_identities(service))
+
+    before = thread_identities(service)
+    start = time.perf_counter()
+    service.stop_all_cameras()
+    service.start_all_cameras()
+    restart_seconds = time.perf_counter() - start
+    restart_interrupted = interrupted(before, thread_identities(service))
+
+    service.stop_all_cameras()
+    backend.stop()
+
+    result = {
+        "cameras": args.cameras,
+        "diff": diff.summary(),
+        "unchanged_poll_seconds": statistics.median(poll_times),
+        "sync_seconds": sync_seconds,
+        "sync_interrupted_streams": sync_interrupted,
+        "restart_seconds": restart_seconds,
+        "restart_interrupted_streams": restart_interrupted,
+        "registry": service.get_registry_stats(),
+    }
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
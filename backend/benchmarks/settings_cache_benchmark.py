@@ -0,0 +1,132 @@
+"""
+Cost of reading settings and delay until a dashboard change applies
+
+Runs NotificationService against a local stub backend (in-process, with a
+simulated request latency) and compares three ways of reading the settings
+on the alert path:
+
+- "startup copy": the settings fetched once at startup, as before; free to
+  read, but a change never applies
+- "fetch per read": GET /api/settings for every notification, the
+  workaround that makes changes apply
+- "cache": the SettingsCache, revalidated on a TTL with conditional GETs
+  and invalidated by settings_update events over /ws
+
+For each it reports the time per read, the requests sent to the backend,
+and how long after a settings change the service saw it, with and without
+the WebSocket push for the cache.
+
+Usage (from the backend directory):
+    python -m benchmarks.settings_cache_benchmark --reads 2000 --ttl 5 --latency 0.005
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import requests
+
+from benchmarks.stub_backend import StubBackend
+from notification_service import NotificationService, listen_for_settings
+
+class StartupCopyService(NotificationService):
+    def _load_settings(self) -> dict:
+        response = requests.get(f"{self.backend_url}/api/settings", headers={"Authorization": f"Bearer {self.api_token}"})
+        return response.json()
+
+class FetchPerReadSettings:
+    def __init__(self, session: requests.Session, backend_url: str):
+        self.session = session
+        self.backend_url = backend_url
+
+    def get(self, key: str, default=None):
+        return self.session.get(f"{self.backend_url}/api/settings").json().get(key, default)
+
+class FetchPerReadService(NotificationService):
+    def _load_settings(self):
+        return FetchPerReadSettings(self.session, self.backend_url)
+
+def time_reads(service: NotificationService, reads: int) -> float:
+    """Microseconds per settings read"""
+    started = time.perf_counter()
+    for _ in range(reads):
+        service.settings.get("unknown_alerts", False)
+    return (time.perf_counter() - started) / reads * 1e6
+
+def time_to_apply(backend: StubBackend, service: NotificationService, timeout: float) -> float:
+    """Turn unknown-visitor alerts off and time until the service reads the change, None if it never does"""
+    expected = not service.settings.get("unknown_alerts", False)
+    changed_at = time.perf_counter()
+    backend.update_settings({"unknown_alerts": expected})
+    while time.perf_counter() - changed_at < timeout:
+        if service.settings.get("unknown_alerts", False) == expected:
+            return time.perf_counter() - changed_at
+        time.sleep(0.001)
+    return None
+
+def run(name: str, args) -> dict:
+    backend = StubBackend().start()
+    backend.settings_latency = args.latency
+    service_class = {"startup copy": StartupCopyService, "fetch per read": FetchPerReadService}.get(name, NotificationService)
+    service = service_class(backend.url, "benchmark", alert_window=0.0, settings_ttl=args.ttl)
+    service.start()
+    if name == "cache + push":
+        threading.Thread(target=listen_for_settings, args=(backend.ws_url, service), daemon=True).start()
+        deadline = time.time() + 5.0
+        while not backend.stats()["websockets"] and time.time() < deadline:
+            time.sleep(0.01)
+
+    # Every fetching read waits for the backend, so fewer of them are timed
+    reads = min(args.reads, 200) if name == "fetch per read" else args.reads
+    backend.reset()
+    per_read = time_reads(service, reads)
+    requests_per_read = backend.stats()["settings_requests"] / reads
+
+    delays = [time_to_apply(backend, service, args.ttl * 2 + 1) for _ in range(args.changes)]
+    service.stop(timeout=1.0)
+    backend.stop()
+
+    applied = [delay for delay in delays if delay is not None]
+    stats = service.get_settings_stats() if service.settings is service.settings_cache else {}
+    return {
+        "setup": name,
+        "read_us": per_read,
+        "requests_per_read": requests_per_read,
+        "changes_applied": len(applied),
+        "changes": len(delays),
+        "apply_median_s": statistics.median(applied) if applied else None,
+        "apply_max_s": max(applied) if applied else None,
+        "hit_rate": stats.get("hit_rate"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Settings cache benchmark")
+    parser.add_argument("--reads", type=int, default=2000, help="Settings reads to time")
+    parser.add_argument("--changes", type=int, default=3, help="Settings changes to time")
+    parser.add_argument("--ttl", type=float, default=5.0, help="Settings cache TTL in seconds")
+    parser.add_argument("--latency", type=float, default=0.005, help="Simulated backend round trip in seconds")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for name in ("startup copy", "fetch per read", "cache", "cache + push"):
+        result = run(name, args)
+        results.append(result)
+        applied = (
+            f"applied {result['changes_applied']}/{result['changes']} changes, "
+            f"median {result['apply_median_s']:.3f}s, max {result['apply_max_s']:.3f}s"
+            if result["changes_applied"] else f"applied 0/{result['changes']} changes"
+        )
+        hit_rate = f", hit rate {result['hit_rate']:.1%}" if result["hit_rate"] is not None else ""
+        print(
+            f"{name:>14}: {result['read_us']:9.1f} us per read, {result['requests_per_read']:.3f} requests per read, "
+            f"{applied}{hit_rate}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
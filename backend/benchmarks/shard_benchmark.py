@@ -0,0 +1,65 @@
+"""
+Measure aggregate processed fps of ShardedCameraService versus worker count
+
+Every run uses the same set of synthetic cameras and a local stub backend.
+The frame interval is set low so the cameras produce more frames than one
+process can decode and encode.
+
+Usage (from the backend directory):
+    python -m benchmarks.shard_benchmark --workers 1 2 4 8 --cameras 32
+"""
+
+import argparse
+import functools
+import time
+
+from benchmarks.stub_backend import StubBackend
+from benchmarks.synthetic_camera import open_synthetic_capture
+from sharded_camera_service import ShardedCameraService
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded camera service benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--cameras", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=25.0)
+    args = parser.parse_args()
+
+    cameras = [
+        {"id": i, "name": f"Synthetic {i}", "url": f"rtsp://synthetic/{i}"}
+        for i in range(1, args.cameras + 1)
+    ]
+    backend = StubBackend(cameras).start()
+    factory = functools.partial(open_synthetic_capture, width=args.width, height=args.height, fps=args.fps)
+
+    for workers in args.workers:
+        service = ShardedCameraService(
+            backend.url,
+            "benchmark",
+            workers=workers,
+            capture_factory=factory
+        )
+        service.set_frame_interval(args.interval)
+        service.start_all_cameras()
+
+        # Let the workers spawn and open their captures before measuring
+        time.sleep(3)
+        backend.reset()
+        time.sleep(args.duration)
+        frames = backend.frames
+
+        torn = sum(shard["torn"] for shard in service.get_shard_stats())
+        service.shutdown()
+
+        print(
+            f"{workers:2d} workers: {frames / args.duration:7.1f} fps processed, "
+            f"{torn} frames dropped before upload"
+        )
+
+    backend.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Simulate a backend outage and watch the frame spool fill and drain
+
+A stub backend is up, goes down (answers 503) and comes back. Frames are
+uploaded the whole time at a fixed rate. Frames that fail during the outage
+are written to the spool and replayed in capture order after recovery.
+
+Usage (from the backend directory):
+    python -m benchmarks.spool_outage_demo --fps 10 --up 3 --down 5 --replay-rate 20
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.stub_backend import StubBackend
+from camera_service import CameraService
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame spool outage demo")
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--up", type=float, default=3.0, help="Seconds before the outage")
+    parser.add_argument("--down", type=float, default=5.0, help="Seconds of outage")
+    parser.add_argument("--replay-rate", type=float, default=20.0)
+    parser.add_argument("--max-mb", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the replay")
+    args = parser.parse_args()
+
+    backend = StubBackend(cameras=[{"id": 1, "name": "demo", "url": "synthetic://1"}]).start()
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        service = CameraService(
+            backend.url,
+            "benchmark",
+            spool_dir=spool_dir,
+            spool_max_bytes=args.max_mb * 1024 * 1024,
+            spool_replay_rate=args.replay_rate
+        )
+
+        start = time.time()
+        sent = 0
+        next_report = start
+        outage_end = start + args.up + args.down
+        while True:
+            now = time.time()
+            backend.available = not (start + args.up <= now < outage_end)
+
+            if now < outage_end + 1.0:
+                service._process_frame(1, frame)
+                sent += 1
+
+            if now >= next_report:
+                stats = service.get_spool_stats()
+                print(json.dumps({
+                    "t": round(now - start, 1),
+                    "backend_up": backend.available,
+                    "sent": sent,
+                    "received": backend.frames,
+                    "disk_bytes": stats["disk_bytes"],
+                    "pending_bytes": stats["pending_bytes"],
+                    "appended": stats["appended"],
+                    "replayed": stats["replayed"],
+                }))
+                next_report += 1.0
+
+                if now > outage_end + 1.0 and stats["pending_bytes"] == 0:
+                    break
+                if now - start > args.up + args.down + args.timeout:
+                    print("Replay did not finish in time")
+                    break
+
+            time.sleep(1.0 / args.fps)
+
+        stats = service.get_spool_stats()
+        print(json.dumps({"sent": sent, "received": backend.frames, "spool": stats}, indent=2))
+        service.spool.close()
+
+    backend.stop()
+
+if __name__ == "__main__":
+    main()
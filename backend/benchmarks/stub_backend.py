@@ -0,0 +1,427 @@
+"""
+Minimal local stand-in for the backend API used by the benchmarks
+
+Runs in-process (``StubBackend(...).start()``) or as its own process, so that
+it does not count towards a benchmarked service's CPU use:
+
+    python -m benchmarks.stub_backend --cameras 10 --latency 0.02 --error-rate 0.01
+
+The standalone stub prints its base URL on the first line of stdout. It can
+be inspected and steered over HTTP: GET /_stub/stats returns its counters,
+and POST /_stub/control takes a JSON object with any of "available",
+"latency", "latency_jitter", "error_rate", "detection_rate", "publish_rate",
+"settings_latency", "settings" (changes merged into the settings and announced as a
+settings_update event), and the actions "reset" and "drop_websockets".
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+DEFAULT_SETTINGS = {
+    "email_notifications": True,
+    "email_address": "security@example.com",
+    "unknown_alerts": True,
+    "system_alerts": True,
+}
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hundreds of cameras connect at once, the default backlog of 5 resets them
+    request_queue_size = 512
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-request are expected when a benchmark stops
+        pass
+
+class StubBackend:
+    def __init__(
+        self,
+        cameras: List[dict] = None,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        detection_rate: float = 0.0,
+        settings: dict = None,
+        seed: int = 0,
+        port: int = 0
+    ):
+        """
+        Serve /api/cameras, /api/settings, /api/process-frame and /ws on a random local port
+
+        /api/cameras and /api/settings carry an ETag and answer a matching
+        If-None-Match with 304. Replace ``cameras`` under ``lock`` to change
+        the list, and change settings with ``update_settings``.
+
+        Set ``available`` to False to simulate an outage: process-frame
+        requests are then answered with 503. ``replayed`` lists the
+        X-Capture-Timestamp of every accepted replay from a frame spool, in
+        the order they arrived. Set ``binary_reply`` to a (status, body) pair
+        to answer every upload that is not JSON with it, like a backend that
+        only takes the legacy JSON body.
+
+        Frames that get a detection are also announced as a "detection" event
+        to every client connected to /ws, as the real backend does.
+
+        Args:
+            cameras: Camera records returned by GET /api/cameras
+            latency: Seconds to sleep before answering process-frame requests
+            latency_jitter: Extra random latency, uniform between 0 and this
+            error_rate: Fraction of process-frame requests answered with 500
+            detection_rate: Fraction of processed frames that contain a face
+            settings: Settings returned by GET /api/settings
+            seed: Seed for the error and detection injection
+            port: Port to listen on, 0 picks a free one
+        """
+        self.cameras = cameras or []
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.detection_rate = detection_rate
+        self.settings = dict(DEFAULT_SETTINGS if settings is None else settings)
+        self.settings_latency = 0.0  # Seconds to sleep before answering /api/settings
+        self.available = True
+        self.binary_reply: Optional[Tuple[int, dict]] = None
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.errors = 0
+        self.detections = 0
+        self.bytes_received = 0
+        self.replayed: List[float] = []
+        self.settings_requests = 0
+        self.websockets: List[socket.socket] = []
+        self.ws_lock = threading.Lock()
+        self.published = 0
+        self.publish_rate = 0.0  # Synthetic WebSocket events per second
+        self.publisher = threading.Thread(target=self._publish_events, daemon=True)
+
+        self.server = QuietHTTPServer(("127.0.0.1", port), self._make_handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.ws_url = f"ws://127.0.0.1:{self.server.server_address[1]}/ws"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.publisher.start()
+        return self
+
+    def stop(self):
+        with self.ws_lock:
+            for connection in self.websockets:
+                try:
+                    connection.sendall(b"\x88\x00")  # Close frame
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.websockets = []
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.frames = 0
+            self.errors = 0
+            self.detections = 0
+            self.bytes_received = 0
+            self.replayed = []
+            self.settings_requests = 0
+            self.published = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "frames": self.frames,
+                "errors": self.errors,
+                "detections": self.detections,
+                "bytes_received": self.bytes_received,
+                "published": self.published,
+                "settings_requests": self.settings_requests,
+                "websockets": len(self.websockets),
+            }
+
+    def control(self, changes: dict):
+        """Apply a /_stub/control request"""
+        if changes.get("reset"):
+            self.reset()
+        for key in ("available", "latency", "latency_jitter", "error_rate", "detection_rate", "publish_rate", "settings_latency"):
+            if key in changes:
+                setattr(self, key, changes[key])
+        if "settings" in changes:
+            self.update_settings(changes["settings"])
+        if changes.get("drop_websockets"):
+            self.drop_websockets()
+
+    def update_settings(self, changes: dict) -> int:
+        """
+        Change settings and announce it with a settings_update event, as the backend does
+
+        Returns:
+            Number of WebSocket clients the event was sent to
+        """
+        with self.lock:
+            self.settings = dict(self.settings, **changes)
+            settings = dict(self.settings)
+        return self.broadcast({"type": "settings_update", "data": settings})
+
+    def _publish_events(self):
+        """Broadcast synthetic detection events at publish_rate"""
+        next_time = time.time()
+        while True:
+            if not self.publish_rate:
+                time.sleep(0.05)
+                next_time = time.time()
+                continue
+            next_time += 1.0 / self.publish_rate
+            delay = next_time - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            with self.lock:
+                self.published += 1
+                sequence = self.published
+            self.broadcast({
+                "type": "detection",
+                "data": {"camera_id": 1, "detections": [], "sequence": sequence, "sent_at": time.time()},
+            })
+
+    def broadcast(self, event: dict) -> int:
+        """
+        Send an event to every connected WebSocket client
+
+        Returns:
+            Number of clients the event was sent to
+        """
+        frame = _websocket_frame(json.dumps(event).encode())
+        sent = 0
+        with self.ws_lock:
+            for connection in list(self.websockets):
+                try:
+                    connection.sendall(frame)
+                    sent += 1
+                except OSError:
+                    self.websockets.remove(connection)
+        return sent
+
+    def drop_websockets(self):
+        """Close every WebSocket connection abruptly, to exercise client reconnects"""
+        with self.ws_lock:
+            for connection in self.websockets:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.websockets = []
+
+    def _make_handler(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, avoid Nagle/delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _reply_conditional(self, payload):
+                # Conditional GET, as the camera registry and settings cache expect from the backend
+                body = json.dumps(payload, sort_keys=True).encode()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("/_stub/stats"):
+                    self._reply(backend.stats())
+                elif self.path.startswith("/ws"):
+                    self._serve_websocket()
+                elif self.path.startswith("/api/cameras"):
+                    with backend.lock:
+                        cameras = list(backend.cameras)
+                    self._reply_conditional(cameras)
+                elif self.path.startswith("/api/settings"):
+                    with backend.lock:
+                        backend.settings_requests += 1
+                        settings = dict(backend.settings)
+                    if backend.settings_latency:
+                        time.sleep(backend.settings_latency)
+                    self._reply_conditional(settings)
+                else:
+                    self._reply({})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if self.path.startswith("/_stub/control"):
+                    backend.control(json.loads(body or b"{}"))
+                    self._reply(backend.stats())
+                    return
+                if not backend.available:
+                    self._reply({"detail": "Service unavailable"}, 503)
+                    return
+                if backend.binary_reply is not None and self.headers.get("Content-Type") != "application/json":
+                    status, reply = backend.binary_reply
+                    self._reply(reply, status)
+                    return
+
+                with backend.lock:
+                    backend.frames += 1
+                    backend.bytes_received += len(self.requestline) + len(str(self.headers)) + length
+                    failed = backend.error_rate and backend.random.random() < backend.error_rate
+                    if not failed and self.headers.get("X-Capture-Timestamp"):
+                        backend.replayed.append(float(self.headers["X-Capture-Timestamp"]))
+                    detected = backend.detection_rate and backend.random.random() < backend.detection_rate
+                    jitter = backend.random.uniform(0, backend.latency_jitter) if backend.latency_jitter else 0.0
+                    if failed:
+                        backend.errors += 1
+                    elif detected:
+                        backend.detections += 1
+
+                if backend.latency or jitter:
+                    time.sleep(backend.latency + jitter)
+                if failed:
+                    self._reply({"detail": "Injected error"}, 500)
+                    return
+
+                camera_id = self.headers.get("X-Camera-ID")
+                camera_id = int(camera_id) if camera_id else None
+                detections = []
+                if detected:
+                    detections.append({
+                        "name": "Benchmark Person",
+                        "person_id": 1,
+                        "verified": True,
+                        "confidence": 95.0,
+                        "bbox": {"x": 0, "y": 0, "width": 100, "height": 100},
+                    })
+                    backend.broadcast({
+                        "type": "detection",
+                        "data": {"camera_id": camera_id, "detections": detections, "sent_at": time.time()},
+                    })
+                self._reply({"camera_id": camera_id, "detections": detections})
+
+            def _serve_websocket(self):
+                key = self.headers.get("Sec-WebSocket-Key")
+                if not key or self.headers.get("Upgrade", "").lower() != "websocket":
+                    self._reply({"detail": "Expected a WebSocket upgrade"}, 400)
+                    return
+
+                accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", accept)
+                self.end_headers()
+                self.wfile.flush()
+
+                with backend.ws_lock:
+                    backend.websockets.append(self.connection)
+
+                # Read client frames until it closes, answering pings
+                try:
+                    while True:
+                        opcode, payload = _read_websocket_frame(self.rfile)
+                        if opcode is None or opcode == 0x8:
+                            break
+                        if opcode == 0x9:
+                            with backend.ws_lock:
+                                self.connection.sendall(_websocket_frame(payload, opcode=0xA))
+                except OSError:
+                    pass
+                finally:
+                    with backend.ws_lock:
+                        if self.connection in backend.websockets:
+                            backend.websockets.remove(self.connection)
+                    self.close_connection = True
+
+        return Handler
+
+def _websocket_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    """Build an unmasked server-to-client frame"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack(">H", length)
+    else:
+        header += bytes([127]) + struct.pack(">Q", length)
+    return header + payload
+
+def _read_websocket_frame(stream):
+    """Read one masked client frame, returns (opcode, payload) or (None, b"") at EOF"""
+    head = stream.read(2)
+    if len(head) < 2:
+        return None, b""
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", stream.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", stream.read(8))[0]
+    mask = stream.read(4) if head[1] & 0x80 else b"\x00\x00\x00\x00"
+    data = stream.read(length)
+    return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub backend for benchmarks")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--cameras", type=int, default=0, help="Number of synthetic cameras to list")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--detection-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cameras = [
+        {"id": i, "name": f"Synthetic {i}", "url": f"rtsp://synthetic/{i}"}
+        for i in range(1, args.cameras + 1)
+    ]
+    backend = StubBackend(
+        cameras,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        detection_rate=args.detection_rate,
+        seed=args.seed,
+        port=args.port
+    ).start()
+    print(backend.url, flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        backend.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Minimal local stand-in for an SMTP server used by the benchmarks
+
+Accepts EHLO/HELO, AUTH PLAIN (any credentials), MAIL, RCPT, DATA, RSET,
+NOOP and QUIT, advertises PIPELINING, and counts connections, commands and
+messages. Messages are kept in memory. ``latency`` simulates the network
+round trip: it is added once for every batch of replies, that is once per
+client write rather than once per command, as for a real server across a
+network. ``drop_connections`` and ``close_next_mail`` simulate a server that
+goes away while clients are connected.
+
+    server = StubSMTPServer(latency=0.01).start()
+    ... send to 127.0.0.1:server.port ...
+    print(server.get_stats())
+    server.stop()
+"""
+
+import socket
+import socketserver
+import threading
+import time
+from typing import List
+
+class StubSMTPServer:
+    def __init__(self, latency: float = 0.0, pipelining: bool = True, port: int = 0):
+        """
+        Args:
+            latency: Seconds added before each batch of replies
+            pipelining: Advertise PIPELINING in the EHLO reply
+            port: Port to listen on, 0 picks a free one
+        """
+        self.latency = latency
+        self.pipelining = pipelining
+        self.lock = threading.Lock()
+        self.messages: List[dict] = []
+        self.connections = 0
+        self.commands = 0
+        self.round_trips = 0
+        self.close_next_mail = False  # Answer the next MAIL with 421 and hang up
+        self.sockets = set()
+
+        stub = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                stub._count(connections=1)
+                with stub.lock:
+                    stub.sockets.add(self.request)
+                try:
+                    self._serve()
+                finally:
+                    with stub.lock:
+                        stub.sockets.discard(self.request)
+
+            def _serve(self):
+                self.request.sendall(b"220 stub-smtp ESMTP ready\r\n")
+                buffer = b""
+                session = {"from": None, "to": [], "data": None}
+                while True:
+                    try:
+                        chunk = self.request.recv(65536)
+                    except OSError:
+                        return
+                    if not chunk:
+                        return
+                    buffer += chunk
+                    replies = []
+                    while b"\r\n" in buffer:
+                        line, buffer = buffer.split(b"\r\n", 1)
+                        reply = stub._handle_line(session, line)
+                        if reply is not None:
+                            replies.append(reply)
+                        if session.get("quit"):
+                            break
+                    if replies:
+                        if stub.latency:
+                            time.sleep(stub.latency)
+                        stub._count(round_trips=1)
+                        try:
+                            self.request.sendall(b"".join(replies))
+                        except OSError:
+                            return
+                        if session.get("quit"):
+                            return
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server(("127.0.0.1", port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def drop_connections(self):
+        """Close every open client connection without a reply, as a restarting server would"""
+        with self.lock:
+            sockets = list(self.sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _count(self, **counters):
+        with self.lock:
+            for name, amount in counters.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def _handle_line(self, session: dict, line: bytes):
+        if session["data"] is not None:
+            if line == b".":
+                with self.lock:
+                    self.messages.append({"from": session["from"], "to": session["to"], "data": b"\r\n".join(session["data"])})
+                session.update({"from": None, "to": [], "data": None})
+                return b"250 2.0.0 Message accepted\r\n"
+            session["data"].append(line[1:] if line.startswith(b"..") else line)
+            return None
+
+        self._count(commands=1)
+        verb = line.split(b" ", 1)[0].upper()
+        argument = line[len(verb) + 1:].decode(errors="replace")
+        if verb == b"EHLO":
+            features = ["250-stub-smtp", "250-AUTH PLAIN", "250-8BITMIME"]
+            if self.pipelining:
+                features.append("250-PIPELINING")
+            features.append("250 SIZE 10485760")
+            return ("\r\n".join(features) + "\r\n").encode()
+        if verb == b"HELO":
+            return b"250 stub-smtp\r\n"
+        if verb == b"AUTH":
+            return b"235 2.7.0 Authentication successful\r\n"
+        if verb == b"MAIL":
+            with self.lock:
+                closing, self.close_next_mail = self.close_next_mail, False
+            if closing:
+                session["quit"] = True
+                return b"421 4.3.2 Service shutting down\r\n"
+            session.update({"from": argument, "to": []})
+            return b"250 2.1.0 OK\r\n"
+        if verb == b"RCPT":
+            if session["from"] is None:
+                return b"503 5.5.1 MAIL first\r\n"
+            session["to"].append(argument)
+            return b"250 2.1.5 OK\r\n"
+        if verb == b"DATA":
+            if not session["to"]:
+                return b"554 5.5.1 No valid recipients\r\n"
+            session["data"] = []
+            return b"354 End data with <CR><LF>.<CR><LF>\r\n"
+        if verb == b"RSET":
+            session.update({"from": None, "to": [], "data": None})
+            return b"250 2.0.0 OK\r\n"
+        if verb == b"NOOP":
+            return b"250 2.0.0 OK\r\n"
+        if verb == b"QUIT":
+            session["quit"] = True
+            return b"221 2.0.0 Bye\r\n"
+        return b"502 5.5.2 Command not implemented\r\n"
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                "connections": self.connections,
+                "messages": len(self.messages),
+                "commands": self.commands,
+                "round_trips": self.round_trips,
+            }
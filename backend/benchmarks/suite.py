@@ -0,0 +1,358 @@
+"""
+Reproducible throughput benchmarks for the camera, notification and WebSocket services
+
+Every scenario runs against a stub backend in its own process, so the CPU
+and memory figures belong to the benchmarked service alone. Results are
+written as JSON together with the git commit, so runs can be compared across
+commits.
+
+Scenarios:
+- camera: CameraService engines ("threads", "asyncio", "sharded") with
+  synthetic cameras. Reports processed fps, the share of the target rate,
+  capture-to-result latency percentiles and errors.
+- notification: NotificationService draining a burst of notifications.
+  Reports notifications per second and queue-to-send latency percentiles.
+- websocket: WebSocketClient receiving events the stub publishes at a fixed
+  rate. Reports events per second and delivery latency percentiles.
+
+Each result also has CPU seconds, CPU percent of one core and RSS in MB.
+
+Usage (from the backend directory):
+    python -m benchmarks.suite --scenarios camera notification websocket --json results.json
+    python -m benchmarks.suite --scenarios camera --engines threads asyncio --cameras 50 \\
+        --latency 0.05 --error-rate 0.01 --video sample.mp4
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+import requests
+
+from async_camera_service import AsyncCameraService
+from benchmarks.synthetic_camera import load_frames, open_synthetic_capture
+from camera_service import CameraService
+from notification_service import NotificationService
+from sharded_camera_service import ShardedCameraService
+from websocket_client import WebSocketClient
+
+class StubProcess:
+    def __init__(self, **options):
+        """
+        Run benchmarks.stub_backend in a child process
+
+        Args:
+            options: Command line options of the stub, e.g. cameras=10, error_rate=0.01
+        """
+        cmd = [sys.executable, "-m", "benchmarks.stub_backend"]
+        for key, value in options.items():
+            cmd += [f"--{key.replace('_', '-')}", str(value)]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        self.url = self.process.stdout.readline().strip()
+        if not self.url:
+            raise RuntimeError("Stub backend did not start")
+        self.ws_url = self.url.replace("http://", "ws://") + "/ws"
+
+    def stats(self) -> dict:
+        return requests.get(f"{self.url}/_stub/stats").json()
+
+    def control(self, **changes) -> dict:
+        return requests.post(f"{self.url}/_stub/control", json=changes).json()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=5)
+
+class ResourceMeter:
+    def __init__(self):
+        """CPU time and memory of this process (and of finished child processes)"""
+        self.start_wall = time.time()
+        self.start_cpu = time.process_time()
+        self.start_children = self._children_cpu()
+
+    @staticmethod
+    def _children_cpu() -> float:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    @staticmethod
+    def rss_mb() -> Optional[float]:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        # ru_maxrss is the peak, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def result(self, include_children: bool = False) -> dict:
+        wall = time.time() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        if include_children:
+            cpu += self._children_cpu() - self.start_children
+        return {
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "cpu_percent": cpu / wall * 100 if wall else 0.0,
+            "rss_mb": self.rss_mb(),
+        }
+
+def percentiles(samples: List[float]) -> dict:
+    """p50/p90/p99/max of latency samples, in milliseconds"""
+    if not samples:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None, "samples": 0}
+    ordered = sorted(samples)
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "p50_ms": at(0.5),
+        "p90_ms": at(0.9),
+        "p99_ms": at(0.99),
+        "max_ms": ordered[-1] * 1000,
+        "samples": len(ordered),
+    }
+
+def measured_service(service_class, frames=None, width: int = 640, height: int = 360, fps: float = 15.0):
+    """
+    Subclass a camera service to use synthetic cameras and record the time
+    from frame capture until its recognition result arrives
+    """
+    class MeasuredService(service_class):
+        def __init__(self, *args, **kwargs):
+            self.result_latencies: List[float] = []
+            super().__init__(*args, **kwargs)
+
+        def _open_capture(self, camera_url: str):
+            return open_synthetic_capture(camera_url, width, height, fps, frames)
+
+        def _handle_result(self, camera_id: int, result: dict, payload: dict):
+            captured_at = payload.get("captured_at")
+            if captured_at is not None:
+                self.result_latencies.append(time.time() - captured_at)
+            super()._handle_result(camera_id, result, payload)
+
+    return MeasuredService
+
+def run_camera_scenario(engine: str, args, frames) -> dict:
+    stub = StubProcess(
+        cameras=args.cameras,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        detection_rate=args.detection_rate
+    )
+    options = {}
+    if engine == "threads":
+        service_class = measured_service(CameraService, frames, args.width, args.height, args.fps)
+    elif engine == "asyncio":
+        service_class = measured_service(AsyncCameraService, frames, args.width, args.height, args.fps)
+    else:
+        service_class = measured_service(ShardedCameraService)
+        options = {
+            "workers": args.workers,
+            "capture_factory": functools.partial(
+                open_synthetic_capture, width=args.width, height=args.height, fps=args.fps, frames=frames
+            ),
+        }
+
+    try:
+        service = service_class(stub.url, "benchmark", metrics=False, **options)
+        service.set_frame_interval(args.interval)
+        service.start_all_cameras()
+        time.sleep(args.warmup)
+
+        service.result_latencies.clear()
+        stub.control(reset=True)
+        meter = ResourceMeter()
+        time.sleep(args.duration)
+        stats = stub.stats()
+        latencies = list(service.result_latencies)
+        threads = threading.active_count()
+
+        service.stop_all_cameras()
+        if hasattr(service, "shutdown"):
+            service.shutdown()
+        usage = meter.result(include_children=engine == "sharded")
+    finally:
+        stub.stop()
+
+    expected = args.cameras * args.duration / args.interval
+    return {
+        "scenario": "camera",
+        "engine": engine,
+        "cameras": args.cameras,
+        "fps": stats["frames"] / args.duration,
+        "target_ratio": stats["frames"] / expected if expected else 0.0,
+        "errors": stats["errors"],
+        "detections": stats["detections"],
+        "result_latency": percentiles(latencies),
+        "threads": threads,
+        **usage,
+    }
+
+def run_notification_scenario(args) -> dict:
+    stub = StubProcess()
+    latencies: List[float] = []
+    done = threading.Event()
+
+    class MeasuredNotificationService(NotificationService):
+        def _send_notification(self, notification: dict):
+            super()._send_notification(notification)
+            latencies.append(time.time() - notification["queued_at"])
+            if len(latencies) >= args.notifications:
+                done.set()
+
+    try:
+        service = MeasuredNotificationService(stub.url, "benchmark")
+        service.start()
+        meter = ResourceMeter()
+        interval = 1.0 / args.notification_rate if args.notification_rate else 0.0
+        for index in range(args.notifications):
+            service.add_notification("system", {"message": f"Benchmark notification {index}"})
+            if interval:
+                time.sleep(interval)
+        done.wait(timeout=args.duration + args.notifications)
+        usage = meter.result()
+        service.stop()
+    finally:
+        stub.stop()
+
+    return {
+        "scenario": "notification",
+        "notifications": args.notifications,
+        "sent": len(latencies),
+        "throughput": len(latencies) / usage["wall_seconds"],
+        "dispatch_latency": percentiles(latencies),
+        **usage,
+    }
+
+def run_websocket_scenario(args) -> dict:
+    stub = StubProcess()
+    latencies: List[float] = []
+
+    def on_detection(data):
+        sent_at = data.get("data", {}).get("sent_at")
+        if sent_at is not None:
+            latencies.append(time.time() - sent_at)
+
+    async def run():
+        client = WebSocketClient(stub.ws_url)
+        client.register_callback("detection", on_detection)
+        if not await client.connect():
+            raise RuntimeError("Could not connect to the stub WebSocket")
+        listener = asyncio.create_task(client.listen())
+
+        await asyncio.sleep(0.5)
+        stub.control(reset=True, publish_rate=args.event_rate)
+        meter = ResourceMeter()
+        await asyncio.sleep(args.duration)
+        stats = stub.control(publish_rate=0)
+        usage = meter.result()
+        # Let events already on the wire arrive
+        await asyncio.sleep(0.5)
+
+        client.running = False
+        await client.disconnect()
+        listener.cancel()
+        return stats, usage
+
+    try:
+        stats, usage = asyncio.run(run())
+    finally:
+        stub.stop()
+
+    return {
+        "scenario": "websocket",
+        "event_rate": args.event_rate,
+        "published": stats["published"],
+        "received": len(latencies),
+        "events_per_second": len(latencies) / args.duration,
+        "delivery_latency": percentiles(latencies),
+        **usage,
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Service throughput benchmark suite")
+    parser.add_argument("--scenarios", nargs="+", default=["camera", "notification", "websocket"],
+                        choices=["camera", "notification", "websocket"])
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+
+    camera = parser.add_argument_group("camera scenario")
+    camera.add_argument("--engines", nargs="+", default=["threads", "asyncio"],
+                        choices=["threads", "asyncio", "sharded"])
+    camera.add_argument("--cameras", type=int, default=20)
+    camera.add_argument("--interval", type=float, default=0.5)
+    camera.add_argument("--width", type=int, default=640)
+    camera.add_argument("--height", type=int, default=360)
+    camera.add_argument("--fps", type=float, default=15.0)
+    camera.add_argument("--video", help="Loop frames from this video file or image directory")
+    camera.add_argument("--workers", type=int, default=2, help="Worker processes of the sharded engine")
+    camera.add_argument("--latency", type=float, default=0.02, help="Stub latency per frame")
+    camera.add_argument("--latency-jitter", type=float, default=0.01)
+    camera.add_argument("--error-rate", type=float, default=0.0)
+    camera.add_argument("--detection-rate", type=float, default=0.1)
+
+    notification = parser.add_argument_group("notification scenario")
+    notification.add_argument("--notifications", type=int, default=200)
+    notification.add_argument("--notification-rate", type=float, default=0.0,
+                              help="Notifications queued per second, 0 queues them all at once")
+
+    websocket = parser.add_argument_group("websocket scenario")
+    websocket.add_argument("--event-rate", type=float, default=200.0)
+    args = parser.parse_args()
+
+    # Per-frame logging would dominate the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+
+    frames = load_frames(args.video, width=args.width) if args.video else None
+    if frames:
+        args.height = frames[0].shape[0]
+
+    results = []
+    for scenario in args.scenarios:
+        if scenario == "camera":
+            for engine in args.engines:
+                results.append(run_camera_scenario(engine, args, frames))
+                print(json.dumps(results[-1]))
+        elif scenario == "notification":
+            results.append(run_notification_scenario(args))
+            print(json.dumps(results[-1]))
+        else:
+            results.append(run_websocket_scenario(args))
+            print(json.dumps(results[-1]))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "arguments": vars(args),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
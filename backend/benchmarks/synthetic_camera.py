@@ -0,0 +1,150 @@
+"""Synthetic stand-in for cv2.VideoCapture used by the benchmarks"""
+
+import os
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+class SyntheticCapture:
+    def __init__(
+        self,
+        width: int = 1280,
+        height: int = 720,
+        fps: float = 25.0,
+        seed: int = 0,
+        frames: Optional[List[np.ndarray]] = None
+    ):
+        """
+        Produce generated frames at a fixed rate, like a live stream
+
+        Frames are paced against a wall clock so a slow reader sees the same
+        "frame is ready" behaviour as a real camera: ``grab`` blocks until the
+        next frame time and ``read`` returns the newest frame.
+
+        Args:
+            width: Frame width in pixels
+            height: Frame height in pixels
+            fps: Frames per second the stream produces
+            seed: Seed for the frame noise
+            frames: Frames to play in a loop instead of generated ones, see
+                load_frames. Width and height are then taken from the frames.
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.opened = True
+        self.start_time = time.time()
+        self.frames_read = 0
+
+        self._frames = frames
+        if frames:
+            self.height, self.width = frames[0].shape[:2]
+        rng = np.random.default_rng(seed)
+        self._base = None if frames else rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        self._frame_index = -1
+
+    def isOpened(self) -> bool:
+        return self.opened
+
+    def set(self, prop_id: int, value) -> bool:
+        return True
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def _current_index(self) -> int:
+        return int((time.time() - self.start_time) * self.fps)
+
+    def grab(self) -> bool:
+        if not self.opened:
+            return False
+
+        # Block until a frame newer than the last grabbed one exists
+        next_index = self._frame_index + 1
+        delay = self.start_time + next_index / self.fps - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self._frame_index = max(next_index, self._current_index())
+        return True
+
+    def retrieve(self):
+        if not self.opened or self._frame_index < 0:
+            return False, None
+
+        if self._frames:
+            frame = self._frames[self._frame_index % len(self._frames)].copy()
+        else:
+            # Shift the image a little per frame so consecutive frames differ
+            frame = np.roll(self._base, self._frame_index % self.width, axis=1)
+        self.frames_read += 1
+        return True, frame
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        self.opened = False
+
+    def frame_timestamp(self) -> Optional[float]:
+        """Time at which the last grabbed frame was produced"""
+        if self._frame_index < 0:
+            return None
+        return self.start_time + self._frame_index / self.fps
+
+def open_synthetic_capture(
+    camera_url: str,
+    width: int = 1280,
+    height: int = 720,
+    fps: float = 25.0,
+    frames: Optional[List[np.ndarray]] = None
+):
+    """
+    Capture factory for ShardedCameraService and friends
+
+    The camera seed is taken from the last path segment of the URL, so
+    ``rtsp://synthetic/7`` always produces the same frames.
+    """
+    tail = camera_url.rsplit("/", 1)[-1]
+    return SyntheticCapture(width, height, fps, seed=int(tail) if tail.isdigit() else 0, frames=frames)
+
+def load_frames(path: str, width: Optional[int] = None, limit: int = 300) -> List[np.ndarray]:
+    """
+    Load frames from a video file or a directory of images for looped playback
+
+    Args:
+        path: Video file, or directory whose .jpg/.png files are read in name order
+        width: Resize frames to this width, keeping the aspect ratio
+        limit: Maximum number of frames to keep in memory
+
+    Returns:
+        List of BGR frames
+    """
+    frames = []
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith((".jpg", ".jpeg", ".png")))
+        for name in names[:limit]:
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                frames.append(frame)
+    else:
+        cap = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+
+    if not frames:
+        raise ValueError(f"No frames could be read from {path}")
+
+    if width is not None:
+        height = int(frames[0].shape[0] * width / frames[0].shape[1])
+        frames = [cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA) for frame in frames]
+    return frames
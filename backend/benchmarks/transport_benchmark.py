@@ -0,0 +1,84 @@
+"""
+Compare frame upload formats for /api/process-frame
+
+Runs a local stub backend and uploads the same JPEG frame with:
+- the legacy JSON/base64 body on a new connection per request
+- the JSON/base64 body over a pooled keep-alive session
+- raw JPEG bytes over a pooled keep-alive session
+
+Usage (from the backend directory):
+    python -m benchmarks.transport_benchmark --requests 500 --width 1920 --height 1080
+"""
+
+import argparse
+import base64
+import time
+
+import cv2
+import numpy as np
+import requests
+
+from benchmarks.stub_backend import StubBackend
+from camera_service import CameraService
+
+def make_frame(width: int, height: int) -> bytes:
+    """Create a JPEG with a gradient and some noise, roughly like a camera image"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = (x + y) / 2
+    noise = np.random.default_rng(0).normal(0, 12, (height, width))
+    gray = np.clip(base + noise, 0, 255).astype(np.uint8)
+    frame = cv2.merge([gray, np.flipud(gray), np.fliplr(gray)])
+    _, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes()
+
+def run_case(backend: StubBackend, name: str, send, count: int) -> dict:
+    backend.reset()
+    start = time.perf_counter()
+    for _ in range(count):
+        response = send()
+        response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return {
+        "case": name,
+        "requests": count,
+        "requests_per_second": count / elapsed,
+        "bytes_per_request": backend.bytes_received / count,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame transport benchmark")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    backend = StubBackend().start()
+    url = backend.url
+
+    jpeg = make_frame(args.width, args.height)
+    service = CameraService(url, "benchmark")
+
+    def unpooled_json():
+        return requests.post(
+            f"{url}/api/process-frame",
+            headers={"Authorization": "Bearer benchmark"},
+            json={"camera_id": 1, "frame": base64.b64encode(jpeg).decode('utf-8')}
+        )
+
+    results = [
+        run_case(backend, "json-unpooled", unpooled_json, args.requests),
+        run_case(backend, "json-pooled", lambda: service._post_frame(1, {"jpeg": jpeg}, "json"), args.requests),
+        run_case(backend, "binary-pooled", lambda: service._post_frame(1, {"jpeg": jpeg}, "binary"), args.requests),
+    ]
+    backend.stop()
+
+    print(f"JPEG size: {len(jpeg)} bytes ({args.width}x{args.height})")
+    for result in results:
+        print(
+            f"{result['case']:>14}: {result['requests_per_second']:8.1f} req/s, "
+            f"{result['bytes_per_request']:10.0f} bytes/request"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+WebSocketClient under dropped connections and slow callbacks
+
+A local websockets server publishes "detection" events at a fixed rate,
+plus a few "camera_status" events whose callback is slow (it sleeps, like
+a handler doing blocking I/O). Every few seconds the server closes all
+connections. Two clients listen for the same duration:
+
+- "legacy": the previous client, which runs every callback inside the
+  receive loop and stays disconnected once the connection closes
+- "resilient": WebSocketClient, with a bounded dispatch queue, a callback
+  worker using an executor, and automatic reconnects
+
+Each run reports the share of published detection events received, their
+delivery latency, the reconnects, and the messages dropped because the
+callbacks fell behind.
+
+Usage (from the backend directory):
+    python -m benchmarks.websocket_resilience_benchmark --duration 10 --drop-every 3 --slow 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import List, Set
+
+import websockets
+
+from benchmarks.suite import percentiles
+from websocket_client import WebSocketClient
+
+class EventServer:
+    def __init__(self, rate: float, status_rate: float, drop_every: float):
+        """
+        Publish events to every connected client from a thread of its own
+
+        Args:
+            rate: Detection events per second
+            status_rate: Camera status events per second
+            drop_every: Seconds between closing all connections, 0 never
+        """
+        self.rate = rate
+        self.status_rate = status_rate
+        self.drop_every = drop_every
+        self.connections: Set = set()
+        self.published = 0
+        self.drops = 0
+        self.port = None
+        self.ready = threading.Event()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._serve(),), daemon=True)
+        self.stopped = None
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait(10)
+        return self
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.stopped.set)
+        self.thread.join(timeout=10)
+
+    async def _handler(self, connection, *args):
+        self.connections.add(connection)
+        try:
+            await connection.wait_closed()
+        finally:
+            self.connections.discard(connection)
+
+    async def _serve(self):
+        self.stopped = asyncio.Event()
+        async with websockets.serve(self._handler, "127.0.0.1", 0) as server:
+            self.port = next(iter(server.sockets)).getsockname()[1]
+            self.ready.set()
+            tasks = [asyncio.create_task(self._publish()), asyncio.create_task(self._drop())]
+            await self.stopped.wait()
+            for task in tasks:
+                task.cancel()
+
+    async def _publish(self):
+        next_at = time.monotonic()
+        next_status = time.monotonic()
+        while True:
+            next_at += 1.0 / self.rate
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            self.published += 1
+            websockets.broadcast(self.connections, json.dumps({
+                "type": "detection",
+                "data": {"sequence": self.published, "sent_at": time.time()},
+            }))
+            if self.status_rate and time.monotonic() >= next_status:
+                next_status += 1.0 / self.status_rate
+                websockets.broadcast(self.connections, json.dumps({"type": "camera_status", "data": {"status": "online"}}))
+
+    async def _drop(self):
+        if not self.drop_every:
+            return
+        while True:
+            await asyncio.sleep(self.drop_every)
+            self.drops += 1
+            for connection in list(self.connections):
+                await connection.close(code=1012, reason="Injected restart")
+
+class LegacyWebSocketClient(WebSocketClient):
+    """The receive loop WebSocketClient used before the dispatch queue and reconnects"""
+
+    # While messages are buffered, recv() never yields to other tasks, so the
+    # loop has to check the end of the run itself
+    stop_at = float("inf")
+
+    async def listen(self):
+        try:
+            while self.running and time.monotonic() < self.stop_at:
+                try:
+                    message = await self.websocket.recv()
+                    data = json.loads(message)
+                    self.received += 1
+                    for callback in self.callbacks.get(data.get("type", "unknown"), []):
+                        try:
+                            callback(data)
+                        except Exception as e:
+                            logging.getLogger("websocket_client").error(f"Error in callback: {str(e)}")
+                except websockets.exceptions.ConnectionClosed:
+                    break
+        finally:
+            await self.disconnect()
+
+async def listen(name: str, args, url: str) -> dict:
+    latencies: List[float] = []
+    sequences: Set[int] = set()
+
+    def on_detection(event):
+        latencies.append(time.time() - event["data"]["sent_at"])
+        sequences.add(event["data"]["sequence"])
+
+    def on_status(event):
+        time.sleep(args.slow)
+
+    client_class = LegacyWebSocketClient if name == "legacy" else WebSocketClient
+    client = client_class(url, queue_size=args.queue_size, backoff_base=0.2, backoff_max=2.0)
+    client.stop_at = time.monotonic() + args.duration
+    client.register_callback("detection", on_detection)
+    client.register_callback("camera_status", on_status)
+    if not await client.connect():
+        raise RuntimeError("Could not connect to the event server")
+    listener = asyncio.create_task(client.listen())
+    await asyncio.sleep(args.duration)
+    connected = client.websocket is not None
+    stats = client.get_stats()
+    client.running = False
+    await client.disconnect()
+    listener.cancel()
+    return {
+        "received": len(sequences),
+        "delivery_latency": percentiles(latencies),
+        "reconnects": stats["reconnects"],
+        "dropped": stats["dropped"],
+        "connected_at_end": connected,
+    }
+
+def run(name: str, args) -> dict:
+    server = EventServer(args.rate, args.status_rate, args.drop_every).start()
+    try:
+        published_before = server.published
+        result = asyncio.run(listen(name, args, f"ws://127.0.0.1:{server.port}"))
+        published = server.published - published_before
+    finally:
+        server.stop()
+    return dict(result, client=name, published=published, connection_drops=server.drops)
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket client resilience benchmark")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, default=200.0, help="Detection events per second")
+    parser.add_argument("--status-rate", type=float, default=5.0, help="Events per second with a slow callback")
+    parser.add_argument("--slow", type=float, default=0.1, help="Seconds the slow callback blocks")
+    parser.add_argument("--drop-every", type=float, default=3.0, help="Seconds between injected disconnects, 0 never")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+    # Every connect and disconnect is logged
+    logging.getLogger().setLevel(logging.ERROR)
+
+    results = []
+    for name in ("legacy", "resilient"):
+        result = run(name, args)
+        results.append(result)
+        latency = result["delivery_latency"]
+        p50 = "n/a" if latency["p50_ms"] is None else f"{latency['p50_ms']:.1f} ms"
+        p99 = "n/a" if latency["p99_ms"] is None else f"{latency['p99_ms']:.1f} ms"
+        print(
+            f"{name:>9}: received {result['received']}/{result['published']} detections "
+            f"({result['received'] / max(1, result['published']):.0%}), p50 {p50}, p99 {p99} | "
+            f"{result['connection_drops']} disconnects injected, {result['reconnects']} reconnects, "
+            f"{result['dropped']} dropped, connected at end: {result['connected_at_end']}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
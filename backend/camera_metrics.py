@@ -0,0 +1,80 @@
+from typing import Optional
+
+from metrics import BYTES_BUCKETS, REGISTRY, MetricsRegistry
+
+class CameraMetrics:
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        """
+        Metric families of the camera pipeline, labelled by camera ID
+
+        Args:
+            registry: Registry to create the families in
+        """
+        self.registry = registry
+        self.frames = registry.counter(
+            "camera_frames_captured_total", "Frames read from the camera", ["camera"]
+        )
+        self.decode = registry.histogram(
+            "camera_decode_seconds", "Time to read and decode one frame", ["camera"]
+        )
+        self.encode = registry.histogram(
+            "camera_encode_seconds", "Time in the pre-upload stages and JPEG encoding of one frame", ["camera"]
+        )
+        self.payload = registry.histogram(
+            "camera_payload_bytes", "JPEG bytes per upload", ["camera"], buckets=BYTES_BUCKETS
+        )
+        self.upload = registry.histogram(
+            "camera_upload_seconds", "Latency of /api/process-frame uploads", ["camera"]
+        )
+        self.uploads = registry.counter(
+            "camera_uploads_total", "Uploads by HTTP status, \"error\" if the request failed", ["camera", "status"]
+        )
+        self.dropped = registry.counter(
+            "camera_frames_dropped_total", "Frames that were not uploaded, by reason", ["camera", "reason"]
+        )
+        self.reconnects = registry.counter(
+            "camera_reconnects_total", "Times the camera stream was reopened after read failures", ["camera"]
+        )
+        self.quality = registry.gauge(
+            "camera_jpeg_quality", "Current JPEG quality of full-frame uploads", ["camera"]
+        )
+        self.dedup = registry.counter(
+            "camera_dedup_checks_total", "Frames and face crops checked for near-duplicates, by result",
+            ["camera", "kind", "result"]
+        )
+
+    def camera(self, camera_id: int) -> "CameraSeries":
+        """Get the series of one camera"""
+        return CameraSeries(self, camera_id)
+
+class CameraSeries:
+    def __init__(self, metrics: CameraMetrics, camera_id: int):
+        """
+        Series of one camera, looked up once so the hot path only observes
+
+        Args:
+            metrics: Metric families
+            camera_id: ID of the camera
+        """
+        self.metrics = metrics
+        self.label = str(camera_id)
+        self.frames = metrics.frames.labels(self.label)
+        self.decode = metrics.decode.labels(self.label)
+        self.encode = metrics.encode.labels(self.label)
+        self.payload = metrics.payload.labels(self.label)
+        self.upload = metrics.upload.labels(self.label)
+        self.reconnects = metrics.reconnects.labels(self.label)
+        self.quality = metrics.quality.labels(self.label)
+
+    def dropped(self, reason: str):
+        """Count a frame that was not uploaded"""
+        self.metrics.dropped.labels(self.label, reason).inc()
+
+    def deduplicated(self, kind: str, duplicate: bool):
+        """Count a dedup check of a frame or a face crop"""
+        self.metrics.dedup.labels(self.label, kind, "hit" if duplicate else "miss").inc()
+
+    def uploaded(self, latency: float, status: Optional[int]):
+        """Record the outcome of an upload"""
+        self.upload.observe(latency)
+        self.metrics.uploads.labels(self.label, status if status is not None else "error").inc()
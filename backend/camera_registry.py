@@ -0,0 +1,154 @@
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger("camera_registry")
+
+# Changing one of these fields means the stream has to be reopened
+RESTART_FIELDS = ("url",)
+
+class CameraDiff:
+    def __init__(self):
+        """Changes between two versions of the camera list"""
+        self.added: Dict[int, dict] = {}  # New cameras
+        self.removed: List[int] = []  # Cameras that are gone
+        self.retargeted: Dict[int, dict] = {}  # Cameras whose stream changed
+        self.updated: Dict[int, dict] = {}  # Cameras with other field changes
+        self.previous: Dict[int, dict] = {}  # Old record of retargeted and updated cameras
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.retargeted or self.updated)
+
+    def summary(self) -> dict:
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "retargeted": len(self.retargeted),
+            "updated": len(self.updated),
+        }
+
+class CameraRegistry:
+    def __init__(self, session: requests.Session, backend_url: str, timeout: float = 10.0):
+        """
+        Local copy of the backend's camera list, kept current by conditional polling
+
+        Each poll sends the ETag of the last answer in If-None-Match, so an
+        unchanged list costs a 304 with no body. A changed list is diffed
+        against the local copy, and only the cameras that differ are reported.
+        ``request_sync`` wakes up a waiting poller early, e.g. on a
+        camera_status WebSocket event.
+
+        Args:
+            session: Authorized HTTP session
+            backend_url: URL of the backend API
+            timeout: HTTP timeout of a poll in seconds
+        """
+        self.session = session
+        self.backend_url = backend_url
+        self.timeout = timeout
+        self.cameras: Dict[int, dict] = {}  # Camera ID -> Camera info
+        self.etag: Optional[str] = None
+        self.wakeup = threading.Event()
+
+        self.polls = 0
+        self.not_modified = 0
+        self.failures = 0
+        self.changes = 0
+        self.last_reconcile: Optional[float] = None  # Seconds the last applied diff took
+
+    def fetch(self) -> Optional[List[dict]]:
+        """
+        Get the camera list if it changed since the last fetch
+
+        Returns:
+            List of camera records, or None if it is unchanged or could not be loaded
+        """
+        self.polls += 1
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        try:
+            response = self.session.get(f"{self.backend_url}/api/cameras", headers=headers, timeout=self.timeout)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error loading cameras: {str(e)}")
+            return None
+
+        if response.status_code == 304:
+            self.not_modified += 1
+            return None
+        if response.status_code != 200:
+            self.failures += 1
+            logger.error(f"Failed to load cameras: {response.status_code} - {response.text}")
+            return None
+
+        try:
+            records = response.json()
+        except ValueError as e:
+            self.failures += 1
+            logger.error(f"Invalid camera list from backend: {str(e)}")
+            return None
+
+        self.etag = response.headers.get("ETag")
+        return records
+
+    def diff(self, records: List[dict]) -> CameraDiff:
+        """
+        Replace the local copy with a new camera list and report what changed
+
+        The ``cameras`` dict is updated in place, so references to it stay valid.
+
+        Args:
+            records: Camera records from /api/cameras
+        """
+        diff = CameraDiff()
+        latest = {camera["id"]: camera for camera in records}
+
+        for camera_id in list(self.cameras):
+            if camera_id not in latest:
+                diff.removed.append(camera_id)
+                del self.cameras[camera_id]
+
+        for camera_id, camera in latest.items():
+            current = self.cameras.get(camera_id)
+            if current is None:
+                diff.added[camera_id] = camera
+            elif any(current.get(field) != camera.get(field) for field in RESTART_FIELDS):
+                diff.retargeted[camera_id] = camera
+                diff.previous[camera_id] = current
+            elif current != camera:
+                diff.updated[camera_id] = camera
+                diff.previous[camera_id] = current
+            self.cameras[camera_id] = camera
+
+        if diff:
+            self.changes += 1
+        return diff
+
+    def poll(self) -> CameraDiff:
+        """Fetch the camera list and diff it, an empty diff if nothing changed"""
+        records = self.fetch()
+        if records is None:
+            return CameraDiff()
+        return self.diff(records)
+
+    def request_sync(self):
+        """Make a waiting poller sync now instead of at its next interval"""
+        self.wakeup.set()
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for the next poll, returns True if woken by request_sync"""
+        woken = self.wakeup.wait(timeout)
+        self.wakeup.clear()
+        return woken
+
+    def get_stats(self) -> dict:
+        """Get poll and change counters"""
+        return {
+            "cameras": len(self.cameras),
+            "polls": self.polls,
+            "not_modified": self.not_modified,
+            "failures": self.failures,
+            "changes": self.changes,
+            "last_reconcile": self.last_reconcile,
+        }
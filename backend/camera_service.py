@@ -1,12 +1,25 @@
 import cv2
 import time
 import threading
-import base64
 import requests
+from requests.adapters import HTTPAdapter
 import numpy as np
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
+
+from camera_metrics import CameraMetrics, CameraSeries
+from camera_registry import CameraDiff, CameraRegistry
+from face_detector import EdgeFaceDetector
+from face_tracker import FaceTracker
+from frame_dedup import DedupCache
+from frame_encoder import DEFAULT_QUALITY, EncodeProfile, FrameEncoder, combine_stats
+from frame_payload import build_frame_request, payload_size, rejects_binary
+from frame_reader import LatestFrameReader
+from frame_spool import FrameSpool
+from metrics import REGISTRY, MetricsServer, RateLimitedLog
+from motion_gate import MotionGate
+from rate_controller import RateController
 
 # Configure logging
 logging.basicConfig(
@@ -15,42 +28,307 @@ logging.basicConfig(
 )
 logger = logging.getLogger("camera_service")
 
+# Per-frame messages go through here so an outage does not flood the log
+log_limiter = RateLimitedLog(logger)
+
+CAPTURE_MODES = ("sequential", "latest")
+FRAME_TRANSPORTS = ("binary", "json")
+RECONNECT_AFTER = 5  # Consecutive read failures before a stream is reopened
+
+def open_capture(camera_url: str):
+    """
+    Open a video capture for a camera URL
+    
+    Args:
+        camera_url: URL of the camera feed (RTSP, HTTP, etc.)
+    """
+    # For testing, use a dummy video or webcam if RTSP URL is not available
+    if camera_url.startswith("rtsp://") or camera_url.startswith("http://"):
+        return cv2.VideoCapture(camera_url)
+    
+    # Use webcam as fallback
+    return cv2.VideoCapture(0)
+
 class CameraService:
-    def __init__(self, backend_url: str, api_token: str):
+    def __init__(
+        self,
+        backend_url: str,
+        api_token: str,
+        capture_mode: str = "sequential",
+        motion_gate: bool = False,
+        motion_threshold: float = 0.01,
+        motion_keepalive: float = 30.0,
+        frame_transport: str = "binary",
+        edge_detection: bool = False,
+        face_tracking: bool = False,
+        recheck_interval: float = 30.0,
+        adaptive_rate: bool = False,
+        rate_budget_fps: Optional[float] = None,
+        spool_dir: Optional[str] = None,
+        spool_max_bytes: int = 512 * 1024 * 1024,
+        spool_max_age: float = 3600.0,
+        spool_replay_rate: float = 5.0,
+        metrics: bool = True,
+        metrics_port: Optional[int] = None,
+        camera_sync_interval: Optional[float] = None,
+        encode_max_width: Optional[int] = None,
+        encode_max_height: Optional[int] = None,
+        jpeg_quality: int = DEFAULT_QUALITY,
+        min_jpeg_quality: Optional[int] = None,
+        dedup: bool = False,
+        dedup_distance: int = 6,
+        dedup_window: float = 10.0,
+        upload_timeout: float = 10.0,
+    ):
         """
         Initialize the camera service
         
         Args:
             backend_url: URL of the backend API
             api_token: JWT token for API authentication
+            capture_mode: "sequential" reads every frame in the processing loop,
+                "latest" drains the stream on a reader thread and only processes
+                the newest frame
+            motion_gate: Skip uploading frames in which nothing moved
+            motion_threshold: Default fraction of changed pixels that counts as
+                motion, overridden per camera by a "motion_threshold" field
+            motion_keepalive: Maximum seconds between uploads when the gate is on
+            frame_transport: "binary" uploads raw JPEG bytes, "json" uploads the
+                legacy base64 JSON body. A camera whose binary upload the backend
+                rejects as unsupported switches to JSON until it is restarted.
+            edge_detection: Detect faces on the camera side and upload only
+                padded face crops. Frames without faces are not uploaded.
+            face_tracking: Track faces across frames and only send a face for
+                recognition when its track is new, its last result had low
+                confidence, or recheck_interval has passed. Implies edge_detection.
+            recheck_interval: Seconds between recognitions of a known face
+            adaptive_rate: Adjust each camera's frame interval from upload
+                latency, errors, 429 responses and detection activity
+            rate_budget_fps: Maximum total frames per second over all cameras
+                when adaptive_rate is on
+            spool_dir: Directory in which uploads that fail because the backend
+                is unreachable, overloaded (5xx) or throttling (429) are kept
+                and replayed in capture order once it recovers. None disables
+                spooling.
+            spool_max_bytes: Maximum disk usage of the spool, the oldest frames
+                are dropped beyond it
+            spool_max_age: Seconds after which spooled frames are discarded
+            spool_replay_rate: Maximum spooled frames replayed per second
+            metrics: Record per-camera pipeline metrics (frames, decode and
+                encode time, payload bytes, upload latency, drops, reconnects)
+            metrics_port: Serve the metrics in Prometheus text format on
+                http://127.0.0.1:<port>/metrics. None serves nothing.
+            camera_sync_interval: Seconds between conditional polls of
+                /api/cameras. Added, removed and retargeted cameras are started,
+                stopped or restarted without touching the other streams. None
+                loads the camera list once.
+            encode_max_width: Default largest width of uploaded full frames,
+                larger frames are downscaled. None keeps the native size.
+            encode_max_height: Default largest height of uploaded full frames
+            jpeg_quality: Default JPEG quality of uploaded full frames
+            min_jpeg_quality: Lowest quality the encoder may step down to while
+                uploads are slow. None keeps jpeg_quality fixed. A camera record
+                can override all of these, and set a region of interest, with
+                an "encode_profile" object (see frame_encoder.EncodeProfile).
+            dedup: Skip frames, and face crops when face tracking is off, that
+                look like one uploaded recently by the same camera
+            dedup_distance: Default largest dHash Hamming distance (of 64 bits)
+                that counts as a duplicate, overridden per camera by a
+                "dedup_distance" field
+            dedup_window: Default seconds an upload suppresses its duplicates,
+                overridden per camera by a "dedup_window" field
+            upload_timeout: Seconds an upload or spool replay may take. A
+                backend that accepts the connection and then stalls counts as
+                down, and the frame is spooled.
         """
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode: {capture_mode}")
+        if frame_transport not in FRAME_TRANSPORTS:
+            raise ValueError(f"Unknown frame transport: {frame_transport}")
+        
         self.backend_url = backend_url
         self.api_token = api_token
+        self.capture_mode = capture_mode
         self.cameras: Dict[int, dict] = {}  # Camera ID -> Camera info
         self.camera_threads: Dict[int, threading.Thread] = {}  # Camera ID -> Thread
+        self.frame_readers: Dict[int, LatestFrameReader] = {}  # Camera ID -> Reader ("latest" mode)
         self.running: Dict[int, bool] = {}  # Camera ID -> Running status
         self.frame_interval = 1.0  # Process one frame per second by default
+        self.motion_gate = motion_gate
+        self.motion_threshold = motion_threshold
+        self.motion_keepalive = motion_keepalive
+        self.motion_gates: Dict[int, MotionGate] = {}  # Camera ID -> Motion gate
+        self.frame_transport = frame_transport
+        self.json_cameras: Set[int] = set()  # Camera IDs whose binary uploads the backend rejected
+        self.edge_detection = edge_detection or face_tracking
+        self.face_tracking = face_tracking
+        self.recheck_interval = recheck_interval
+        self.face_trackers: Dict[int, FaceTracker] = {}  # Camera ID -> Tracker
+        self.rate_controller: Optional[RateController] = None
+        if adaptive_rate:
+            self.rate_controller = RateController(base_interval=self.frame_interval, budget_fps=rate_budget_fps)
+        self.face_detectors: Dict[int, EdgeFaceDetector] = {}  # Camera ID -> Detector
+        self.edge_stats: Dict[int, dict] = {}  # Camera ID -> Edge detection counters
+        self.encode_profile = EncodeProfile(
+            max_width=encode_max_width,
+            max_height=encode_max_height,
+            quality=jpeg_quality,
+            min_quality=min_jpeg_quality
+        )
+        self.frame_encoders: Dict[int, FrameEncoder] = {}  # Camera ID -> Encoder of full frames
+        self.dedup = dedup
+        self.dedup_distance = dedup_distance
+        self.dedup_window = dedup_window
+        self.dedup_caches: Dict[int, DedupCache] = {}  # Camera ID -> Recent image hashes
+        self.upload_timeout = upload_timeout
+        
+        # Keep-alive connections shared by all camera threads
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {self.api_token}"
+        
+        self.metrics: Optional[CameraMetrics] = CameraMetrics() if metrics else None
+        self.camera_metrics: Dict[int, CameraSeries] = {}  # Camera ID -> Metric series
+        self.metrics_server: Optional[MetricsServer] = None
+        if self.metrics is not None and metrics_port is not None:
+            self.metrics_server = MetricsServer(port=metrics_port).start()
+            logger.info(f"Serving metrics on port {self.metrics_server.port}")
+        
+        self.spool: Optional[FrameSpool] = None
+        self.spool_replay_rate = spool_replay_rate
+        if spool_dir:
+            self.spool = FrameSpool(spool_dir, max_bytes=spool_max_bytes, max_age=spool_max_age)
+            self.spool_thread = threading.Thread(target=self._drain_spool, daemon=True)
+            self.spool_thread.start()
+            if self.metrics is not None:
+                REGISTRY.gauge(
+                    "camera_spool_bytes", "Disk usage of the outage spool", ["state"],
+                    callback=self._spool_metrics
+                )
         
         # Load cameras from backend
+        self.registry = CameraRegistry(self.session, backend_url)
+        self.cameras = self.registry.cameras
+        self.auto_start = False  # Start cameras that appear later, set by start_all_cameras
+        self.sync_lock = threading.Lock()
         self._load_cameras()
+        self._resize_connection_pool()
+        
+        if camera_sync_interval:
+            self.sync_interval = camera_sync_interval
+            self.sync_thread = threading.Thread(target=self._sync_loop, daemon=True)
+            self.sync_thread.start()
+    
+    def _resize_connection_pool(self):
+        """Size the HTTP connection pool so every camera thread can hold a connection"""
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(len(self.cameras), 1))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
     
     def _load_cameras(self):
         """Load cameras from the backend API"""
-        try:
-            response = requests.get(
-                f"{self.backend_url}/api/cameras",
-                headers={"Authorization": f"Bearer {self.api_token}"}
+        if self.registry.poll():
+            logger.info(f"Loaded {len(self.cameras)} cameras from backend")
+    
+    def _sync_loop(self):
+        """Poll the camera registry until the process exits"""
+        while True:
+            self.registry.wait(self.sync_interval)
+            try:
+                self.sync_cameras()
+            except Exception as e:
+                logger.error(f"Error syncing cameras: {str(e)}")
+    
+    def sync_cameras(self) -> CameraDiff:
+        """
+        Reload the camera list and apply only what changed
+        
+        Removed cameras are stopped and forgotten, retargeted cameras are
+        restarted with fresh pipeline state, and new cameras are started if
+        start_all_cameras was called. Other field changes are applied in place.
+        
+        Returns:
+            The applied changes
+        """
+        with self.sync_lock:
+            start = time.perf_counter()
+            diff = self.registry.poll()
+            if not diff:
+                return diff
+            
+            restart = [camera_id for camera_id in diff.retargeted if self.running.get(camera_id, False)]
+            self._stop_cameras(
+                [camera_id for camera_id in diff.removed if self.running.get(camera_id, False)] + restart
             )
+            for camera_id in diff.removed:
+                self._forget_camera(camera_id)
+            for camera_id in diff.retargeted:
+                self._forget_camera(camera_id)
             
-            if response.status_code == 200:
-                cameras = response.json()
-                for camera in cameras:
-                    self.cameras[camera["id"]] = camera
-                logger.info(f"Loaded {len(cameras)} cameras from backend")
-            else:
-                logger.error(f"Failed to load cameras: {response.status_code} - {response.text}")
-        except Exception as e:
-            logger.error(f"Error loading cameras: {str(e)}")
+            for camera_id, camera in diff.updated.items():
+                threshold = camera.get("motion_threshold")
+                if threshold is not None and threshold != diff.previous[camera_id].get("motion_threshold"):
+                    self.set_motion_threshold(camera_id, threshold)
+                if camera_id in self.dedup_caches and any(
+                    camera.get(field) != diff.previous[camera_id].get(field) for field in ("dedup_distance", "dedup_window")
+                ):
+                    self.dedup_caches[camera_id] = self._make_dedup_cache(camera)
+                if camera_id in self.frame_encoders and camera.get("encode_profile") != diff.previous[camera_id].get("encode_profile"):
+                    self.frame_encoders[camera_id] = FrameEncoder(EncodeProfile.from_camera(camera, self.encode_profile))
+            
+            for camera_id in restart:
+                self.start_camera(camera_id)
+            if self.auto_start:
+                for camera_id in diff.added:
+                    self.start_camera(camera_id)
+            
+            if diff.added:
+                self._resize_connection_pool()
+            
+            self.registry.last_reconcile = time.perf_counter() - start
+            logger.info(f"Synced cameras {diff.summary()} in {self.registry.last_reconcile * 1000:.1f} ms")
+            return diff
+    
+    def _stop_cameras(self, camera_ids: List[int]):
+        """Stop several cameras, signalling all of them before waiting for any"""
+        for camera_id in camera_ids:
+            self.running[camera_id] = False
+        for camera_id in camera_ids:
+            self.stop_camera(camera_id)
+    
+    def _forget_camera(self, camera_id: int):
+        """
+        Drop the per-camera pipeline state of a stopped camera
+        
+        Args:
+            camera_id: ID of the camera
+        """
+        self.running.pop(camera_id, None)
+        self.frame_readers.pop(camera_id, None)
+        self.motion_gates.pop(camera_id, None)
+        self.face_detectors.pop(camera_id, None)
+        self.edge_stats.pop(camera_id, None)
+        self.face_trackers.pop(camera_id, None)
+        self.camera_metrics.pop(camera_id, None)
+        self.frame_encoders.pop(camera_id, None)
+        self.dedup_caches.pop(camera_id, None)
+        self.json_cameras.discard(camera_id)
+    
+    def handle_camera_event(self, event: dict):
+        """
+        WebSocketClient callback that syncs the camera list on camera events
+        
+        Register it for "camera_status" (and any camera change events the
+        backend sends) so dashboard edits are picked up without waiting for
+        the next poll.
+        
+        Args:
+            event: Event received from the backend
+        """
+        self.registry.request_sync()
+    
+    def get_registry_stats(self) -> dict:
+        """Get camera registry poll counters and the duration of the last sync"""
+        return self.registry.get_stats()
     
     def start_camera(self, camera_id: int):
         """
@@ -69,6 +347,7 @@ class CameraService:
         
         camera = self.cameras[camera_id]
         self.running[camera_id] = True
+        self._prepare_pipeline(camera_id)
         
         # Start camera thread
         thread = threading.Thread(
@@ -82,6 +361,67 @@ class CameraService:
         logger.info(f"Started camera {camera_id} - {camera['name']}")
         return True
     
+    def _prepare_pipeline(self, camera_id: int):
+        """
+        Create the per-camera processing stages before a camera starts
+        
+        Args:
+            camera_id: ID of the camera
+        """
+        camera = self.cameras[camera_id]
+        
+        if self.motion_gate and camera_id not in self.motion_gates:
+            self.motion_gates[camera_id] = MotionGate(
+                threshold=camera.get("motion_threshold", self.motion_threshold),
+                keepalive_interval=self.motion_keepalive
+            )
+        
+        if self.dedup and camera_id not in self.dedup_caches:
+            self.dedup_caches[camera_id] = self._make_dedup_cache(camera)
+        
+        if self.edge_detection and camera_id not in self.face_detectors:
+            self.face_detectors[camera_id] = EdgeFaceDetector()
+            self.edge_stats[camera_id] = {"frames": 0, "frames_without_faces": 0, "crops": 0, "crop_bytes": 0}
+        
+        if self.rate_controller is not None:
+            self.rate_controller.add_camera(camera_id)
+        
+        if self.metrics is not None and camera_id not in self.camera_metrics:
+            self.camera_metrics[camera_id] = self.metrics.camera(camera_id)
+        
+        if camera_id not in self.frame_encoders:
+            self.frame_encoders[camera_id] = FrameEncoder(EncodeProfile.from_camera(camera, self.encode_profile))
+            if camera_id in self.camera_metrics:
+                self.camera_metrics[camera_id].quality.set(self.frame_encoders[camera_id].quality)
+        
+        if self.face_tracking and camera_id not in self.face_trackers:
+            self.face_trackers[camera_id] = FaceTracker(
+                max_age=max(2.0, 3 * self.frame_interval),
+                recheck_interval=self.recheck_interval
+            )
+    
+    def _make_dedup_cache(self, camera: dict) -> DedupCache:
+        """
+        Create the dedup cache of a camera from its record
+        
+        Args:
+            camera: Camera record
+        """
+        return DedupCache(
+            max_distance=camera.get("dedup_distance", self.dedup_distance),
+            window=camera.get("dedup_window", self.dedup_window)
+        )
+    
+    def _release_pipeline(self, camera_id: int):
+        """
+        Release per-camera state that should not outlive a stopped camera
+        
+        Args:
+            camera_id: ID of the camera
+        """
+        if self.rate_controller is not None:
+            self.rate_controller.remove_camera(camera_id)
+    
     def stop_camera(self, camera_id: int):
         """
         Stop processing a camera feed
@@ -97,19 +437,21 @@ class CameraService:
         if camera_id in self.camera_threads:
             self.camera_threads[camera_id].join(timeout=5.0)
             del self.camera_threads[camera_id]
+        self._release_pipeline(camera_id)
         
         logger.info(f"Stopped camera {camera_id}")
         return True
     
     def start_all_cameras(self):
         """Start all cameras"""
-        for camera_id in self.cameras:
+        self.auto_start = True
+        for camera_id in list(self.cameras):
             self.start_camera(camera_id)
     
     def stop_all_cameras(self):
         """Stop all cameras"""
-        for camera_id in list(self.running.keys()):
-            self.stop_camera(camera_id)
+        self.auto_start = False
+        self._stop_cameras(list(self.running.keys()))
     
     def _process_camera_feed(self, camera_id: int, camera_url: str):
         """
@@ -119,12 +461,7 @@ class CameraService:
             camera_id: ID of the camera
             camera_url: URL of the camera feed (RTSP, HTTP, etc.)
         """
-        # For testing, use a dummy video or webcam if RTSP URL is not available
-        if camera_url.startswith("rtsp://") or camera_url.startswith("http://"):
-            cap = cv2.VideoCapture(camera_url)
-        else:
-            # Use webcam as fallback
-            cap = cv2.VideoCapture(0)
+        cap = self._open_capture(camera_url)
         
         if not cap.isOpened():
             logger.error(f"Failed to open camera {camera_id} - {camera_url}")
@@ -133,63 +470,500 @@ class CameraService:
         
         logger.info(f"Processing camera {camera_id} - {camera_url}")
         
+        if self.capture_mode == "latest":
+            cap = self._run_latest_capture(camera_id, cap)
+        else:
+            cap = self._run_sequential_capture(camera_id, cap)
+        
+        # Release camera
+        cap.release()
+        logger.info(f"Camera {camera_id} processing stopped")
+    
+    def _open_capture(self, camera_url: str):
+        """
+        Open a video capture for a camera URL
+        
+        Args:
+            camera_url: URL of the camera feed (RTSP, HTTP, etc.)
+        """
+        return open_capture(camera_url)
+    
+    def _reopen_capture(self, camera_id: int, cap):
+        """
+        Release a capture that keeps failing and open the camera again
+        
+        Args:
+            camera_id: ID of the camera
+            cap: Failing video capture
+        
+        Returns:
+            The new capture
+        """
+        logger.warning(f"Reconnecting camera {camera_id}")
+        cap.release()
+        series = self.camera_metrics.get(camera_id)
+        if series is not None:
+            series.reconnects.inc()
+        return self._open_capture(self.cameras[camera_id]["url"])
+    
+    def _read_frame(self, camera_id: int, cap):
+        """
+        Read and decode the next frame of a capture, timing the decode
+        
+        Args:
+            camera_id: ID of the camera
+            cap: Opened video capture
+        
+        Returns:
+            Tuple of (success, frame) like cv2.VideoCapture.read
+        """
+        series = self.camera_metrics.get(camera_id)
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        if ret and series is not None:
+            series.decode.observe(time.perf_counter() - start)
+            series.frames.inc()
+        return ret, frame
+    
+    def _run_sequential_capture(self, camera_id: int, cap):
+        """
+        Read and decode every frame, processing one per frame interval
+        
+        Args:
+            camera_id: ID of the camera
+            cap: Opened video capture
+        
+        Returns:
+            The capture in use when the camera stopped, after any reconnects
+        """
         last_process_time = 0
+        failures = 0
         
         while self.running.get(camera_id, False):
-            ret, frame = cap.read()
+            ret, frame = self._read_frame(camera_id, cap)
             
             if not ret:
-                logger.warning(f"Failed to read frame from camera {camera_id}")
+                log_limiter.warning(("read", camera_id), f"Failed to read frame from camera {camera_id}")
+                failures += 1
+                if failures >= RECONNECT_AFTER:
+                    cap = self._reopen_capture(camera_id, cap)
+                    failures = 0
                 time.sleep(1)
                 continue
+            failures = 0
             
             current_time = time.time()
             
             # Process frame at specified interval
-            if current_time - last_process_time >= self.frame_interval:
+            if current_time - last_process_time >= self._interval_for(camera_id):
                 last_process_time = current_time
-                
-                try:
-                    # Convert frame to base64
-                    _, buffer = cv2.imencode('.jpg', frame)
-                    frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                    
-                    # Send frame to backend for processing
-                    self._send_frame_to_backend(camera_id, frame_base64)
-                except Exception as e:
-                    logger.error(f"Error processing frame from camera {camera_id}: {str(e)}")
+                self._process_frame(camera_id, frame, current_time)
             
             # Small delay to reduce CPU usage
             time.sleep(0.01)
         
-        # Release camera
-        cap.release()
-        logger.info(f"Camera {camera_id} processing stopped")
+        return cap
+    
+    def _run_latest_capture(self, camera_id: int, cap):
+        """
+        Drain the stream on a reader thread and process the newest frame each interval
+        
+        Args:
+            camera_id: ID of the camera
+            cap: Opened video capture
+        
+        Returns:
+            The capture in use when the camera stopped, after any reconnects
+        """
+        reader = LatestFrameReader(
+            cap,
+            camera_id,
+            reopen=lambda: self._open_capture(self.cameras[camera_id]["url"]),
+            reconnect_after=RECONNECT_AFTER,
+            metrics=self.camera_metrics.get(camera_id)
+        )
+        self.frame_readers[camera_id] = reader
+        reader.start()
+        
+        next_process_time = time.time()
+        
+        try:
+            while self.running.get(camera_id, False):
+                delay = next_process_time - time.time()
+                if delay > 0:
+                    time.sleep(min(delay, 0.1))
+                    continue
+                
+                frame, captured_at = reader.read(timeout=self._interval_for(camera_id))
+                if frame is None:
+                    log_limiter.warning(("read", camera_id), f"No frame available from camera {camera_id}")
+                    continue
+                
+                next_process_time = time.time() + self._interval_for(camera_id)
+                self._process_frame(camera_id, frame, captured_at)
+        finally:
+            reader.stop()
+        return reader.cap
+    
+    def _process_frame(self, camera_id: int, frame: np.ndarray, captured_at: Optional[float] = None):
+        """
+        Encode a frame and send it to the backend
+        
+        Args:
+            camera_id: ID of the camera
+            frame: Decoded BGR frame
+            captured_at: Time the frame was read from the camera, defaults to now
+        """
+        try:
+            payload = self._encode_frame(camera_id, frame, captured_at)
+            if payload is None:
+                return
+            
+            # Send frame to backend for processing
+            self._send_frame_to_backend(camera_id, payload)
+        except Exception as e:
+            log_limiter.error(("process", camera_id), f"Error processing frame from camera {camera_id}: {str(e)}")
+    
+    def _encode_frame(self, camera_id: int, frame: np.ndarray, captured_at: Optional[float] = None) -> Optional[dict]:
+        """
+        Run the pre-upload stages on a frame and JPEG encode it
+        
+        Args:
+            camera_id: ID of the camera
+            frame: Decoded BGR frame
+            captured_at: Time the frame was read from the camera, defaults to now
+        
+        Returns:
+            Upload payload (see frame_payload.build_frame_request), or None if
+            the frame should not be uploaded
+        """
+        if captured_at is None:
+            captured_at = time.time()
+        series = self.camera_metrics.get(camera_id)
+        start = time.perf_counter()
+        
+        gate = self.motion_gates.get(camera_id)
+        if gate is not None and not gate.check(frame):
+            if series is not None:
+                series.dropped("motion")
+            return None
+        
+        detector = self.face_detectors.get(camera_id)
+        if detector is not None:
+            payload = self._encode_face_crops(camera_id, detector, frame)
+        elif self._is_duplicate(camera_id, frame, "frame"):
+            if series is not None:
+                series.dropped("duplicate")
+            return None
+        else:
+            payload = {"jpeg": self._encode_full_frame(camera_id, frame)}
+        
+        if payload is None:
+            if series is not None:
+                series.dropped("no_faces")
+            return None
+        
+        payload["captured_at"] = captured_at
+        if series is not None:
+            series.encode.observe(time.perf_counter() - start)
+            series.payload.observe(payload_size(payload))
+        return payload
+    
+    def _encode_full_frame(self, camera_id: int, frame: np.ndarray) -> bytes:
+        """
+        JPEG encode a full frame with the camera's encode profile
+        
+        Args:
+            camera_id: ID of the camera
+            frame: Decoded BGR frame
+        """
+        encoder = self.frame_encoders.get(camera_id)
+        if encoder is None:
+            _, buffer = cv2.imencode('.jpg', frame)
+            return buffer.tobytes()
+        
+        start = time.perf_counter()
+        jpeg = encoder.encode(frame)
+        encoder.record_encode(time.perf_counter() - start, len(jpeg))
+        return jpeg
+    
+    def _encode_face_crops(self, camera_id: int, detector: EdgeFaceDetector, frame: np.ndarray) -> Optional[dict]:
+        """
+        Build a crops payload from the faces found in a frame
+        
+        Args:
+            camera_id: ID of the camera
+            detector: Face detector of the camera
+            frame: Decoded BGR frame
+        
+        Returns:
+            Crops payload, or None if the frame has no faces
+        """
+        stats = self.edge_stats[camera_id]
+        stats["frames"] += 1
+        
+        boxes = detector.detect(frame)
+        if not boxes:
+            stats["frames_without_faces"] += 1
+            return None
+        
+        track_ids = None
+        tracker = self.face_trackers.get(camera_id)
+        if tracker is not None:
+            # Only faces the tracker wants recognized are uploaded
+            wanted = [(box, track) for box, (track, needs) in zip(boxes, tracker.update(boxes)) if needs]
+            if not wanted:
+                return None
+            boxes = [box for box, _ in wanted]
+            track_ids = [track.track_id for _, track in wanted]
+        
+        if tracker is None and camera_id in self.dedup_caches:
+            # Without a tracker, a face that sits still would be recognised on every frame
+            boxes = [(x, y, w, h) for (x, y, w, h) in boxes if not self._is_duplicate(camera_id, frame[y:y + h, x:x + w], "crop")]
+            if not boxes:
+                return None
+        
+        crops = detector.crop(frame, boxes)
+        if track_ids is not None:
+            for crop, track_id in zip(crops, track_ids):
+                crop["track_id"] = track_id
+        
+        payload = {"crops": crops, "frame_width": frame.shape[1], "frame_height": frame.shape[0]}
+        stats["crops"] += len(crops)
+        stats["crop_bytes"] += payload_size(payload)
+        return payload
+    
+    def _is_duplicate(self, camera_id: int, image: np.ndarray, kind: str) -> bool:
+        """
+        Check a frame or face crop against the camera's recent uploads
+        
+        Args:
+            camera_id: ID of the camera
+            image: Frame or face crop
+            kind: "frame" or "crop", for the metrics
+        
+        Returns:
+            True if it should be skipped, False if it is new or dedup is off
+        """
+        cache = self.dedup_caches.get(camera_id)
+        if cache is None:
+            return False
+        
+        duplicate = cache.check(image)
+        series = self.camera_metrics.get(camera_id)
+        if series is not None:
+            series.deduplicated(kind, duplicate)
+        return duplicate
     
-    def _send_frame_to_backend(self, camera_id: int, frame_base64: str):
+    def _send_frame_to_backend(self, camera_id: int, payload: dict):
         """
         Send a frame to the backend for processing
         
         Args:
             camera_id: ID of the camera
-            frame_base64: Base64 encoded frame
+            payload: Full frame or face crops, see frame_payload.build_frame_request
         """
+        start = time.time()
         try:
-            response = requests.post(
-                f"{self.backend_url}/api/process-frame",
-                headers={"Authorization": f"Bearer {self.api_token}"},
-                json={"camera_id": camera_id, "frame": frame_base64}
+            response = self._upload(camera_id, payload)
+        except Exception as e:
+            # Refused, reset or timed out: the backend may never have seen the frame
+            self._record_upload(camera_id, time.time() - start, None)
+            self._spool_frame(camera_id, payload, None)
+            log_limiter.error(("upload", camera_id), f"Error sending frame from camera {camera_id} to backend: {str(e)}")
+            return
+        latency = time.time() - start
+        
+        if response.status_code != 200:
+            self._record_upload(camera_id, latency, response.status_code)
+            self._spool_frame(camera_id, payload, response.status_code)
+            log_limiter.error(
+                ("upload", camera_id),
+                f"Failed to process frame from camera {camera_id}: {response.status_code} - {response.text}"
             )
+            return
+        
+        # The backend accepted the frame, so nothing below may spool it or count it as failed
+        try:
+            result = response.json()
+            if not isinstance(result, dict):
+                raise ValueError(f"expected an object, got {type(result).__name__}")
+        except ValueError as e:
+            self._record_upload(camera_id, latency, 200)
+            log_limiter.error(("result", camera_id), f"Invalid response to frame from camera {camera_id}: {str(e)}")
+            return
+        
+        self._record_upload(camera_id, latency, 200, result)
+        try:
+            self._handle_result(camera_id, result, payload)
+        except Exception as e:
+            log_limiter.error(("result", camera_id), f"Error handling result for camera {camera_id}: {str(e)}")
+    
+    def _upload(self, camera_id: int, payload: dict) -> requests.Response:
+        """
+        Post a payload with the camera's transport, retrying it as JSON if
+        the backend does not take binary frames
+        
+        Args:
+            camera_id: ID of the camera
+            payload: Full frame or face crops
+        """
+        transport = self._transport_for(camera_id)
+        response = self._post_frame(camera_id, payload, transport)
+        if transport == "binary" and rejects_binary(response.status_code, response.content):
+            self._fall_back_to_json(camera_id, response.status_code)
+            response = self._post_frame(camera_id, payload, "json")
+        return response
+    
+    def _transport_for(self, camera_id: int) -> str:
+        """Transport to upload frames from a camera with"""
+        return "json" if camera_id in self.json_cameras else self.frame_transport
+    
+    def _fall_back_to_json(self, camera_id: int, status: int):
+        """
+        Upload a camera's frames as JSON from now on, until it is restarted
+        
+        Args:
+            camera_id: ID of the camera
+            status: HTTP status code of the rejected binary upload
+        """
+        self.json_cameras.add(camera_id)
+        logger.warning(
+            f"Backend rejected a binary frame from camera {camera_id} ({status}), "
+            f"uploading its frames as JSON until it is restarted"
+        )
+    
+    def _spool_frame(self, camera_id: int, payload: dict, status: Optional[int]):
+        """
+        Keep a failed upload on disk for replay, if the failure is temporary
+        
+        Args:
+            camera_id: ID of the camera
+            payload: Payload that failed to upload
+            status: HTTP status code, or None if the request failed
+        """
+        if self.spool is None or not (status is None or status >= 500 or status == 429):
+            return
+        
+        captured_at = payload.get("captured_at", time.time())
+        headers, body = build_frame_request(camera_id, payload, self._transport_for(camera_id))
+        headers["X-Capture-Timestamp"] = f"{captured_at:.3f}"
+        try:
+            self.spool.append(camera_id, captured_at, headers, body)
+        except OSError as e:
+            log_limiter.error(("spool", camera_id), f"Failed to spool frame from camera {camera_id}: {str(e)}")
+    
+    def _drain_spool(self):
+        """Replay spooled uploads in capture order at a limited rate"""
+        backoff = 1.0
+        while True:
+            entry = self.spool.peek()
+            if entry is None:
+                time.sleep(1.0)
+                continue
+            
+            record, position = entry
+            if time.time() - record["captured_at"] > self.spool.max_age:
+                self.spool.advance(position, record["captured_at"], "expired")
+                continue
+            
+            try:
+                response = self.session.post(
+                    f"{self.backend_url}/api/process-frame",
+                    headers=record["headers"],
+                    data=record["body"],
+                    timeout=self.upload_timeout
+                )
+                status = response.status_code
+            except Exception as e:
+                logger.debug(f"Spool replay failed: {str(e)}")
+                status = None
             
-            if response.status_code == 200:
-                result = response.json()
-                detections = result.get("detections", [])
-                if detections:
-                    logger.info(f"Camera {camera_id}: Detected {len(detections)} faces")
+            if status is None or status >= 500 or status == 429:
+                # Backend still down, try again later
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            
+            backoff = 1.0
+            if status == 200:
+                self.spool.advance(position, record["captured_at"])
             else:
-                logger.error(f"Failed to process frame: {response.status_code} - {response.text}")
-        except Exception as e:
-            logger.error(f"Error sending frame to backend: {str(e)}")
+                log_limiter.error(
+                    ("replay", record["camera_id"]),
+                    f"Backend rejected spooled frame from camera {record['camera_id']}: {status}"
+                )
+                self.spool.advance(position, record["captured_at"], "rejected")
+            time.sleep(1.0 / self.spool_replay_rate)
+    
+    def _record_upload(self, camera_id: int, latency: float, status: Optional[int], result: Optional[dict] = None):
+        """
+        Feed the outcome of an upload to the metrics and the rate controller
+        
+        Args:
+            camera_id: ID of the camera
+            latency: Seconds the upload took
+            status: HTTP status code, or None if the request failed
+            result: Decoded response body of a successful upload
+        """
+        series = self.camera_metrics.get(camera_id)
+        if series is not None:
+            series.uploaded(latency, status)
+        
+        encoder = self.frame_encoders.get(camera_id)
+        if encoder is not None:
+            encoder.record_upload(latency, status)
+            if series is not None:
+                series.quality.set(encoder.quality)
+        
+        if self.rate_controller is None:
+            return
+        
+        detections = len(result.get("detections", [])) if result else 0
+        self.rate_controller.record(camera_id, latency, status, detections)
+    
+    def _interval_for(self, camera_id: int) -> float:
+        """
+        Get the current frame interval of a camera
+        
+        Args:
+            camera_id: ID of the camera
+        """
+        if self.rate_controller is not None:
+            return self.rate_controller.interval_for(camera_id)
+        return self.frame_interval
+    
+    def _handle_result(self, camera_id: int, result: dict, payload: dict):
+        """
+        Handle a successful /api/process-frame response
+        
+        Args:
+            camera_id: ID of the camera
+            result: Decoded response body
+            payload: The uploaded payload
+        """
+        detections = result.get("detections", [])
+        
+        tracker = self.face_trackers.get(camera_id)
+        if tracker is not None and "crops" in payload:
+            tracker.record_upload([crop.get("track_id") for crop in payload["crops"]], detections)
+        
+        if detections:
+            log_limiter.info(("detections", camera_id), f"Camera {camera_id}: Detected {len(detections)} faces")
+    
+    def _post_frame(self, camera_id: int, payload: dict, transport: str) -> requests.Response:
+        """
+        Upload a payload with the given transport
+        
+        Args:
+            camera_id: ID of the camera
+            payload: Full frame or face crops
+            transport: "binary" (raw JPEG / multipart) or "json" (base64, legacy format)
+        """
+        headers, body = build_frame_request(camera_id, payload, transport)
+        return self.session.post(
+            f"{self.backend_url}/api/process-frame", headers=headers, data=body, timeout=self.upload_timeout
+        )
     
     def set_frame_interval(self, interval: float):
         """
@@ -200,11 +974,164 @@ class CameraService:
         """
         if interval > 0:
             self.frame_interval = interval
+            if self.rate_controller is not None:
+                self.rate_controller.base_interval = interval
             logger.info(f"Set frame interval to {interval} seconds")
+    
+    def set_motion_threshold(self, camera_id: int, threshold: float):
+        """
+        Set the motion gate sensitivity for a camera
+        
+        Args:
+            camera_id: ID of the camera
+            threshold: Fraction of changed pixels (0-1) that counts as motion
+        """
+        if not 0 < threshold <= 1:
+            logger.error(f"Invalid motion threshold: {threshold}")
+            return False
+        
+        if camera_id not in self.cameras:
+            logger.error(f"Camera {camera_id} not found")
+            return False
+        
+        self.cameras[camera_id]["motion_threshold"] = threshold
+        if camera_id in self.motion_gates:
+            self.motion_gates[camera_id].threshold = threshold
+        logger.info(f"Set motion threshold for camera {camera_id} to {threshold}")
+        return True
+    
+    def get_motion_stats(self, camera_id: int) -> Optional[dict]:
+        """
+        Get passed/suppressed frame counters from a camera's motion gate
+        
+        Args:
+            camera_id: ID of the camera
+        
+        Returns:
+            Gate counters, or None if the camera has no motion gate
+        """
+        gate = self.motion_gates.get(camera_id)
+        if gate is None:
+            return None
+        return gate.get_stats()
+    
+    def get_edge_stats(self, camera_id: int) -> Optional[dict]:
+        """
+        Get edge face detection counters for a camera
+        
+        Args:
+            camera_id: ID of the camera
+        
+        Returns:
+            Frames checked, frames without faces, crops sent and crop bytes,
+            or None if edge detection is off
+        """
+        stats = self.edge_stats.get(camera_id)
+        if stats is None:
+            return None
+        return dict(stats)
+    
+    def get_tracking_stats(self, camera_id: int) -> Optional[dict]:
+        """
+        Get face tracker counters for a camera
+        
+        Args:
+            camera_id: ID of the camera
+        
+        Returns:
+            Active tracks, faces seen and recognition requests, or None if
+            face tracking is off
+        """
+        tracker = self.face_trackers.get(camera_id)
+        if tracker is None:
+            return None
+        return tracker.get_stats()
+    
+    def get_dedup_stats(self, camera_id: int) -> Optional[dict]:
+        """
+        Get duplicate detection counters for a camera
+        
+        Args:
+            camera_id: ID of the camera
+        
+        Returns:
+            Thresholds, checks, hits and hit rate, or None if dedup is off
+        """
+        cache = self.dedup_caches.get(camera_id)
+        if cache is None:
+            return None
+        return cache.get_stats()
+    
+    def get_rate_stats(self, camera_id: int) -> Optional[dict]:
+        """
+        Get adaptive rate controller state for a camera
+        
+        Args:
+            camera_id: ID of the camera
+        
+        Returns:
+            Current interval, latency and error averages and activity, or None
+            if adaptive rate is off
+        """
+        if self.rate_controller is None:
+            return None
+        return self.rate_controller.get_stats(camera_id)
+    
+    def get_encode_stats(self, camera_id: Optional[int] = None) -> Optional[dict]:
+        """
+        Get full-frame encode cost, per camera or per encode profile
+        
+        Args:
+            camera_id: ID of the camera, or None for every profile in use
+        
+        Returns:
+            For a camera: its profile, current JPEG quality, output size and
+            mean encode time and bytes per frame, or None if it has no encoder.
+            Otherwise the same means per profile name.
+        """
+        if camera_id is None:
+            return combine_stats([encoder.get_stats() for encoder in self.frame_encoders.values()])
+        encoder = self.frame_encoders.get(camera_id)
+        if encoder is None:
+            return None
+        return encoder.get_stats()
+    
+    def _spool_metrics(self):
+        """Spool disk usage for the camera_spool_bytes gauge"""
+        stats = self.spool.get_stats()
+        return [(("disk",), stats["disk_bytes"]), (("pending",), stats["pending_bytes"])]
+    
+    def get_spool_stats(self) -> Optional[dict]:
+        """
+        Get disk usage and replay progress of the outage spool
+        
+        Returns:
+            Spool counters, or None if spooling is off
+        """
+        if self.spool is None:
+            return None
+        return self.spool.get_stats()
+    
+    def get_capture_stats(self, camera_id: int) -> Optional[dict]:
+        """
+        Get grabbed/decoded/dropped frame counters for a camera
+        
+        Args:
+            camera_id: ID of the camera
+        
+        Returns:
+            Counters for the camera, or None if it has no reader ("sequential" mode)
+        """
+        reader = self.frame_readers.get(camera_id)
+        if reader is None:
+            return None
+        return reader.get_stats()
 
 # Example usage
 if __name__ == "__main__":
     import os
+    import signal
+    import sys
     import time
     
     # Get backend URL and token from environment
@@ -221,17 +1148,51 @@ if __name__ == "__main__":
             token = response.json()["access_token"]
             
             # Initialize camera service
-            camera_service = CameraService(backend_url, token)
+            capture_mode = os.getenv("CAPTURE_MODE", "sequential")
+            camera_service = CameraService(
+                backend_url,
+                token,
+                capture_mode=capture_mode,
+                motion_gate=os.getenv("MOTION_GATE", "false").lower() == "true",
+                motion_threshold=float(os.getenv("MOTION_THRESHOLD", "0.01")),
+                motion_keepalive=float(os.getenv("MOTION_KEEPALIVE", "30")),
+                frame_transport=os.getenv("FRAME_TRANSPORT", "binary"),
+                edge_detection=os.getenv("EDGE_DETECTION", "false").lower() == "true",
+                face_tracking=os.getenv("FACE_TRACKING", "false").lower() == "true",
+                recheck_interval=float(os.getenv("RECHECK_INTERVAL", "30")),
+                adaptive_rate=os.getenv("ADAPTIVE_RATE", "false").lower() == "true",
+                rate_budget_fps=float(os.getenv("RATE_BUDGET_FPS")) if os.getenv("RATE_BUDGET_FPS") else None,
+                spool_dir=os.getenv("SPOOL_DIR") or None,
+                spool_max_bytes=int(os.getenv("SPOOL_MAX_MB", "512")) * 1024 * 1024,
+                spool_max_age=float(os.getenv("SPOOL_MAX_AGE", "3600")),
+                spool_replay_rate=float(os.getenv("SPOOL_REPLAY_RATE", "5")),
+                metrics_port=int(os.getenv("CAMERA_METRICS_PORT")) if os.getenv("CAMERA_METRICS_PORT") else None,
+                camera_sync_interval=float(os.getenv("CAMERA_SYNC_INTERVAL")) if os.getenv("CAMERA_SYNC_INTERVAL") else None,
+                encode_max_width=int(os.getenv("ENCODE_MAX_WIDTH")) if os.getenv("ENCODE_MAX_WIDTH") else None,
+                encode_max_height=int(os.getenv("ENCODE_MAX_HEIGHT")) if os.getenv("ENCODE_MAX_HEIGHT") else None,
+                jpeg_quality=int(os.getenv("JPEG_QUALITY", str(DEFAULT_QUALITY))),
+                min_jpeg_quality=int(os.getenv("MIN_JPEG_QUALITY")) if os.getenv("MIN_JPEG_QUALITY") else None,
+                dedup=os.getenv("DEDUP", "false").lower() == "true",
+                dedup_distance=int(os.getenv("DEDUP_DISTANCE", "6")),
+                dedup_window=float(os.getenv("DEDUP_WINDOW", "10")),
+                upload_timeout=float(os.getenv("UPLOAD_TIMEOUT", "10"))
+            )
             
             # Start all cameras
             camera_service.start_all_cameras()
             
-            # Run for 1 hour
-            time.sleep(3600)
+            # Run until stopped, e.g. by run.py
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda sig, frame: stop.set())
+            signal.signal(signal.SIGINT, lambda sig, frame: stop.set())
+            while not stop.wait(1):
+                pass
             
             # Stop all cameras
             camera_service.stop_all_cameras()
         else:
             print(f"Failed to get token: {response.status_code} - {response.text}")
+            sys.exit(1)
     except Exception as e:
         print(f"Error: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,110 @@
+import threading
+import logging
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("face_detector")
+
+Box = Tuple[int, int, int, int]  # x, y, width, height in original frame pixels
+
+class EdgeFaceDetector:
+    def __init__(
+        self,
+        width: int = 480,
+        padding: float = 0.3,
+        min_face: int = 24,
+        scale_factor: float = 1.1,
+        min_neighbors: int = 5,
+        cascade_path: Optional[str] = None
+    ):
+        """
+        Cheap face detector that runs on the camera side before upload
+
+        Detection runs on a downscaled grayscale copy of the frame with one of
+        OpenCV's bundled Haar cascades. Boxes are scaled back to the original
+        frame and padded, so the backend still gets enough context around
+        each face for recognition.
+
+        Args:
+            width: Width in pixels of the image the detector runs on
+            padding: Extra margin around each face, as a fraction of its size
+            min_face: Smallest face in pixels of the downscaled image
+            scale_factor: Haar cascade pyramid scale step
+            min_neighbors: Haar cascade detection confidence
+            cascade_path: Cascade XML file, defaults to the bundled frontal face model
+        """
+        self.width = width
+        self.padding = padding
+        self.min_face = min_face
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+        if cascade_path is None:
+            cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        self.classifier = cv2.CascadeClassifier(cascade_path)
+        if self.classifier.empty():
+            raise ValueError(f"Could not load face cascade: {cascade_path}")
+
+        # CascadeClassifier is not safe to share between threads
+        self._lock = threading.Lock()
+
+    def detect(self, frame: np.ndarray) -> List[Box]:
+        """
+        Find faces in a frame
+
+        Args:
+            frame: Decoded BGR frame
+
+        Returns:
+            Padded face boxes in original frame coordinates
+        """
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.width / width)
+        small = frame
+        if scale < 1.0:
+            small = cv2.resize(frame, (self.width, int(height * scale)), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.equalizeHist(small)
+
+        with self._lock:
+            faces = self.classifier.detectMultiScale(
+                small,
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=(self.min_face, self.min_face)
+            )
+
+        boxes = []
+        for (x, y, w, h) in faces:
+            pad_x = w * self.padding
+            pad_y = h * self.padding
+            x0 = max(0, int((x - pad_x) / scale))
+            y0 = max(0, int((y - pad_y) / scale))
+            x1 = min(width, int((x + w + pad_x) / scale))
+            y1 = min(height, int((y + h + pad_y) / scale))
+            boxes.append((x0, y0, x1 - x0, y1 - y0))
+        return boxes
+
+    def crop(self, frame: np.ndarray, boxes: Optional[List[Box]] = None) -> List[dict]:
+        """
+        JPEG encode a crop of each face in a frame
+
+        Args:
+            frame: Decoded BGR frame
+            boxes: Face boxes to crop, detected in the frame if not given
+
+        Returns:
+            List of crops with "x", "y", "width", "height" (original frame
+            coordinates) and "jpeg" bytes
+        """
+        if boxes is None:
+            boxes = self.detect(frame)
+
+        crops = []
+        for (x, y, w, h) in boxes:
+            _, buffer = cv2.imencode('.jpg', frame[y:y + h, x:x + w])
+            crops.append({"x": x, "y": y, "width": w, "height": h, "jpeg": buffer.tobytes()})
+        return crops
@@ -0,0 +1,317 @@
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# face_recognition's default tolerance: encodings closer than this are the same person
+DEFAULT_THRESHOLD = 0.6
+
+ENCODING_SIZE = 128
+
+# Per-row arrays, kept in step on growth and removal
+ROW_ARRAYS = ("encodings", "norms", "person_ids", "face_ids", "clusters")
+
+def to_encoding(value) -> np.ndarray:
+    """
+    Convert a stored face encoding to a float32 vector
+
+    Args:
+        value: Sequence of floats, a NumPy array, or the raw bytes of a
+            float64 array as produced by ``encoding.tobytes()``
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return np.frombuffer(value, dtype=np.float64).astype(np.float32)
+    return np.asarray(value, dtype=np.float32).reshape(-1)
+
+def confidence_from_distance(distance: float) -> float:
+    """Confidence in percent reported for a match at a given distance"""
+    return round(max(0.0, 1.0 - float(distance)) * 100, 1)
+
+class Match:
+    def __init__(self, person_id: int, face_id: int, distance: float, threshold: float):
+        """
+        A gallery entry close to a probe encoding
+
+        Args:
+            person_id: Person the matched encoding belongs to
+            face_id: ID of the matched FaceData row
+            distance: Euclidean distance between probe and encoding
+            threshold: Distance at or below which the match is verified
+        """
+        self.person_id = person_id
+        self.face_id = face_id
+        self.distance = distance
+        self.verified = distance <= threshold
+        self.confidence = confidence_from_distance(distance)
+
+    def to_dict(self) -> dict:
+        return {
+            "person_id": self.person_id,
+            "face_id": self.face_id,
+            "distance": self.distance,
+            "verified": self.verified,
+            "confidence": self.confidence,
+        }
+
+class FaceGallery:
+    def __init__(
+        self,
+        dimensions: int = ENCODING_SIZE,
+        capacity: int = 1024,
+        threshold: float = DEFAULT_THRESHOLD,
+        index=None
+    ):
+        """
+        Resident matrix of every enrolled face encoding
+
+        Encodings live in one contiguous float32 matrix, with the person ID
+        and FaceData row ID of each row in parallel arrays and the squared norm
+        of each row cached. Matching all faces of a frame is then one matrix
+        product instead of a loop over encodings, and nothing is read from the
+        database per request.
+
+        The gallery is updated in place: ``add`` appends rows (doubling the
+        storage when it is full), and ``remove_person`` / ``remove_face`` move
+        the last rows into the freed slots. Load it once at startup with
+        ``load``, then call ``add`` after POST /api/people/{person_id}/face
+        stores an encoding and ``remove_person`` after a person is deleted.
+
+        Large galleries can narrow each search down with an approximate
+        index such as face_index.IVFIndex. Candidates are still ranked by
+        exact distance.
+
+        Args:
+            dimensions: Length of an encoding, 128 for dlib's face model
+            capacity: Rows allocated up front
+            threshold: Default distance at or below which a match is verified
+            index: Approximate nearest-neighbour index, or None to compare
+                every probe with every row
+        """
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.size = 0
+        self.encodings = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.norms = np.zeros(capacity, dtype=np.float32)  # Squared norm of each row
+        self.person_ids = np.zeros(capacity, dtype=np.int64)
+        self.face_ids = np.zeros(capacity, dtype=np.int64)
+        self.clusters = np.zeros(capacity, dtype=np.int32)  # Index cell of each row
+        self.index = index
+        self.lock = threading.RLock()
+        self.version = 0  # Bumped on every change
+        self.sequence = 0  # Last face data change-log entry included, see gallery_snapshot
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self, needed: int):
+        capacity = len(self.encodings)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ROW_ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def load(self, rows: Iterable[Tuple[int, int, object]], sequence: int = 0):
+        """
+        Replace the gallery contents, e.g. with every FaceData row at startup
+
+        Args:
+            rows: (face_id, person_id, encoding) tuples, see to_encoding
+            sequence: Last face data change-log entry the rows include
+        """
+        rows = list(rows)
+        with self.lock:
+            self.size = 0
+            self._grow(len(rows))
+            for index, (face_id, person_id, encoding) in enumerate(rows):
+                self.encodings[index] = to_encoding(encoding)
+                self.person_ids[index] = person_id
+                self.face_ids[index] = face_id
+            self.size = len(rows)
+            self.sequence = sequence
+            block = self.encodings[:self.size]
+            self.norms[:self.size] = np.einsum("ij,ij->i", block, block)
+            self.version += 1
+            if self.index is not None:
+                self.index.train(self)
+
+    def add(self, face_id: int, person_id: int, encoding) -> int:
+        """
+        Add one encoding
+
+        Args:
+            face_id: ID of the FaceData row
+            person_id: Person the face belongs to
+            encoding: Face encoding, see to_encoding
+
+        Returns:
+            Row of the new encoding
+        """
+        vector = to_encoding(encoding)
+        if len(vector) != self.dimensions:
+            raise ValueError(f"Expected a {self.dimensions}-d encoding, got {len(vector)}")
+        with self.lock:
+            self._grow(self.size + 1)
+            row = self.size
+            self.encodings[row] = vector
+            self.norms[row] = vector @ vector
+            self.person_ids[row] = person_id
+            self.face_ids[row] = face_id
+            self.size += 1
+            self.version += 1
+            if self.index is not None:
+                self.index.added(self, row, row + 1)
+            return row
+
+    def _remove_rows(self, mask: np.ndarray) -> int:
+        """Drop the rows selected by a boolean mask of length size, keeping storage contiguous"""
+        removed = np.flatnonzero(mask)
+        if len(removed) == 0:
+            return 0
+        keep_size = self.size - len(removed)
+        # Rows past the new end that survive fill the holes before it
+        holes = removed[removed < keep_size]
+        tail = np.arange(keep_size, self.size)
+        movers = tail[~mask[keep_size:]]
+        if self.index is not None:
+            self.index.removed(self, removed, holes, movers)
+        for name in ROW_ARRAYS:
+            array = getattr(self, name)
+            array[holes] = array[movers]
+        self.size = keep_size
+        self.version += 1
+        return len(removed)
+
+    def remove_person(self, person_id: int) -> int:
+        """
+        Remove every encoding of a person
+
+        Returns:
+            Number of encodings removed
+        """
+        with self.lock:
+            return self._remove_rows(self.person_ids[:self.size] == person_id)
+
+    def remove_face(self, face_id: int) -> int:
+        """
+        Remove one FaceData row's encoding
+
+        Returns:
+            Number of encodings removed
+        """
+        with self.lock:
+            return self._remove_rows(self.face_ids[:self.size] == face_id)
+
+    def distances(self, probes: np.ndarray) -> np.ndarray:
+        """
+        Euclidean distance from each probe to every gallery row
+
+        Args:
+            probes: (n, dimensions) array of encodings
+
+        Returns:
+            (n, size) float32 array
+        """
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.dimensions)
+        with self.lock:
+            block = self.encodings[:self.size]
+            # |p - e|^2 = |p|^2 + |e|^2 - 2 p.e, the product is the only O(n * size * d) step
+            squared = np.einsum("ij,ij->i", probes, probes)[:, None] + self.norms[:self.size][None, :]
+            squared -= 2.0 * (probes @ block.T)
+        np.maximum(squared, 0.0, out=squared)
+        return np.sqrt(squared, out=squared)
+
+    def match(
+        self,
+        probes: Sequence,
+        top_k: int = 1,
+        threshold: Optional[float] = None
+    ) -> List[List[Match]]:
+        """
+        Find the closest enrolled people for every face of a frame
+
+        Args:
+            probes: Encodings of the faces, one per row
+            top_k: Number of distinct people returned per face, best first
+            threshold: Distance at or below which a match is verified,
+                defaults to the gallery's threshold
+
+        Returns:
+            One list of matches per probe. Unverified matches are included so
+            the caller can still report the best guess for unknown faces.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.dimensions)
+        if len(probes) == 0:
+            return []
+
+        with self.lock:
+            if self.size == 0:
+                return [[] for _ in probes]
+            if self.index is not None:
+                return [self._match_candidates(probe, top_k, threshold) for probe in probes]
+            distances = self.distances(probes)
+            person_ids = self.person_ids[:self.size].copy()
+            face_ids = self.face_ids[:self.size].copy()
+
+        results = []
+        for row in distances:
+            results.append(self._best_people(row, person_ids, face_ids, top_k, threshold))
+        return results
+
+    def _match_candidates(self, probe: np.ndarray, top_k: int, threshold: float) -> List[Match]:
+        """Match one probe against the rows its index proposes, re-ranked by exact distance"""
+        rows = self.index.candidates(self, probe)
+        if rows is None:
+            return self._best_people(self.distances(probe)[0], self.person_ids[:self.size], self.face_ids[:self.size], top_k, threshold)
+        if len(rows) == 0:
+            return []
+        squared = probe @ probe + self.norms[rows] - 2.0 * (self.encodings[rows] @ probe)
+        distances = np.sqrt(np.maximum(squared, 0.0))
+        return self._best_people(distances, self.person_ids[rows], self.face_ids[rows], top_k, threshold)
+
+    @staticmethod
+    def _best_people(row: np.ndarray, person_ids: np.ndarray, face_ids: np.ndarray, top_k: int, threshold: float) -> List[Match]:
+        """Closest ``top_k`` distinct people of one probe"""
+        # People usually have a handful of encodings, so a few times top_k
+        # nearest rows nearly always hold top_k distinct people
+        candidates = min(len(row), max(top_k * 8, 16))
+        while True:
+            if candidates < len(row):
+                nearest = np.argpartition(row, candidates - 1)[:candidates]
+            else:
+                nearest = np.arange(len(row))
+            nearest = nearest[np.argsort(row[nearest], kind="stable")]
+
+            matches = []
+            seen = set()
+            for index in nearest:
+                person_id = int(person_ids[index])
+                if person_id in seen:
+                    continue
+                seen.add(person_id)
+                matches.append(Match(person_id, int(face_ids[index]), float(row[index]), threshold))
+                if len(matches) == top_k:
+                    return matches
+            if candidates >= len(row):
+                return matches
+            candidates = min(len(row), candidates * 4)
+
+    def get_stats(self) -> dict:
+        """Get size and memory use"""
+        with self.lock:
+            return {
+                "encodings": self.size,
+                "people": int(len(np.unique(self.person_ids[:self.size]))),
+                "capacity": len(self.encodings),
+                "bytes": sum(getattr(self, name).nbytes for name in ROW_ARRAYS),
+                "version": self.version,
+                "index": self.index.get_stats() if self.index is not None else None,
+            }
+
+# Gallery opened by run.py before it forks backend workers, shared by them copy-on-write
+preloaded: Optional[FaceGallery] = None
@@ -0,0 +1,236 @@
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("face_index")
+
+def kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Plain k-means (Lloyd's algorithm) for the coarse quantiser
+
+    Args:
+        vectors: (n, d) float32 training vectors
+        clusters: Number of centroids
+        iterations: Assignment/update rounds
+        seed: Seed for the initial centroids and for reseeding empty clusters
+
+    Returns:
+        (clusters, d) float32 centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = nearest_centroids(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=clusters)
+        empty = counts == 0
+        centroids = sums / np.maximum(counts, 1)[:, None]
+        if empty.any():
+            # Restart empty clusters on random training vectors
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+    return centroids.astype(np.float32)
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """Index of the closest centroid of each vector, computed in chunks to bound memory"""
+    norms = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        block = vectors[start:start + chunk]
+        # |c|^2 - 2 v.c ranks centroids the same as the full squared distance
+        labels[start:start + chunk] = np.argmin(norms[None, :] - 2.0 * (block @ centroids.T), axis=1)
+    return labels
+
+class IVFIndex:
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        min_size: int = 5000,
+        iterations: int = 10,
+        train_per_list: int = 64,
+        retrain_growth: float = 2.0,
+        seed: int = 0
+    ):
+        """
+        Inverted-file index over a FaceGallery
+
+        The encodings are split into ``nlist`` cells by k-means. A probe is
+        compared with the centroids first, and then only with the encodings
+        in its ``nprobe`` closest cells. Those candidates are re-ranked by
+        their exact distance, so any match that is returned has the same
+        distance, verified flag and confidence as with exact search. A true
+        match can only be missed if it falls in a cell that was not probed.
+
+        The cell of every gallery row is stored in ``gallery.clusters``, which
+        the gallery keeps in step with its other per-row arrays. Each cell
+        also keeps the list of its rows, so a search only touches the rows
+        of the probed cells. Inserts and deletes update both incrementally.
+        The index retrains once the gallery has grown by ``retrain_growth``
+        since the last training.
+
+        Args:
+            nlist: Number of cells, defaults to 4 * sqrt(gallery size)
+            nprobe: Cells searched per probe. Raising it improves recall and
+                costs speed, nprobe = nlist is exact search.
+            min_size: Smaller galleries are searched exactly, without training
+            iterations: k-means rounds per training
+            train_per_list: Training vectors sampled per cell
+            retrain_growth: Gallery growth factor that triggers retraining
+            seed: Seed for sampling and k-means
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_size = min_size
+        self.iterations = iterations
+        self.train_per_list = train_per_list
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.centroid_norms: Optional[np.ndarray] = None
+        self.cell_rows: List[np.ndarray] = []  # Rows of each cell, the first cell_sizes[cell] are in use
+        self.cell_sizes = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros(0, dtype=np.int64)  # Position of each gallery row in its cell's list
+        self.trained_size = 0
+        self.trainings = 0
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, gallery):
+        """
+        Train the cells on the gallery's encodings and assign every row
+
+        The caller holds the gallery lock.
+        """
+        size = len(gallery)
+        if size < self.min_size:
+            self.centroids = None
+            self.centroid_norms = None
+            self.cell_rows = []
+            self.cell_sizes = np.zeros(0, dtype=np.int64)
+            self.trained_size = 0
+            return
+
+        nlist = self.nlist or int(4 * np.sqrt(size))
+        nlist = max(1, min(nlist, size))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(size, nlist * self.train_per_list)
+        sample = gallery.encodings[:size][rng.choice(size, sample_size, replace=False)]
+
+        self.centroids = kmeans(sample, nlist, self.iterations, self.seed)
+        self.centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        gallery.clusters[:size] = nearest_centroids(gallery.encodings[:size], self.centroids)
+        self._build_cells(gallery)
+        self.trained_size = size
+        self.trainings += 1
+        logger.info(f"Trained IVF index with {nlist} cells on {sample_size} of {size} encodings")
+
+    def added(self, gallery, start: int, stop: int):
+        """
+        Assign new gallery rows to their cells
+
+        The caller holds the gallery lock.
+
+        Args:
+            gallery: Gallery the rows were added to
+            start: First new row
+            stop: One past the last new row
+        """
+        size = len(gallery)
+        if not self.trained:
+            if size >= self.min_size:
+                self.train(gallery)
+            return
+        if size >= self.trained_size * self.retrain_growth:
+            self.train(gallery)
+            return
+        gallery.clusters[start:stop] = nearest_centroids(gallery.encodings[start:stop], self.centroids)
+        self._grow_positions(len(gallery.clusters))
+        for row in range(start, stop):
+            cell = gallery.clusters[row]
+            rows = self.cell_rows[cell]
+            count = self.cell_sizes[cell]
+            if count == len(rows):
+                rows = self.cell_rows[cell] = np.concatenate([rows, np.empty(max(len(rows), 16), dtype=np.int64)])
+            rows[count] = row
+            self.positions[row] = count
+            self.cell_sizes[cell] = count + 1
+
+    def removed(self, gallery, removed: np.ndarray, holes: np.ndarray, movers: np.ndarray):
+        """
+        Drop deleted gallery rows from their cells and follow the rows moved into their place
+
+        Called before the gallery moves any rows. The caller holds the gallery lock.
+
+        Args:
+            gallery: Gallery the rows are removed from
+            removed: Rows being deleted
+            holes: Rows that ``movers`` are moved to, in the same order
+            movers: Rows being moved
+        """
+        if not self.trained:
+            return
+        for row in removed:
+            # Fill the gap with the last row of the cell
+            cell = gallery.clusters[row]
+            rows = self.cell_rows[cell]
+            position = self.positions[row]
+            last = rows[self.cell_sizes[cell] - 1]
+            rows[position] = last
+            self.positions[last] = position
+            self.cell_sizes[cell] -= 1
+        for mover, hole in zip(movers, holes):
+            position = self.positions[mover]
+            self.cell_rows[gallery.clusters[mover]][position] = hole
+            self.positions[hole] = position
+
+    def _build_cells(self, gallery):
+        """List the rows of every cell from gallery.clusters"""
+        size = len(gallery)
+        labels = gallery.clusters[:size]
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=len(self.centroids))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.cell_rows = [
+            np.concatenate([order[start:start + count], np.empty(max(count, 16), dtype=np.int64)])
+            for start, count in zip(starts, counts)
+        ]
+        self.cell_sizes = counts.astype(np.int64)
+        self._grow_positions(len(gallery.clusters))
+        self.positions[order] = np.arange(size) - np.repeat(starts, counts)
+
+    def _grow_positions(self, capacity: int):
+        if len(self.positions) < capacity:
+            positions = np.zeros(capacity, dtype=np.int64)
+            positions[:len(self.positions)] = self.positions
+            self.positions = positions
+
+    def candidates(self, gallery, probe: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Rows worth comparing with a probe
+
+        The caller holds the gallery lock.
+
+        Returns:
+            Row indices, or None if every row has to be compared
+        """
+        if not self.trained or self.nprobe >= len(self.centroids):
+            return None
+        scores = self.centroid_norms - 2.0 * (self.centroids @ probe)
+        probed = np.argpartition(scores, self.nprobe - 1)[:self.nprobe]
+        return np.concatenate([self.cell_rows[cell][:self.cell_sizes[cell]] for cell in probed])
+
+    def get_stats(self) -> dict:
+        """Get training state and search knobs"""
+        return {
+            "type": "ivf",
+            "trained": self.trained,
+            "nlist": len(self.centroids) if self.trained else None,
+            "nprobe": self.nprobe,
+            "trained_size": self.trained_size,
+            "trainings": self.trainings,
+        }
@@ -0,0 +1,191 @@
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from face_detector import Box
+
+def iou(a: Box, b: Box) -> float:
+    """Intersection over union of two boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+class Track:
+    def __init__(self, track_id: int, box: Box, now: float):
+        """
+        A face followed across frames of one camera
+
+        Args:
+            track_id: Unique ID of the track
+            box: Last known face box
+            now: Time the track was created
+        """
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = now
+        self.last_seen = now
+        self.last_request: Optional[float] = None  # Last time the face was sent for recognition
+        self.last_result: Optional[float] = None  # Last time a recognition result arrived
+        self.person_id: Optional[int] = None
+        self.name: Optional[str] = None
+        self.confidence: Optional[float] = None
+
+class FaceTracker:
+    # Track IDs are unique across all cameras of the process
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_age: float = 2.0,
+        recheck_interval: float = 30.0,
+        min_confidence: float = 80.0,
+        retry_interval: float = 2.0
+    ):
+        """
+        IoU tracker that decides which faces need backend recognition
+
+        A face is sent for recognition when its track is new, when the last
+        result had low confidence (retried every ``retry_interval``), or when
+        ``recheck_interval`` has passed since the last request. All other
+        frames of the same person are not sent.
+
+        Args:
+            iou_threshold: Minimum overlap to match a box to an existing track
+            max_age: Seconds a track survives without being seen
+            recheck_interval: Seconds between recognitions of a confident track
+            min_confidence: Confidence (0-100) below which a result is retried
+            retry_interval: Seconds between retries of a low-confidence track
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.recheck_interval = recheck_interval
+        self.min_confidence = min_confidence
+        self.retry_interval = retry_interval
+
+        self.tracks: Dict[int, Track] = {}
+        self.lock = threading.Lock()
+
+        self.tracks_created = 0
+        self.faces_seen = 0
+        self.recognition_requests = 0
+
+    def update(self, boxes: List[Box], now: Optional[float] = None) -> List[Tuple[Track, bool]]:
+        """
+        Associate detected boxes with tracks
+
+        Args:
+            boxes: Face boxes detected in the current frame
+            now: Current time, defaults to time.time()
+
+        Returns:
+            List of (track, needs recognition) in the order of ``boxes``
+        """
+        now = time.time() if now is None else now
+
+        with self.lock:
+            # Expire tracks that have not been seen for a while
+            for track_id in [tid for tid, t in self.tracks.items() if now - t.last_seen > self.max_age]:
+                del self.tracks[track_id]
+
+            # Greedy matching by descending overlap
+            pairs = sorted(
+                (
+                    (iou(box, track.box), index, track.track_id)
+                    for index, box in enumerate(boxes)
+                    for track in self.tracks.values()
+                ),
+                reverse=True
+            )
+            assigned: Dict[int, Track] = {}
+            used_tracks = set()
+            for overlap, index, track_id in pairs:
+                if overlap < self.iou_threshold:
+                    break
+                if index in assigned or track_id in used_tracks:
+                    continue
+                assigned[index] = self.tracks[track_id]
+                used_tracks.add(track_id)
+
+            results = []
+            for index, box in enumerate(boxes):
+                track = assigned.get(index)
+                if track is None:
+                    track = Track(next(FaceTracker._ids), box, now)
+                    self.tracks[track.track_id] = track
+                    self.tracks_created += 1
+                track.box = box
+                track.last_seen = now
+
+                needs = self._needs_recognition(track, now)
+                if needs:
+                    track.last_request = now
+                    self.recognition_requests += 1
+                results.append((track, needs))
+
+            self.faces_seen += len(boxes)
+            return results
+
+    def _needs_recognition(self, track: Track, now: float) -> bool:
+        if track.last_request is None:
+            return True
+        if track.last_result is None or track.last_result < track.last_request:
+            # Still waiting for the previous answer
+            return now - track.last_request >= self.retry_interval
+        if track.confidence is None or track.confidence < self.min_confidence:
+            return now - track.last_request >= self.retry_interval
+        return now - track.last_request >= self.recheck_interval
+
+    def record_upload(self, track_ids: List[Optional[int]], detections: List[dict], now: Optional[float] = None):
+        """
+        Store the answer to a successful upload on the tracks whose crops it carried
+
+        Every uploaded track counts as answered, even if the backend found
+        nothing in its crop. A new track without a result is then retried
+        after ``retry_interval``, and a known track keeps its last result.
+        Detections are matched to crops by "crop_index", the position of the
+        crop in the upload, or by an echoed "track_id" if there is no index.
+
+        Args:
+            track_ids: Track of each uploaded crop, in upload order
+            detections: Detections from /api/process-frame
+            now: Current time, defaults to time.time()
+        """
+        now = time.time() if now is None else now
+
+        with self.lock:
+            answered: Dict[int, Track] = {}
+            for track_id in track_ids:
+                track = self.tracks.get(track_id)
+                if track is not None:
+                    track.last_result = now
+                    answered[track_id] = track
+
+            for detection in detections:
+                index = detection.get("crop_index")
+                if isinstance(index, int) and 0 <= index < len(track_ids):
+                    track = answered.get(track_ids[index])
+                else:
+                    track = answered.get(detection.get("track_id"))
+                if track is None:
+                    continue
+                track.person_id = detection.get("person_id")
+                track.name = detection.get("name")
+                track.confidence = detection.get("confidence")
+
+    def get_stats(self) -> dict:
+        """Get tracker counters"""
+        with self.lock:
+            active = len(self.tracks)
+        return {
+            "active_tracks": active,
+            "tracks_created": self.tracks_created,
+            "faces_seen": self.faces_seen,
+            "recognition_requests": self.recognition_requests,
+            "request_ratio": self.recognition_requests / self.faces_seen if self.faces_seen else 0.0,
+        }
@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import cv2
+import numpy as np
+
+def dhash(image: np.ndarray, size: int = 8) -> int:
+    """
+    Difference hash of an image
+
+    The image is shrunk to (size + 1) x size grayscale pixels, and each bit
+    says whether a pixel is brighter than its right neighbour. Small shifts,
+    noise and recompression leave most bits unchanged.
+
+    Args:
+        image: BGR or grayscale image
+        size: Hash side, the hash has size * size bits
+    """
+    small = cv2.resize(image, (size + 1, size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+class DedupCache:
+    def __init__(self, max_distance: int = 6, window: float = 10.0, capacity: int = 32):
+        """
+        Recognise images that look like one seen recently on the same camera
+
+        Keeps the dHash of the last ``capacity`` distinct images. An image
+        whose hash is within ``max_distance`` bits of one first seen less than
+        ``window`` seconds ago is a duplicate. A duplicate does not renew the
+        entry it matched, so a scene that never changes is still let through
+        once per window.
+
+        Args:
+            max_distance: Largest Hamming distance (of 64 bits) that counts as
+                the same image. 0 only matches identical hashes.
+            window: Seconds an image suppresses its near-duplicates
+            capacity: Number of recent hashes kept, least recently matched first out
+        """
+        self.max_distance = max_distance
+        self.window = window
+        self.capacity = capacity
+        self.entries: "OrderedDict[int, float]" = OrderedDict()  # Hash -> Time first seen
+
+        self.checks = 0
+        self.hits = 0
+
+    def check(self, image: np.ndarray, now: Optional[float] = None) -> bool:
+        """
+        Check an image and remember it if it is new
+
+        Args:
+            image: Frame or face crop
+            now: Current time, defaults to time.time()
+
+        Returns:
+            True if the image is a near-duplicate of a recent one
+        """
+        if now is None:
+            now = time.time()
+        image_hash = dhash(image)
+        self.checks += 1
+
+        for known, seen in list(self.entries.items()):
+            if now - seen > self.window:
+                del self.entries[known]
+            elif hamming(known, image_hash) <= self.max_distance:
+                self.entries.move_to_end(known)
+                self.hits += 1
+                return True
+
+        self.entries[image_hash] = now
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return False
+
+    def get_stats(self) -> dict:
+        """Get dedup counters"""
+        return {
+            "max_distance": self.max_distance,
+            "window": self.window,
+            "checks": self.checks,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.checks if self.checks else 0.0,
+            "entries": len(self.entries),
+        }
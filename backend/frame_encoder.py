@@ -0,0 +1,272 @@
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# cv2.imencode's default quality, used when a camera has no profile
+DEFAULT_QUALITY = 95
+
+class EncodeProfile:
+    def __init__(
+        self,
+        name: str = "default",
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        roi: Optional[Sequence[Sequence[float]]] = None,
+        quality: int = DEFAULT_QUALITY,
+        min_quality: Optional[int] = None,
+    ):
+        """
+        How a camera's full frames are turned into JPEG uploads
+
+        Args:
+            name: Name the encode stats are grouped by
+            max_width: Largest width sent to the backend, frames are downscaled
+                to fit. None keeps the native width.
+            max_height: Largest height sent to the backend
+            roi: Region of interest as a polygon of (x, y) points in 0-1 frame
+                coordinates, e.g. the doorway. The frame is cropped to the
+                polygon's bounding box and everything outside it is blanked.
+            quality: JPEG quality (1-100) while uploads are fast
+            min_quality: Lowest quality the encoder may step down to when
+                uploads get slow. None keeps the quality fixed.
+        """
+        self.name = name
+        self.max_width = max_width
+        self.max_height = max_height
+        self.roi = [(float(x), float(y)) for x, y in roi] if roi else None
+        self.quality = quality
+        self.min_quality = quality if min_quality is None else min(min_quality, quality)
+
+    @classmethod
+    def from_camera(cls, camera: dict, default: "EncodeProfile") -> "EncodeProfile":
+        """
+        Build the profile of a camera record
+
+        The record's optional "encode_profile" object can set any of "name",
+        "max_width", "max_height", "roi", "quality" and "min_quality". Missing
+        keys are taken from ``default``.
+
+        Args:
+            camera: Camera record from /api/cameras
+            default: Service-wide profile
+        """
+        overrides = camera.get("encode_profile") or {}
+        if not overrides:
+            return default
+        return cls(
+            name=overrides.get("name", f"camera-{camera['id']}"),
+            max_width=overrides.get("max_width", default.max_width),
+            max_height=overrides.get("max_height", default.max_height),
+            roi=overrides.get("roi", default.roi),
+            quality=overrides.get("quality", default.quality),
+            min_quality=overrides.get("min_quality", default.min_quality),
+        )
+
+class FrameEncoder:
+    def __init__(
+        self,
+        profile: EncodeProfile,
+        latency_high: float = 0.5,
+        latency_low: float = 0.2,
+        quality_step: int = 5,
+        settle_uploads: int = 5,
+        smoothing: float = 0.2,
+    ):
+        """
+        JPEG encode one camera's frames according to its encode profile
+
+        The crop, scale and mask are worked out on the first frame of a given
+        size and reused, and the resize and mask run into buffers allocated
+        once, so a steady stream allocates nothing but the JPEG itself.
+
+        Quality follows upload latency: when the smoothed latency goes above
+        ``latency_high`` the quality drops by ``quality_step`` (not below the
+        profile's min_quality), and when it falls below ``latency_low`` it climbs
+        back towards the profile's quality. At most one step is taken every
+        ``settle_uploads`` uploads, so each step can take effect before the next.
+
+        Args:
+            profile: Encode profile of the camera
+            latency_high: Upload latency in seconds above which quality steps down
+            latency_low: Upload latency in seconds below which quality steps up
+            quality_step: JPEG quality change per step
+            settle_uploads: Uploads between two quality steps
+            smoothing: Weight of the newest sample in the latency average
+        """
+        self.profile = profile
+        self.latency_high = latency_high
+        self.latency_low = latency_low
+        self.quality_step = quality_step
+        self.settle_uploads = settle_uploads
+        self.smoothing = smoothing
+
+        self.quality = profile.quality
+        self.latency: Optional[float] = None  # EWMA of upload latency in seconds
+        self.uploads_since_step = 0
+        self.lock = threading.Lock()
+
+        self.source_shape: Optional[Tuple[int, ...]] = None
+        self.crop: Optional[Tuple[int, int, int, int]] = None  # x0, y0, x1, y1 in the source frame
+        self.size: Optional[Tuple[int, int]] = None  # Output (width, height) if the crop is resized
+        self.output_size: Optional[Tuple[int, int]] = None  # (width, height) sent to the backend
+        self.mask: Optional[np.ndarray] = None  # 255 inside the ROI at output size
+        self.resized: Optional[np.ndarray] = None
+        self.masked: Optional[np.ndarray] = None
+
+        self.frames = 0
+        self.encode_seconds = 0.0
+        self.bytes = 0
+        self.quality_steps = 0
+
+    def _plan(self, shape: Tuple[int, ...]):
+        """Work out the crop, output size, mask and buffers for a frame size"""
+        height, width = shape[:2]
+        x0, y0, x1, y1 = 0, 0, width, height
+        polygon = None
+        if self.profile.roi:
+            polygon = np.array([(x * width, y * height) for x, y in self.profile.roi], dtype=np.float32)
+            bx, by, bw, bh = cv2.boundingRect(polygon)
+            x0, y0 = max(0, bx), max(0, by)
+            x1, y1 = min(width, bx + bw), min(height, by + bh)
+            if x1 <= x0 or y1 <= y0:
+                x0, y0, x1, y1 = 0, 0, width, height
+                polygon = None
+
+        crop_width, crop_height = x1 - x0, y1 - y0
+        scale = 1.0
+        if self.profile.max_width:
+            scale = min(scale, self.profile.max_width / crop_width)
+        if self.profile.max_height:
+            scale = min(scale, self.profile.max_height / crop_height)
+        out_width = max(1, int(round(crop_width * scale)))
+        out_height = max(1, int(round(crop_height * scale)))
+
+        self.source_shape = shape
+        self.crop = (x0, y0, x1, y1)
+        self.size = (out_width, out_height) if scale < 1.0 else None
+        self.output_size = (out_width, out_height)
+        self.resized = np.empty((out_height, out_width) + shape[2:], dtype=np.uint8) if scale < 1.0 else None
+        self.mask = None
+        self.masked = None
+        if polygon is not None:
+            points = (polygon - (x0, y0)) * scale
+            self.mask = np.zeros((out_height, out_width), dtype=np.uint8)
+            cv2.fillPoly(self.mask, [np.round(points).astype(np.int32)], 255)
+            self.masked = np.empty((out_height, out_width) + shape[2:], dtype=np.uint8)
+
+    def prepare(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Crop, downscale and mask a frame as its profile says
+
+        The result may be one of the encoder's buffers, which the next call
+        overwrites.
+
+        Args:
+            frame: Decoded BGR frame
+        """
+        if frame.shape != self.source_shape:
+            self._plan(frame.shape)
+
+        x0, y0, x1, y1 = self.crop
+        image = frame[y0:y1, x0:x1]
+        if self.size is not None:
+            image = cv2.resize(image, self.size, dst=self.resized, interpolation=cv2.INTER_AREA)
+        if self.mask is not None:
+            image = cv2.bitwise_and(image, image, dst=self.masked, mask=self.mask)
+        return image
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        """
+        Encode a frame to JPEG at the current quality
+
+        Args:
+            frame: Decoded BGR frame
+
+        Returns:
+            JPEG bytes
+        """
+        _, buffer = cv2.imencode('.jpg', self.prepare(frame), [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes()
+
+    def record_encode(self, seconds: float, size: int):
+        """Count an encoded frame in the stats"""
+        self.frames += 1
+        self.encode_seconds += seconds
+        self.bytes += size
+
+    def record_upload(self, latency: float, status: Optional[int]):
+        """
+        Adjust the quality after an upload
+
+        Args:
+            latency: Seconds the upload took
+            status: HTTP status code, or None if the request failed
+        """
+        if self.profile.min_quality >= self.profile.quality:
+            return
+        # A failed or throttled upload counts as a slow one
+        if status is None or status == 429 or status >= 500:
+            latency = max(latency, self.latency_high * 2)
+
+        with self.lock:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.smoothing * (latency - self.latency)
+
+            self.uploads_since_step += 1
+            if self.uploads_since_step < self.settle_uploads:
+                return
+
+            quality = self.quality
+            if self.latency > self.latency_high:
+                quality = max(self.profile.min_quality, quality - self.quality_step)
+            elif self.latency < self.latency_low:
+                quality = min(self.profile.quality, quality + self.quality_step)
+            if quality != self.quality:
+                self.quality = quality
+                self.quality_steps += 1
+                self.uploads_since_step = 0
+
+    def get_stats(self) -> dict:
+        """Get the profile, current quality and encode cost per frame"""
+        return {
+            "profile": self.profile.name,
+            "quality": self.quality,
+            "quality_steps": self.quality_steps,
+            "output_size": self.output_size,
+            "frames": self.frames,
+            "encode_ms": self.encode_seconds / self.frames * 1000 if self.frames else None,
+            "bytes_per_frame": self.bytes / self.frames if self.frames else None,
+            "latency": self.latency,
+        }
+
+def combine_stats(stats: List[dict]) -> dict:
+    """
+    Group the encode stats of several cameras by profile name
+
+    Args:
+        stats: FrameEncoder.get_stats() of each camera
+
+    Returns:
+        Profile name -> cameras, frames, mean encode_ms and bytes_per_frame
+    """
+    profiles = {}
+    for camera in stats:
+        totals = profiles.setdefault(camera["profile"], {"cameras": 0, "frames": 0, "seconds": 0.0, "bytes": 0})
+        totals["cameras"] += 1
+        if camera["frames"]:
+            totals["frames"] += camera["frames"]
+            totals["seconds"] += camera["encode_ms"] / 1000 * camera["frames"]
+            totals["bytes"] += camera["bytes_per_frame"] * camera["frames"]
+    return {
+        name: {
+            "cameras": totals["cameras"],
+            "frames": totals["frames"],
+            "encode_ms": totals["seconds"] / totals["frames"] * 1000 if totals["frames"] else None,
+            "bytes_per_frame": totals["bytes"] / totals["frames"] if totals["frames"] else None,
+        }
+        for name, totals in profiles.items()
+    }
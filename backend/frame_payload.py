@@ -0,0 +1,91 @@
+import base64
+import json
+from typing import Dict, Tuple
+
+from urllib3 import encode_multipart_formdata
+
+def build_frame_request(camera_id: int, payload: dict, transport: str) -> Tuple[Dict[str, str], bytes]:
+    """
+    Build the headers and body of a /api/process-frame request
+
+    The payload is either a full frame, ``{"jpeg": bytes}``, or a set of face
+    crops, ``{"crops": [...], "frame_width": int, "frame_height": int}``, where
+    every crop has "x", "y", "width", "height", "jpeg" and optionally a
+    "track_id" from the camera-side face tracker. A "captured_at" key, if
+    present, is not sent. Both the blocking and the asyncio engines send
+    exactly these bytes.
+
+    Args:
+        camera_id: ID of the camera
+        payload: Full frame or crops payload
+        transport: "binary" or "json"
+
+    Returns:
+        Tuple of (headers, body)
+    """
+    if "crops" in payload:
+        return _build_crops_request(camera_id, payload, transport)
+
+    if transport == "binary":
+        return {"Content-Type": "image/jpeg", "X-Camera-ID": str(camera_id)}, payload["jpeg"]
+
+    body = {"camera_id": camera_id, "frame": base64.b64encode(payload["jpeg"]).decode('utf-8')}
+    return {"Content-Type": "application/json"}, json.dumps(body).encode()
+
+def _build_crops_request(camera_id: int, payload: dict, transport: str) -> Tuple[Dict[str, str], bytes]:
+    crops = payload["crops"]
+    boxes = [
+        {key: crop[key] for key in ("x", "y", "width", "height", "track_id") if key in crop}
+        for crop in crops
+    ]
+
+    if transport == "binary":
+        fields = [
+            ("frame_width", str(payload["frame_width"])),
+            ("frame_height", str(payload["frame_height"])),
+            ("crops", json.dumps(boxes)),
+        ]
+        for index, crop in enumerate(crops):
+            fields.append((f"crop_{index}", (f"crop_{index}.jpg", crop["jpeg"], "image/jpeg")))
+        body, content_type = encode_multipart_formdata(fields)
+        return {"Content-Type": content_type, "X-Camera-ID": str(camera_id)}, body
+
+    body = {
+        "camera_id": camera_id,
+        "frame_width": payload["frame_width"],
+        "frame_height": payload["frame_height"],
+        "crops": [
+            {**box, "image": base64.b64encode(crop["jpeg"]).decode('utf-8')}
+            for box, crop in zip(boxes, crops)
+        ],
+    }
+    return {"Content-Type": "application/json"}, json.dumps(body).encode()
+
+def payload_size(payload: dict) -> int:
+    """Number of JPEG bytes in a payload"""
+    if "crops" in payload:
+        return sum(len(crop["jpeg"]) for crop in payload["crops"])
+    return len(payload["jpeg"])
+
+# Phrases in a 422 body that mean the backend wanted JSON, not that the frame was bad
+JSON_ONLY_MARKERS = ("json decode error", "json_invalid", "content type", "content-type", "media type")
+
+def rejects_binary(status: int, body: bytes) -> bool:
+    """
+    Check whether the reply to a binary upload means the backend only takes JSON frames
+
+    A 415 always does. A 422 only does when its body complains that the
+    request is not JSON, which is what a backend that still expects the
+    legacy JSON body answers to raw JPEG bytes. Any other 422 is about the
+    frame itself and would fail as JSON too.
+
+    Args:
+        status: HTTP status code of the reply
+        body: Body of the reply
+    """
+    if status == 415:
+        return True
+    if status != 422:
+        return False
+    text = body.decode("utf-8", errors="replace").lower()
+    return any(marker in text for marker in JSON_ONLY_MARKERS)
@@ -0,0 +1,172 @@
+import time
+import threading
+import logging
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("frame_reader")
+
+class LatestFrameReader:
+    def __init__(
+        self,
+        cap,
+        camera_id: int,
+        retry_delay: float = 1.0,
+        reopen: Optional[Callable[[], object]] = None,
+        reconnect_after: int = 5,
+        metrics=None
+    ):
+        """
+        Keep a capture drained on a background thread and expose only the newest frame
+
+        The reader calls ``cap.grab()`` continuously so the OpenCV/FFmpeg buffer
+        never backs up. Frames are only decoded with ``cap.retrieve()`` once a
+        consumer has asked for one, and the result is published into a single
+        slot, so the consumer always gets a frame that is at most one frame
+        period old.
+
+        Args:
+            cap: An opened ``cv2.VideoCapture`` (or anything with grab/retrieve)
+            camera_id: ID of the camera, used for logging
+            retry_delay: Seconds to wait after a failed grab
+            reopen: Opens a new capture for the camera, used after
+                ``reconnect_after`` grabs in a row have failed
+            reconnect_after: Consecutive failed grabs before reopening
+            metrics: camera_metrics.CameraSeries to record grabs, decode
+                time and reconnects in
+        """
+        self.cap = cap
+        self.camera_id = camera_id
+        self.retry_delay = retry_delay
+        self.reopen = reopen
+        self.reconnect_after = reconnect_after
+        self.metrics = metrics
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        self._cond = threading.Condition()
+        self._wanted = threading.Event()
+        self._frame: Optional[np.ndarray] = None
+        self._frame_time = 0.0
+
+        self.grabbed = 0
+        self.decoded = 0
+        self.dropped = 0
+        self.failed = 0
+        self.reconnects = 0
+
+    def start(self):
+        """Start the reader thread"""
+        if self.thread and self.thread.is_alive():
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the reader thread and wake up any waiting consumer"""
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5.0)
+            self.thread = None
+
+    def _run(self):
+        """Grab frames as fast as the stream delivers them"""
+        failures = 0
+        while self.running:
+            if not self.cap.grab():
+                self.failed += 1
+                failures += 1
+                if failures == 1:
+                    logger.warning(f"Failed to grab frame from camera {self.camera_id}")
+                if self.reopen is not None and failures >= self.reconnect_after:
+                    self._reconnect()
+                    failures = 0
+                time.sleep(self.retry_delay)
+                continue
+
+            failures = 0
+            grabbed_at = time.time()
+            self.grabbed += 1
+            if self.metrics is not None:
+                self.metrics.frames.inc()
+
+            # Nobody is waiting for a frame, skip the decode
+            if not self._wanted.is_set():
+                with self._cond:
+                    self.dropped += 1
+                continue
+
+            start = time.perf_counter()
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                self.failed += 1
+                continue
+            if self.metrics is not None:
+                self.metrics.decode.observe(time.perf_counter() - start)
+
+            self.decoded += 1
+            with self._cond:
+                if self._frame is not None:
+                    # Previous frame was never collected
+                    self.dropped += 1
+                self._frame = frame
+                self._frame_time = grabbed_at
+                self._wanted.clear()
+                self._cond.notify_all()
+
+    def _reconnect(self):
+        """Replace a capture that keeps failing with a newly opened one"""
+        logger.warning(f"Reconnecting camera {self.camera_id}")
+        self.cap.release()
+        self.cap = self.reopen()
+        self.reconnects += 1
+        if self.metrics is not None:
+            self.metrics.reconnects.inc()
+
+    def read(self, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Get the newest frame from the stream
+
+        Args:
+            timeout: Maximum time in seconds to wait for a frame
+
+        Returns:
+            Tuple of (frame, grab timestamp), or (None, 0.0) on timeout
+        """
+        deadline = time.time() + timeout
+
+        with self._cond:
+            if self._frame is not None:
+                # Left over from a read that timed out, too old to use
+                self.dropped += 1
+                self._frame = None
+            self._wanted.set()
+
+            while self._frame is None and self.running:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._wanted.clear()
+                    return None, 0.0
+                self._cond.wait(remaining)
+
+            if self._frame is None:
+                return None, 0.0
+
+            frame, frame_time = self._frame, self._frame_time
+            self._frame = None
+            return frame, frame_time
+
+    def get_stats(self) -> dict:
+        """Get capture counters for this reader"""
+        return {
+            "grabbed": self.grabbed,
+            "decoded": self.decoded,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "reconnects": self.reconnects,
+        }
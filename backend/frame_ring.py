@@ -0,0 +1,168 @@
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+HEADER_FIELDS = 4  # seq, camera_id, size, timestamp_ns
+HEADER_BYTES = HEADER_FIELDS * 8
+
+class FrameRing:
+    def __init__(
+        self,
+        slots: int,
+        slot_bytes: int,
+        name: Optional[str] = None,
+        create: bool = True
+    ):
+        """
+        Fixed-size ring of encoded frames in a shared memory block
+
+        A shard worker writes the JPEG bytes of each upload payload into the
+        ring and only sends the slot number, the sequence number and the small
+        metadata of the payload to the coordinator, so no image data is
+        pickled between processes.
+
+        Every slot has a sequence number that the writer makes odd while it
+        writes and even again once the frame is complete (a seqlock). A reader
+        checks the sequence number before and after copying a frame out to
+        detect frames that were overwritten in the meantime.
+
+        Args:
+            slots: Number of frames the ring holds
+            slot_bytes: Largest encoded frame a slot holds
+            name: Name of an existing shared memory block to attach to
+            create: Create a new block instead of attaching to ``name``
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+
+        size = slots * HEADER_BYTES + slots * slot_bytes
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.owner = create
+
+        self.headers = np.ndarray((slots, HEADER_FIELDS), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray(
+            (slots, slot_bytes),
+            dtype=np.uint8,
+            buffer=self.shm.buf,
+            offset=slots * HEADER_BYTES
+        )
+        if create:
+            self.headers[:] = 0
+
+        self._next_slot = 0
+
+    @classmethod
+    def for_stream(cls, width: int, height: int, slots: int, max_bytes: Optional[int] = None) -> "FrameRing":
+        """
+        Create a ring for the encoded frames of one stream
+
+        A slot holds the raw size of a frame at the stream's resolution, which
+        its JPEG or face crops stay below. With ``max_bytes`` set, the ring
+        gets fewer slots, down to one, and then smaller ones, so it never takes
+        more shared memory than that. Frames that do not fit are rejected by
+        write.
+
+        Args:
+            width: Frame width of the stream
+            height: Frame height of the stream
+            slots: Number of frames the ring should hold
+            max_bytes: Most shared memory the ring may take, None for no limit
+        """
+        slot_bytes = width * height * 3
+        if max_bytes is not None:
+            slots = max(1, min(slots, max_bytes // (slot_bytes + HEADER_BYTES)))
+            slot_bytes = max(1, min(slot_bytes, max_bytes // slots - HEADER_BYTES))
+        return cls(slots, slot_bytes)
+
+    @classmethod
+    def attach(cls, name: str, slots: int, slot_bytes: int) -> "FrameRing":
+        """Attach to a ring created by another process"""
+        return cls(slots, slot_bytes, name=name, create=False)
+
+    def write(self, camera_id: int, chunks: List[bytes], timestamp: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """
+        Copy an encoded frame into the next slot
+
+        Only one thread may write to a ring.
+
+        Args:
+            camera_id: ID of the camera the frame came from
+            chunks: Encoded images of the frame, stored back to back
+            timestamp: Capture time, defaults to time.time()
+
+        Returns:
+            Tuple of (slot, sequence number) identifying the frame, or None if
+            it is bigger than a slot
+        """
+        size = sum(len(chunk) for chunk in chunks)
+        if size > self.slot_bytes:
+            return None
+
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+
+        header = self.headers[slot]
+        seq = int(header[0])
+        if seq % 2:
+            # A previous writer died halfway through this slot
+            seq += 1
+
+        header[0] = seq + 1
+        offset = 0
+        for chunk in chunks:
+            self.data[slot, offset:offset + len(chunk)] = np.frombuffer(chunk, dtype=np.uint8)
+            offset += len(chunk)
+        header[1] = camera_id
+        header[2] = size
+        header[3] = int((timestamp if timestamp is not None else time.time()) * 1e9)
+        header[0] = seq + 2
+        return slot, seq + 2
+
+    def read(self, slot: int, seq: int) -> Optional[Tuple[int, float, bytes]]:
+        """
+        Copy a frame out of the ring
+
+        Args:
+            slot: Slot returned by write
+            seq: Sequence number returned by write
+
+        Returns:
+            Tuple of (camera ID, timestamp, encoded bytes), or None if the
+            slot was overwritten before or while it was copied
+        """
+        header = self.headers[slot]
+        if int(header[0]) != seq:
+            return None
+
+        camera_id, size, timestamp_ns = (int(v) for v in header[1:4])
+        data = self.data[slot, :min(size, self.slot_bytes)].tobytes()
+        if not self.is_current(slot, seq):
+            return None
+        return camera_id, timestamp_ns / 1e9, data
+
+    def is_current(self, slot: int, seq: int) -> bool:
+        """Check that a slot still holds the frame with the given sequence number"""
+        return int(self.headers[slot, 0]) == seq
+
+    def close(self, unlink: bool = False):
+        """
+        Detach from the shared memory block, and free it if this ring created it
+
+        Args:
+            unlink: Free the block even though another process created it,
+                for a ring whose writer died
+        """
+        del self.headers
+        del self.data
+        self.shm.close()
+        if self.owner or unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
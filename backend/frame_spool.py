@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("frame_spool")
+
+# crc32, meta length, body length, capture time
+RECORD_HEADER = struct.Struct("<IIId")
+SEGMENT_SUFFIX = ".seg"
+CURSOR_FILE = "cursor.json"
+
+class Segment:
+    def __init__(self, seq: int, path: str):
+        """
+        One append-only spool file
+
+        Args:
+            seq: Sequence number of the segment, also its file name
+            path: Path of the segment file
+        """
+        self.seq = seq
+        self.path = path
+        self.size = 0
+        self.records = 0
+        self.last_time = 0.0
+
+class FrameSpool:
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age: float = 3600.0,
+        segment_bytes: int = 16 * 1024 * 1024
+    ):
+        """
+        Bounded on-disk queue of frame submissions the backend did not accept
+
+        Records are appended to numbered segment files. Replay progress is a
+        (segment, offset) cursor that is kept in ``cursor.json``, so a restart
+        resumes where replay stopped. Whole segments are deleted once they are
+        replayed, once the spool grows past ``max_bytes`` (oldest first), or
+        once their newest record is older than ``max_age``.
+
+        Each record stores the camera ID, capture time and the exact request
+        headers and body, with a CRC so a record torn by a crash is ignored.
+
+        Args:
+            directory: Directory for the segment files
+            max_bytes: Maximum disk usage, the oldest segments are dropped beyond it
+            max_age: Seconds after which records are discarded instead of replayed
+            segment_bytes: Size at which a new segment file is started
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.segment_bytes = min(segment_bytes, max(1, max_bytes // 4))
+        self.lock = threading.Lock()
+
+        self.appended = 0
+        self.replayed = 0
+        self.expired = 0
+        self.rejected = 0
+        self.dropped_segments = 0
+        self.dropped_bytes = 0
+        self.last_replayed_capture: Optional[float] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.segments: List[Segment] = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit():
+                segment = Segment(int(name[:-len(SEGMENT_SUFFIX)]), os.path.join(directory, name))
+                self._scan(segment)
+                self.segments.append(segment)
+
+        self.cursor = self._load_cursor()
+        self.writer = None
+        if not self.segments:
+            self._rotate()
+        else:
+            self.writer = open(self.segments[-1].path, "ab")
+
+    def _scan(self, segment: Segment):
+        """Read the record headers of a segment to rebuild its size and times"""
+        with open(segment.path, "rb") as f:
+            offset = 0
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                _, meta_len, body_len, captured_at = RECORD_HEADER.unpack(header)
+                end = offset + RECORD_HEADER.size + meta_len + body_len
+                f.seek(end)
+                if f.tell() != end or end > os.path.getsize(segment.path):
+                    break
+                offset = end
+                segment.records += 1
+                segment.last_time = captured_at
+            segment.size = offset
+
+        # Cut off a record that was only partly written before a crash
+        if os.path.getsize(segment.path) != segment.size:
+            with open(segment.path, "r+b") as f:
+                f.truncate(segment.size)
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        path = os.path.join(self.directory, CURSOR_FILE)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            cursor = (int(data["segment"]), int(data["offset"]))
+        except (OSError, ValueError, KeyError):
+            cursor = (0, 0)
+
+        # Start at the oldest segment if the cursor's segment is gone
+        if self.segments and cursor[0] < self.segments[0].seq:
+            cursor = (self.segments[0].seq, 0)
+        return cursor
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, CURSOR_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": self.cursor[0], "offset": self.cursor[1]}, f)
+        os.replace(tmp, path)
+
+    def _rotate(self):
+        """Start a new segment file"""
+        if self.writer is not None:
+            self.writer.close()
+        seq = self.segments[-1].seq + 1 if self.segments else max(1, self.cursor[0])
+        segment = Segment(seq, os.path.join(self.directory, f"{seq:020d}{SEGMENT_SUFFIX}"))
+        self.segments.append(segment)
+        self.writer = open(segment.path, "ab")
+        if len(self.segments) == 1:
+            self.cursor = (seq, 0)
+
+    def append(self, camera_id: int, captured_at: float, headers: Dict[str, str], body: bytes):
+        """
+        Store a submission for later replay
+
+        Args:
+            camera_id: ID of the camera
+            captured_at: Capture time of the frame
+            headers: Request headers
+            body: Request body
+        """
+        meta = json.dumps({"camera_id": camera_id, "headers": headers}).encode()
+        crc = zlib.crc32(body, zlib.crc32(meta))
+        record = RECORD_HEADER.pack(crc, len(meta), len(body), captured_at) + meta + body
+
+        with self.lock:
+            if self.segments[-1].size and self.segments[-1].size + len(record) > self.segment_bytes:
+                self._rotate()
+            self.writer.write(record)
+            self.writer.flush()
+
+            segment = self.segments[-1]
+            segment.size += len(record)
+            segment.records += 1
+            segment.last_time = captured_at
+            self.appended += 1
+
+            self._enforce_limits(time.time())
+
+    def _enforce_limits(self, now: float):
+        """Drop the oldest segments that are over the size or age limit"""
+        while len(self.segments) > 1:
+            oldest = self.segments[0]
+            too_big = self.disk_bytes() > self.max_bytes
+            too_old = oldest.last_time < now - self.max_age
+            if not (too_big or too_old):
+                break
+            if self.cursor[0] > oldest.seq:
+                pass  # Already replayed
+            elif too_old:
+                self.expired += oldest.records
+            else:
+                self.dropped_segments += 1
+                self.dropped_bytes += oldest.size
+                logger.warning(f"Spool over {self.max_bytes} bytes, dropped segment {oldest.seq}")
+            self._delete_oldest()
+
+    def _delete_oldest(self):
+        oldest = self.segments.pop(0)
+        try:
+            os.remove(oldest.path)
+        except OSError as e:
+            logger.error(f"Failed to remove spool segment {oldest.path}: {str(e)}")
+        if self.cursor[0] <= oldest.seq:
+            self.cursor = (self.segments[0].seq, 0)
+            self._save_cursor()
+
+    def peek(self) -> Optional[Tuple[dict, Tuple[int, int]]]:
+        """
+        Get the next record to replay without consuming it
+
+        Returns:
+            Tuple of (record, position after the record), or None if the spool
+            is empty. The record has "camera_id", "captured_at", "headers" and
+            "body".
+        """
+        with self.lock:
+            while self.segments:
+                segment = next((s for s in self.segments if s.seq == self.cursor[0]), None)
+                if segment is None:
+                    self.cursor = (self.segments[0].seq, 0)
+                    continue
+
+                offset = self.cursor[1]
+                if offset < segment.size:
+                    return self._read(segment, offset)
+
+                # Segment fully replayed, start a new one so it can be deleted
+                if segment is self.segments[-1]:
+                    if not segment.size:
+                        return None
+                    self._rotate()
+                self.cursor = (self.segments[self.segments.index(segment) + 1].seq, 0)
+                self._save_cursor()
+                while self.segments[0].seq < self.cursor[0]:
+                    self._delete_oldest()
+            return None
+
+    def _read(self, segment: Segment, offset: int) -> Optional[Tuple[dict, Tuple[int, int]]]:
+        with open(segment.path, "rb") as f:
+            f.seek(offset)
+            header = f.read(RECORD_HEADER.size)
+            crc, meta_len, body_len, captured_at = RECORD_HEADER.unpack(header)
+            meta = f.read(meta_len)
+            body = f.read(body_len)
+
+        end = offset + RECORD_HEADER.size + meta_len + body_len
+        if zlib.crc32(body, zlib.crc32(meta)) != crc:
+            logger.error(f"Corrupt spool record in segment {segment.seq} at {offset}, skipping")
+            self.cursor = (segment.seq, end)
+            return self._read(segment, end) if end < segment.size else None
+
+        info = json.loads(meta)
+        record = {
+            "camera_id": info["camera_id"],
+            "captured_at": captured_at,
+            "headers": info["headers"],
+            "body": body,
+        }
+        return record, (segment.seq, end)
+
+    def advance(self, position: Tuple[int, int], captured_at: float, outcome: str = "replayed"):
+        """
+        Consume records up to a position returned by peek
+
+        Args:
+            position: Position after the consumed record
+            captured_at: Capture time of the consumed record
+            outcome: "replayed", "expired" (too old to replay) or "rejected"
+                (the backend refused it for good)
+        """
+        with self.lock:
+            self.cursor = position
+            self._save_cursor()
+            self.last_replayed_capture = captured_at
+            if outcome == "replayed":
+                self.replayed += 1
+            elif outcome == "expired":
+                self.expired += 1
+            else:
+                self.rejected += 1
+
+    def disk_bytes(self) -> int:
+        """Bytes of all segment files"""
+        return sum(segment.size for segment in self.segments)
+
+    def pending_bytes(self) -> int:
+        """Bytes of records that have not been replayed yet"""
+        pending = 0
+        for segment in self.segments:
+            if segment.seq > self.cursor[0]:
+                pending += segment.size
+            elif segment.seq == self.cursor[0]:
+                pending += segment.size - self.cursor[1]
+        return pending
+
+    def get_stats(self) -> dict:
+        """Get disk usage and replay progress"""
+        with self.lock:
+            return {
+                "disk_bytes": self.disk_bytes(),
+                "pending_bytes": self.pending_bytes(),
+                "segments": len(self.segments),
+                "appended": self.appended,
+                "replayed": self.replayed,
+                "expired": self.expired,
+                "rejected": self.rejected,
+                "dropped_segments": self.dropped_segments,
+                "dropped_bytes": self.dropped_bytes,
+                # Age of the last frame replayed, i.e. how far behind replay is
+                "replay_lag": time.time() - self.last_replayed_capture if self.last_replayed_capture else None,
+            }
+
+    def close(self):
+        """Close the segment writer"""
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
@@ -0,0 +1,150 @@
+import logging
+import os
+import struct
+from typing import Iterable, Optional
+
+import numpy as np
+
+from face_gallery import FaceGallery
+
+logger = logging.getLogger("gallery_snapshot")
+
+MAGIC = b"FGAL"
+VERSION = 1
+# magic, version, reserved, dimensions, count, capacity, sequence
+HEADER = struct.Struct("<4sHHIQQQ")
+ALIGN = 64  # Sections start on cache-line boundaries
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+def _layout(dimensions: int, capacity: int) -> dict:
+    """Byte offset of each section for a snapshot shape"""
+    offsets = {}
+    offset = _aligned(HEADER.size)
+    for name, row_bytes in (("encodings", dimensions * 4), ("norms", 4), ("person_ids", 8), ("face_ids", 8)):
+        offsets[name] = offset
+        offset = _aligned(offset + capacity * row_bytes)
+    offsets["end"] = offset
+    return offsets
+
+def save_snapshot(gallery: FaceGallery, path: str, headroom: Optional[int] = None):
+    """
+    Write a gallery snapshot atomically
+
+    Layout: a 64-byte header (magic, format version, encoding size, row
+    count, row capacity and the change-log sequence the snapshot includes),
+    then the float32 encoding matrix, the squared norms, the person IDs and
+    the FaceData IDs, each section padded to 64 bytes. Rows past the count
+    are zero headroom, so a gallery opened from the snapshot can take new
+    encodings without leaving the shared mapping.
+
+    Args:
+        gallery: Gallery to write
+        path: Snapshot file, replaced only once the new one is complete
+        headroom: Spare rows, defaults to an eighth of the gallery (at least
+            1024). A snapshot always has room for at least one row, since
+            numpy.memmap cannot map an empty section.
+    """
+    with gallery.lock:
+        count = len(gallery)
+        capacity = max(1, count + (headroom if headroom is not None else max(1024, count // 8)))
+        offsets = _layout(gallery.dimensions, capacity)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.truncate(offsets["end"])
+            f.write(HEADER.pack(MAGIC, VERSION, 0, gallery.dimensions, count, capacity, gallery.sequence))
+            for name in ("encodings", "norms", "person_ids", "face_ids"):
+                f.seek(offsets[name])
+                f.write(np.ascontiguousarray(getattr(gallery, name)[:count]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    logger.info(f"Saved gallery snapshot of {count} encodings at sequence {gallery.sequence} to {path}")
+
+def open_snapshot(path: str, index=None, threshold: Optional[float] = None) -> FaceGallery:
+    """
+    Open a gallery snapshot without reading it into memory
+
+    The sections are mapped copy-on-write with numpy.memmap: pages are read
+    from the page cache on first use and shared by every process that opens
+    the same file, and only pages the process modifies (by adding or removing
+    encodings) become private copies. The file itself is never written.
+
+    Args:
+        path: Snapshot file
+        index: Approximate index for the gallery, trained on open
+        threshold: Verification threshold, defaults to FaceGallery's
+
+    Returns:
+        Gallery whose ``sequence`` is the last change-log entry in the
+        snapshot; pass the later entries to ``catch_up``
+
+    Raises:
+        ValueError: If the file is not a snapshot or has an unknown version
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is too short for a gallery snapshot")
+    magic, version, _, dimensions, count, capacity, sequence = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a gallery snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported gallery snapshot version {version}")
+
+    offsets = _layout(dimensions, capacity)
+    if os.path.getsize(path) < offsets["end"]:
+        raise ValueError(f"{path} is truncated")
+
+    kwargs = {} if threshold is None else {"threshold": threshold}
+    gallery = FaceGallery(dimensions=dimensions, capacity=1, **kwargs)
+    # Snapshots written before they kept a spare row can be empty, with nothing to map
+    if capacity > 0:
+        gallery.encodings = np.memmap(path, np.float32, "c", offsets["encodings"], (capacity, dimensions))
+        gallery.norms = np.memmap(path, np.float32, "c", offsets["norms"], (capacity,))
+        gallery.person_ids = np.memmap(path, np.int64, "c", offsets["person_ids"], (capacity,))
+        gallery.face_ids = np.memmap(path, np.int64, "c", offsets["face_ids"], (capacity,))
+        gallery.clusters = np.zeros(capacity, dtype=np.int32)
+    gallery.size = count
+    gallery.sequence = sequence
+    gallery.index = index
+    if index is not None:
+        index.train(gallery)
+    return gallery
+
+def catch_up(gallery: FaceGallery, changes: Iterable[dict]) -> int:
+    """
+    Apply face data change-log entries newer than the gallery
+
+    Each entry has a "sequence" number, increasing with every FaceData change,
+    and an "op":
+    - "add" with "face_id", "person_id" and "encoding"
+    - "remove_face" with "face_id"
+    - "remove_person" with "person_id"
+    Entries at or below the gallery's sequence are already included and skipped.
+
+    Args:
+        gallery: Gallery to update, usually fresh from open_snapshot
+        changes: Change-log entries in sequence order
+
+    Returns:
+        Number of entries applied
+    """
+    applied = 0
+    for change in changes:
+        if change["sequence"] <= gallery.sequence:
+            continue
+        op = change["op"]
+        if op == "add":
+            gallery.add(change["face_id"], change["person_id"], change["encoding"])
+        elif op == "remove_face":
+            gallery.remove_face(change["face_id"])
+        elif op == "remove_person":
+            gallery.remove_person(change["person_id"])
+        else:
+            raise ValueError(f"Unknown face data change: {op}")
+        gallery.sequence = change["sequence"]
+        applied += 1
+    return applied
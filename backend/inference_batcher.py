@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional, Set
+
+import cv2
+import numpy as np
+
+from face_gallery import FaceGallery
+
+logger = logging.getLogger("inference_batcher")
+
+class Overloaded(Exception):
+    """Raised instead of queueing a frame when the batcher's queue is full, answer with 429"""
+
+def extract_faces(jpeg: bytes, upsample: int = 1) -> dict:
+    """
+    Decode a JPEG and find and encode the faces in it with face_recognition
+
+    Args:
+        jpeg: Encoded image
+        upsample: Times the HOG detector upsamples the image to find small faces
+
+    Returns:
+        "boxes" as (x, y, width, height) tuples and the matching (n, 128)
+        "encodings"
+    """
+    import face_recognition
+
+    image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    locations = face_recognition.face_locations(rgb, number_of_times_to_upsample=upsample)
+    encodings = face_recognition.face_encodings(rgb, locations)
+    return {
+        "boxes": [(left, top, right - left, bottom - top) for top, right, bottom, left in locations],
+        "encodings": np.array(encodings, dtype=np.float32).reshape(-1, 128),
+    }
+
+def extract_batch(jpegs: List[bytes], extract: Callable[[bytes], dict] = extract_faces) -> List[dict]:
+    """
+    Run ``extract`` over a batch of frames in one pool task
+
+    A frame that fails is returned as {"error": message} so it does not fail
+    the rest of the batch.
+    """
+    results = []
+    for jpeg in jpegs:
+        try:
+            results.append(extract(jpeg))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+class MicroBatcher:
+    def __init__(
+        self,
+        gallery: FaceGallery,
+        max_batch: int = 8,
+        max_wait: float = 0.005,
+        workers: int = 4,
+        executor: Optional[Executor] = None,
+        extract: Callable[[bytes], dict] = extract_faces,
+        top_k: int = 1,
+        max_queue: Optional[int] = None
+    ):
+        """
+        Collect concurrent process-frame requests into batches for the recognition engine
+
+        ``recognize`` queues a frame and waits. A collector takes the first
+        queued frame as soon as a worker is free, adds frames that arrive
+        within ``max_wait`` seconds of it (up to ``max_batch``), and sends the
+        batch to a process pool as one task. Decoding, face detection and
+        encoding run there; then the encodings of every face in the batch are
+        matched against the gallery in one call, and each request gets its
+        own detections back.
+
+        A frame waits at most ``max_wait`` for its batch to fill, and only
+        while other batches are running, on top of any time all workers are
+        busy. Under load the queue fills while workers
+        are busy, so batches grow without anyone waiting for them. Once more
+        than ``max_queue`` frames are waiting, new frames are refused with
+        Overloaded. That keeps the queueing delay bounded, and cameras back
+        off on a 429.
+
+        Args:
+            gallery: Enrolled face encodings
+            max_batch: Most frames per batch
+            max_wait: Seconds the first frame of a batch waits for more
+            workers: Batches processed at once, and the pool size if no
+                executor is given
+            executor: Pool to run batches on, defaults to a ProcessPoolExecutor
+            extract: Per-frame function run in the pool, must be picklable
+            top_k: Matches returned per face
+            max_queue: Most frames waiting for a batch, None for no limit
+        """
+        self.gallery = gallery
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers
+        self.executor = executor
+        self.owns_executor = executor is None
+        self.process = partial(extract_batch, extract=extract)
+        self.top_k = top_k
+        self.max_queue = max_queue
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.collector: Optional[asyncio.Task] = None
+        self.collecting: list = []  # Batch the collector is still filling
+        self.batch_tasks: Set[asyncio.Task] = set()  # Tasks processing a batch
+
+        self.batches = 0
+        self.frames = 0
+        self.largest_batch = 0
+        self.wait_seconds = 0.0  # Summed time frames spent queued before their batch left
+        self.rejected = 0
+        self.inflight = 0  # Batches being processed
+
+    async def start(self):
+        """Start the pool and the collector on the running event loop"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.workers)
+        self.collector = asyncio.create_task(self._collect())
+        return self
+
+    async def stop(self):
+        """
+        Stop collecting and shut the pool down if it was created here
+
+        Frames that are still queued, or in a batch that was being collected,
+        fail with RuntimeError. Batches already sent to the pool finish first.
+        """
+        if self.collector is not None:
+            self.collector.cancel()
+            try:
+                await self.collector
+            except asyncio.CancelledError:
+                pass
+            self.collector = None
+
+        waiting = self.collecting
+        self.collecting = []
+        while self.queue is not None and not self.queue.empty():
+            waiting.append(self.queue.get_nowait())
+        for _, _, future in waiting:
+            if not future.done():
+                future.set_exception(RuntimeError("Recognition stopped before the frame was processed"))
+
+        if self.batch_tasks:
+            await asyncio.gather(*self.batch_tasks, return_exceptions=True)
+        if self.owns_executor and self.executor is not None:
+            # Waiting for the pool's processes to exit would block the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+            self.executor = None
+
+    async def recognize(self, jpeg: bytes) -> List[dict]:
+        """
+        Recognise the faces in one frame
+
+        Args:
+            jpeg: Encoded frame
+
+        Returns:
+            One detection per face with "bbox", "person_id", "verified",
+            "confidence" and "distance"; person_id is None without any
+            enrolled faces
+
+        Raises:
+            Overloaded: If max_queue frames are already waiting
+            ValueError: If the frame could not be processed
+            RuntimeError: If the batcher is not running
+        """
+        if self.collector is None:
+            raise RuntimeError("Recognition batcher is not running")
+        if self.max_queue is not None and self.queue.qsize() >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"{self.queue.qsize()} frames waiting for recognition")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((jpeg, time.perf_counter(), future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            batch = self.collecting = [await self.queue.get()]
+            # With every worker idle there is nothing to wait for: waiting would only add latency
+            wait = self.max_wait if self.inflight else 0.0
+            deadline = loop.time() + wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    # Take whatever is already queued without waiting longer
+                    if self.queue.empty():
+                        break
+                    batch.append(self.queue.get_nowait())
+                    continue
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.collecting = []
+            self.inflight += 1
+            task = asyncio.create_task(self._run(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def _run(self, batch: list):
+        now = time.perf_counter()
+        self.batches += 1
+        self.frames += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.wait_seconds += sum(now - queued for _, queued, _ in batch)
+
+        try:
+            loop = asyncio.get_running_loop()
+            extracted = await loop.run_in_executor(self.executor, self.process, [jpeg for jpeg, _, _ in batch])
+            # NumPy releases the GIL, so matching a large gallery does not stall the event loop
+            detections = await loop.run_in_executor(None, self._match, extracted)
+        except Exception as e:
+            logger.error(f"Recognition batch of {len(batch)} frames failed: {str(e)}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.inflight -= 1
+            self.slots.release()
+
+        for (_, _, future), result, frame_detections in zip(batch, extracted, detections):
+            if future.done():
+                continue
+            if "error" in result:
+                future.set_exception(ValueError(result["error"]))
+            else:
+                future.set_result(frame_detections)
+
+    def _match(self, extracted: List[dict]) -> List[List[dict]]:
+        """Match every face of a batch against the gallery in one call"""
+        encodings = [result["encodings"] for result in extracted if "error" not in result]
+        probes = np.concatenate(encodings) if encodings else np.zeros((0, self.gallery.dimensions), dtype=np.float32)
+        matches = iter(self.gallery.match(probes, top_k=self.top_k))
+
+        detections = []
+        for result in extracted:
+            frame_detections = []
+            boxes = [] if "error" in result else result["boxes"]
+            for x, y, width, height in boxes:
+                best = next(matches)
+                detection = {"bbox": {"x": int(x), "y": int(y), "width": int(width), "height": int(height)}}
+                if best:
+                    detection.update(best[0].to_dict())
+                    if self.top_k > 1:
+                        detection["candidates"] = [match.to_dict() for match in best]
+                else:
+                    detection.update({"person_id": None, "verified": False, "confidence": 0.0, "distance": None})
+                frame_detections.append(detection)
+            detections.append(frame_detections)
+        return detections
+
+    def get_stats(self) -> dict:
+        """Get batch counters"""
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "mean_batch": self.frames / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "mean_wait_ms": self.wait_seconds / self.frames * 1000 if self.frames else 0.0,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "rejected": self.rejected,
+        }
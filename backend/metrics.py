@@ -0,0 +1,284 @@
+import bisect
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 131072, 262144, 524288, 1048576, 2097152, 4194304)
+
+class CounterValue:
+    def __init__(self):
+        """A single counter series"""
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+class GaugeValue:
+    def __init__(self):
+        """A single gauge series"""
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+class HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        """
+        A single histogram series
+
+        Args:
+            buckets: Sorted upper bounds of the buckets, +Inf is implied
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class MetricFamily:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        metric_type: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        callback: Optional[Callable[[], Iterable[Tuple[Sequence[str], float]]]] = None
+    ):
+        """
+        A named metric with one series per combination of label values
+
+        Series are created on first use and then cached, so hot paths should
+        keep the object returned by ``labels()`` instead of looking it up for
+        every observation.
+
+        Args:
+            name: Metric name
+            help_text: Description shown in the exposition
+            metric_type: "counter", "gauge" or "histogram"
+            labelnames: Names of the labels
+            buckets: Histogram bucket upper bounds
+            callback: For counters and gauges read at scrape time, returns
+                (label values, value) pairs. More can be added with
+                ``add_callback``.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.callbacks = [callback] if callback is not None else []
+        self.series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> object:
+        """Get the series for the given label values"""
+        key = tuple(str(value) for value in values)
+        series = self.series.get(key)
+        if series is None:
+            with self._lock:
+                series = self.series.get(key)
+                if series is None:
+                    if self.metric_type == "counter":
+                        series = CounterValue()
+                    elif self.metric_type == "gauge":
+                        series = GaugeValue()
+                    else:
+                        series = HistogramValue(self.buckets)
+                    self.series[key] = series
+        return series
+
+    def add_callback(self, callback: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        """Add a source of (label values, value) pairs read at scrape time"""
+        with self._lock:
+            self.callbacks.append(callback)
+
+    def remove(self, *values):
+        """Drop the series for the given label values"""
+        with self._lock:
+            self.series.pop(tuple(str(value) for value in values), None)
+
+    def _label_text(self, values: Sequence[str], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+
+        with self._lock:
+            callbacks = list(self.callbacks)
+            series = list(self.series.items())
+        for callback in callbacks:
+            for values, value in callback():
+                lines.append(f"{self.name}{self._label_text(values)} {_number(value)}")
+
+        for values, item in series:
+            if isinstance(item, HistogramValue):
+                with item._lock:
+                    counts = list(item.counts)
+                    total = item.sum
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="' + ("+Inf" if bound == float("inf") else _number(bound)) + '"'
+                    lines.append(f"{self.name}_bucket{self._label_text(values, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{self._label_text(values)} {_number(total)}")
+                lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+            else:
+                lines.append(f"{self.name}{self._label_text(values)} {_number(item.value)}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        """Collection of metric families rendered together in Prometheus text format"""
+        self.families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, *args, **kwargs) -> MetricFamily:
+        # Registering the same name again returns the existing family, so
+        # several service instances in one process share their metrics
+        with self._lock:
+            family = self.families.get(name)
+            if family is None:
+                return self.families.setdefault(name, MetricFamily(name, *args, **kwargs))
+        if kwargs.get("callback") is not None:
+            family.add_callback(kwargs["callback"])
+        return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = (), callback=None) -> MetricFamily:
+        return self._register(name, help_text, "counter", labelnames, callback=callback)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (), callback=None) -> MetricFamily:
+        return self._register(name, help_text, "gauge", labelnames, callback=callback)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> MetricFamily:
+        return self._register(name, help_text, "histogram", labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        with self._lock:
+            families = list(self.families.values())
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+# Registry shared by all services of the process
+REGISTRY = MetricsRegistry()
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9100):
+        """
+        Serve a registry on GET /metrics
+
+        Args:
+            registry: Metrics to serve
+            host: Address to bind to, local only by default
+            port: Port to bind to, 0 picks a free port
+        """
+        self.registry = registry
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _make_handler(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+class RateLimitedLog:
+    def __init__(self, logger: logging.Logger, interval: float = 10.0):
+        """
+        Log a message at most once per interval per key
+
+        Repeated messages within the interval are counted, and the count is
+        added to the next message that gets through. Meant for per-frame
+        paths, where an outage would otherwise log every frame of every camera.
+
+        Args:
+            logger: Logger to write to
+            interval: Minimum seconds between messages with the same key
+        """
+        self.logger = logger
+        self.interval = interval
+        self.last: Dict[object, float] = {}
+        self.suppressed: Dict[object, int] = {}
+        self._lock = threading.Lock()
+
+    def log(self, level: int, key, message: str):
+        if not self.logger.isEnabledFor(level):
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self.last.get(key, -self.interval) < self.interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return
+            self.last[key] = now
+            suppressed = self.suppressed.pop(key, 0)
+
+        if suppressed:
+            message = f"{message} ({suppressed} similar messages suppressed)"
+        self.logger.log(level, message)
+
+    def info(self, key, message: str):
+        self.log(logging.INFO, key, message)
+
+    def warning(self, key, message: str):
+        self.log(logging.WARNING, key, message)
+
+    def error(self, key, message: str):
+        self.log(logging.ERROR, key, message)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if not math.isfinite(value):
+        return "NaN" if math.isnan(value) else ("+Inf" if value > 0 else "-Inf")
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
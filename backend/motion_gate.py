@@ -0,0 +1,104 @@
+import time
+import logging
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("motion_gate")
+
+class MotionGate:
+    def __init__(
+        self,
+        threshold: float = 0.01,
+        keepalive_interval: float = 30.0,
+        width: int = 160,
+        pixel_delta: int = 25,
+        learning_rate: float = 0.05,
+    ):
+        """
+        Decide whether a frame is worth uploading by comparing it to a background model
+
+        Frames are converted to a small, blurred grayscale image and compared to a
+        running average of previous frames. The frame passes when enough pixels
+        changed, or when nothing has been uploaded for ``keepalive_interval``.
+
+        Args:
+            threshold: Fraction of pixels (0-1) that must change to count as motion.
+                Lower values make the gate more sensitive.
+            keepalive_interval: Maximum seconds between uploads, even without motion
+            width: Width in pixels of the downscaled comparison image
+            pixel_delta: Minimum grayscale difference for a pixel to count as changed
+            learning_rate: How fast the background model follows the scene
+        """
+        self.threshold = threshold
+        self.keepalive_interval = keepalive_interval
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.learning_rate = learning_rate
+
+        self.background: Optional[np.ndarray] = None
+        self.last_pass_time = 0.0
+        self.last_motion = 0.0
+
+        self.passed = 0
+        self.suppressed = 0
+        self.keepalives = 0
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        """Downscale, convert to grayscale and blur a frame"""
+        height = max(1, int(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def check(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        """
+        Check a frame against the background model and update the model
+
+        Args:
+            frame: Decoded BGR frame
+            now: Current time, defaults to time.time()
+
+        Returns:
+            True if the frame should be uploaded
+        """
+        now = time.time() if now is None else now
+        small = self._prepare(frame)
+
+        if self.background is None or self.background.shape != small.shape:
+            self.background = small.astype(np.float32)
+            self.last_motion = 1.0
+            return self._accept(now)
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background))
+        self.last_motion = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+        cv2.accumulateWeighted(small, self.background, self.learning_rate)
+
+        if self.last_motion >= self.threshold:
+            return self._accept(now)
+
+        if now - self.last_pass_time >= self.keepalive_interval:
+            self.keepalives += 1
+            return self._accept(now)
+
+        self.suppressed += 1
+        return False
+
+    def _accept(self, now: float) -> bool:
+        self.passed += 1
+        self.last_pass_time = now
+        return True
+
+    def get_stats(self) -> dict:
+        """Get gate counters"""
+        total = self.passed + self.suppressed
+        return {
+            "threshold": self.threshold,
+            "passed": self.passed,
+            "suppressed": self.suppressed,
+            "keepalives": self.keepalives,
+            "suppressed_ratio": self.suppressed / total if total else 0.0,
+            "last_motion": self.last_motion,
+        }
@@ -0,0 +1,383 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from notification_queue import PRIORITIES
+
+logger = logging.getLogger("notification_outbox")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    queued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    leased_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (channel, priority, id);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    queued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    failed_at REAL NOT NULL,
+    last_error TEXT
+);
+"""
+
+class RetryPolicy:
+    def __init__(self, base: float = 1.0, maximum: float = 300.0, max_attempts: int = 5):
+        """
+        Jittered exponential backoff between attempts to send a notification
+
+        The n-th retry waits ``base * 2 ** (n - 1)`` seconds, capped at
+        ``maximum``, times a random factor between 0.5 and 1 so that
+        notifications that failed together do not retry together.
+
+        Args:
+            base: Seconds before the first retry
+            maximum: Longest wait between attempts
+            max_attempts: Attempts before a notification is dead-lettered
+        """
+        self.base = base
+        self.maximum = maximum
+        self.max_attempts = max_attempts
+
+    def delay(self, attempts: int) -> float:
+        """Seconds to wait after ``attempts`` failed attempts"""
+        return min(self.maximum, self.base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+class OutboxEntry:
+    def __init__(self, entry_id: int, channel: str, attempts: int, notification: dict):
+        """
+        A leased outbox row
+
+        Args:
+            entry_id: Row ID
+            channel: Notification type
+            attempts: Failed attempts so far
+            notification: The notification as passed to ``put``
+        """
+        self.id = entry_id
+        self.channel = channel
+        self.attempts = attempts
+        self.notification = notification
+
+class NotificationOutbox:
+    def __init__(
+        self,
+        path: str,
+        channels: Iterable[str],
+        retry: Optional[Dict[str, RetryPolicy]] = None,
+        lease_seconds: float = 300.0,
+        synchronous: str = "NORMAL"
+    ):
+        """
+        Durable notification queue in an SQLite database in WAL mode
+
+        ``put`` only appends to a buffer and returns. A writer thread
+        inserts everything buffered since its last commit in one
+        transaction (group commit), so enqueueing stays far below a
+        millisecond while commits keep up with any number of producers. A
+        notification is durable once its batch is committed, normally
+        within a millisecond; ``flush`` waits for that.
+
+        Workers ``lease`` the most urgent due rows of their channel. A
+        leased row is not handed out again until ``lease_seconds`` pass.
+        ``ack`` deletes a sent row. ``fail`` schedules another attempt
+        after the channel's RetryPolicy delay, or moves the row to the
+        dead_letters table after ``max_attempts``.
+
+        Rows stay in the database until they are acknowledged, so a
+        crash or restart loses nothing that was committed. On open, leases
+        of the previous process are cleared and its rows are sent again.
+        Delivery is therefore at least once: a notification being sent when
+        the process died is sent again.
+
+        One process owns the database at a time.
+
+        Args:
+            path: Database file, created if missing
+            channels: Notification types the workers lease
+            retry: Retry policy per channel, channels without one get RetryPolicy()
+            lease_seconds: Seconds before a leased row that was neither acked
+                nor failed is handed out again
+            synchronous: SQLite synchronous pragma. "NORMAL" survives a
+                process crash; "FULL" also survives power loss, at the cost
+                of an fsync per commit.
+        """
+        self.path = path
+        self.channels = list(channels)
+        self.retry = retry or {}
+        self.lease_seconds = lease_seconds
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(f"PRAGMA synchronous={synchronous}")
+        self.connection.executescript(SCHEMA)
+        self.db_lock = threading.Lock()
+        self.closed = False
+
+        self.buffer: List[Tuple[str, int, str, float]] = []
+        buffer_lock = threading.Lock()
+        self.buffer_condition = threading.Condition(buffer_lock)  # Wakes the writer
+        self.commit_condition = threading.Condition(buffer_lock)  # Wakes flush
+        self.committed_batches = 0
+        self.buffered_batches = 0  # Batch number the next commit will have
+        self.ready = threading.Condition()
+        self.stopping = False
+        self.writer: Optional[threading.Thread] = None
+
+        self.enqueued = 0
+        self.commits = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+        with self.db_lock:
+            self.connection.execute("BEGIN")
+            self.connection.execute("UPDATE outbox SET leased_until = 0 WHERE leased_until > 0")
+            self.connection.execute("COMMIT")
+            rows = self.connection.execute("SELECT channel, COUNT(*) FROM outbox GROUP BY channel").fetchall()
+        self.depth: Dict[str, int] = {channel: 0 for channel in self.channels}
+        self.depth.update(dict(rows))
+        self.resumed = sum(self.depth.values())
+        if self.resumed:
+            logger.info(f"Resuming {self.resumed} notifications from outbox {path}")
+
+    def start(self):
+        """Start the group-commit writer"""
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, name="outbox-writer", daemon=True)
+            self.writer.start()
+        return self
+
+    def put(self, channel: str, notification: dict, priority: str = "normal") -> bool:
+        """
+        Queue a notification without waiting for it to be written
+
+        Args:
+            channel: Notification type
+            notification: JSON-serializable notification
+            priority: One of notification_queue.PRIORITIES
+
+        Returns:
+            False if the outbox is stopping
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority}, expected one of {', '.join(PRIORITIES)}")
+        row = (channel, PRIORITIES.index(priority), json.dumps(notification, default=str), notification.get("queued_at", time.time()))
+        with self.buffer_condition:
+            if self.stopping:
+                return False
+            self.buffer.append(row)
+            self.enqueued += 1
+            self.buffer_condition.notify()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every notification put so far is committed
+
+        Returns:
+            False on timeout
+        """
+        with self.buffer_condition:
+            target = self.buffered_batches + (1 if self.buffer else 0)
+            return self.commit_condition.wait_for(lambda: self.committed_batches >= target, timeout)
+
+    def _write_loop(self):
+        while True:
+            with self.buffer_condition:
+                while not self.buffer and not self.stopping:
+                    self.buffer_condition.wait()
+                if not self.buffer:
+                    return
+                rows, self.buffer = self.buffer, []
+                self.buffered_batches += 1
+            try:
+                with self.db_lock:
+                    self.connection.execute("BEGIN")
+                    self.connection.executemany(
+                        "INSERT INTO outbox (channel, priority, payload, queued_at) VALUES (?, ?, ?, ?)", rows
+                    )
+                    self.connection.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self.closed:
+                    return
+                logger.error(f"Failed to write {len(rows)} notifications to the outbox: {str(e)}")
+                with self.db_lock:
+                    if self.connection.in_transaction:
+                        self.connection.execute("ROLLBACK")
+                # Keep them buffered and try again
+                with self.buffer_condition:
+                    self.buffer[:0] = rows
+                    self.buffered_batches -= 1
+                time.sleep(0.1)
+                continue
+
+            with self.buffer_condition:
+                self.commits += 1
+                self.committed_batches += 1
+                self.commit_condition.notify_all()
+            with self.ready:
+                for row in rows:
+                    self.depth[row[0]] = self.depth.get(row[0], 0) + 1
+                self.ready.notify_all()
+
+    def lease(self, channel: str, limit: int = 10) -> List[OutboxEntry]:
+        """
+        Take up to ``limit`` due rows of a channel, most urgent first
+
+        Waits until a row is due. Once the outbox is stopping, returns the
+        rows that are already due and then an empty list. A closed outbox
+        always returns an empty list.
+
+        Args:
+            channel: Notification type
+            limit: Most rows to lease
+
+        Returns:
+            Leased entries, empty once the outbox is stopping and nothing is
+            due, or closed
+        """
+        while True:
+            with self.ready:
+                now = time.time()
+                with self.db_lock:
+                    if self.closed:
+                        return []
+                    rows = self.connection.execute(
+                        "SELECT id, attempts, payload FROM outbox "
+                        "WHERE channel = ? AND next_attempt_at <= ? AND leased_until <= ? "
+                        "ORDER BY priority, id LIMIT ?",
+                        (channel, now, now, limit)
+                    ).fetchall()
+                    if rows:
+                        self.connection.execute("BEGIN")
+                        self.connection.executemany(
+                            "UPDATE outbox SET leased_until = ? WHERE id = ?",
+                            [(now + self.lease_seconds, row[0]) for row in rows]
+                        )
+                        self.connection.execute("COMMIT")
+                        return [OutboxEntry(row[0], channel, row[1], json.loads(row[2])) for row in rows]
+                    next_due = self.connection.execute(
+                        "SELECT MIN(MAX(next_attempt_at, leased_until)) FROM outbox WHERE channel = ?", (channel,)
+                    ).fetchone()[0]
+                if self.stopping:
+                    return []
+                self.ready.wait(None if next_due is None else max(0.0, next_due - now))
+
+    def ack(self, entry: OutboxEntry):
+        """Delete a sent notification"""
+        with self.db_lock:
+            if self.closed:
+                return
+            self.connection.execute("DELETE FROM outbox WHERE id = ?", (entry.id,))
+        with self.ready:
+            self.sent += 1
+            self.depth[entry.channel] -= 1
+
+    def fail(self, entry: OutboxEntry, error: str) -> bool:
+        """
+        Record a failed attempt and schedule the next one
+
+        Args:
+            entry: The leased entry that could not be sent
+            error: Why it failed
+
+        Returns:
+            True if the notification ran out of attempts and was dead-lettered
+        """
+        policy = self.retry.get(entry.channel) or RetryPolicy()
+        attempts = entry.attempts + 1
+        now = time.time()
+        with self.db_lock:
+            if self.closed:
+                # Still leased in the database, so it is sent again after a restart
+                return False
+            if attempts >= policy.max_attempts:
+                self.connection.execute("BEGIN")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO dead_letters "
+                    "SELECT id, channel, priority, payload, queued_at, ?, ?, ? FROM outbox WHERE id = ?",
+                    (attempts, now, error, entry.id)
+                )
+                self.connection.execute("DELETE FROM outbox WHERE id = ?", (entry.id,))
+                self.connection.execute("COMMIT")
+            else:
+                self.connection.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, leased_until = 0, last_error = ? WHERE id = ?",
+                    (attempts, now + policy.delay(attempts), error, entry.id)
+                )
+        with self.ready:
+            if attempts >= policy.max_attempts:
+                self.dead += 1
+                self.depth[entry.channel] -= 1
+            else:
+                self.retried += 1
+            # The retry may be due before what the channel's workers wait for
+            self.ready.notify_all()
+        return attempts >= policy.max_attempts
+
+    def get_dead_letters(self, channel: Optional[str] = None, limit: int = 100) -> List[dict]:
+        """Get the most recent dead-lettered notifications with their last error"""
+        query = "SELECT id, channel, payload, attempts, failed_at, last_error FROM dead_letters"
+        parameters: tuple = ()
+        if channel is not None:
+            query += " WHERE channel = ?"
+            parameters = (channel,)
+        with self.db_lock:
+            rows = self.connection.execute(query + " ORDER BY failed_at DESC LIMIT ?", parameters + (limit,)).fetchall()
+        return [
+            {"id": row[0], "channel": row[1], "notification": json.loads(row[2]), "attempts": row[3], "failed_at": row[4], "error": row[5]}
+            for row in rows
+        ]
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop taking notifications, commit the buffered ones and let workers
+        finish what is due
+        """
+        with self.buffer_condition:
+            self.stopping = True
+            self.buffer_condition.notify_all()
+        if self.writer is not None:
+            self.writer.join(timeout=timeout)
+        with self.ready:
+            self.ready.notify_all()
+
+    def close(self):
+        """Close the database; rows that were not sent are kept for the next start"""
+        with self.db_lock:
+            self.closed = True
+            self.connection.close()
+        # Workers still waiting in lease return instead of querying the closed database
+        with self.ready:
+            self.ready.notify_all()
+
+    def __len__(self) -> int:
+        return sum(self.depth.values())
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Get pending rows per channel and the outbox counters"""
+        with self.ready:
+            return {
+                "pending": dict(self.depth),
+                "enqueued": self.enqueued,
+                "commits": self.commits,
+                "sent": self.sent,
+                "retried": self.retried,
+                "dead_lettered": self.dead,
+                "resumed": self.resumed,
+            }
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Priority classes, most urgent first
+PRIORITIES = ("high", "normal", "low")
+
+OVERFLOW_POLICIES = ("drop_lowest", "reject", "block")
+
+class NotificationQueue:
+    def __init__(self, maxsize: int = 1000, overflow: str = "drop_lowest", block_timeout: float = 1.0):
+        """
+        Bounded queue with priority classes and a blocking get
+
+        Each priority class is a FIFO deque, so both ends are O(1) and
+        notifications of one class keep their order. ``get`` waits on a
+        condition variable and wakes as soon as something is queued.
+
+        When ``maxsize`` items are queued, ``overflow`` decides what ``put`` does:
+        - "drop_lowest": evict the oldest item of the lowest non-empty class,
+          if that class is not more urgent than the new item; otherwise refuse
+          the new item
+        - "reject": refuse the new item
+        - "block": wait up to ``block_timeout`` seconds for room, then refuse
+
+        Args:
+            maxsize: Most items queued across all classes, at least 1
+            overflow: Policy when the queue is full, see above
+            block_timeout: Longest wait of put under the "block" policy
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}, expected one of {', '.join(OVERFLOW_POLICIES)}")
+        if maxsize < 1:
+            raise ValueError(f"Queue size must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.queues: Dict[str, Deque] = {priority: deque() for priority in PRIORITIES}
+        self.size = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+        self.queued = 0
+        self.dropped: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def put(self, item, priority: str = "normal") -> Tuple[bool, Optional[Tuple[str, object]]]:
+        """
+        Queue an item without waiting, except under the "block" policy
+
+        Args:
+            item: Item to queue
+            priority: One of PRIORITIES
+
+        Returns:
+            Whether the item was queued, and the (priority, item) evicted to
+            make room for it, if any
+        """
+        if priority not in self.queues:
+            raise ValueError(f"Unknown priority {priority}, expected one of {', '.join(PRIORITIES)}")
+        evicted = None
+        with self.condition:
+            if self.closed:
+                return False, None
+            if self.size >= self.maxsize:
+                if self.overflow == "block":
+                    deadline = time.monotonic() + self.block_timeout
+                    while self.size >= self.maxsize and not self.closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self.condition.wait(remaining):
+                            break
+                if self.size >= self.maxsize and self.overflow == "drop_lowest":
+                    lowest = next(name for name in reversed(PRIORITIES) if self.queues[name])
+                    if PRIORITIES.index(lowest) >= PRIORITIES.index(priority):
+                        evicted = (lowest, self.queues[lowest].popleft())
+                        self.size -= 1
+                        self.dropped[lowest] += 1
+                if self.size >= self.maxsize or self.closed:
+                    self.dropped[priority] += 1
+                    return False, None
+
+            self.queues[priority].append(item)
+            self.size += 1
+            self.queued += 1
+            self.condition.notify()
+        return True, evicted
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Take the oldest item of the most urgent non-empty class
+
+        Args:
+            timeout: Seconds to wait for an item, None waits until one is
+                queued or the queue is closed
+
+        Returns:
+            The item, or None on timeout or once the queue is closed and empty
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.size or self.closed, timeout):
+                return None
+            for priority in PRIORITIES:
+                if self.queues[priority]:
+                    self.size -= 1
+                    if self.overflow == "block":
+                        # Wake a put waiting for room
+                        self.condition.notify_all()
+                    return self.queues[priority].popleft()
+            return None
+
+    def close(self):
+        """Refuse new items and wake every waiting get once the queue is empty"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def drain(self) -> List:
+        """Remove and return every queued item, most urgent first"""
+        with self.condition:
+            items = []
+            for priority in PRIORITIES:
+                items.extend(self.queues[priority])
+                self.queues[priority].clear()
+            self.size = 0
+            self.condition.notify_all()
+            return items
+
+    def get_stats(self) -> dict:
+        with self.condition:
+            return {
+                "depth": self.size,
+                "depth_by_priority": {priority: len(queue) for priority, queue in self.queues.items()},
+                "queued": self.queued,
+                "dropped": dict(self.dropped),
+            }
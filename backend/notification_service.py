@@ -1,3 +1,4 @@
+import asyncio
 import smtplib
 import logging
 import requests
@@ -10,81 +11,243 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from typing import Dict, List, Optional
 
+from alert_coalescer import AlertCoalescer
+from metrics import REGISTRY, MetricsServer, RateLimitedLog
+from notification_outbox import NotificationOutbox, RetryPolicy
+from notification_queue import NotificationQueue
+from settings_cache import SETTINGS_EVENT, SettingsCache
+from websocket_client import WebSocketClient
+from smtp_mailer import SMTPMailer
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger("notification_service")
+log_limiter = RateLimitedLog(logger)
 
 class NotificationService:
-    def __init__(self, backend_url: str, api_token: str):
+    # Worker threads per channel unless overridden. Email sends block on SMTP,
+    # so they get more than the log-only system channel.
+    DEFAULT_WORKERS = {"email": 2, "system": 1}
+    # Retries of failed sends per channel when an outbox is used. SMTP
+    # outages can last minutes, a failing system notification is not worth
+    # retrying for long.
+    DEFAULT_RETRY = {
+        "email": RetryPolicy(base=5.0, maximum=600.0, max_attempts=8),
+        "system": RetryPolicy(base=1.0, maximum=30.0, max_attempts=3),
+    }
+    
+    def __init__(
+        self,
+        backend_url: str,
+        api_token: str,
+        metrics_port: Optional[int] = None,
+        workers: Optional[Dict[str, int]] = None,
+        queue_size: int = 1000,
+        overflow: str = "drop_lowest",
+        alert_window: float = 60.0,
+        smtp: Optional[dict] = None,
+        settings_ttl: float = 30.0,
+        outbox_path: Optional[str] = None,
+        retry: Optional[Dict[str, RetryPolicy]] = None,
+        lease_size: int = 10
+    ):
         """
         Initialize the notification service
         
+        Every channel (notification type) has its own bounded priority queue
+        and its own worker threads, so a slow SMTP server only holds up
+        emails. add_notification never waits for a send: workers wake as
+        soon as something is queued and send outside the queue's lock.
+        
+        Repeated alerts of the same kind and location within ``alert_window``
+        seconds are grouped into one digest, see alert_coalescer. Emails go
+        out over a reused SMTP connection per email worker, see smtp_mailer.
+        
+        Settings are read from a SettingsCache, so changes made in the
+        dashboard apply without a restart and without a request per
+        notification. Register ``handle_settings_event`` for settings_update
+        WebSocket events to apply them at once instead of within
+        ``settings_ttl`` seconds.
+        
+        With ``outbox_path``, notifications are kept in a durable SQLite
+        outbox instead of the in-memory queues, see notification_outbox.
+        Pending notifications survive a crash or restart and are sent when
+        the service starts again. Failed sends are retried with backoff and
+        dead-lettered after the channel's last attempt. ``queue_size`` and
+        ``overflow`` do not apply to the outbox.
+        
         Args:
             backend_url: URL of the backend API
             api_token: JWT token for API authentication
+            metrics_port: Serve queue depth and dispatch latency in Prometheus
+                text format on http://127.0.0.1:<port>/metrics. None serves nothing.
+            workers: Worker threads per channel, defaults to DEFAULT_WORKERS
+            queue_size: Most notifications queued per channel
+            overflow: What a full channel does with a new notification, see
+                notification_queue.NotificationQueue
+            alert_window: Seconds repeated alerts are grouped for, 0 sends
+                every alert
+            smtp: SMTPMailer arguments (host, port, username, password,
+                starttls, sender, ...). None only logs emails.
+            settings_ttl: Seconds cached settings are used before they are
+                revalidated with the backend
+            outbox_path: SQLite database for the outbox, None keeps
+                notifications in memory
+            retry: Retry policy per channel, defaults to DEFAULT_RETRY
+            lease_size: Notifications a worker takes from the outbox at once
         """
         self.backend_url = backend_url
         self.api_token = api_token
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {self.api_token}"
+        self.settings_cache = SettingsCache(self.session, backend_url, ttl=settings_ttl)
         self.settings = self._load_settings()
-        self.notification_thread = None
         self.running = False
-        self.notification_queue = []
-        self.queue_lock = threading.Lock()
+        self.workers = dict(self.DEFAULT_WORKERS, **(workers or {}))
+        self.queues = {
+            channel: NotificationQueue(maxsize=queue_size, overflow=overflow)
+            for channel in self.workers
+        }
+        self.outbox: Optional[NotificationOutbox] = None
+        if outbox_path is not None:
+            self.outbox = NotificationOutbox(outbox_path, self.workers, retry=dict(self.DEFAULT_RETRY, **(retry or {})))
+        self.lease_size = lease_size
+        self.worker_threads: List[threading.Thread] = []
+        self.coalescer = AlertCoalescer(self._emit_alert, window=alert_window)
+        self.smtp = smtp
+        self.mailers: List[SMTPMailer] = []
+        self.thread_state = threading.local()
+        
+        REGISTRY.gauge(
+            "notification_queue_depth", "Notifications waiting to be sent",
+            callback=lambda: [((), len(self.outbox) if self.outbox is not None else sum(len(queue) for queue in self.queues.values()))]
+        )
+        self.dispatch_latency = REGISTRY.histogram(
+            "notification_dispatch_seconds", "Time from queueing a notification until it was sent", ["type"]
+        )
+        self.dropped = REGISTRY.counter(
+            "notification_dropped_total", "Notifications dropped because their channel's queue was full", ["type", "priority"]
+        )
+        self.retries = REGISTRY.counter(
+            "notification_retries_total", "Failed sends scheduled for another attempt", ["type"]
+        )
+        self.dead_lettered = REGISTRY.counter(
+            "notification_dead_letters_total", "Notifications given up on after their last attempt", ["type"]
+        )
+        self.metrics_server: Optional[MetricsServer] = None
+        if metrics_port is not None:
+            self.metrics_server = MetricsServer(port=metrics_port).start()
+            logger.info(f"Serving metrics on port {self.metrics_server.port}")
     
-    def _load_settings(self) -> dict:
-        """Load settings from the backend API"""
-        try:
-            response = requests.get(
-                f"{self.backend_url}/api/settings",
-                headers={"Authorization": f"Bearer {self.api_token}"}
-            )
-            
-            if response.status_code == 200:
-                settings = response.json()
-                logger.info("Loaded settings from backend")
-                return settings
-            else:
-                logger.error(f"Failed to load settings: {response.status_code} - {response.text}")
-                return {}
-        except Exception as e:
-            logger.error(f"Error loading settings: {str(e)}")
-            return {}
+    def _load_settings(self):
+        """
+        Load settings from the backend API
+        
+        Returns:
+            The settings cache, filled with the current settings if the
+            backend could be reached. Anything with a dict-like ``get`` works.
+        """
+        self.settings_cache.refresh()
+        return self.settings_cache
+    
+    def handle_settings_event(self, event: dict):
+        """
+        WebSocketClient callback that reloads the settings on settings_update events
+        
+        Args:
+            event: Event received from the backend
+        """
+        self.settings_cache.handle_settings_event(event)
+    
+    def get_settings_stats(self) -> dict:
+        """Get settings cache hit rate, age and refresh counters"""
+        return self.settings_cache.get_stats()
     
     def start(self):
         """Start the notification service"""
-        if self.notification_thread and self.notification_thread.is_alive():
+        if self.running:
             logger.warning("Notification service is already running")
             return
         
         self.running = True
-        self.notification_thread = threading.Thread(
-            target=self._process_notifications,
-            daemon=True
-        )
-        self.notification_thread.start()
-        logger.info("Notification service started")
+        if self.settings is self.settings_cache:
+            self.settings_cache.start()
+        self.coalescer.start()
+        if self.outbox is not None:
+            self.outbox.start()
+        self.worker_threads = []
+        for channel, count in self.workers.items():
+            for index in range(count):
+                thread = threading.Thread(
+                    target=self._process_notifications if self.outbox is None else self._process_outbox,
+                    args=(channel,),
+                    name=f"notify-{channel}-{index}",
+                    daemon=True
+                )
+                thread.start()
+                self.worker_threads.append(thread)
+        logger.info(f"Notification service started with {len(self.worker_threads)} workers")
     
-    def stop(self):
-        """Stop the notification service"""
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop the notification service
+        
+        Notifications already queued are still sent if the workers finish
+        them within ``timeout`` seconds. With an outbox, the rest are kept
+        for the next start.
+        """
         self.running = False
-        if self.notification_thread:
-            self.notification_thread.join(timeout=5.0)
+        # Open digests are queued before the queues stop taking notifications
+        self.coalescer.stop()
+        for queue in self.queues.values():
+            queue.close()
+        if self.outbox is not None:
+            self.outbox.stop()
+        deadline = time.time() + timeout
+        for thread in self.worker_threads:
+            thread.join(timeout=max(0.0, deadline - time.time()))
+        if self.outbox is not None:
+            self.outbox.close()
+        for mailer in self.mailers:
+            mailer.close()
+        self.settings_cache.stop()
         logger.info("Notification service stopped")
     
-    def _process_notifications(self):
-        """Process notifications from the queue"""
-        while self.running:
-            # Process notifications in the queue
-            with self.queue_lock:
-                if self.notification_queue:
-                    notification = self.notification_queue.pop(0)
-                    self._send_notification(notification)
-            
-            # Sleep to reduce CPU usage
-            time.sleep(0.1)
+    def _process_notifications(self, channel: str):
+        """Send a channel's notifications until its queue is closed and empty"""
+        queue = self.queues[channel]
+        while True:
+            notification = queue.get()
+            if notification is None:
+                return
+            try:
+                self._send_notification(notification)
+            except Exception as e:
+                logger.error(f"Failed to send {channel} notification: {str(e)}")
+            self.dispatch_latency.labels(channel).observe(time.time() - notification["queued_at"])
+    
+    def _process_outbox(self, channel: str):
+        """Send a channel's notifications from the outbox until it is stopped and nothing is due"""
+        while True:
+            entries = self.outbox.lease(channel, self.lease_size)
+            if not entries:
+                return
+            for entry in entries:
+                try:
+                    self._send_notification(entry.notification)
+                except Exception as e:
+                    if self.outbox.fail(entry, str(e)):
+                        self.dead_lettered.labels(channel).inc()
+                        logger.error(f"Gave up on {channel} notification after {entry.attempts + 1} attempts: {str(e)}")
+                    else:
+                        self.retries.labels(channel).inc()
+                        log_limiter.warning(("retry", channel), f"Failed to send {channel} notification, will retry: {str(e)}")
+                    continue
+                self.outbox.ack(entry)
+                self.dispatch_latency.labels(channel).observe(time.time() - entry.notification["queued_at"])
     
     def _send_notification(self, notification: dict):
         """
@@ -108,6 +271,9 @@ class NotificationService:
         
         Args:
             notification: Email notification data
+        
+        Raises:
+            smtplib.SMTPException, OSError: If the email could not be sent
         """
         if not self.settings.get("email_notifications", False):
             logger.info("Email notifications are disabled")
@@ -121,30 +287,34 @@ class NotificationService:
         subject = notification.get("subject", "ESTIN Entry Detection System Notification")
         body = notification.get("body", "")
         
-        # In a real implementation, you would configure SMTP settings
-        # For now, we'll just log the email
-        logger.info(f"Would send email to {recipient}: {subject}")
-        logger.info(f"Email body: {body}")
+        if self.smtp is None:
+            logger.info(f"Would send email to {recipient}: {subject}")
+            logger.info(f"Email body: {body}")
+            return
         
-        # Example of actual email sending (commented out)
-        """
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = 'estin@example.com'
-            msg['To'] = recipient
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body, 'plain'))
-            
-            server = smtplib.SMTP('smtp.example.com', 587)
-            server.starttls()
-            server.login('username', 'password')
-            server.send_message(msg)
-            server.quit()
-            
-            logger.info(f"Email sent to {recipient}")
-        except Exception as e:
-            logger.error(f"Failed to send email: {str(e)}")
-        """
+        msg = MIMEMultipart()
+        msg['To'] = recipient
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+        self._mailer().send(msg)
+        logger.info(f"Email sent to {recipient}")
+    
+    def _mailer(self) -> SMTPMailer:
+        """SMTP connection of the calling email worker, opened on first use"""
+        mailer = getattr(self.thread_state, "mailer", None)
+        if mailer is None:
+            mailer = SMTPMailer(**self.smtp)
+            self.thread_state.mailer = mailer
+            self.mailers.append(mailer)
+        return mailer
+    
+    def get_smtp_stats(self) -> dict:
+        """Get connection and message counts summed over the email workers' SMTP connections"""
+        totals: Dict[str, int] = {}
+        for mailer in self.mailers:
+            for name, value in mailer.get_stats().items():
+                totals[name] = totals.get(name, 0) + int(value)
+        return totals
     
     def _send_system_notification(self, notification: dict):
         """
@@ -157,23 +327,56 @@ class NotificationService:
         # For now, we'll just log it
         logger.info(f"System notification: {notification.get('message', '')}")
     
-    def add_notification(self, notification_type: str, data: dict):
+    def add_notification(self, notification_type: str, data: dict, priority: str = "normal") -> bool:
         """
         Add a notification to the queue
         
         Args:
             notification_type: Type of notification (email, system, etc.)
             data: Notification data
+            priority: "high", "normal" or "low". Queued notifications of a
+                higher priority are sent first.
+        
+        Returns:
+            Whether the notification was queued; False if its channel is
+            unknown or full
         """
-        notification = {"type": notification_type, **data}
+        queue = self.queues.get(notification_type)
+        if queue is None:
+            logger.warning(f"Unknown notification type: {notification_type}")
+            return False
         
-        with self.queue_lock:
-            self.notification_queue.append(notification)
+        notification = {"type": notification_type, **data, "queued_at": time.time(), "priority": priority}
+        if self.outbox is not None:
+            return self.outbox.put(notification_type, notification, priority)
+        queued, evicted = queue.put(notification, priority)
+        if evicted is not None:
+            self.dropped.labels(notification_type, evicted[0]).inc()
+            log_limiter.warning(("evicted", notification_type), f"{notification_type} queue full, dropped a queued {evicted[0]} priority notification")
+        if not queued:
+            self.dropped.labels(notification_type, priority).inc()
+            log_limiter.warning(("refused", notification_type), f"{notification_type} queue full, dropped a new {priority} priority notification")
+        return queued
+    
+    def get_queue_stats(self) -> Dict[str, dict]:
+        """Get depth and drop counts of each channel's queue, or the outbox counters"""
+        if self.outbox is not None:
+            return {"outbox": self.outbox.get_stats()}
+        return {channel: queue.get_stats() for channel, queue in self.queues.items()}
+    
+    def get_dead_letters(self, limit: int = 100) -> List[dict]:
+        """Get the most recent notifications that ran out of attempts, an empty list without an outbox"""
+        if self.outbox is None:
+            return []
+        return self.outbox.get_dead_letters(limit=limit)
     
     def notify_unknown_visitor(self, visitor_data: dict):
         """
         Send notification about an unknown visitor
         
+        Further unknown visitors at the same location within the alert
+        window are sent as one digest.
+        
         Args:
             visitor_data: Data about the unknown visitor
         """
@@ -181,62 +384,167 @@ class NotificationService:
             return
         
         location = visitor_data.get("location", "Unknown location")
-        time = visitor_data.get("time", datetime.now().strftime("%H:%M:%S"))
-        date = visitor_data.get("date", datetime.now().strftime("%Y-%m-%d"))
+        self.coalescer.add("unknown_visitor", location, visitor_data)
+    
+    def notify_system_issue(self, issue_type: str, details: str):
+        """
+        Send notification about a system issue
         
-        # Add email notification
-        self.add_notification("email", {
-            "subject": f"Unknown Visitor Detected - {location}",
-            "body": f"""
+        Further issues of the same type within the alert window are sent as
+        one digest.
+        
+        Args:
+            issue_type: Type of issue
+            details: Issue details
+        """
+        if not self.settings.get("system_alerts", False):
+            return
+        
+        self.coalescer.add("system_issue", issue_type, {
+            "details": details,
+            "time": datetime.now().strftime("%H:%M:%S"),
+            "date": datetime.now().strftime("%Y-%m-%d")
+        })
+    
+    def _emit_alert(self, alert: dict):
+        """Queue the email and system notification of an alert or a digest from the coalescer"""
+        if alert["kind"] == "unknown_visitor":
+            self._emit_unknown_visitor(alert)
+        elif alert["kind"] == "system_issue":
+            self._emit_system_issue(alert)
+        else:
+            logger.warning(f"Unknown alert kind: {alert['kind']}")
+    
+    def _emit_unknown_visitor(self, alert: dict):
+        location = alert["key"]
+        
+        if not alert["digest"]:
+            visitor_data = alert["events"][0]
+            time = visitor_data.get("time", datetime.now().strftime("%H:%M:%S"))
+            date = visitor_data.get("date", datetime.now().strftime("%Y-%m-%d"))
+            
+            # Add email notification
+            self.add_notification("email", {
+                "subject": f"Unknown Visitor Detected - {location}",
+                "body": f"""
             Unknown visitor detected at {location}
             Time: {time}
             Date: {date}
             
+            Please check the ESTIN Entry Detection System for more details.
+            """
+            })
+            
+            # Add system notification
+            self.add_notification("system", {
+                "message": f"Unknown visitor detected at {location} ({time})",
+                "data": visitor_data
+            })
+            return
+        
+        count = alert["count"]
+        first, last = _format_range(alert["first"], alert["last"])
+        
+        # Add digest email
+        self.add_notification("email", {
+            "subject": f"{count} More Unknown Visitors Detected - {location}",
+            "body": f"""
+            {count} more unknown visitors detected at {location}
+            From: {first}
+            To: {last}
+            
             Please check the ESTIN Entry Detection System for more details.
             """
         })
         
         # Add system notification
         self.add_notification("system", {
-            "message": f"Unknown visitor detected at {location} ({time})",
-            "data": visitor_data
+            "message": f"{count} more unknown visitors detected at {location} ({first} - {last})",
+            "data": {"location": location, "count": count, "first": alert["first"], "last": alert["last"], "examples": alert["events"]}
         })
     
-    def notify_system_issue(self, issue_type: str, details: str):
-        """
-        Send notification about a system issue
+    def _emit_system_issue(self, alert: dict):
+        issue_type = alert["key"]
         
-        Args:
-            issue_type: Type of issue
-            details: Issue details
-        """
-        if not self.settings.get("system_alerts", False):
+        if not alert["digest"]:
+            issue = alert["events"][0]
+            
+            # Add email notification
+            self.add_notification("email", {
+                "subject": f"ESTIN System Alert - {issue_type}",
+                "body": f"""
+            System issue detected: {issue_type}
+            
+            Details: {issue["details"]}
+            
+            Time: {issue["time"]}
+            Date: {issue["date"]}
+            
+            Please check the ESTIN Entry Detection System for more details.
+            """
+            }, priority="high")
+            
+            # Add system notification
+            self.add_notification("system", {
+                "message": f"System issue: {issue_type}",
+                "details": issue["details"]
+            }, priority="high")
             return
         
-        # Add email notification
+        count = alert["count"]
+        first, last = _format_range(alert["first"], alert["last"])
+        details = "\n".join(f"            - {event['time']}: {event['details']}" for event in alert["events"])
+        
+        # Add digest email
         self.add_notification("email", {
-            "subject": f"ESTIN System Alert - {issue_type}",
+            "subject": f"ESTIN System Alert - {issue_type} ({count} more times)",
             "body": f"""
-            System issue detected: {issue_type}
-            
-            Details: {details}
+            System issue detected {count} more times: {issue_type}
+            From: {first}
+            To: {last}
             
-            Time: {datetime.now().strftime("%H:%M:%S")}
-            Date: {datetime.now().strftime("%Y-%m-%d")}
+            Details:
+{details}
             
             Please check the ESTIN Entry Detection System for more details.
             """
-        })
+        }, priority="high")
         
         # Add system notification
         self.add_notification("system", {
-            "message": f"System issue: {issue_type}",
-            "details": details
-        })
+            "message": f"System issue: {issue_type} ({count} more times, {first} - {last})",
+            "details": [event["details"] for event in alert["events"]]
+        }, priority="high")
+
+def _format_range(first: float, last: float) -> tuple:
+    """Digest time range as local date and time strings"""
+    return (
+        datetime.fromtimestamp(first).strftime("%Y-%m-%d %H:%M:%S"),
+        datetime.fromtimestamp(last).strftime("%Y-%m-%d %H:%M:%S"),
+    )
 
 # Example usage
+def listen_for_settings(websocket_url: str, service: NotificationService):
+    """
+    Forward settings_update events from the backend's WebSocket to a service
+    
+    Blocks, so run it in a thread. The client reconnects on its own, and
+    the settings are reloaded after every reconnect, since changes made
+    while disconnected were not announced.
+    
+    Args:
+        websocket_url: URL of the backend's WebSocket endpoint
+        service: Notification service to forward the events to
+    """
+    client = WebSocketClient(websocket_url, workers=1)
+    client.register_callback(SETTINGS_EVENT, service.handle_settings_event)
+    client.register_reconnect_callback(service.settings_cache.invalidate)
+    asyncio.run(client.run())
+
 if __name__ == "__main__":
     import os
+    import signal
+    import sys
     import time
     
     # Get backend URL and token from environment
@@ -253,29 +561,65 @@ if __name__ == "__main__":
             token = response.json()["access_token"]
             
             # Initialize notification service
-            notification_service = NotificationService(backend_url, token)
+            metrics_port = os.getenv("NOTIFICATION_METRICS_PORT")
+            notification_service = NotificationService(
+                backend_url,
+                token,
+                metrics_port=int(metrics_port) if metrics_port else None,
+                workers={"email": int(os.getenv("EMAIL_WORKERS", "2"))},
+                queue_size=int(os.getenv("NOTIFICATION_QUEUE_SIZE", "1000")),
+                overflow=os.getenv("NOTIFICATION_OVERFLOW", "drop_lowest"),
+                alert_window=float(os.getenv("ALERT_WINDOW", "60")),
+                smtp={
+                    "host": os.getenv("SMTP_HOST"),
+                    "port": int(os.getenv("SMTP_PORT", "587")),
+                    "username": os.getenv("SMTP_USERNAME") or None,
+                    "password": os.getenv("SMTP_PASSWORD") or None,
+                    "starttls": os.getenv("SMTP_STARTTLS", "true").lower() == "true",
+                    "use_ssl": os.getenv("SMTP_SSL", "false").lower() == "true",
+                    "sender": os.getenv("SMTP_FROM", "estin@example.com"),
+                } if os.getenv("SMTP_HOST") else None,
+                settings_ttl=float(os.getenv("SETTINGS_TTL", "30")),
+                outbox_path=os.getenv("NOTIFICATION_OUTBOX") or None
+            )
             
             # Start service
             notification_service.start()
             
-            # Test notifications
-            notification_service.notify_unknown_visitor({
-                "location": "Main Entrance",
-                "time": "14:30:00",
-                "date": "2025-04-16"
-            })
+            # Apply dashboard settings changes as soon as the backend announces them
+            websocket_url = os.getenv("BACKEND_WS_URL", backend_url.replace("http", "ws", 1) + "/ws")
+            threading.Thread(
+                target=listen_for_settings,
+                args=(websocket_url, notification_service),
+                name="settings-events",
+                daemon=True
+            ).start()
             
-            notification_service.notify_system_issue(
-                "Camera Offline",
-                "Camera 'Side Entrance' is offline"
-            )
+            # Send test notifications
+            if os.getenv("NOTIFICATION_TEST", "false").lower() == "true":
+                notification_service.notify_unknown_visitor({
+                    "location": "Main Entrance",
+                    "time": "14:30:00",
+                    "date": "2025-04-16"
+                })
+                
+                notification_service.notify_system_issue(
+                    "Camera Offline",
+                    "Camera 'Side Entrance' is offline"
+                )
             
-            # Wait for notifications to be processed
-            time.sleep(5)
+            # Run until stopped, e.g. by run.py
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda sig, frame: stop.set())
+            signal.signal(signal.SIGINT, lambda sig, frame: stop.set())
+            while not stop.wait(1):
+                pass
             
             # Stop service
             notification_service.stop()
         else:
             print(f"Failed to get token: {response.status_code} - {response.text}")
+            sys.exit(1)
     except Exception as e:
         print(f"Error: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,205 @@
+import threading
+import time
+from typing import Dict, Optional
+
+class CameraRate:
+    def __init__(self, interval: float):
+        """
+        Rate controller state for one camera
+
+        Args:
+            interval: Starting interval in seconds between processed frames
+        """
+        self.desired_interval = interval  # What the feedback loop asks for
+        self.interval = interval  # What the camera uses after the global budget
+        self.latency: Optional[float] = None  # EWMA of upload latency in seconds
+        self.error_rate = 0.0  # EWMA of failed uploads (0-1)
+        self.throttled = 0  # 429 responses received
+        self.uploads = 0
+        self.last_activity = 0.0  # Last time the backend reported detections
+
+class RateController:
+    def __init__(
+        self,
+        base_interval: float = 1.0,
+        min_interval: float = 0.25,
+        max_interval: float = 5.0,
+        latency_target: float = 0.5,
+        activity_window: float = 10.0,
+        budget_fps: Optional[float] = None,
+        smoothing: float = 0.2,
+        rebalance_interval: float = 1.0
+    ):
+        """
+        Per-camera frame rate control from backend feedback
+
+        After each upload the camera's interval is adjusted:
+        - a 429 or an error doubles the interval (up to ``max_interval``)
+        - latency above ``latency_target`` increases it by 25%
+        - a camera whose frames recently had detections speeds up by 20%
+          towards ``min_interval``
+        - an idle camera slows down by 10% towards ``max_interval``
+
+        The rates of all cameras are then fit into ``budget_fps``: idle cameras
+        give up their rate first, and active cameras are only scaled down when
+        that is not enough.
+
+        Args:
+            base_interval: Starting interval for new cameras
+            min_interval: Shortest interval (fastest rate) of an active camera
+            max_interval: Longest interval (floor rate) of an idle or struggling camera
+            latency_target: Upload latency in seconds above which cameras back off
+            activity_window: Seconds a camera counts as active after a detection
+            budget_fps: Maximum total frames per second over all cameras, or None
+            smoothing: Weight of the newest sample in the latency and error averages
+            rebalance_interval: Minimum seconds between global budget passes
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.latency_target = latency_target
+        self.activity_window = activity_window
+        self.budget_fps = budget_fps
+        self.smoothing = smoothing
+        self.rebalance_interval = rebalance_interval
+
+        self.cameras: Dict[int, CameraRate] = {}
+        self.lock = threading.Lock()
+        self.last_rebalance = 0.0
+
+    def add_camera(self, camera_id: int):
+        """Start tracking a camera at the base interval"""
+        with self.lock:
+            if camera_id not in self.cameras:
+                self.cameras[camera_id] = CameraRate(self.base_interval)
+
+    def remove_camera(self, camera_id: int):
+        """Stop tracking a camera and give its share of the budget back"""
+        with self.lock:
+            self.cameras.pop(camera_id, None)
+
+    def interval_for(self, camera_id: int) -> float:
+        """Get the interval a camera should currently use"""
+        state = self.cameras.get(camera_id)
+        return state.interval if state is not None else self.base_interval
+
+    def record(
+        self,
+        camera_id: int,
+        latency: float,
+        status: Optional[int],
+        detections: int = 0,
+        now: Optional[float] = None
+    ) -> float:
+        """
+        Feed the result of one upload into the controller
+
+        Args:
+            camera_id: ID of the camera
+            latency: Seconds the upload took
+            status: HTTP status code, or None if the request failed
+            detections: Number of faces the backend found
+            now: Current time, defaults to time.time()
+
+        Returns:
+            The camera's new interval
+        """
+        now = time.time() if now is None else now
+
+        with self.lock:
+            state = self.cameras.get(camera_id)
+            if state is None:
+                state = self.cameras[camera_id] = CameraRate(self.base_interval)
+
+            failed = status is None or status >= 500 or status == 429
+            state.uploads += 1
+            state.error_rate += self.smoothing * ((1.0 if failed else 0.0) - state.error_rate)
+            if state.latency is None:
+                state.latency = latency
+            else:
+                state.latency += self.smoothing * (latency - state.latency)
+            if detections:
+                state.last_activity = now
+
+            interval = state.desired_interval
+            if status == 429:
+                state.throttled += 1
+                interval *= 2.0
+            elif failed:
+                interval *= 2.0
+            elif state.latency > self.latency_target:
+                interval *= 1.25
+            elif now - state.last_activity <= self.activity_window:
+                interval *= 0.8
+            else:
+                interval *= 1.1
+            state.desired_interval = min(self.max_interval, max(self.min_interval, interval))
+
+            if now - self.last_rebalance >= self.rebalance_interval:
+                self._rebalance(now)
+            else:
+                # Never let one camera go faster than its last budgeted share
+                state.interval = max(state.desired_interval, state.interval)
+
+            return state.interval
+
+    def _rebalance(self, now: float):
+        """Fit the desired rates of all cameras into the global budget"""
+        self.last_rebalance = now
+
+        for state in self.cameras.values():
+            state.interval = state.desired_interval
+        if not self.budget_fps:
+            return
+
+        rates = {camera_id: 1.0 / state.interval for camera_id, state in self.cameras.items()}
+        excess = sum(rates.values()) - self.budget_fps
+        if excess <= 0:
+            return
+
+        floor = 1.0 / self.max_interval
+        active = {
+            camera_id for camera_id, state in self.cameras.items()
+            if now - state.last_activity <= self.activity_window
+        }
+
+        # Idle cameras give up rate first, proportionally, down to the floor
+        idle_spare = sum(rates[c] - floor for c in rates if c not in active)
+        if idle_spare > 0:
+            share = min(1.0, excess / idle_spare)
+            for camera_id in rates:
+                if camera_id not in active:
+                    rates[camera_id] -= (rates[camera_id] - floor) * share
+            excess -= idle_spare * share
+
+        # Then active cameras, proportionally, down to the floor
+        active_spare = sum(rates[c] - floor for c in active)
+        if excess > 0 and active_spare > 0:
+            share = min(1.0, excess / active_spare)
+            for camera_id in active:
+                rates[camera_id] -= (rates[camera_id] - floor) * share
+
+        for camera_id, rate in rates.items():
+            self.cameras[camera_id].interval = 1.0 / rate
+
+    def get_stats(self, camera_id: int) -> Optional[dict]:
+        """Get controller state of a camera"""
+        with self.lock:
+            state = self.cameras.get(camera_id)
+            if state is None:
+                return None
+            return {
+                "interval": state.interval,
+                "desired_interval": state.desired_interval,
+                "fps": 1.0 / state.interval,
+                "latency": state.latency,
+                "error_rate": state.error_rate,
+                "throttled": state.throttled,
+                "uploads": state.uploads,
+                "active": time.time() - state.last_activity <= self.activity_window,
+            }
+
+    def total_fps(self) -> float:
+        """Sum of the current rates of all cameras"""
+        with self.lock:
+            return sum(1.0 / state.interval for state in self.cameras.values())
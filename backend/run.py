@@ -10,14 +10,17 @@ This script starts all the necessary services for the ESTIN Entry Detection Syst
 
 import os
 import sys
+import gc
 import time
 import argparse
+import socket
 import subprocess
 import logging
 import signal
 import requests
 import threading
-from typing import List, Dict
+from logging.handlers import RotatingFileHandler
+from typing import Callable, List, Dict, Optional
 
 # Configure logging
 logging.basicConfig(
@@ -30,9 +33,260 @@ logger = logging.getLogger("runner")
 processes: Dict[str, subprocess.Popen] = {}
 running = True
 
-def start_backend_server(host: str = "0.0.0.0", port: int = 8000, reload: bool = True):
+# Application, listening socket and options shared by forked backend workers
+preloaded: Dict[str, object] = {}
+
+# Restart and health-check state of every supervised process, by name
+services: Dict[str, "SupervisedService"] = {}
+
+# Directory for rotating per-service log files, None forwards output to the runner's log
+log_dir: Optional[str] = None
+
+class ForkedWorker:
+    def __init__(self, pid: int):
+        """
+        Handle on a backend worker forked from this process
+
+        Offers the subset of subprocess.Popen that monitor_processes and
+        signal_handler use, so workers sit in ``processes`` next to the
+        other services.
+
+        Args:
+            pid: Process ID of the worker
+        """
+        self.pid = pid
+        self.returncode: Optional[int] = None
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(f"worker {self.pid}", timeout)
+            time.sleep(0.05)
+        return self.returncode
+
+    def communicate(self):
+        # Workers write straight to the runner's stdout and stderr
+        self.wait()
+        return None, None
+
+    def _signal(self, sig: int):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self._signal(signal.SIGTERM)
+
+    def kill(self):
+        self._signal(signal.SIGKILL)
+
+class SupervisedService:
+    def __init__(
+        self,
+        name: str,
+        start: Callable[[], object],
+        health_url: Optional[str] = None,
+        probe_interval: float = 5.0,
+        probe_timeout: float = 5.0,
+        max_lag: float = 1.0,
+        failure_threshold: int = 3,
+        startup_grace: float = 60.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        stable_after: float = 60.0,
+        stop_timeout: float = 10.0
+    ):
+        """
+        Restart policy and health checks of one supervised process
+
+        A prober thread requests ``health_url`` every ``probe_interval``
+        seconds. A probe fails if nothing answers within ``probe_timeout``
+        (liveness), or if the answer takes longer than ``max_lag``: the
+        request waits in the server's event loop behind whatever blocks it,
+        so its latency is the loop's lag. After ``failure_threshold`` failed
+        probes in a row monitor_processes terminates the process. Failures are
+        not counted until the service first answers or ``startup_grace``
+        seconds have passed, so loading models does not count as a hang.
+
+        A process that exits or is terminated is restarted at once the first
+        time, then after ``backoff_base`` seconds, doubling with every
+        further restart up to ``backoff_max``. The count starts over once a
+        process has run for ``stable_after`` seconds.
+
+        Args:
+            name: Key of the process in ``processes``
+            start: Starts the process and stores it in ``processes``
+            health_url: URL to probe, None to only watch the process
+            probe_interval: Seconds between probes
+            probe_timeout: Seconds a probe waits for an answer
+            max_lag: Slowest answer in seconds that still counts as healthy
+            failure_threshold: Failed probes in a row before a restart
+            startup_grace: Seconds after a start before failures count
+            backoff_base: Delay before the second restart in a row
+            backoff_max: Longest delay between restarts
+            stable_after: Seconds of running that reset the backoff
+            stop_timeout: Seconds between terminating and killing a process
+        """
+        self.name = name
+        self.start = start
+        self.health_url = health_url
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.max_lag = max_lag
+        self.failure_threshold = failure_threshold
+        self.startup_grace = startup_grace
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.stop_timeout = stop_timeout
+
+        self.session = requests.Session()
+        self.prober: Optional[threading.Thread] = None
+        self.started = 0.0
+        self.answered = False  # Whether the current process has answered a probe yet
+        self.failures = 0  # Failed probes in a row
+        self.last_error: Optional[str] = None
+        self.lag: Optional[float] = None  # Latency of the last answered probe
+        self.restarts = 0
+        self.attempts = 0  # Restarts since the process last ran for stable_after
+        self.restart_at: Optional[float] = None
+        self.stopping_since: Optional[float] = None
+
+    def launch(self):
+        """Start the process and reset its health state"""
+        self.failures = 0
+        self.answered = False
+        self.lag = None
+        self.restart_at = None
+        self.stopping_since = None
+        self.started = time.monotonic()
+        self.start()
+
+    def schedule_restart(self) -> float:
+        """
+        Schedule the next start of a process that has exited
+
+        Returns:
+            Seconds until the restart
+        """
+        now = time.monotonic()
+        if now - self.started >= self.stable_after:
+            self.attempts = 0
+        delay = 0.0 if self.attempts == 0 else min(self.backoff_max, self.backoff_base * 2 ** (self.attempts - 1))
+        self.attempts += 1
+        self.restarts += 1
+        self.restart_at = now + delay
+        return delay
+
+    def unhealthy(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    def probe(self):
+        """Request the health URL once and record the outcome"""
+        started = time.monotonic()
+        try:
+            response = self.session.get(self.health_url, timeout=self.probe_timeout)
+            lag = time.monotonic() - started
+            if response.status_code >= 500:
+                error = f"status {response.status_code}"
+            elif lag > self.max_lag:
+                error = f"answered after {lag:.2f}s"
+            else:
+                error = None
+            self.lag = lag
+        except requests.RequestException as e:
+            error = f"no answer: {e.__class__.__name__}"
+
+        if error is None:
+            self.answered = True
+            self.failures = 0
+            return
+        self.last_error = error
+        if self.answered or time.monotonic() - self.started > self.startup_grace:
+            self.failures += 1
+            logger.warning(f"{self.name} health check failed ({error}), {self.failures}/{self.failure_threshold}")
+
+    def start_probing(self):
+        def probe_loop():
+            while running:
+                time.sleep(self.probe_interval)
+                # No probes while the process is down or being replaced
+                if self.restart_at is None and self.stopping_since is None:
+                    self.probe()
+
+        self.prober = threading.Thread(target=probe_loop, name=f"{self.name}-probe", daemon=True)
+        self.prober.start()
+
+    def get_stats(self) -> dict:
+        return {
+            "healthy": not self.unhealthy(),
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "lag": self.lag,
+            "restarts": self.restarts,
+        }
+
+def service_logger(name: str) -> logging.Logger:
+    """
+    Logger that a child's output is forwarded to
+
+    Lines go through the runner's own handlers, or with --log-dir to
+    <log_dir>/<name>.log, rotated at 10 MB with 5 old files kept.
+    """
+    output = logging.getLogger(f"runner.{name}")
+    if log_dir is not None and not output.handlers:
+        handler = RotatingFileHandler(os.path.join(log_dir, f"{name}.log"), maxBytes=10 * 1024 * 1024, backupCount=5)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        output.addHandler(handler)
+        output.propagate = False
+    return output
+
+def drain_output(name: str, stream) -> threading.Thread:
+    """
+    Forward a child's output line by line while it runs
+
+    A pipe nobody reads fills up after a few dozen KB, and the child then
+    blocks on its next log write. Reading on a thread of its own keeps the
+    child writing however quiet the runner's other threads are.
+
+    Args:
+        name: Service the output belongs to
+        stream: Text stream of the child's stdout, with stderr merged in
+    """
+    output = service_logger(name)
+
+    def read():
+        with stream:
+            for line in stream:
+                output.info(line.rstrip())
+
+    thread = threading.Thread(target=read, name=f"{name}-output", daemon=True)
+    thread.start()
+    return thread
+
+def probe_url(host: str, port: int, path: str) -> str:
+    """URL the runner probes a service on, on loopback if it listens on every address"""
+    if host in ("", "0.0.0.0"):
+        host = "127.0.0.1"
+    elif host == "::":
+        host = "::1"
+    if ":" in host:
+        host = f"[{host}]"
+    return f"http://{host}:{port}{path}"
+
+def start_backend_server(host: str = "0.0.0.0", port: int = 8000, reload: bool = True, app: str = "main:app"):
     """Start the FastAPI backend server"""
-    cmd = ["uvicorn", "main:app", "--host", host, "--port", str(port)]
+    cmd = [sys.executable, "-m", "uvicorn", app, "--host", host, "--port", str(port)]
     
     if reload:
         cmd.append("--reload")
@@ -43,40 +297,174 @@ def start_backend_server(host: str = "0.0.0.0", port: int = 8000, reload: bool =
     process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=dict(os.environ, PYTHONUNBUFFERED="1")
     )
+    drain_output("backend", process.stdout)
     
     processes["backend"] = process
     logger.info("Backend server started")
     
     return process
 
-def start_camera_service():
-    """Start the camera service"""
-    # In a real implementation, this would start the camera_service.py script
-    # For now, we'll just log that it would be started
-    logger.info("Camera service would be started here")
+def preload_backend(app: str = "main:app"):
+    """
+    Load the application and everything heavy it uses before forking workers
+
+    face_recognition loads dlib's detector, landmark and encoding models when
+    it is imported. With GALLERY_SNAPSHOT set, the face gallery is opened from
+    that snapshot (see gallery_snapshot) and published as
+    ``face_gallery.preloaded`` for the application to use instead of loading
+    its own. Everything loaded here is shared copy-on-write by the workers.
+
+    Args:
+        app: Application as "module:attribute"
+    """
+    import uvicorn.importer
+
+    started = time.time()
+    try:
+        import face_recognition  # noqa: F401
+        logger.info("Recognition models loaded")
+    except ImportError:
+        logger.warning("face_recognition is not installed, workers will run without preloaded models")
+
+    snapshot = os.getenv("GALLERY_SNAPSHOT")
+    if snapshot:
+        import face_gallery
+        from gallery_snapshot import open_snapshot
+        face_gallery.preloaded = open_snapshot(snapshot)
+        logger.info(f"Face gallery of {len(face_gallery.preloaded)} encodings opened from {snapshot}")
+
+    application = uvicorn.importer.import_from_string(app)
+
+    # Objects created so far are never collected, so the collector's
+    # bookkeeping does not dirty their pages in every worker
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Preloaded {app} in {time.time() - started:.1f}s")
+    return application
+
+def start_backend_worker(index: int) -> ForkedWorker:
+    """
+    Fork one backend worker from the preloaded runner
+
+    The worker serves the preloaded application on the shared listening
+    socket, and on a loopback socket of its own that the runner probes it
+    on. Its output is piped back to the runner. Call from the main thread;
+    the worker runs nothing that the runner's other threads hold locks in,
+    apart from logging, which resets its locks after a fork.
+
+    Args:
+        index: Worker number, also selects its CPU when pinning
+    """
+    import uvicorn
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            processes.clear()
+            os.close(read_fd)
+            os.dup2(write_fd, 1)
+            os.dup2(write_fd, 2)
+
+            cpus = preloaded["cpus"]
+            if cpus:
+                os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+
+            config = uvicorn.Config(preloaded["app"], host=preloaded["host"], port=preloaded["port"])
+            uvicorn.Server(config).run(sockets=[preloaded["socket"], preloaded["health_sockets"][index]])
+            code = 0
+        finally:
+            os._exit(code)
+
+    os.close(write_fd)
+    name = f"backend-{index}"
+    drain_output(name, os.fdopen(read_fd, errors="replace"))
+
+    cpus = preloaded["cpus"]
+    pinned = f" on CPU {cpus[index % len(cpus)]}" if cpus else ""
+    logger.info(f"Started backend worker {index} (pid {pid}){pinned}")
+    process = ForkedWorker(pid)
+    processes[name] = process
+    return process
+
+def prepare_backend_workers(host: str, port: int, workers: int, pin_cpus: bool = False, app: str = "main:app") -> List[int]:
+    """
+    Preload the backend once and bind the sockets its forked workers serve
+
+    Start each worker with start_backend_worker.
+
+    Args:
+        host: Host to bind the backend server to
+        port: Port to bind the backend server to
+        workers: Number of worker processes
+        pin_cpus: Pin each worker to one of the CPUs this process may run on
+        app: Application as "module:attribute"
+
+    Returns:
+        Port of each worker's own health socket on 127.0.0.1
+    """
+    application = preload_backend(app)
+
+    # Bound once here and inherited, so every worker accepts on the same port
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # One per worker, bound once so a restarted worker is probed on the same port
+    health_sockets = []
+    for _ in range(workers):
+        health_socket = socket.socket(socket.AF_INET)
+        health_socket.bind(("127.0.0.1", 0))
+        health_socket.listen(16)
+        health_sockets.append(health_socket)
+
+    preloaded.update(
+        app=application,
+        socket=sock,
+        health_sockets=health_sockets,
+        host=host,
+        port=port,
+        cpus=sorted(os.sched_getaffinity(0)) if pin_cpus else None,
+    )
+    return [health_socket.getsockname()[1] for health_socket in health_sockets]
+
+def start_service_script(name: str, script: str):
+    """Start a service script of this directory as a child process"""
+    cmd = [sys.executable, script]
+    logger.info(f"Starting {name} service: {' '.join(cmd)}")
+    
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=dict(os.environ, PYTHONUNBUFFERED="1")
+    )
+    drain_output(name, process.stdout)
     
-    # Example of how to start it:
-    # cmd = ["python", "camera_service.py"]
-    # process = subprocess.Popen(cmd)
-    # processes["camera"] = process
+    processes[name] = process
+    logger.info(f"{name.capitalize()} service started")
     
-    return None
+    return process
+
+def start_camera_service():
+    """Start the camera service"""
+    return start_service_script("camera", "camera_service.py")
 
 def start_notification_service():
     """Start the notification service"""
-    # In a real implementation, this would start the notification_service.py script
-    # For now, we'll just log that it would be started
-    logger.info("Notification service would be started here")
-    
-    # Example of how to start it:
-    # cmd = ["python", "notification_service.py"]
-    # process = subprocess.Popen(cmd)
-    # processes["notification"] = process
-    
-    return None
+    return start_service_script("notification", "notification_service.py")
 
 def initialize_database():
     """Initialize the database with default data"""
@@ -89,31 +477,59 @@ def initialize_database():
         logger.error(f"Failed to initialize database: {e}")
         sys.exit(1)
 
-def monitor_processes():
-    """Monitor running processes and restart if needed"""
+def supervise(name: str, start: Callable[[], object], health_url: Optional[str] = None, **options) -> SupervisedService:
+    """
+    Start a service and register it with monitor_processes
+
+    Args:
+        name: Key of the service's process in ``processes``
+        start: Starts the process and stores it in ``processes``
+        health_url: URL to probe, None to only watch the process
+        options: SupervisedService options
+    """
+    service = SupervisedService(name, start, health_url, **options)
+    services[name] = service
+    service.launch()
+    if health_url is not None:
+        logger.info(f"Probing {name} on {health_url}")
+        service.start_probing()
+    return service
+
+def monitor_processes(interval: float = 0.5):
+    """Restart supervised processes that exit or fail their health checks"""
     while running:
-        for name, process in list(processes.items()):
-            if process and process.poll() is not None:
-                logger.warning(f"{name} process exited with code {process.returncode}")
-                
-                # Read output
-                stdout, stderr = process.communicate()
-                if stdout:
-                    logger.info(f"{name} stdout: {stdout}")
-                if stderr:
-                    logger.error(f"{name} stderr: {stderr}")
-                
-                # Restart process
-                logger.info(f"Restarting {name} process...")
-                if name == "backend":
-                    processes[name] = start_backend_server()
-                elif name == "camera":
-                    processes[name] = start_camera_service()
-                elif name == "notification":
-                    processes[name] = start_notification_service()
+        now = time.monotonic()
+        for name, service in list(services.items()):
+            if not running:
+                break
+            process = processes.get(name)
+            
+            if service.restart_at is not None:
+                if now >= service.restart_at:
+                    logger.info(f"Restarting {name} process...")
+                    service.launch()
+                continue
+            
+            if process is None:
+                continue
+            
+            if process.poll() is not None:
+                delay = service.schedule_restart()
+                logger.warning(f"{name} process exited with code {process.returncode}, restarting in {delay:.0f}s")
+                continue
+            
+            if service.stopping_since is not None:
+                if now - service.stopping_since > service.stop_timeout:
+                    logger.warning(f"{name} process did not terminate, killing...")
+                    process.kill()
+                continue
+            
+            if service.unhealthy():
+                logger.error(f"{name} failed {service.failures} health checks in a row ({service.last_error}), terminating")
+                service.stopping_since = now
+                process.terminate()
         
-        # Sleep to reduce CPU usage
-        time.sleep(1)
+        time.sleep(interval)
 
 def signal_handler(sig, frame):
     """Handle termination signals"""
@@ -145,12 +561,23 @@ def main():
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind the backend server to")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind the backend server to")
     parser.add_argument("--no-reload", action="store_true", help="Disable auto-reload for the backend server")
+    parser.add_argument("--workers", type=int, default=0, help="Preload the backend once and fork this many workers (implies --no-reload)")
+    parser.add_argument("--pin-cpus", action="store_true", help="Pin each forked worker to its own CPU")
+    parser.add_argument("--app", default="main:app", help="Backend application as module:attribute")
     parser.add_argument("--init-db", action="store_true", help="Initialize the database")
     parser.add_argument("--camera", action="store_true", help="Start the camera service")
     parser.add_argument("--notification", action="store_true", help="Start the notification service")
+    parser.add_argument("--health-path", default="/docs", help="Backend path probed for liveness, empty to disable probing")
+    parser.add_argument("--max-lag", type=float, default=1.0, help="Slowest health check answer in seconds that counts as healthy")
+    parser.add_argument("--log-dir", help="Write each service's output to a rotating <service>.log here")
     
     args = parser.parse_args()
     
+    global log_dir
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+        log_dir = args.log_dir
+    
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -160,24 +587,37 @@ def main():
         initialize_database()
     
     # Start backend server
-    start_backend_server(args.host, args.port, not args.no_reload)
+    if args.workers > 0:
+        # Restarting a forked worker forks it again from this preloaded process
+        health_ports = prepare_backend_workers(args.host, args.port, args.workers, args.pin_cpus, args.app)
+        for index, health_port in enumerate(health_ports):
+            supervise(
+                f"backend-{index}",
+                lambda index=index: start_backend_worker(index),
+                probe_url("127.0.0.1", health_port, args.health_path) if args.health_path else None,
+                max_lag=args.max_lag
+            )
+    else:
+        supervise(
+            "backend",
+            lambda: start_backend_server(args.host, args.port, not args.no_reload, args.app),
+            probe_url(args.host, args.port, args.health_path) if args.health_path else None,
+            max_lag=args.max_lag
+        )
     
-    # Start camera service if requested
+    # Start camera service if requested. Their metrics servers, if enabled, answer the health checks
     if args.camera:
-        start_camera_service()
+        metrics_port = os.getenv("CAMERA_METRICS_PORT")
+        supervise("camera", start_camera_service, probe_url("127.0.0.1", int(metrics_port), "/metrics") if metrics_port else None)
     
     # Start notification service if requested
     if args.notification:
-        start_notification_service()
-    
-    # Start monitoring thread
-    monitor_thread = threading.Thread(target=monitor_processes, daemon=True)
-    monitor_thread.start()
+        metrics_port = os.getenv("NOTIFICATION_METRICS_PORT")
+        supervise("notification", start_notification_service, probe_url("127.0.0.1", int(metrics_port), "/metrics") if metrics_port else None)
     
-    # Wait for termination
+    # Supervise from the main thread, forked workers must not be forked from another thread
     try:
-        while running:
-            time.sleep(1)
+        monitor_processes()
     except KeyboardInterrupt:
         signal_handler(signal.SIGINT, None)
 
@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+import requests
+
+from metrics import REGISTRY
+
+logger = logging.getLogger("settings_cache")
+
+# WebSocket event the backend sends after the settings were changed
+SETTINGS_EVENT = "settings_update"
+
+class SettingsSnapshot:
+    def __init__(self, values: dict, etag: Optional[str], loaded_at: float):
+        """
+        One version of the settings, never changed after it is created
+
+        Args:
+            values: Settings as returned by /api/settings
+            etag: ETag of the response, None if the backend sent none
+            loaded_at: time.monotonic() when the backend returned this version
+        """
+        self.values: Mapping[str, Any] = MappingProxyType(dict(values))
+        self.etag = etag
+        self.loaded_at = loaded_at
+
+class SettingsCache:
+    def __init__(self, session: requests.Session, backend_url: str, ttl: float = 30.0, timeout: float = 10.0):
+        """
+        Local copy of the backend's settings, revalidated on a TTL and on push
+
+        Reads never wait and take no lock: ``get`` looks up a key in the
+        current SettingsSnapshot, and a refresh swaps in a new snapshot
+        with one assignment. Readers see either the old or the new version,
+        never a mix.
+
+        A background thread revalidates the snapshot every ``ttl`` seconds
+        with a conditional GET (If-None-Match), so unchanged settings cost a
+        304 with no body. ``invalidate``, e.g. from a settings_update
+        WebSocket event, marks the snapshot stale and wakes the thread to
+        fetch the new version at once. Until it arrives, and while the
+        backend cannot be reached, the last known settings keep being served.
+
+        Args:
+            session: Authorized HTTP session
+            backend_url: URL of the backend API
+            ttl: Seconds a snapshot is served before it is revalidated
+            timeout: HTTP timeout of a refresh in seconds
+        """
+        self.session = session
+        self.backend_url = backend_url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.snapshot = SettingsSnapshot({}, None, float("-inf"))  # Empty until the first refresh
+        self.invalidated_at: Optional[float] = None  # Set while a pushed change is not fetched yet
+        self.last_invalidation_lag: Optional[float] = None  # Seconds from the last invalidation until it was fetched
+        self.refresh_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.stale_reads = 0
+        self.refreshes = 0
+        self.not_modified = 0
+        self.changes = 0
+        self.failures = 0
+        self.invalidations = 0
+
+        REGISTRY.counter(
+            "settings_cache_reads_total", "Settings reads by whether the cached snapshot was fresh", ["result"],
+            callback=lambda: [(("hit",), self.hits), (("stale",), self.stale_reads)]
+        )
+        REGISTRY.gauge(
+            "settings_cache_age_seconds", "Seconds since the cached settings were last confirmed by the backend",
+            callback=lambda: [((), age) for age in [self.get_age()] if age is not None]
+        )
+        REGISTRY.counter(
+            "settings_cache_refreshes_total", "Settings refreshes by outcome", ["result"],
+            callback=lambda: [
+                (("changed",), self.changes),
+                (("not_modified",), self.not_modified),
+                (("failed",), self.failures),
+            ]
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get one setting from the current snapshot"""
+        snapshot = self.snapshot
+        if self.invalidated_at is None and time.monotonic() - snapshot.loaded_at <= self.ttl:
+            self.hits += 1
+        else:
+            self.stale_reads += 1
+        return snapshot.values.get(key, default)
+
+    def current(self) -> Mapping[str, Any]:
+        """Get all settings of the current snapshot, as a read-only mapping"""
+        return self.snapshot.values
+
+    def refresh(self) -> bool:
+        """
+        Revalidate the snapshot with the backend now
+
+        Returns:
+            True if the settings changed
+        """
+        with self.refresh_lock:
+            self.refreshes += 1
+            invalidated_at = self.invalidated_at
+            snapshot = self.snapshot
+            headers = {"If-None-Match": snapshot.etag} if snapshot.etag else {}
+            try:
+                response = self.session.get(f"{self.backend_url}/api/settings", headers=headers, timeout=self.timeout)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Error loading settings: {str(e)}")
+                return False
+
+            now = time.monotonic()
+            changed = False
+            if response.status_code == 304:
+                self.not_modified += 1
+                self.snapshot = SettingsSnapshot(snapshot.values, snapshot.etag, now)
+            elif response.status_code == 200:
+                try:
+                    values = response.json()
+                except ValueError as e:
+                    self.failures += 1
+                    logger.error(f"Invalid settings from backend: {str(e)}")
+                    return False
+                changed = values != snapshot.values
+                self.snapshot = SettingsSnapshot(values, response.headers.get("ETag"), now)
+                if changed:
+                    self.changes += 1
+                    logger.info("Loaded settings from backend")
+                else:
+                    self.not_modified += 1
+            else:
+                self.failures += 1
+                logger.error(f"Failed to load settings: {response.status_code} - {response.text}")
+                return False
+
+            # An invalidation that arrived during the request needs another fetch
+            if invalidated_at is not None and self.invalidated_at == invalidated_at:
+                self.invalidated_at = None
+                self.last_invalidation_lag = now - invalidated_at
+            return changed
+
+    def invalidate(self):
+        """Mark the snapshot stale and fetch the settings again now"""
+        self.invalidations += 1
+        self.invalidated_at = time.monotonic()
+        self.wakeup.set()
+
+    def handle_settings_event(self, event: dict):
+        """
+        WebSocketClient callback for settings_update events
+
+        Args:
+            event: Event received from the backend
+        """
+        self.invalidate()
+
+    def start(self):
+        """Start revalidating in the background"""
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._refresh_loop, name="settings-cache", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background thread, reads keep the last snapshot"""
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.timeout)
+            self.thread = None
+
+    def _refresh_loop(self):
+        while self.running:
+            if self.invalidated_at is None:
+                delay = self.snapshot.loaded_at + self.ttl - time.monotonic()
+                if delay > 0:
+                    self.wakeup.wait(delay)
+                    self.wakeup.clear()
+                    continue
+            failures = self.failures
+            self.refresh()
+            if self.failures != failures:
+                # Backend unreachable: keep serving the last snapshot and retry after a pause
+                self.wakeup.wait(min(self.ttl, 5.0))
+                self.wakeup.clear()
+
+    def get_age(self) -> Optional[float]:
+        """Seconds since the backend last confirmed the snapshot, None before the first refresh"""
+        loaded_at = self.snapshot.loaded_at
+        if loaded_at == float("-inf"):
+            return None
+        return time.monotonic() - loaded_at
+
+    def get_stats(self) -> dict:
+        """Get read and refresh counters"""
+        reads = self.hits + self.stale_reads
+        return {
+            "hits": self.hits,
+            "stale_reads": self.stale_reads,
+            "hit_rate": self.hits / reads if reads else None,
+            "age": self.get_age(),
+            "stale": self.invalidated_at is not None,
+            "refreshes": self.refreshes,
+            "not_modified": self.not_modified,
+            "changes": self.changes,
+            "failures": self.failures,
+            "invalidations": self.invalidations,
+            "last_invalidation_lag": self.last_invalidation_lag,
+        }
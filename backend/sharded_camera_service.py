@@ -0,0 +1,778 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from camera_service import RECONNECT_AFTER, CameraService, open_capture
+from frame_encoder import combine_stats
+from frame_reader import LatestFrameReader
+from frame_ring import FrameRing
+from metrics import RateLimitedLog
+
+logger = logging.getLogger("sharded_camera_service")
+log_limiter = RateLimitedLog(logger)
+
+# CameraService settings the shard workers need to run the pipeline
+PIPELINE_OPTIONS = (
+    "motion_gate",
+    "motion_threshold",
+    "motion_keepalive",
+    "edge_detection",
+    "face_tracking",
+    "recheck_interval",
+    "encode_profile",
+    "dedup",
+    "dedup_distance",
+    "dedup_window",
+    "frame_interval",
+)
+
+class _RecordedMetric:
+    def __init__(self, series: "_RecordingSeries", name: str):
+        """Stands in for one metric of a CameraSeries, see _RecordingSeries"""
+        self.series = series
+        self.name = name
+
+    def inc(self, amount: float = 1.0):
+        self.series.record(self.name, "inc", amount)
+
+    def observe(self, value: float):
+        self.series.record(self.name, "observe", value)
+
+    def set(self, value: float):
+        self.series.record(self.name, "set", value)
+
+class _RecordingSeries:
+    def __init__(self):
+        """
+        Stands in for a CameraSeries inside a shard worker
+
+        Calls are recorded instead of counted, and the coordinator replays
+        them on the camera's real series, so the metrics are served from one
+        registry whichever process produced them.
+        """
+        self.events: List[tuple] = []
+        self.lock = threading.Lock()
+        for name in ("frames", "decode", "encode", "payload", "upload", "reconnects", "quality"):
+            setattr(self, name, _RecordedMetric(self, name))
+
+    def record(self, name: Optional[str], method: str, *args):
+        with self.lock:
+            self.events.append((name, method, args))
+
+    def dropped(self, reason: str):
+        self.record(None, "dropped", reason)
+
+    def deduplicated(self, kind: str, duplicate: bool):
+        self.record(None, "deduplicated", kind, duplicate)
+
+    def take(self) -> List[tuple]:
+        """Get the calls recorded since the last take"""
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+class _RecordingMetrics:
+    def camera(self, camera_id: int) -> _RecordingSeries:
+        return _RecordingSeries()
+
+class ShardPipeline(CameraService):
+    def __init__(self, options: dict, record_metrics: bool):
+        """
+        The per-camera stages of CameraService (motion gate, dedup, edge
+        detection, face tracking and JPEG encoding), run inside a shard worker
+
+        Only the pipeline state is set up, a worker does not talk to the
+        backend. Upload outcomes and recognition results reach the encoders
+        and trackers through record_upload and record_result.
+
+        Args:
+            options: Settings of the coordinator, see PIPELINE_OPTIONS
+            record_metrics: Record metric calls for the coordinator to replay
+        """
+        for name in PIPELINE_OPTIONS:
+            setattr(self, name, options[name])
+        self.cameras: Dict[int, dict] = {}
+        self.running: Dict[int, bool] = {}
+        self.frame_readers: Dict[int, LatestFrameReader] = {}
+        self.motion_gates = {}
+        self.dedup_caches = {}
+        self.face_detectors = {}
+        self.edge_stats = {}
+        self.face_trackers = {}
+        self.frame_encoders = {}
+        self.rate_controller = None
+        self.metrics = _RecordingMetrics() if record_metrics else None
+        self.camera_metrics = {}
+
+    def add_camera(self, camera: dict):
+        """Create the pipeline of a camera, keeping the state of an earlier run"""
+        self.cameras[camera["id"]] = camera
+        self._prepare_pipeline(camera["id"])
+
+    def take_outcome(self, camera_id: int) -> Tuple[List[tuple], dict]:
+        """
+        Get what the coordinator needs to know after a frame went through the pipeline
+
+        Returns:
+            Tuple of (metric calls since the last frame, stats of every stage)
+        """
+        series = self.camera_metrics.get(camera_id)
+        stats = {
+            "motion": self.get_motion_stats(camera_id),
+            "edge": self.get_edge_stats(camera_id),
+            "tracking": self.get_tracking_stats(camera_id),
+            "dedup": self.get_dedup_stats(camera_id),
+            "encode": self.get_encode_stats(camera_id),
+        }
+        return (series.take() if series is not None else []), stats
+
+    def record_upload(self, camera_id: int, latency: float, status: Optional[int]):
+        """Let the camera's encoder adapt its JPEG quality to an upload"""
+        encoder = self.frame_encoders.get(camera_id)
+        if encoder is None:
+            return
+        encoder.record_upload(latency, status)
+        series = self.camera_metrics.get(camera_id)
+        if series is not None:
+            series.quality.set(encoder.quality)
+
+    def record_result(self, camera_id: int, track_ids: List[Optional[int]], detections: List[dict]):
+        """Answer the tracks of an uploaded crops payload"""
+        tracker = self.face_trackers.get(camera_id)
+        if tracker is not None:
+            tracker.record_upload(track_ids, detections)
+
+def _split_payload(payload: dict) -> Tuple[dict, List[bytes]]:
+    """Take the JPEG bytes out of a payload, leaving their lengths in its metadata"""
+    if "crops" in payload:
+        crops = [dict(crop, jpeg=len(crop["jpeg"])) for crop in payload["crops"]]
+        return dict(payload, crops=crops), [crop["jpeg"] for crop in payload["crops"]]
+    return dict(payload, jpeg=len(payload["jpeg"])), [payload["jpeg"]]
+
+def _join_payload(meta: dict, data: bytes) -> dict:
+    """Put the JPEG bytes copied out of a ring back into a payload"""
+    if "crops" not in meta:
+        return dict(meta, jpeg=data)
+    crops = []
+    offset = 0
+    for crop in meta["crops"]:
+        crops.append(dict(crop, jpeg=data[offset:offset + crop["jpeg"]]))
+        offset += crop["jpeg"]
+    return dict(meta, crops=crops)
+
+def _shard_capture_loop(
+    camera: dict,
+    pipeline: ShardPipeline,
+    frames,
+    state: dict,
+    stop_event: threading.Event,
+    capture_factory: Callable,
+    capture_mode: str,
+    ring_slots: int,
+    ring_bytes: int
+):
+    """
+    Capture and encode frames for one camera inside a shard worker
+
+    Every processed frame goes through the camera's pipeline. Its encoded
+    images are written to the camera's ring, which is created on the first
+    frame to upload and sized from the stream resolution.
+
+    Args:
+        camera: Camera record
+        pipeline: Pipeline of this worker's cameras
+        frames: Queue that receives ("ring", camera_id, name, slots, slot_bytes)
+            when the ring is created, ("frame", camera_id, events, stats, slot,
+            seq, meta) for every processed frame, where meta is None if the
+            pipeline dropped it and slot is None if meta is the whole payload
+            because it did not fit in the ring, and ("stopped", camera_id,
+            ring name) when the camera stops
+        state: Shared worker state holding the default and per-camera frame intervals
+        stop_event: Set to stop this camera
+        capture_factory: Function that opens a capture for a URL
+        capture_mode: "sequential" or "latest", see CameraService
+        ring_slots: Frames the camera's ring should hold
+        ring_bytes: Most shared memory the camera's ring may take
+    """
+    camera_id, camera_url = camera["id"], camera["url"]
+    cap = capture_factory(camera_url)
+    if not cap.isOpened():
+        logger.error(f"Failed to open camera {camera_id} - {camera_url}")
+        frames.put(("failed", camera_id))
+        return
+
+    reader = None
+    if capture_mode == "latest":
+        reader = LatestFrameReader(
+            cap, camera_id, reopen=lambda: capture_factory(camera_url), reconnect_after=RECONNECT_AFTER
+        )
+        reader.start()
+
+    ring: Optional[FrameRing] = None
+    next_process_time = time.time()
+    failures = 0
+    try:
+        while not stop_event.is_set():
+            if reader is not None:
+                delay = next_process_time - time.time()
+                if delay > 0:
+                    stop_event.wait(min(delay, 0.1))
+                    continue
+                frame, captured_at = reader.read(timeout=state["intervals"].get(camera_id, state["interval"]))
+                if frame is None:
+                    continue
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    log_limiter.warning(("read", camera_id), f"Failed to read frame from camera {camera_id}")
+                    failures += 1
+                    if failures >= RECONNECT_AFTER:
+                        logger.warning(f"Reconnecting camera {camera_id}")
+                        cap.release()
+                        cap = capture_factory(camera_url)
+                        failures = 0
+                    stop_event.wait(1)
+                    continue
+                failures = 0
+                captured_at = time.time()
+                if captured_at < next_process_time:
+                    stop_event.wait(0.01)
+                    continue
+
+            try:
+                payload = pipeline._encode_frame(camera_id, frame, captured_at)
+            except Exception as e:
+                log_limiter.error(("process", camera_id), f"Error processing frame from camera {camera_id}: {str(e)}")
+                payload = None
+            events, stats = pipeline.take_outcome(camera_id)
+
+            slot = seq = meta = None
+            if payload is not None:
+                if ring is None:
+                    ring = FrameRing.for_stream(frame.shape[1], frame.shape[0], ring_slots, ring_bytes)
+                    frames.put(("ring", camera_id, ring.name, ring.slots, ring.slot_bytes))
+                meta, chunks = _split_payload(payload)
+                written = ring.write(camera_id, chunks, captured_at)
+                if written is None:
+                    meta = payload
+                else:
+                    slot, seq = written
+
+            frames.put(("frame", camera_id, events, stats, slot, seq, meta))
+            next_process_time = time.time() + state["intervals"].get(camera_id, state["interval"])
+    finally:
+        if reader is not None:
+            reader.stop()
+            cap = reader.cap
+        cap.release()
+        if ring is not None:
+            frames.put(("stopped", camera_id, ring.name))
+            ring.close()
+
+def _shard_worker(
+    shard_id: int,
+    commands,
+    frames,
+    capture_factory: Callable,
+    capture_mode: str,
+    frame_interval: float,
+    options: dict,
+    record_metrics: bool,
+    ring_slots: int
+):
+    """
+    Entry point of a shard worker process
+
+    Runs until it receives a "shutdown" command. Commands are tuples:
+    ("start", camera, ring_bytes), ("stop", camera_id), ("forget", camera_id),
+    ("interval", seconds), ("camera_interval", camera_id, seconds),
+    ("motion_threshold", camera_id, threshold), ("upload", camera_id,
+    latency, status), ("result", camera_id, track_ids, detections) and
+    ("shutdown",).
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    pipeline = ShardPipeline(options, record_metrics)
+    state = {"interval": frame_interval, "intervals": {}}
+    cameras: Dict[int, tuple] = {}  # Camera ID -> (thread, stop event)
+
+    logger.info(f"Shard {shard_id} started (pid {os.getpid()})")
+
+    while True:
+        command = commands.get()
+        kind = command[0]
+
+        if kind == "start":
+            camera, ring_bytes = command[1], command[2]
+            camera_id = camera["id"]
+            if camera_id in cameras and cameras[camera_id][0].is_alive():
+                continue
+            pipeline.add_camera(camera)
+            stop_event = threading.Event()
+            thread = threading.Thread(
+                target=_shard_capture_loop,
+                args=(
+                    camera, pipeline, frames, state, stop_event, capture_factory, capture_mode,
+                    ring_slots, ring_bytes
+                ),
+                daemon=True
+            )
+            cameras[camera_id] = (thread, stop_event)
+            thread.start()
+        elif kind == "stop":
+            entry = cameras.pop(command[1], None)
+            if entry:
+                entry[1].set()
+                entry[0].join(timeout=5.0)
+        elif kind == "forget":
+            pipeline._forget_camera(command[1])
+        elif kind == "interval":
+            state["interval"] = command[1]
+            pipeline.frame_interval = command[1]
+        elif kind == "camera_interval":
+            state["intervals"][command[1]] = command[2]
+        elif kind == "motion_threshold":
+            pipeline.set_motion_threshold(command[1], command[2])
+        elif kind == "upload":
+            pipeline.record_upload(command[1], command[2], command[3])
+        elif kind == "result":
+            pipeline.record_result(command[1], command[2], command[3])
+        elif kind == "shutdown":
+            break
+
+    for thread, stop_event in cameras.values():
+        stop_event.set()
+    for thread, stop_event in cameras.values():
+        thread.join(timeout=5.0)
+    logger.info(f"Shard {shard_id} stopped")
+
+class Shard:
+    def __init__(self, shard_id: int):
+        """
+        Coordinator-side handle for one worker process
+
+        Args:
+            shard_id: Index of the shard
+        """
+        self.shard_id = shard_id
+        self.process: Optional[multiprocessing.Process] = None
+        self.commands = None
+        self.frames = None
+        self.dispatcher: Optional[threading.Thread] = None
+        self.restarts = 0
+        self.published = 0
+        self.torn = 0
+
+class ShardedCameraService(CameraService):
+    def __init__(
+        self,
+        backend_url: str,
+        api_token: str,
+        workers: Optional[int] = None,
+        ring_slots: int = 4,
+        ring_memory: int = 256 * 1024 * 1024,
+        upload_workers: int = 8,
+        capture_factory: Callable = open_capture,
+        **kwargs
+    ):
+        """
+        Camera service that spreads capture, decode and encode work over worker processes
+
+        Cameras are assigned to ``workers`` processes by camera ID. Each worker
+        runs the whole per-camera pipeline (motion gate, dedup, edge detection,
+        face tracking and JPEG encoding) and writes the encoded images into a
+        shared memory FrameRing per camera. The coordinator (this process)
+        copies them out and uploads them, and sends upload outcomes and
+        recognition results back to the worker. Only the newest waiting
+        payload of each camera is uploaded, so a slow backend drops old frames
+        instead of building a backlog. If a worker dies, only the cameras of
+        that worker are restarted.
+
+        The public API is the same as CameraService.
+
+        Args:
+            backend_url: URL of the backend API
+            api_token: JWT token for API authentication
+            workers: Number of worker processes, defaults to the CPU count
+            ring_slots: Frames each camera's ring holds. A slot takes the raw
+                size of one frame at the camera's resolution.
+            ring_memory: Most shared memory the rings of all cameras take
+                together. It is split evenly between the cameras, and rings
+                that would not fit get fewer or smaller slots.
+            upload_workers: Threads that upload payloads
+            capture_factory: Picklable function that opens a capture for a URL
+            **kwargs: Passed on to CameraService
+        """
+        super().__init__(backend_url, api_token, **kwargs)
+
+        self.capture_factory = capture_factory
+        self.ring_slots = ring_slots
+        self.ring_memory = ring_memory
+        self.context = multiprocessing.get_context("spawn")
+        self.upload_pool = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="upload")
+        self.active = True
+
+        # Last interval sent to the workers per camera (adaptive rate)
+        self.sent_intervals: Dict[int, float] = {}
+
+        # Stage stats the workers send with every processed frame
+        self.pipeline_stats: Dict[int, dict] = {}  # Camera ID -> Stage -> Stats
+
+        # Newest payload per camera waiting for the upload pool
+        self.pending: Dict[int, dict] = {}  # Camera ID -> Payload
+        self.pending_lock = threading.Lock()
+
+        self.shards: List[Shard] = [Shard(i) for i in range(workers or os.cpu_count() or 1)]
+
+        self.monitor_thread = threading.Thread(target=self._monitor_shards, daemon=True)
+        self.monitor_thread.start()
+
+    def shard_for(self, camera_id: int) -> Shard:
+        """Get the shard a camera is assigned to"""
+        return self.shards[camera_id % len(self.shards)]
+
+    def _spawn_shard(self, shard: Shard):
+        """Start (or restart) the worker process of a shard"""
+        shard.commands = self.context.Queue()
+        shard.frames = self.context.Queue()
+        shard.process = self.context.Process(
+            target=_shard_worker,
+            args=(
+                shard.shard_id, shard.commands, shard.frames, self.capture_factory, self.capture_mode,
+                self.frame_interval, {name: getattr(self, name) for name in PIPELINE_OPTIONS},
+                self.metrics is not None, self.ring_slots
+            ),
+            daemon=True
+        )
+        shard.process.start()
+
+        shard.dispatcher = threading.Thread(
+            target=self._dispatch_frames,
+            args=(shard, shard.frames, shard.process),
+            daemon=True
+        )
+        shard.dispatcher.start()
+
+    def _send(self, camera_id: int, command: tuple):
+        """Send a command to the worker of a camera, if it is running"""
+        shard = self.shard_for(camera_id)
+        if shard.process is not None and shard.process.is_alive():
+            shard.commands.put(command)
+
+    def _start_command(self, camera_id: int) -> tuple:
+        """Command that starts a camera on its worker, with its share of the ring memory"""
+        return ("start", self.cameras[camera_id], self.ring_memory // max(1, len(self.cameras)))
+
+    def start_camera(self, camera_id: int):
+        """
+        Start processing a camera feed
+
+        Args:
+            camera_id: ID of the camera to start
+        """
+        if camera_id not in self.cameras:
+            logger.error(f"Camera {camera_id} not found")
+            return False
+
+        if self.running.get(camera_id, False):
+            logger.warning(f"Camera {camera_id} is already running")
+            return True
+
+        camera = self.cameras[camera_id]
+        self.running[camera_id] = True
+        self._prepare_pipeline(camera_id)
+
+        shard = self.shard_for(camera_id)
+        if shard.process is None:
+            self._spawn_shard(shard)
+        shard.commands.put(self._start_command(camera_id))
+
+        logger.info(f"Started camera {camera_id} - {camera['name']} on shard {shard.shard_id}")
+        return True
+
+    def _prepare_pipeline(self, camera_id: int):
+        """
+        Create the coordinator's share of a camera's state, its rate and
+        metrics. The stages themselves run in the worker.
+
+        Args:
+            camera_id: ID of the camera
+        """
+        if self.rate_controller is not None:
+            self.rate_controller.add_camera(camera_id)
+
+        if self.metrics is not None and camera_id not in self.camera_metrics:
+            self.camera_metrics[camera_id] = self.metrics.camera(camera_id)
+
+    def stop_camera(self, camera_id: int):
+        """
+        Stop processing a camera feed
+
+        Args:
+            camera_id: ID of the camera to stop
+        """
+        if camera_id not in self.running:
+            logger.warning(f"Camera {camera_id} is not running")
+            return False
+
+        self.running[camera_id] = False
+        self._send(camera_id, ("stop", camera_id))
+        self._release_pipeline(camera_id)
+        self.sent_intervals.pop(camera_id, None)
+
+        logger.info(f"Stopped camera {camera_id}")
+        return True
+
+    def _forget_camera(self, camera_id: int):
+        """
+        Drop the pipeline state of a stopped camera here and in its worker
+
+        Args:
+            camera_id: ID of the camera
+        """
+        super()._forget_camera(camera_id)
+        self.pipeline_stats.pop(camera_id, None)
+        self._send(camera_id, ("forget", camera_id))
+
+    def set_frame_interval(self, interval: float):
+        """
+        Set the frame processing interval on every shard
+
+        Args:
+            interval: Interval in seconds between processed frames
+        """
+        super().set_frame_interval(interval)
+        for shard in self.shards:
+            if shard.process is not None and shard.process.is_alive():
+                shard.commands.put(("interval", self.frame_interval))
+
+    def set_motion_threshold(self, camera_id: int, threshold: float):
+        """
+        Set the motion gate sensitivity for a camera, in its worker
+
+        Args:
+            camera_id: ID of the camera
+            threshold: Fraction of changed pixels (0-1) that counts as motion
+        """
+        if not super().set_motion_threshold(camera_id, threshold):
+            return False
+        self._send(camera_id, ("motion_threshold", camera_id, threshold))
+        return True
+
+    def _record_upload(self, camera_id: int, latency: float, status: Optional[int], result: Optional[dict] = None):
+        """Feed the rate controller, and the camera's encoder and interval in its worker"""
+        super()._record_upload(camera_id, latency, status, result)
+        self._send(camera_id, ("upload", camera_id, latency, status))
+        if self.rate_controller is None:
+            return
+
+        interval = self._interval_for(camera_id)
+        previous = self.sent_intervals.get(camera_id, self.frame_interval)
+        if abs(interval - previous) / previous < 0.1:
+            return
+
+        shard = self.shard_for(camera_id)
+        if shard.process is not None and shard.process.is_alive():
+            self.sent_intervals[camera_id] = interval
+            shard.commands.put(("camera_interval", camera_id, interval))
+
+    def _handle_result(self, camera_id: int, result: dict, payload: dict):
+        """Handle a successful upload, answering the uploaded tracks in the worker"""
+        super()._handle_result(camera_id, result, payload)
+        if self.face_tracking and "crops" in payload:
+            track_ids = [crop.get("track_id") for crop in payload["crops"]]
+            self._send(camera_id, ("result", camera_id, track_ids, result.get("detections", [])))
+
+    def shutdown(self):
+        """Stop all workers and free the shared memory rings"""
+        self.active = False
+        for camera_id in list(self.running.keys()):
+            self.running[camera_id] = False
+
+        for shard in self.shards:
+            if shard.process is not None and shard.process.is_alive():
+                shard.commands.put(("shutdown",))
+        for shard in self.shards:
+            if shard.process is not None:
+                shard.process.join(timeout=10.0)
+                if shard.process.is_alive():
+                    shard.process.terminate()
+                    shard.process.join(timeout=2.0)
+            if shard.dispatcher is not None:
+                shard.dispatcher.join(timeout=2.0)
+
+        self.upload_pool.shutdown(wait=True)
+        logger.info("Sharded camera service stopped")
+
+    def _dispatch_frames(self, shard: Shard, frames, process):
+        """Copy payloads published by a worker out of its rings and hand them to the upload pool"""
+        rings: Dict[int, FrameRing] = {}  # Camera ID -> Ring the worker writes the camera's frames to
+        try:
+            while (self.active or process.is_alive()) and shard.process is process:
+                try:
+                    message = frames.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                except (EOFError, OSError):
+                    break
+
+                kind = message[0]
+                if kind == "frame":
+                    self._receive_frame(shard, rings, *message[1:])
+                elif kind == "ring":
+                    _, camera_id, name, slots, slot_bytes = message
+                    previous = rings.pop(camera_id, None)
+                    if previous is not None:
+                        previous.close()
+                    try:
+                        rings[camera_id] = FrameRing.attach(name, slots, slot_bytes)
+                    except FileNotFoundError:
+                        # The camera stopped and freed its ring already
+                        pass
+                elif kind == "stopped":
+                    _, camera_id, name = message
+                    if camera_id in rings and rings[camera_id].name == name:
+                        rings.pop(camera_id).close()
+                elif kind == "failed":
+                    self.running[message[1]] = False
+        finally:
+            # A worker that crashed did not free its rings
+            crashed = process.exitcode is not None and process.exitcode != 0
+            for ring in rings.values():
+                ring.close(unlink=crashed)
+
+    def _receive_frame(
+        self,
+        shard: Shard,
+        rings: Dict[int, FrameRing],
+        camera_id: int,
+        events: List[tuple],
+        stats: dict,
+        slot: Optional[int],
+        seq: Optional[int],
+        meta: Optional[dict]
+    ):
+        """
+        Take in a frame a worker processed, queueing its payload for upload
+
+        See _shard_capture_loop for the arguments.
+        """
+        shard.published += 1
+        self.pipeline_stats[camera_id] = stats
+        series = self.camera_metrics.get(camera_id)
+        if series is not None:
+            series.frames.inc()
+            for name, method, args in events:
+                getattr(series if name is None else getattr(series, name), method)(*args)
+
+        if meta is None:
+            return
+        payload = meta
+        if slot is not None:
+            ring = rings.get(camera_id)
+            item = ring.read(slot, seq) if ring is not None else None
+            if item is None:
+                self._count_torn(shard, camera_id)
+                return
+            payload = _join_payload(meta, item[2])
+
+        with self.pending_lock:
+            scheduled = camera_id in self.pending
+            if scheduled:
+                # Replaced before the upload pool got to it
+                shard.torn += 1
+                if series is not None:
+                    series.dropped("superseded")
+            self.pending[camera_id] = payload
+        if not scheduled:
+            self.upload_pool.submit(self._upload_pending, camera_id)
+
+    def _upload_pending(self, camera_id: int):
+        """
+        Upload the newest pending payload of a camera
+
+        Args:
+            camera_id: ID of the camera
+        """
+        with self.pending_lock:
+            payload = self.pending.pop(camera_id, None)
+        if payload is None or not self.running.get(camera_id, False):
+            return
+        self._send_frame_to_backend(camera_id, payload)
+
+    def _count_torn(self, shard: Shard, camera_id: int):
+        """Count a frame whose ring slot was overwritten before it was copied out"""
+        shard.torn += 1
+        series = self.camera_metrics.get(camera_id)
+        if series is not None:
+            series.dropped("torn")
+
+    def _monitor_shards(self):
+        """Restart crashed workers and resume only their cameras"""
+        while self.active:
+            for shard in self.shards:
+                process = shard.process
+                if process is None or process.is_alive() or not self.active:
+                    continue
+
+                logger.error(f"Shard {shard.shard_id} exited with code {process.exitcode}, restarting")
+                shard.restarts += 1
+                self._spawn_shard(shard)
+
+                for camera_id, running in list(self.running.items()):
+                    if running and self.shard_for(camera_id) is shard:
+                        shard.commands.put(self._start_command(camera_id))
+                        if camera_id in self.sent_intervals:
+                            shard.commands.put(("camera_interval", camera_id, self.sent_intervals[camera_id]))
+
+            time.sleep(1)
+
+    def get_motion_stats(self, camera_id: int) -> Optional[dict]:
+        """Get passed/suppressed frame counters from a camera's motion gate, as last sent by its worker"""
+        return self.pipeline_stats.get(camera_id, {}).get("motion")
+
+    def get_edge_stats(self, camera_id: int) -> Optional[dict]:
+        """Get edge face detection counters for a camera, as last sent by its worker"""
+        return self.pipeline_stats.get(camera_id, {}).get("edge")
+
+    def get_tracking_stats(self, camera_id: int) -> Optional[dict]:
+        """Get face tracker counters for a camera, as last sent by its worker"""
+        return self.pipeline_stats.get(camera_id, {}).get("tracking")
+
+    def get_dedup_stats(self, camera_id: int) -> Optional[dict]:
+        """Get duplicate detection counters for a camera, as last sent by its worker"""
+        return self.pipeline_stats.get(camera_id, {}).get("dedup")
+
+    def get_encode_stats(self, camera_id: Optional[int] = None) -> Optional[dict]:
+        """Get full-frame encode cost per camera or per encode profile, as last sent by the workers"""
+        if camera_id is None:
+            return combine_stats([
+                stats["encode"] for stats in list(self.pipeline_stats.values()) if stats["encode"] is not None
+            ])
+        return self.pipeline_stats.get(camera_id, {}).get("encode")
+
+    def get_shard_stats(self) -> List[dict]:
+        """Get process and frame counters for every shard"""
+        stats = []
+        for shard in self.shards:
+            process = shard.process
+            stats.append({
+                "shard": shard.shard_id,
+                "pid": process.pid if process else None,
+                "alive": bool(process and process.is_alive()),
+                "cameras": [
+                    camera_id for camera_id, running in self.running.items()
+                    if running and self.shard_for(camera_id) is shard
+                ],
+                "restarts": shard.restarts,
+                "published": shard.published,
+                "torn": shard.torn,
+            })
+        return stats
@@ -0,0 +1,226 @@
+import logging
+import re
+import smtplib
+import ssl
+import threading
+import time
+from email.message import Message
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import getaddresses
+from typing import List, Optional
+
+logger = logging.getLogger("smtp_mailer")
+
+def _dot_stuff(data: bytes) -> bytes:
+    """CRLF line endings and doubled leading dots, as the DATA command requires"""
+    data = re.sub(rb"(?:\r\n|\n|\r(?!\n))", b"\r\n", data)
+    data = re.sub(rb"(?m)^\.", b"..", data)
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data
+
+def _refused(error: Exception) -> bool:
+    """
+    Whether the server refused a message over a connection that is still
+    usable, rather than answering 421 because it is closing the connection
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code != 421 for code, _ in error.recipients.values())
+    if isinstance(error, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError)):
+        return error.smtp_code != 421
+    return False
+
+class SMTPMailer:
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        use_ssl: bool = False,
+        sender: str = "estin@example.com",
+        timeout: float = 30.0,
+        idle_timeout: float = 60.0
+    ):
+        """
+        Send email over one reused, authenticated SMTP connection
+
+        The connection is opened on the first send, upgraded with STARTTLS
+        and logged in, then kept for later messages. It is checked with NOOP
+        before reuse after ``idle_timeout`` idle seconds. If it was dropped,
+        fails during a send, or the server answers 421 (closing the
+        connection), it is reopened and the message is sent again once.
+
+        If the server advertises PIPELINING (RFC 2920), MAIL FROM, every
+        RCPT TO and DATA go out in one write, so a message takes two round
+        trips instead of three plus one per recipient.
+
+        One mailer sends one message at a time. Give each sending thread its
+        own mailer.
+
+        Args:
+            host: SMTP server
+            port: SMTP port, 587 for submission with STARTTLS
+            username: Login user, None to send without logging in
+            password: Login password
+            starttls: Require STARTTLS before logging in or sending
+            use_ssl: Connect with implicit TLS, usually on port 465
+            sender: Envelope and From address
+            timeout: Socket timeout in seconds
+            idle_timeout: Idle seconds after which the connection is checked
+                before reuse
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.sender = sender
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self.connection: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+
+        self.connections = 0
+        self.messages = 0
+        self.pipelined = 0
+        self.reconnects = 0
+        self.failures = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.ehlo()
+            if self.starttls and not self.use_ssl:
+                connection.starttls(context=ssl.create_default_context())
+                connection.ehlo()
+            if self.username:
+                connection.login(self.username, self.password or "")
+        except Exception:
+            connection.close()
+            raise
+        self.connections += 1
+        logger.info(f"Connected to SMTP server {self.host}:{self.port}")
+        return connection
+
+    def _ensure_connection(self) -> smtplib.SMTP:
+        if self.connection is not None and time.monotonic() - self.last_used > self.idle_timeout:
+            try:
+                code, _ = self.connection.noop()
+                if code != 250:
+                    raise smtplib.SMTPServerDisconnected(f"NOOP answered {code}")
+            except (smtplib.SMTPException, OSError):
+                self._close()
+        if self.connection is None:
+            self.connection = self._connect()
+        return self.connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.quit()
+        except (smtplib.SMTPException, OSError):
+            self.connection.close()
+        self.connection = None
+
+    def _deliver(self, connection: smtplib.SMTP, sender: str, recipients: List[str], data: bytes):
+        if not connection.has_extn("pipelining"):
+            connection.sendmail(sender, recipients, data)
+            return
+
+        commands = [f"MAIL FROM:<{sender}>"] + [f"RCPT TO:<{recipient}>" for recipient in recipients] + ["DATA"]
+        connection.send("".join(f"{command}\r\n" for command in commands))
+        replies = [connection.getreply() for _ in commands]
+        mail_reply, recipient_replies, data_reply = replies[0], replies[1:-1], replies[-1]
+
+        closing = next((reply for reply in replies if reply[0] == 421), None)
+        if closing is not None:
+            raise smtplib.SMTPServerDisconnected(f"Server is closing the connection: {closing[0]} {closing[1].decode(errors='replace')}")
+
+        refused = {
+            recipient: reply for recipient, reply in zip(recipients, recipient_replies)
+            if reply[0] not in (250, 251)
+        }
+        if data_reply[0] == 354 and (mail_reply[0] != 250 or len(refused) == len(recipients)):
+            # The server took DATA anyway: end an empty message before resetting
+            connection.send(b".\r\n")
+            connection.getreply()
+        if mail_reply[0] != 250:
+            connection.rset()
+            raise smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], sender)
+        if len(refused) == len(recipients):
+            connection.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        if data_reply[0] != 354:
+            connection.rset()
+            raise smtplib.SMTPDataError(*data_reply)
+
+        connection.send(_dot_stuff(data) + b".\r\n")
+        code, reply = connection.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, reply)
+        self.pipelined += 1
+        if refused:
+            logger.warning(f"SMTP server refused recipients {', '.join(refused)}")
+
+    def send(self, message: Message):
+        """
+        Send one message, reconnecting once if the connection fails
+
+        The envelope recipients are taken from the To, Cc and Bcc headers;
+        Bcc is not transmitted.
+
+        Raises:
+            smtplib.SMTPException: If the server refuses the message
+            OSError: If the server cannot be reached
+        """
+        recipients = [address for _, address in getaddresses(message.get_all("To", []) + message.get_all("Cc", []) + message.get_all("Bcc", []))]
+        if not recipients:
+            raise ValueError("Message has no recipients")
+        if message["From"] is None:
+            message["From"] = self.sender
+        del message["Bcc"]
+        data = message.as_bytes(policy=SMTP_POLICY)
+
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    connection = self._ensure_connection()
+                    self._deliver(connection, self.sender, recipients, data)
+                    self.messages += 1
+                    self.last_used = time.monotonic()
+                    return
+                except (smtplib.SMTPException, OSError) as e:
+                    if _refused(e):
+                        # The server answered, the connection is still usable
+                        self.failures += 1
+                        raise
+                    self._close()
+                    if attempt:
+                        self.failures += 1
+                        raise
+                    self.reconnects += 1
+                    logger.warning(f"SMTP connection failed ({str(e)}), reconnecting")
+
+    def close(self):
+        """Say QUIT and close the connection"""
+        with self.lock:
+            self._close()
+
+    def get_stats(self) -> dict:
+        return {
+            "connected": self.connection is not None,
+            "connections": self.connections,
+            "messages": self.messages,
+            "pipelined": self.pipelined,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+        }
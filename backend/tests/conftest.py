@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The service modules are imported by name, as when running from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from async_camera_service import AsyncCameraService
+from benchmarks.stub_backend import StubBackend
+
+FPS = 50.0
+
+class BufferedCapture:
+    """Live stream that queues every frame until it is grabbed, like FFmpeg reading RTSP"""
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.index = -1
+        self.opened = True
+
+    def isOpened(self) -> bool:
+        return self.opened
+
+    def set(self, prop_id: int, value) -> bool:
+        return True
+
+    def get(self, prop_id: int) -> float:
+        return FPS if prop_id == cv2.CAP_PROP_FPS else 0.0
+
+    def grab(self) -> bool:
+        if not self.opened:
+            return False
+        self.index += 1
+        delay = self.start_time + self.index / FPS - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    def retrieve(self):
+        # The "image" carries the index of the frame in the stream
+        return True, np.array([self.index])
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        self.opened = False
+
+    def newest(self) -> int:
+        """Index of the newest frame the camera has sent"""
+        return int((time.time() - self.start_time) * FPS)
+
+class RecordingService(AsyncCameraService):
+    """Opens BufferedCaptures and records how far behind the stream each processed frame was"""
+
+    def _open_capture(self, camera_url: str):
+        self.capture = BufferedCapture()
+        return self.capture
+
+    async def _submit_frame(self, camera_id: int, frame: np.ndarray, captured_at: float):
+        self.lags.append(self.capture.newest() - int(frame[0]))
+
+@pytest.fixture
+def backend():
+    backend = StubBackend([{"id": 1, "name": "Entrance", "url": "rtsp://camera/1"}]).start()
+    yield backend
+    backend.stop()
+
+@pytest.mark.parametrize("capture_mode", ["sequential", "latest"])
+def test_processes_the_newest_frame_of_a_buffered_stream(backend, capture_mode):
+    service = RecordingService(backend.url, "test", capture_mode=capture_mode)
+    service.lags = []
+    service.set_frame_interval(0.2)
+    try:
+        service.start_camera(1)
+        time.sleep(1.5)
+        service.stop_camera(1)
+    finally:
+        service.shutdown()
+
+    # Reading one buffered frame per interval would fall 9 frames further behind every time
+    assert len(service.lags) >= 5
+    assert max(service.lags) <= 2
+    assert (service.get_capture_stats(1) is not None) == (capture_mode == "latest")
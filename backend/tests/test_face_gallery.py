@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from face_gallery import FaceGallery
+
+def make_faces(size: int, people: int, seed: int = 0) -> dict:
+    """Face ID -> (person ID, encoding), with every person's faces spread over the ID range"""
+    rng = np.random.default_rng(seed)
+    return {face_id: (face_id % people, rng.normal(size=128).astype(np.float32)) for face_id in range(size)}
+
+def make_gallery(faces: dict) -> FaceGallery:
+    gallery = FaceGallery(capacity=16)
+    gallery.load((face_id, person_id, encoding) for face_id, (person_id, encoding) in faces.items())
+    return gallery
+
+def brute_force(faces: dict, probe: np.ndarray, top_k: int) -> list:
+    """(person ID, face ID, distance) of the closest top_k people, from every face's np.linalg.norm distance"""
+    best = {}
+    for face_id, (person_id, encoding) in faces.items():
+        distance = float(np.linalg.norm(probe.astype(np.float64) - encoding.astype(np.float64)))
+        if person_id not in best or distance < best[person_id][1]:
+            best[person_id] = (face_id, distance)
+    ranked = sorted(best.items(), key=lambda item: item[1][1])[:top_k]
+    return [(person_id, face_id, distance) for person_id, (face_id, distance) in ranked]
+
+def test_match_agrees_with_brute_force():
+    faces = make_faces(300, people=60)
+    gallery = make_gallery(faces)
+    rng = np.random.default_rng(1)
+    # Random probes, and noisy copies of enrolled faces that should be verified
+    probes = np.concatenate([
+        rng.normal(size=(5, 128)),
+        np.stack([faces[face_id][1] for face_id in (7, 150, 299)]) + rng.normal(scale=0.01, size=(3, 128)),
+    ]).astype(np.float32)
+
+    results = gallery.match(probes, top_k=5)
+    assert len(results) == len(probes)
+    for probe, matches in zip(probes, results):
+        expected = brute_force(faces, probe, 5)
+        assert [(match.person_id, match.face_id) for match in matches] == [entry[:2] for entry in expected]
+        assert [match.distance for match in matches] == pytest.approx([entry[2] for entry in expected], abs=1e-3)
+        assert [match.verified for match in matches] == [entry[2] <= gallery.threshold for entry in expected]
+    assert [results[index][0].face_id for index in (5, 6, 7)] == [7, 150, 299]
+    assert all(results[index][0].verified for index in (5, 6, 7))
+
+def test_top_k_returns_distinct_people():
+    faces = make_faces(100, people=20)
+    rng = np.random.default_rng(2)
+    probe = rng.normal(size=128).astype(np.float32)
+    # Person 99 has more near copies of the probe than the first candidate batch holds
+    for face_id in range(1000, 1050):
+        faces[face_id] = (99, probe + rng.normal(scale=0.001, size=128).astype(np.float32))
+    gallery = make_gallery(faces)
+
+    [matches] = gallery.match(probe, top_k=4)
+    assert len({match.person_id for match in matches}) == 4
+    assert matches[0].person_id == 99 and matches[0].verified
+    assert [(match.person_id, match.face_id) for match in matches] == [entry[:2] for entry in brute_force(faces, probe, 4)]
+
+    # Asking for more people than are enrolled returns every person once
+    [matches] = gallery.match(probe, top_k=50)
+    assert sorted(match.person_id for match in matches) == sorted({person_id for person_id, _ in faces.values()})
+
+def test_removal_keeps_rows_in_step():
+    faces = make_faces(64, people=8)
+    gallery = make_gallery(faces)
+
+    # Person 3's rows are spread out, so rows from the end move into the holes
+    assert gallery.remove_person(3) == 8
+    assert gallery.remove_face(10) == 1
+    assert gallery.remove_face(10) == 0
+    assert gallery.remove_person(3) == 0
+    remaining = {face_id: face for face_id, face in faces.items() if face[0] != 3 and face_id != 10}
+
+    size = len(gallery)
+    assert size == len(remaining)
+    assert sorted(gallery.face_ids[:size].tolist()) == sorted(remaining)
+    for row in range(size):
+        person_id, encoding = remaining[int(gallery.face_ids[row])]
+        assert gallery.person_ids[row] == person_id
+        assert np.array_equal(gallery.encodings[row], encoding)
+        assert gallery.norms[row] == pytest.approx(float(encoding @ encoding), rel=1e-5)
+
+    # Matching still finds every moved row under its own IDs
+    for face_id, (person_id, encoding) in remaining.items():
+        [[match]] = gallery.match(encoding)
+        assert (match.person_id, match.face_id) == (person_id, face_id)
+
+    # Rows added after the compaction land after the survivors
+    row = gallery.add(500, 3, faces[3][1])
+    assert row == size
+    [[match]] = gallery.match(faces[3][1])
+    assert (match.person_id, match.face_id) == (3, 500)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from face_gallery import FaceGallery
+from face_index import IVFIndex
+
+def make_gallery(size: int, seed: int = 0) -> FaceGallery:
+    rng = np.random.default_rng(seed)
+    gallery = FaceGallery(capacity=16, index=IVFIndex(nlist=16, nprobe=4, min_size=200))
+    gallery.load((face_id, face_id // 4, rng.normal(size=128)) for face_id in range(size))
+    return gallery
+
+def assert_cells_consistent(gallery: FaceGallery):
+    index = gallery.index
+    listed = []
+    for cell, rows in enumerate(index.cell_rows):
+        rows = rows[:index.cell_sizes[cell]]
+        assert (gallery.clusters[rows] == cell).all()
+        assert (index.positions[rows] == np.arange(len(rows))).all()
+        listed.extend(rows.tolist())
+    assert sorted(listed) == list(range(len(gallery)))
+
+def probed_rows(gallery: FaceGallery, probe: np.ndarray) -> set:
+    """Rows of the probed cells, found by scanning every row's cell"""
+    index = gallery.index
+    scores = index.centroid_norms - 2.0 * (index.centroids @ probe)
+    probed = np.argpartition(scores, index.nprobe - 1)[:index.nprobe]
+    return set(np.flatnonzero(np.isin(gallery.clusters[:len(gallery)], probed)).tolist())
+
+def test_candidates_are_the_rows_of_the_probed_cells():
+    gallery = make_gallery(1000)
+    assert gallery.index.trained
+    assert_cells_consistent(gallery)
+    rng = np.random.default_rng(1)
+    for probe in rng.normal(size=(10, 128)).astype(np.float32):
+        rows = gallery.index.candidates(gallery, probe)
+        assert len(rows) == len(set(rows.tolist()))
+        assert set(rows.tolist()) == probed_rows(gallery, probe)
+
+def test_cells_follow_adds_and_removals():
+    gallery = make_gallery(1000)
+    rng = np.random.default_rng(2)
+    for face_id in range(1000, 1300):
+        gallery.add(face_id, face_id // 4, rng.normal(size=128))
+    assert_cells_consistent(gallery)
+
+    for person_id in rng.choice(325, 40, replace=False):
+        gallery.remove_person(int(person_id))
+        assert_cells_consistent(gallery)
+    for face_id in rng.choice(1300, 100, replace=False):
+        gallery.remove_face(int(face_id))
+    assert_cells_consistent(gallery)
+
+    for probe in rng.normal(size=(5, 128)).astype(np.float32):
+        assert set(gallery.index.candidates(gallery, probe).tolist()) == probed_rows(gallery, probe)
+
+def test_search_matches_exact_search_when_every_cell_is_probed():
+    gallery = make_gallery(1000)
+    gallery.remove_person(3)
+    probes = gallery.encodings[:5].copy()
+    approximate = gallery.match(probes)
+    gallery.index.nprobe = 16
+    exact = gallery.match(probes)
+    assert [match[0].face_id for match in approximate] == [match[0].face_id for match in exact]
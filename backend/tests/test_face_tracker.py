@@ -0,0 +1,64 @@
+from face_tracker import FaceTracker
+
+FACES = [(10, 10, 50, 50), (200, 40, 60, 60)]
+
+def make_tracker() -> FaceTracker:
+    return FaceTracker(recheck_interval=30.0, min_confidence=80.0, retry_interval=2.0)
+
+def follow(tracker: FaceTracker, boxes, start: float, end: float) -> list:
+    """Keep the faces in view once a second, returning the needs-recognition flags at ``end``"""
+    now = start
+    while now < end:
+        tracker.update(boxes, now=now)
+        now += 1.0
+    return [needs for _, needs in tracker.update(boxes, now=end)]
+
+def test_upload_answers_tracks_matched_by_crop_index():
+    tracker = make_tracker()
+    results = tracker.update(FACES, now=0.0)
+    assert [needs for _, needs in results] == [True, True]
+    track_ids = [track.track_id for track, _ in results]
+
+    # The backend does not echo track_id, only the position of each crop
+    tracker.record_upload(track_ids, [
+        {"crop_index": 1, "person_id": 7, "name": "Bob", "confidence": 95.0},
+        {"crop_index": 0, "person_id": 3, "name": "Alice", "confidence": 91.0},
+    ], now=0.2)
+
+    first, second = [track for track, _ in results]
+    assert (first.person_id, first.confidence) == (3, 91.0)
+    assert (second.person_id, second.confidence) == (7, 95.0)
+    # Confident tracks wait for the recheck instead of being retried
+    assert follow(tracker, FACES, 1.0, 29.0) == [False, False]
+    assert [needs for _, needs in tracker.update(FACES, now=30.0)] == [True, True]
+
+def test_crop_without_detection_counts_as_answered():
+    tracker = make_tracker()
+    [(track, _)] = tracker.update(FACES[:1], now=0.0)
+    tracker.record_upload([track.track_id], [], now=0.1)
+    assert track.last_result == 0.1
+    assert track.person_id is None
+    # Nothing recognised, so it is retried like a low-confidence result
+    assert tracker.update(FACES[:1], now=1.0)[0][1] is False
+    assert tracker.update(FACES[:1], now=2.0)[0][1] is True
+
+def test_known_track_keeps_its_identity_when_a_recheck_finds_nothing():
+    tracker = make_tracker()
+    [(track, _)] = tracker.update(FACES[:1], now=0.0)
+    tracker.record_upload([track.track_id], [{"crop_index": 0, "person_id": 3, "confidence": 91.0}], now=0.1)
+    assert follow(tracker, FACES[:1], 1.0, 30.0) == [True]
+    tracker.record_upload([track.track_id], [], now=30.1)
+    assert (track.person_id, track.confidence) == (3, 91.0)
+    assert follow(tracker, FACES[:1], 31.0, 59.0) == [False]
+
+def test_echoed_track_id_is_still_accepted():
+    tracker = make_tracker()
+    [(track, _)] = tracker.update(FACES[:1], now=0.0)
+    tracker.record_upload([track.track_id], [{"track_id": track.track_id, "person_id": 3, "confidence": 91.0}], now=0.1)
+    assert track.person_id == 3
+
+def test_unanswered_track_is_retried():
+    tracker = make_tracker()
+    tracker.update(FACES[:1], now=0.0)
+    assert tracker.update(FACES[:1], now=1.0)[0][1] is False
+    assert tracker.update(FACES[:1], now=2.0)[0][1] is True
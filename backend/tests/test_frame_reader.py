@@ -0,0 +1,86 @@
+import threading
+import time
+
+import numpy as np
+
+from frame_reader import LatestFrameReader
+
+class FakeCapture:
+    """Stands in for cv2.VideoCapture, delivering a frame every ``interval`` seconds"""
+
+    def __init__(self, interval: float = 0.002, fail_after: int = 0):
+        self.interval = interval
+        self.fail_after = fail_after
+        self.sequence = 0
+        self.grabbed_at = 0.0
+        self.released = False
+        self.lock = threading.Lock()
+
+    def grab(self) -> bool:
+        time.sleep(self.interval)
+        if self.fail_after and self.sequence >= self.fail_after:
+            return False
+        with self.lock:
+            self.sequence += 1
+            self.grabbed_at = time.time()
+        return True
+
+    def retrieve(self):
+        # The "image" carries the sequence number and grab time of the frame
+        with self.lock:
+            return True, np.array([self.sequence, self.grabbed_at])
+
+    def release(self):
+        self.released = True
+
+def test_read_returns_newest_frame_when_consumer_is_slow():
+    cap = FakeCapture(interval=0.002)
+    reader = LatestFrameReader(cap, camera_id=1)
+    reader.start()
+    try:
+        ages = []
+        lags = []
+        for _ in range(20):
+            # The consumer is ten times slower than the stream
+            time.sleep(0.02)
+            frame, frame_time = reader.read(timeout=1.0)
+            assert frame is not None
+            sequence, grabbed_at = frame
+            assert abs(frame_time - grabbed_at) < 0.01
+            ages.append(time.time() - frame_time)
+            lags.append(cap.sequence - sequence)
+    finally:
+        reader.stop()
+
+    # A buffered reader would fall further behind on every read
+    assert max(ages) < 0.05
+    assert max(lags) < 10
+    stats = reader.get_stats()
+    assert stats["dropped"] > stats["decoded"]
+
+def test_read_times_out_without_frames():
+    reader = LatestFrameReader(FakeCapture(fail_after=1), camera_id=1, retry_delay=0.01)
+    reader.start()
+    try:
+        time.sleep(0.05)
+        started = time.time()
+        frame, frame_time = reader.read(timeout=0.1)
+        assert frame is None and frame_time == 0.0
+        assert time.time() - started < 0.5
+    finally:
+        reader.stop()
+
+def test_reopens_capture_after_repeated_failures():
+    first = FakeCapture(fail_after=1)
+    second = FakeCapture()
+    reader = LatestFrameReader(first, camera_id=1, retry_delay=0.001, reopen=lambda: second, reconnect_after=3)
+    reader.start()
+    try:
+        frame, _ = reader.read(timeout=1.0)
+        frame, _ = reader.read(timeout=1.0)
+        assert frame is not None
+    finally:
+        reader.stop()
+    assert first.released
+    assert reader.cap is second
+    assert reader.get_stats()["reconnects"] == 1
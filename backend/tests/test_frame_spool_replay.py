@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.stub_backend import StubBackend
+from camera_service import CameraService
+
+def wait_for(predicate, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.05)
+
+@pytest.fixture
+def backend():
+    backend = StubBackend([{"id": 1, "name": "Entrance", "url": "rtsp://camera/1"}]).start()
+    yield backend
+    backend.stop()
+
+def test_frames_from_an_outage_are_replayed_in_capture_order(backend, tmp_path):
+    service = CameraService(backend.url, "test", spool_dir=str(tmp_path), spool_replay_rate=200.0)
+    rng = np.random.default_rng(0)
+    captured = [round(time.time() - 60 + index * 0.5, 3) for index in range(20)]
+
+    backend.available = False
+    for captured_at in captured:
+        frame = rng.integers(0, 255, (120, 160, 3), dtype=np.uint8)
+        service._process_frame(1, frame, captured_at)
+    assert backend.frames == 0
+    assert service.get_spool_stats()["appended"] == len(captured)
+
+    backend.available = True
+    wait_for(lambda: service.get_spool_stats()["pending_bytes"] == 0)
+
+    # Every frame arrives once, in the order it was captured, stamped with its capture time
+    assert backend.replayed == captured
+    stats = service.get_spool_stats()
+    assert stats["replayed"] == len(captured)
+    service.spool.close()
+
+def test_a_stalled_backend_times_out_and_the_frame_is_spooled(backend, tmp_path):
+    service = CameraService(backend.url, "test", spool_dir=str(tmp_path), spool_replay_rate=200.0, upload_timeout=0.2)
+    frame = np.random.default_rng(0).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+
+    backend.latency = 1.0
+    service._process_frame(1, frame, time.time())
+    assert service.get_spool_stats()["appended"] == 1
+
+    backend.latency = 0.0
+    wait_for(lambda: service.get_spool_stats()["pending_bytes"] == 0)
+    assert service.get_spool_stats()["replayed"] == 1
+    service.spool.close()
@@ -0,0 +1,51 @@
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.stub_backend import StubBackend
+from camera_service import CameraService
+
+CAMERAS = [
+    {"id": 1, "name": "Entrance", "url": "rtsp://camera/1"},
+    {"id": 2, "name": "Lobby", "url": "rtsp://camera/2"},
+]
+
+@pytest.fixture
+def backend():
+    backend = StubBackend(CAMERAS).start()
+    yield backend
+    backend.stop()
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(0).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+
+@pytest.mark.parametrize("reply", [
+    (415, {"detail": "Unsupported Media Type"}),
+    (422, {"detail": [{"type": "json_invalid", "loc": ["body", 0], "msg": "JSON decode error"}]}),
+])
+def test_a_camera_whose_binary_upload_is_rejected_retries_as_json(backend, frame, reply):
+    service = CameraService(backend.url, "test")
+    backend.binary_reply = reply
+
+    service._process_frame(1, frame, time.time())
+    assert backend.frames == 1
+    assert service.json_cameras == {1}
+
+    # Only that camera switches, and a restart tries binary again
+    backend.binary_reply = None
+    service._process_frame(2, frame, time.time())
+    assert service.json_cameras == {1}
+    service._forget_camera(1)
+    assert service._transport_for(1) == "binary"
+
+def test_a_422_about_the_frame_keeps_the_binary_transport(backend, frame, tmp_path):
+    service = CameraService(backend.url, "test", spool_dir=str(tmp_path))
+    backend.binary_reply = (422, {"detail": "Image could not be decoded"})
+
+    service._process_frame(1, frame, time.time())
+    assert backend.frames == 0
+    assert service.json_cameras == set()
+    assert service.get_spool_stats()["appended"] == 0
+    service.spool.close()
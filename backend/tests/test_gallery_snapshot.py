@@ -0,0 +1,72 @@
+import numpy as np
+
+from face_gallery import FaceGallery
+from gallery_snapshot import HEADER, MAGIC, VERSION, catch_up, open_snapshot, save_snapshot
+
+def make_gallery(size: int, sequence: int = 0, seed: int = 0) -> FaceGallery:
+    rng = np.random.default_rng(seed)
+    gallery = FaceGallery(capacity=16)
+    gallery.load(((face_id, face_id % 7, rng.normal(size=128)) for face_id in range(size)), sequence=sequence)
+    return gallery
+
+def assert_same_rows(gallery: FaceGallery, expected: FaceGallery):
+    size = len(expected)
+    assert len(gallery) == size
+    assert gallery.sequence == expected.sequence
+    for name in ("encodings", "norms", "person_ids", "face_ids"):
+        assert np.array_equal(getattr(gallery, name)[:size], getattr(expected, name)[:size])
+
+def test_snapshot_round_trip_grows_and_catches_up(tmp_path):
+    path = str(tmp_path / "gallery.snap")
+    original = make_gallery(40, sequence=12)
+    save_snapshot(original, path, headroom=2)
+
+    gallery = open_snapshot(path)
+    assert_same_rows(gallery, original)
+    assert len(gallery.encodings) == 42
+    assert isinstance(gallery.encodings, np.memmap)
+
+    # Entries the snapshot already includes are skipped, the rest grow it past its capacity
+    rng = np.random.default_rng(1)
+    changes = [
+        {"sequence": 11, "op": "remove_person", "person_id": 1},
+        {"sequence": 12, "op": "add", "face_id": 0, "person_id": 0, "encoding": rng.normal(size=128)},
+    ] + [
+        {"sequence": 13 + index, "op": "add", "face_id": 100 + index, "person_id": 20, "encoding": rng.normal(size=128)}
+        for index in range(5)
+    ] + [
+        {"sequence": 18, "op": "remove_face", "face_id": 3},
+    ]
+    assert catch_up(gallery, changes) == 6
+    assert catch_up(gallery, changes) == 0
+    expected = make_gallery(40, sequence=12)
+    catch_up(expected, changes)
+    assert_same_rows(gallery, expected)
+    assert gallery.sequence == 18
+    assert len(gallery.encodings) >= 44
+    [[match]] = gallery.match(changes[2]["encoding"])
+    assert (match.person_id, match.face_id) == (20, 100)
+
+    # The snapshot file itself is never written
+    assert_same_rows(open_snapshot(path), original)
+
+def test_empty_gallery_without_headroom_round_trips(tmp_path):
+    path = str(tmp_path / "gallery.snap")
+    save_snapshot(FaceGallery(), path, headroom=0)
+
+    gallery = open_snapshot(path)
+    assert len(gallery) == 0
+    assert gallery.match(np.zeros(128)) == [[]]
+    gallery.add(1, 1, np.ones(128))
+    gallery.add(2, 2, np.zeros(128))
+    [[match]] = gallery.match(np.ones(128))
+    assert (match.person_id, match.face_id) == (1, 1)
+
+def test_snapshots_without_a_spare_row_still_open(tmp_path):
+    path = tmp_path / "gallery.snap"
+    path.write_bytes(HEADER.pack(MAGIC, VERSION, 0, 128, 0, 0, 5).ljust(64, b"\0"))
+
+    gallery = open_snapshot(str(path))
+    assert (len(gallery), gallery.sequence) == (0, 5)
+    gallery.add(1, 1, np.ones(128))
+    assert len(gallery) == 1
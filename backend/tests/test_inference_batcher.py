@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import inference_batcher
+from face_gallery import FaceGallery
+from inference_batcher import MicroBatcher
+
+async def wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        await asyncio.sleep(0.001)
+
+def gated_extract(gate: threading.Event):
+    def extract(jpeg: bytes) -> dict:
+        gate.wait(5)
+        return {"boxes": [], "encodings": np.zeros((0, 128), dtype=np.float32)}
+    return extract
+
+@pytest.mark.parametrize("workers, max_batch", [
+    (1, 1),  # Later frames wait in the queue for a free worker
+    (2, 3),  # Later frames wait in a batch that is still being collected
+])
+def test_stop_fails_waiting_frames_and_finishes_running_batches(workers, max_batch):
+    async def scenario():
+        gate = threading.Event()
+        executor = ThreadPoolExecutor(workers)
+        batcher = await MicroBatcher(
+            FaceGallery(),
+            max_batch=max_batch,
+            max_wait=10.0,
+            workers=workers,
+            executor=executor,
+            extract=gated_extract(gate)
+        ).start()
+
+        running = asyncio.create_task(batcher.recognize(b"first"))
+        await wait_for(lambda: batcher.inflight == 1)
+        waiting = [asyncio.create_task(batcher.recognize(b"next")) for _ in range(2)]
+        await wait_for(lambda: batcher.queue.qsize() + len(batcher.collecting) == 2)
+
+        stopping = asyncio.create_task(batcher.stop())
+        results = await asyncio.wait_for(asyncio.gather(*waiting, return_exceptions=True), 1.0)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # The batch in the pool is still running, and stop waits for it
+        assert not stopping.done()
+
+        gate.set()
+        await asyncio.wait_for(stopping, 5.0)
+        assert running.done() and await running == []
+        assert not batcher.batch_tasks
+        with pytest.raises(RuntimeError):
+            await batcher.recognize(b"late")
+        executor.shutdown()
+
+    asyncio.run(scenario())
+
+class SlowShutdownPool(ThreadPoolExecutor):
+    """Pool whose shutdown takes a while, like a process pool waiting for its workers to exit"""
+
+    def shutdown(self, wait=True, **kwargs):
+        time.sleep(0.1)
+        super().shutdown(wait=wait, **kwargs)
+
+def test_stop_shuts_down_own_pool_without_blocking_the_loop(monkeypatch):
+    monkeypatch.setattr(inference_batcher, "ProcessPoolExecutor", SlowShutdownPool)
+
+    async def scenario():
+        batcher = await MicroBatcher(FaceGallery(), workers=1).start()
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0)
+        before = ticks
+        await batcher.stop()
+        ticker.cancel()
+        assert batcher.executor is None
+        assert ticks - before > 10
+
+    asyncio.run(scenario())
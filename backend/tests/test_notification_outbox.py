@@ -0,0 +1,99 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from notification_outbox import NotificationOutbox, RetryPolicy
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Queues ten notifications, leases four of them and waits to be killed
+CHILD = """
+import sys
+from notification_outbox import NotificationOutbox
+
+outbox = NotificationOutbox(sys.argv[1], ["email"]).start()
+for sequence in range(10):
+    outbox.put("email", {"sequence": sequence, "queued_at": 0.0}, priority="high" if sequence == 9 else "normal")
+outbox.flush()
+leased = outbox.lease("email", 4)
+print(" ".join(str(entry.notification["sequence"]) for entry in leased), flush=True)
+sys.stdin.read()
+"""
+
+def test_notifications_survive_a_crash_mid_lease(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    process = subprocess.Popen(
+        [sys.executable, "-c", CHILD, path],
+        cwd=BACKEND_DIR,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    try:
+        leased = [int(sequence) for sequence in process.stdout.readline().split()]
+    finally:
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+    assert leased == [9, 0, 1, 2]
+
+    retry = {"email": RetryPolicy(base=0.01, maximum=0.01, max_attempts=3)}
+    outbox = NotificationOutbox(path, ["email"], retry=retry).start()
+    try:
+        assert outbox.resumed == 10
+        # Leases of the killed process are cleared, so its rows are handed out again
+        entries = outbox.lease("email", 20)
+        assert [entry.notification["sequence"] for entry in entries] == [9] + list(range(9))
+
+        poison = entries[0]
+        for entry in entries[1:]:
+            outbox.ack(entry)
+        for attempt in range(1, 4):
+            assert outbox.fail(poison, "Injected failure") == (attempt == 3)
+            if attempt < 3:
+                [poison] = outbox.lease("email", 20)
+                assert poison.attempts == attempt
+
+        assert len(outbox) == 0
+        [dead] = outbox.get_dead_letters("email")
+        assert dead["notification"]["sequence"] == 9
+        assert dead["attempts"] == 3
+        assert dead["error"] == "Injected failure"
+        assert outbox.get_stats()["dead_lettered"] == 1
+    finally:
+        outbox.stop()
+        outbox.close()
+
+def test_unacknowledged_rows_are_sent_again_after_reopening(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    outbox = NotificationOutbox(path, ["email"]).start()
+    outbox.put("email", {"sequence": 1, "queued_at": 0.0})
+    outbox.flush()
+    [entry] = outbox.lease("email")
+    outbox.stop()
+    outbox.close()
+
+    reopened = NotificationOutbox(path, ["email"]).start()
+    try:
+        [again] = reopened.lease("email")
+        assert again.id == entry.id and again.attempts == 0
+    finally:
+        reopened.stop()
+        reopened.close()
+
+def test_lease_returns_nothing_once_closed(tmp_path):
+    outbox = NotificationOutbox(str(tmp_path / "outbox.db"), ["email"]).start()
+    results = []
+    worker = threading.Thread(target=lambda: results.append(outbox.lease("email")))
+    worker.start()
+    time.sleep(0.05)
+
+    # A worker that is still waiting when the database is closed must not query it
+    outbox.close()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert results == [[]]
+    assert outbox.lease("email") == []
+    outbox.stop()
@@ -0,0 +1,71 @@
+import pytest
+
+from rate_controller import RateController
+
+START = 1000.0
+
+def simulate(
+    controller: RateController,
+    cameras: int,
+    active: set,
+    duration: float,
+    start: float = START,
+    latency: float = 0.1,
+    status=200,
+    check=None
+):
+    """
+    Upload from every camera at the interval the controller gives it, in simulated time
+
+    Cameras in ``active`` get a detection with every upload. ``check`` is
+    called after every upload.
+    """
+    for camera_id in range(cameras):
+        controller.add_camera(camera_id)
+    next_upload = {camera_id: start for camera_id in range(cameras)}
+    while True:
+        camera_id = min(next_upload, key=next_upload.get)
+        now = next_upload[camera_id]
+        if now >= start + duration:
+            return
+        interval = controller.record(camera_id, latency, status, detections=int(camera_id in active), now=now)
+        if check is not None:
+            check()
+        next_upload[camera_id] = now + interval
+
+def test_total_rate_stays_within_the_budget():
+    controller = RateController(budget_fps=8.0)
+
+    def check():
+        assert controller.total_fps() <= 8.0 + 1e-9
+
+    # 20 cameras at the base interval would take 20 fps, the active ones alone want 16
+    simulate(controller, 20, active={0, 1, 2, 3}, duration=120.0, check=check)
+
+    # Idle cameras are at the floor, the active ones share what is left
+    idle = [controller.interval_for(camera_id) for camera_id in range(4, 20)]
+    assert idle == pytest.approx([controller.max_interval] * 16)
+    spare = (8.0 - 16 / controller.max_interval) / 4
+    for camera_id in range(4):
+        assert 1.0 / controller.interval_for(camera_id) == pytest.approx(spare, rel=0.01)
+
+def test_rates_converge_to_activity():
+    controller = RateController()
+    simulate(controller, 6, active={0, 1}, duration=120.0)
+    intervals = [controller.interval_for(camera_id) for camera_id in range(6)]
+
+    # Another minute changes nothing
+    simulate(controller, 6, active={0, 1}, duration=60.0, start=START + 120.0)
+    assert [controller.interval_for(camera_id) for camera_id in range(6)] == intervals
+    assert intervals[:2] == pytest.approx([controller.min_interval] * 2)
+    assert intervals[2:] == pytest.approx([controller.max_interval] * 4)
+
+def test_throttled_cameras_back_off_and_recover():
+    controller = RateController()
+    simulate(controller, 3, active={0, 1, 2}, duration=30.0, status=429)
+    assert all(controller.interval_for(camera_id) == controller.max_interval for camera_id in range(3))
+    assert controller.get_stats(0)["throttled"] > 0
+
+    # Once the backend keeps up, every camera is back at the fastest rate
+    simulate(controller, 3, active={0, 1, 2}, duration=60.0, start=START + 30.0)
+    assert all(controller.interval_for(camera_id) == pytest.approx(controller.min_interval) for camera_id in range(3))
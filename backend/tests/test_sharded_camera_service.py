@@ -0,0 +1,78 @@
+import functools
+import time
+
+import pytest
+
+from benchmarks.stub_backend import StubBackend
+from benchmarks.synthetic_camera import open_synthetic_capture
+from frame_ring import HEADER_BYTES, FrameRing
+from sharded_camera_service import ShardedCameraService
+
+CAMERA = {"id": 901, "name": "Lobby", "url": "rtsp://synthetic/901"}
+
+def wait_for(predicate, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.05)
+
+def test_ring_is_sized_from_the_stream_and_capped():
+    frame_bytes = 640 * 360 * 3
+    ring = FrameRing.for_stream(640, 360, 4)
+    assert (ring.slots, ring.slot_bytes) == (4, frame_bytes)
+    ring.close()
+
+    ring = FrameRing.for_stream(640, 360, 4, max_bytes=2 * (frame_bytes + HEADER_BYTES) + 100)
+    assert (ring.slots, ring.slot_bytes) == (2, frame_bytes)
+    ring.close()
+
+    # Too small for one frame: one smaller slot, and bigger payloads are refused
+    ring = FrameRing.for_stream(640, 360, 4, max_bytes=100_000)
+    assert ring.slots == 1
+    assert ring.slots * (ring.slot_bytes + HEADER_BYTES) <= 100_000
+    assert ring.write(1, [bytes(60_000), bytes(60_000)]) is None
+    slot, seq = ring.write(1, [b"abc", b"de"], timestamp=5.0)
+    assert ring.read(slot, seq) == (1, 5.0, b"abcde")
+    ring.write(1, [b"f"])
+    assert ring.read(slot, seq) is None
+    ring.close()
+
+@pytest.fixture
+def backend():
+    backend = StubBackend([CAMERA]).start()
+    yield backend
+    backend.stop()
+
+def test_workers_run_the_pipeline_and_adapt_to_slow_uploads(backend):
+    service = ShardedCameraService(
+        backend.url,
+        "test",
+        workers=1,
+        ring_memory=4 * 1024 * 1024,
+        capture_factory=functools.partial(open_synthetic_capture, width=320, height=240, fps=25.0),
+        min_jpeg_quality=50
+    )
+    service.set_frame_interval(0.1)
+    try:
+        service.start_camera(901)
+        wait_for(lambda: backend.frames >= 5)
+
+        # Encoded in the worker, reported to the coordinator with every frame
+        stats = service.get_encode_stats(901)
+        assert stats["frames"] >= 5
+        assert stats["output_size"] == (320, 240)
+        assert service.get_encode_stats()[stats["profile"]]["cameras"] == 1
+        series = service.camera_metrics[901]
+        assert sum(series.encode.counts) >= 5
+        assert sum(series.payload.counts) >= 5
+        [shard] = service.get_shard_stats()
+        assert shard["published"] >= 5 and shard["cameras"] == [901]
+
+        # Upload latency reaches the encoder in the worker, which lowers the quality
+        backend.latency = 0.6
+        wait_for(lambda: service.get_encode_stats(901)["quality"] < 95)
+        assert series.quality.value < 95
+    finally:
+        service.stop_camera(901)
+        service.shutdown()
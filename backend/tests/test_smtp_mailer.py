@@ -0,0 +1,98 @@
+from email.message import EmailMessage
+
+import pytest
+
+from benchmarks.stub_smtp import StubSMTPServer
+from notification_service import NotificationService
+from smtp_mailer import SMTPMailer
+
+SETTINGS = {
+    "email_notifications": True,
+    "email_address": "security@example.com",
+    "unknown_alerts": True,
+    "system_alerts": False,
+}
+
+class StubSettingsService(NotificationService):
+    def _load_settings(self) -> dict:
+        return dict(SETTINGS)
+
+@pytest.fixture
+def server():
+    server = StubSMTPServer().start()
+    yield server
+    server.stop()
+
+def make_mailer(server: StubSMTPServer) -> SMTPMailer:
+    return SMTPMailer("127.0.0.1", server.port, starttls=False)
+
+def make_message(subject: str) -> EmailMessage:
+    message = EmailMessage()
+    message["To"] = "security@example.com"
+    message["Subject"] = subject
+    message.set_content("Unknown visitor detected")
+    return message
+
+def send_alerts(server: StubSMTPServer, alert_window: float) -> dict:
+    """Raise 10 unknown-visitor alerts at each of 3 entrances, returning what the server received"""
+    service = StubSettingsService(
+        "http://127.0.0.1:9",
+        "test",
+        alert_window=alert_window,
+        smtp={"host": "127.0.0.1", "port": server.port, "starttls": False}
+    )
+    service.start()
+    for index in range(30):
+        service.notify_unknown_visitor({"location": f"Entrance {index % 3 + 1}"})
+    service.stop(timeout=30.0)
+    return server.get_stats()
+
+def test_coalescing_sends_fewer_emails_over_reused_connections():
+    per_alert = StubSMTPServer().start()
+    coalesced = StubSMTPServer().start()
+    try:
+        before = send_alerts(per_alert, alert_window=0.0)
+        after = send_alerts(coalesced, alert_window=60.0)
+    finally:
+        per_alert.stop()
+        coalesced.stop()
+
+    assert before["messages"] == 30
+    # One alert at once and one digest of the other nine, per entrance
+    assert after["messages"] == 6
+    # Every email worker keeps one connection open
+    workers = NotificationService.DEFAULT_WORKERS["email"]
+    assert 1 <= before["connections"] <= workers
+    assert 1 <= after["connections"] <= workers
+
+def test_reconnects_after_the_server_drops_the_connection(server):
+    mailer = make_mailer(server)
+    mailer.send(make_message("First"))
+    mailer.send(make_message("Second"))
+    assert server.get_stats()["connections"] == 1
+
+    server.drop_connections()
+    mailer.send(make_message("Third"))
+    assert server.get_stats()["messages"] == 3
+    assert server.get_stats()["connections"] == 2
+    assert mailer.get_stats()["reconnects"] == 1
+    assert mailer.get_stats()["failures"] == 0
+    mailer.close()
+
+@pytest.mark.parametrize("pipelining", [True, False])
+def test_421_reply_reconnects_instead_of_refusing(pipelining):
+    server = StubSMTPServer(pipelining=pipelining).start()
+    try:
+        mailer = make_mailer(server)
+        mailer.send(make_message("First"))
+        # The server shuts down: it answers MAIL FROM with 421 and hangs up
+        server.close_next_mail = True
+        mailer.send(make_message("Second"))
+
+        stats = server.get_stats()
+        assert (stats["messages"], stats["connections"]) == (2, 2)
+        assert mailer.get_stats()["reconnects"] == 1
+        assert mailer.get_stats()["failures"] == 0
+        mailer.close()
+    finally:
+        server.stop()
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import threading
+import time
+from typing import List
+
+import pytest
+import websockets
+
+from websocket_client import WebSocketClient
+
+class EventServer:
+    """Local websockets server that records what each connection sent"""
+
+    def __init__(self):
+        self.connections = set()
+        self.opened = 0
+        self.messages: List[List[dict]] = []
+        self.server = None
+        self.url = None
+
+    async def __aenter__(self):
+        self.server = await websockets.serve(self._handler, "127.0.0.1", 0)
+        self.url = f"ws://127.0.0.1:{next(iter(self.server.sockets)).getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handler(self, connection, *args):
+        self.connections.add(connection)
+        self.opened += 1
+        messages = []
+        self.messages.append(messages)
+        try:
+            async for message in connection:
+                messages.append(json.loads(message))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(connection)
+
+    def broadcast(self, event: dict):
+        websockets.broadcast(self.connections, json.dumps(event))
+
+    async def drop(self):
+        for connection in list(self.connections):
+            await connection.close(code=1012, reason="Restart")
+
+async def wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        await asyncio.sleep(0.01)
+
+async def start(client: WebSocketClient) -> asyncio.Task:
+    assert await client.connect()
+    return asyncio.create_task(client.listen())
+
+async def stop(client: WebSocketClient, listener: asyncio.Task):
+    await client.disconnect()
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+
+def test_reconnects_and_sends_subscriptions_again():
+    async def scenario():
+        async with EventServer() as server:
+            client = WebSocketClient(server.url, backoff_base=0.05, backoff_max=0.2)
+            reconnected = []
+            client.register_reconnect_callback(lambda: reconnected.append(True))
+            listener = await start(client)
+            await client.subscribe({"type": "subscribe", "topic": "detections"})
+            await wait_for(lambda: server.messages and server.messages[0])
+
+            for drop in range(1, 3):
+                await server.drop()
+                await wait_for(lambda: client.reconnects == drop and len(server.messages) == drop + 1 and server.messages[drop])
+            await wait_for(lambda: len(reconnected) == 2)
+
+            received = []
+            client.register_callback("detection", received.append)
+            server.broadcast({"type": "detection", "data": {"sequence": 1}})
+            await wait_for(lambda: received)
+            await stop(client, listener)
+
+        assert server.opened == 3
+        for messages in server.messages:
+            assert messages == [{"type": "subscribe", "topic": "detections"}]
+        assert client.get_stats()["reconnects"] == 2
+
+    asyncio.run(scenario())
+
+def test_blocking_callback_does_not_hold_up_recv():
+    async def scenario():
+        async with EventServer() as server:
+            client = WebSocketClient(server.url)
+            arrivals = {}
+            handle_message = client._handle_message
+
+            async def timed_handle_message(message):
+                data = json.loads(message)
+                arrivals[data["data"]["sequence"]] = time.time() - data["data"]["sent_at"]
+                await handle_message(message)
+
+            client._handle_message = timed_handle_message
+            client.register_callback("camera_status", lambda event: time.sleep(0.3))
+            client.register_callback("detection", lambda event: None)
+            listener = await start(client)
+            await wait_for(lambda: server.connections)
+
+            server.broadcast({"type": "camera_status", "data": {"sequence": 0, "sent_at": time.time()}})
+            for sequence in range(1, 51):
+                await asyncio.sleep(0.005)
+                server.broadcast({"type": "detection", "data": {"sequence": sequence, "sent_at": time.time()}})
+            await wait_for(lambda: len(arrivals) == 51)
+            # All detections were read while the slow callback was still running
+            assert client.dispatched == 0
+            await wait_for(lambda: client.dispatched == 51)
+            await stop(client, listener)
+
+        assert max(arrivals.values()) < 0.05
+
+    asyncio.run(scenario())
+
+def test_callbacks_see_messages_in_order():
+    async def scenario():
+        async with EventServer() as server:
+            client = WebSocketClient(server.url)
+            sequences = []
+
+            def record(event):
+                # Later messages would overtake this one with several workers
+                if event["data"]["sequence"] % 7 == 0:
+                    time.sleep(0.01)
+                sequences.append(event["data"]["sequence"])
+
+            client.register_callback("detection", record)
+            listener = await start(client)
+            await wait_for(lambda: server.connections)
+            for sequence in range(100):
+                server.broadcast({"type": "detection", "data": {"sequence": sequence}})
+            await wait_for(lambda: len(sequences) == 100)
+            await stop(client, listener)
+
+        assert sequences == list(range(100))
+
+    asyncio.run(scenario())
+
+@pytest.mark.parametrize("overflow, expected, dropped", [
+    ("drop_oldest", [0, 8, 9], 7),
+    ("drop_newest", [0, 1, 2], 7),
+    ("block", list(range(10)), 0),
+])
+def test_overflow_policies(overflow, expected, dropped):
+    async def scenario():
+        async with EventServer() as server:
+            client = WebSocketClient(server.url, queue_size=2, overflow=overflow)
+            release = threading.Event()
+            sequences = []
+
+            def record(event):
+                release.wait(5)
+                sequences.append(event["data"]["sequence"])
+
+            client.register_callback("detection", record)
+            listener = await start(client)
+            await wait_for(lambda: server.connections)
+
+            # The first message occupies the worker until it is released
+            server.broadcast({"type": "detection", "data": {"sequence": 0}})
+            await wait_for(lambda: client.get_stats()["received"] == 1 and client.queue.qsize() == 0)
+            for sequence in range(1, 10):
+                server.broadcast({"type": "detection", "data": {"sequence": sequence}})
+            if overflow == "block":
+                # Receiving stops with a full queue instead of dropping
+                await wait_for(lambda: client.get_stats()["queued"] == 2)
+                await asyncio.sleep(0.1)
+                assert client.get_stats()["received"] == 4
+            else:
+                await wait_for(lambda: client.get_stats()["received"] == 10)
+            release.set()
+            await wait_for(lambda: len(sequences) == len(expected))
+            await asyncio.sleep(0.05)
+            await stop(client, listener)
+
+        assert sequences == expected
+        assert client.get_stats()["dropped"] == dropped
+
+    asyncio.run(scenario())
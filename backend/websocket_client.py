@@ -1,8 +1,13 @@
 import asyncio
+import inspect
 import json
 import logging
+import random
 import websockets
-from typing import Callable, Dict, List, Optional, Any
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Set, Any
+
+from metrics import RateLimitedLog
 
 # Configure logging
 logging.basicConfig(
@@ -10,41 +15,130 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger("websocket_client")
+log_limiter = RateLimitedLog(logger)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
 
 class WebSocketClient:
-    def __init__(self, websocket_url: str):
+    def __init__(
+        self,
+        websocket_url: str,
+        queue_size: int = 1000,
+        workers: int = 1,
+        overflow: str = "drop_oldest",
+        reconnect: bool = True,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        executor: Optional[Executor] = None
+    ):
         """
         Initialize the WebSocket client
         
+        The receive loop only parses messages and puts them on a bounded
+        dispatch queue. A worker task takes them off and runs the callbacks,
+        so a slow callback never holds up ``recv()``. Coroutine callbacks are
+        awaited on the event loop, plain functions run in ``executor``. With
+        the default single worker, callbacks see messages in the order they
+        arrived. More workers handle messages concurrently, so only use them
+        when the callbacks do not depend on the order of events.
+        
+        When the callbacks fall behind and the queue is full, ``overflow``
+        decides what happens to a new message:
+        - "drop_oldest": drop the oldest queued message to make room
+        - "drop_newest": drop the new message
+        - "block": stop receiving until there is room, which pushes back on
+          the server
+        
+        If the connection is lost while listening, the client reconnects
+        after a jittered exponential backoff between ``backoff_base`` and
+        ``backoff_max`` seconds, sends every ``subscribe`` message again and
+        calls the reconnect callbacks. Events sent while it was disconnected
+        are lost, so use a reconnect callback to reload state.
+        
         Args:
             websocket_url: URL of the WebSocket server
+            queue_size: Most received messages waiting for their callbacks
+            workers: Tasks running callbacks at once, 1 keeps messages in order
+            overflow: What a full dispatch queue does with a new message, see above
+            reconnect: Reconnect when the connection is lost
+            backoff_base: Seconds before the first reconnect attempt
+            backoff_max: Longest wait between reconnect attempts
+            executor: Executor for plain-function callbacks, None uses the
+                event loop's default thread pool
         """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}, expected one of {', '.join(OVERFLOW_POLICIES)}")
         self.websocket_url = websocket_url
         self.websocket = None
         self.running = False
         self.callbacks: Dict[str, List[Callable]] = {}
+        self.reconnect_callbacks: List[Callable] = []
+        self.subscriptions: List[dict] = []
+        self.queue_size = queue_size
+        self.workers = workers
+        self.overflow = overflow
+        self.reconnect = reconnect
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.executor = executor
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker_tasks: List[asyncio.Task] = []
+        self.callback_tasks: Set[asyncio.Task] = set()  # Running reconnect callbacks
+        
+        self.received = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.callback_errors = 0
+        self.reconnects = 0
     
-    async def connect(self):
-        """Connect to the WebSocket server"""
+    async def _open(self) -> bool:
+        """Open the connection and send the subscriptions"""
         try:
             self.websocket = await websockets.connect(self.websocket_url)
-            self.running = True
-            logger.info(f"Connected to WebSocket server at {self.websocket_url}")
-            return True
         except Exception as e:
             logger.error(f"Failed to connect to WebSocket server: {str(e)}")
             return False
+        logger.info(f"Connected to WebSocket server at {self.websocket_url}")
+        for message in self.subscriptions:
+            await self.send(message)
+        return True
+    
+    async def connect(self):
+        """Connect to the WebSocket server"""
+        if not await self._open():
+            return False
+        self.running = True
+        self._start_workers()
+        return True
+    
+    def _start_workers(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.worker_tasks = [task for task in self.worker_tasks if not task.done()]
+        while len(self.worker_tasks) < self.workers:
+            self.worker_tasks.append(asyncio.create_task(self._dispatch_loop()))
     
     async def disconnect(self):
-        """Disconnect from the WebSocket server"""
+        """Disconnect from the WebSocket server and stop reconnecting"""
+        self.running = False
+        for task in self.worker_tasks:
+            task.cancel()
+        self.worker_tasks = []
+        self.queue = None
         if self.websocket:
             await self.websocket.close()
             self.websocket = None
-            self.running = False
             logger.info("Disconnected from WebSocket server")
     
+    async def run(self):
+        """Connect, retrying with backoff, and listen until ``disconnect``"""
+        self.running = True
+        if not await self.connect() and not await self._reconnect():
+            return
+        await self.listen()
+    
     async def listen(self):
-        """Listen for messages from the WebSocket server"""
+        """Listen for messages from the WebSocket server, reconnecting if the connection is lost"""
         if not self.websocket:
             logger.error("Not connected to WebSocket server")
             return
@@ -53,15 +147,54 @@ class WebSocketClient:
             while self.running:
                 try:
                     message = await self.websocket.recv()
-                    await self._handle_message(message)
                 except websockets.exceptions.ConnectionClosed:
                     logger.warning("WebSocket connection closed")
-                    break
+                    if not await self._reconnect():
+                        break
+                    continue
                 except Exception as e:
                     logger.error(f"Error receiving message: {str(e)}")
+                    if not await self._reconnect():
+                        break
+                    continue
+                await self._handle_message(message)
         finally:
             await self.disconnect()
     
+    async def _reconnect(self) -> bool:
+        """
+        Replace a lost connection, waiting longer after every failed attempt
+        
+        Returns:
+            True once reconnected, False if reconnecting is off or the client
+            was disconnected meanwhile
+        """
+        if not (self.reconnect and self.running):
+            return False
+        if self.websocket is not None:
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+            self.websocket = None
+        
+        attempt = 0
+        while self.running:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+            await asyncio.sleep(delay)
+            if not self.running:
+                return False
+            if await self._open():
+                self.reconnects += 1
+                self._start_workers()
+                for callback in self.reconnect_callbacks:
+                    task = asyncio.create_task(self._call(callback, (), "reconnect"))
+                    self.callback_tasks.add(task)
+                    task.add_done_callback(self.callback_tasks.discard)
+                return True
+            attempt += 1
+        return False
+    
     async def _handle_message(self, message: str):
         """
         Handle a message from the WebSocket server
@@ -71,29 +204,59 @@ class WebSocketClient:
         """
         try:
             data = json.loads(message)
-            
-            # Determine message type
-            message_type = data.get("type", "unknown")
-            
-            # Call registered callbacks for this message type
-            if message_type in self.callbacks:
-                for callback in self.callbacks[message_type]:
-                    try:
-                        callback(data)
-                    except Exception as e:
-                        logger.error(f"Error in callback for {message_type}: {str(e)}")
-            
-            # Call general callbacks
-            if "all" in self.callbacks:
-                for callback in self.callbacks["all"]:
-                    try:
-                        callback(data)
-                    except Exception as e:
-                        logger.error(f"Error in general callback: {str(e)}")
         except json.JSONDecodeError:
             logger.warning(f"Received non-JSON message: {message}")
+            return
+        
+        # Determine message type
+        message_type = data.get("type", "unknown") if isinstance(data, dict) else "unknown"
+        self.received += 1
+        if message_type not in self.callbacks and "all" not in self.callbacks:
+            return
+        
+        item = (message_type, data)
+        if self.overflow == "block":
+            await self.queue.put(item)
+            return
+        try:
+            self.queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            pass
+        self.dropped += 1
+        if self.overflow == "drop_oldest":
+            dropped_type = self.queue.get_nowait()[0]
+            self.queue.put_nowait(item)
+        else:
+            dropped_type = message_type
+        log_limiter.warning(("dropped", dropped_type), f"Callbacks are behind, dropped a {dropped_type} message")
+    
+    async def _dispatch_loop(self):
+        """Run the callbacks of queued messages"""
+        while True:
+            message_type, data = await self.queue.get()
+            
+            # Call registered callbacks for this message type, then general callbacks
+            for callback in self.callbacks.get(message_type, []):
+                await self._call(callback, (data,), message_type)
+            for callback in self.callbacks.get("all", []):
+                await self._call(callback, (data,), "all")
+            self.dispatched += 1
+    
+    async def _call(self, callback: Callable, args: tuple, label: str):
+        try:
+            if inspect.iscoroutinefunction(callback):
+                await callback(*args)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, callback, *args)
+                if inspect.isawaitable(result):
+                    await result
         except Exception as e:
-            logger.error(f"Error handling message: {str(e)}")
+            self.callback_errors += 1
+            if label == "all":
+                logger.error(f"Error in general callback: {str(e)}")
+            else:
+                logger.error(f"Error in callback for {label}: {str(e)}")
     
     def register_callback(self, message_type: str, callback: Callable[[Dict[str, Any]], None]):
         """
@@ -101,7 +264,8 @@ class WebSocketClient:
         
         Args:
             message_type: Type of message to listen for
-            callback: Function to call when a message of this type is received
+            callback: Function or coroutine function to call when a message
+                of this type is received
         """
         if message_type not in self.callbacks:
             self.callbacks[message_type] = []
@@ -109,6 +273,26 @@ class WebSocketClient:
         self.callbacks[message_type].append(callback)
         logger.info(f"Registered callback for message type: {message_type}")
     
+    def register_reconnect_callback(self, callback: Callable[[], None]):
+        """
+        Register a callback to run after every reconnect
+        
+        Args:
+            callback: Function or coroutine function without arguments
+        """
+        self.reconnect_callbacks.append(callback)
+    
+    async def subscribe(self, data: dict):
+        """
+        Send a message now and again after every reconnect, e.g. a subscription request
+        
+        Args:
+            data: Data to send
+        """
+        self.subscriptions.append(data)
+        if self.websocket:
+            await self.send(data)
+    
     async def send(self, data: dict):
         """
         Send a message to the WebSocket server
@@ -126,6 +310,18 @@ class WebSocketClient:
         except Exception as e:
             logger.error(f"Error sending message: {str(e)}")
             return False
+    
+    def get_stats(self) -> dict:
+        """Get message, drop and reconnect counters"""
+        return {
+            "connected": self.websocket is not None,
+            "received": self.received,
+            "dispatched": self.dispatched,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "dropped": self.dropped,
+            "callback_errors": self.callback_errors,
+            "reconnects": self.reconnects,
+        }
 
 # Example usage
 async def example():
@@ -142,10 +338,8 @@ async def example():
     client.register_callback("detection", on_detection)
     client.register_callback("all", on_all_messages)
     
-    # Connect to server
-    if await client.connect():
-        # Start listening for messages
-        await client.listen()
+    # Connect to server and listen for messages, reconnecting as needed
+    await client.run()
 
 if __name__ == "__main__":
     asyncio.run(example())